@@ -0,0 +1,143 @@
+"""AgentRunLoop 回合开销基准测试
+
+通过 ReplayProvider 离线回放录制的多回合会话，测量每个回合中 LLM 以外的开销
+（上下文管理、advisor、工具执行、会话持久化等）。
+
+用法:
+    python -m benchmarks.bench_run_loop                       # 使用合成会话
+    python -m benchmarks.bench_run_loop --cassette rec.jsonl  # 回放 EFLYCODE_RECORD_LLM 录制的会话
+    python -m benchmarks.bench_run_loop --time-scale 1.0      # 按录制速度模拟首 token 延迟和 chunk 间隔
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import build_cassette, build_workspace
+from eflycode.core.agent.base import BaseAgent
+from eflycode.core.agent.run_loop import AgentRunLoop
+from eflycode.core.llm.providers.recording import ReplayProvider, load_cassette
+from eflycode.core.tool.file_system_tool import FILE_SYSTEM_TOOL_GROUP
+
+# 基准测试配置常量
+BENCH_DEFAULT_REPEAT = 5
+BENCH_WARMUP = 1
+
+
+def split_turns(interactions: List[Dict[str, Any]]) -> List[str]:
+    """从录制记录中提取每个回合的用户输入
+
+    请求的最后一条消息是用户消息时，该请求是一个新回合的第一次调用
+    """
+    prompts = []
+    for interaction in interactions:
+        messages = interaction.get("request", {}).get("messages", [])
+        if messages and messages[-1].get("role") == "user":
+            prompts.append(messages[-1].get("content") or "")
+    return prompts
+
+
+def run_session(interactions: List[Dict[str, Any]], prompts: List[str], time_scale: float, stream: bool) -> List[Dict[str, float]]:
+    """回放一次完整会话，返回每个回合的耗时"""
+    provider = ReplayProvider(interactions, time_scale=time_scale)
+    agent = BaseAgent(model="replay", provider=provider, tool_groups=[FILE_SYSTEM_TOOL_GROUP])
+    run_loop = AgentRunLoop(agent)
+    results = []
+    try:
+        for prompt in prompts:
+            emulated_before = provider.emulated_ms
+            start = time.perf_counter()
+            run_loop.run(prompt, stream=stream)
+            wall_ms = (time.perf_counter() - start) * 1000
+            emulated_ms = provider.emulated_ms - emulated_before
+            results.append({"wall_ms": wall_ms, "overhead_ms": wall_ms - emulated_ms})
+    finally:
+        agent.shutdown()
+    return results
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(runs: List[List[Dict[str, float]]]) -> Dict[str, Any]:
+    """汇总多次回放的结果"""
+    turns = []
+    for turn_index in range(len(runs[0])):
+        overhead = [run[turn_index]["overhead_ms"] for run in runs]
+        wall = [run[turn_index]["wall_ms"] for run in runs]
+        turns.append(
+            {
+                "turn": turn_index + 1,
+                "wall_ms_median": round(statistics.median(wall), 3),
+                "overhead_ms_median": round(statistics.median(overhead), 3),
+                "overhead_ms_p95": round(_percentile(overhead, 95), 3),
+                "overhead_ms_min": round(min(overhead), 3),
+            }
+        )
+    totals = [sum(turn["overhead_ms"] for turn in run) for run in runs]
+    return {
+        "repeat": len(runs),
+        "turns": turns,
+        "total_overhead_ms_median": round(statistics.median(totals), 3),
+        "total_overhead_ms_min": round(min(totals), 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="回放录制的会话，测量 AgentRunLoop 每个回合的非 LLM 开销")
+    parser.add_argument("--cassette", type=Path, help="录制文件路径，不提供时使用合成会话")
+    parser.add_argument("--repeat", type=int, default=BENCH_DEFAULT_REPEAT, help="回放次数")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="LLM 延迟模拟的时间缩放系数，0 表示不模拟")
+    parser.add_argument("--no-stream", action="store_true", help="使用非流式调用")
+    parser.add_argument("--turns", type=int, default=3, help="合成会话的回合数")
+    parser.add_argument("--tool-rounds", type=int, default=4, help="合成会话每个回合的工具调用轮数")
+    parser.add_argument("-o", "--output", type=Path, help="将汇总结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    workspace = tempfile.mkdtemp(prefix="eflycode-bench-")
+    original_cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        if args.cassette:
+            interactions = load_cassette(Path(original_cwd, args.cassette))
+        else:
+            build_workspace(Path(workspace))
+            interactions = build_cassette(turns=args.turns, tool_rounds=args.tool_rounds)
+        prompts = split_turns(interactions)
+        if not prompts:
+            print("录制文件中没有找到用户回合", file=sys.stderr)
+            return 1
+
+        stream = not args.no_stream
+        for _ in range(BENCH_WARMUP):
+            run_session(interactions, prompts, args.time_scale, stream)
+        runs = [run_session(interactions, prompts, args.time_scale, stream) for _ in range(args.repeat)]
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    summary = summarize(runs)
+    for turn in summary["turns"]:
+        print(
+            f"turn {turn['turn']}: overhead median={turn['overhead_ms_median']:.1f}ms "
+            f"p95={turn['overhead_ms_p95']:.1f}ms min={turn['overhead_ms_min']:.1f}ms "
+            f"(wall median={turn['wall_ms_median']:.1f}ms)"
+        )
+    print(f"total overhead median={summary['total_overhead_ms_median']:.1f}ms min={summary['total_overhead_ms_min']:.1f}ms")
+    if args.output:
+        args.output.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""生成合成的工作区和录制记录
+
+没有真实录制文件时，基准测试使用这里生成的多回合会话：
+每个回合先进行若干轮只读工具调用（读取文件、搜索、列目录），最后返回文本回答
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from eflycode.core.llm.protocol import (
+    ChatCompletionChunk,
+    DeltaMessage,
+    DeltaToolCall,
+    DeltaToolCallFunction,
+    Usage,
+)
+from eflycode.core.llm.providers.recording import CASSETTE_VERSION
+
+# 合成数据配置常量
+SYNTHETIC_FILES = 20
+SYNTHETIC_FILE_LINES = 400
+SYNTHETIC_CHUNK_CHARS = 16  # 每个文本 chunk 的字符数
+SYNTHETIC_CHUNK_DELAY_MS = 15.0
+SYNTHETIC_TTFT_MS = 400.0
+
+
+def build_workspace(root: Path, files: int = SYNTHETIC_FILES, lines: int = SYNTHETIC_FILE_LINES) -> None:
+    """在 root 下创建合成的源码文件"""
+    source_dir = root / "src"
+    source_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(files):
+        body = "\n".join(f"def function_{i}_{j}(value):\n    return value * {j}  # TODO item {j}" for j in range(lines // 2))
+        (source_dir / f"module_{i}.py").write_text(body + "\n", encoding="utf-8")
+
+
+def build_cassette(turns: int = 3, tool_rounds: int = 4, answer_chars: int = 1200) -> List[Dict[str, Any]]:
+    """生成合成的多回合录制记录
+
+    Args:
+        turns: 用户回合数
+        tool_rounds: 每个回合中工具调用的轮数
+        answer_chars: 每个回合最终回答的字符数
+
+    Returns:
+        List[Dict[str, Any]]: 按顺序排列的流式调用记录
+    """
+    interactions = []
+    for turn in range(turns):
+        user_message = {"role": "user", "content": f"第 {turn + 1} 个问题：分析 src 目录中的 TODO"}
+        for round_index in range(tool_rounds):
+            module = (turn * tool_rounds + round_index) % SYNTHETIC_FILES
+            tool_calls = [
+                ("read_file", {"file_path": f"src/module_{module}.py"}),
+                ("search_file_content", {"pattern": f"TODO item {round_index}", "dir_path": "src"}),
+                ("list_directory", {"dir_path": "src"}),
+            ]
+            chunks = _tool_call_chunks(f"turn{turn}-round{round_index}", tool_calls)
+            interactions.append(_interaction(user_message if round_index == 0 else None, chunks))
+        answer = ("结论：TODO 分布在各个模块中。" * answer_chars)[:answer_chars]
+        interactions.append(_interaction(user_message if tool_rounds == 0 else None, _content_chunks(f"turn{turn}-answer", answer)))
+    return interactions
+
+
+def write_cassette(path: Path, interactions: List[Dict[str, Any]]) -> None:
+    """将录制记录写入 JSONL 文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        for interaction in interactions:
+            f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+
+
+def _interaction(user_message, chunks: List[ChatCompletionChunk]) -> Dict[str, Any]:
+    messages = [user_message] if user_message else []
+    delays = [SYNTHETIC_TTFT_MS] + [SYNTHETIC_CHUNK_DELAY_MS] * (len(chunks) - 1)
+    return {
+        "version": CASSETTE_VERSION,
+        "mode": "stream",
+        "key": "",
+        "request": {"model": "synthetic", "messages": messages},
+        "duration_ms": sum(delays),
+        "chunks": [
+            {"delay_ms": delay, "chunk": chunk.model_dump(mode="json", exclude_none=True)}
+            for delay, chunk in zip(delays, chunks)
+        ],
+    }
+
+
+def _chunk(completion_id: str, delta: DeltaMessage, finish_reason=None, usage=None) -> ChatCompletionChunk:
+    return ChatCompletionChunk(
+        id=completion_id,
+        object="chat.completion.chunk",
+        created=int(time.time()),
+        model="synthetic",
+        delta=delta,
+        finish_reason=finish_reason,
+        usage=usage,
+    )
+
+
+def _content_chunks(completion_id: str, content: str) -> List[ChatCompletionChunk]:
+    parts = [content[i:i + SYNTHETIC_CHUNK_CHARS] for i in range(0, len(content), SYNTHETIC_CHUNK_CHARS)]
+    chunks = [_chunk(completion_id, DeltaMessage(content=part)) for part in parts]
+    chunks[-1].finish_reason = "stop"
+    chunks[-1].usage = Usage(prompt_tokens=1000, completion_tokens=len(parts), total_tokens=1000 + len(parts))
+    return chunks
+
+
+def _tool_call_chunks(completion_id: str, tool_calls) -> List[ChatCompletionChunk]:
+    chunks = []
+    for index, (name, arguments) in enumerate(tool_calls):
+        text = json.dumps(arguments, ensure_ascii=False)
+        head, tail = text[: len(text) // 2], text[len(text) // 2:]
+        chunks.append(
+            _chunk(
+                completion_id,
+                DeltaMessage(
+                    tool_calls=[
+                        DeltaToolCall(
+                            index=index,
+                            id=f"{completion_id}-call{index}",
+                            type="function",
+                            function=DeltaToolCallFunction(name=name, arguments=head),
+                        )
+                    ]
+                ),
+            )
+        )
+        chunks.append(
+            _chunk(
+                completion_id,
+                DeltaMessage(tool_calls=[DeltaToolCall(index=index, function=DeltaToolCallFunction(arguments=tail))]),
+            )
+        )
+    chunks[-1].finish_reason = "tool_calls"
+    chunks[-1].usage = Usage(prompt_tokens=1000, completion_tokens=50, total_tokens=1050)
+    return chunks
@@ -10,6 +10,7 @@ import argparse
 import asyncio
 import sys
 
+from eflycode.cli.commands.batch import BATCH_DEFAULT_WORKERS, batch_command
 from eflycode.cli.commands.init import init_command
 from eflycode.cli.commands.mcp import mcp_add, mcp_list, mcp_remove
 from eflycode.cli.commands.restore import restore_command
@@ -86,7 +87,30 @@ def main() -> None:
     # resume 命令
     resume_parser = subparsers.add_parser("resume", help="恢复会话并继续对话")
     resume_parser.add_argument("session_id", nargs="?", help="会话 ID")
+    resume_parser.add_argument("--search", "-s", metavar="QUERY", help="按用户提问和助手回答的内容搜索会话")
     resume_parser.set_defaults(func=resume_command)
+
+    # batch 命令
+    batch_parser = subparsers.add_parser("batch", help="批量执行 JSONL 文件中的任务")
+    batch_parser.add_argument("tasks", help="任务文件路径，每行一个包含 prompt 字段的 JSON 对象")
+    batch_parser.add_argument(
+        "-o",
+        "--output",
+        help="结果输出文件路径（NDJSON），默认输出到标准输出",
+    )
+    batch_parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=BATCH_DEFAULT_WORKERS,
+        help=f"并发执行的任务数，默认为 {BATCH_DEFAULT_WORKERS}",
+    )
+    batch_parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="使用进程池代替线程池执行任务",
+    )
+    batch_parser.set_defaults(func=batch_command)
     
     # 解析参数
     args = parser.parse_args()
@@ -0,0 +1,217 @@
+"""批量执行任务命令
+
+从 JSONL 文件读取任务，在线程池或进程池中并发执行，
+每个任务使用独立的 Agent 和 Session，结果以 NDJSON 格式逐行输出
+"""
+
+import json
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+from eflycode.core.agent.base import BaseAgent, TaskStatistics
+from eflycode.core.agent.run_loop import AgentRunLoop
+from eflycode.core.utils.logger import logger
+
+# 批量执行配置常量
+BATCH_DEFAULT_WORKERS = 4
+
+
+@dataclass
+class BatchTask:
+    """批量执行中的单个任务"""
+
+    index: int
+    id: str
+    prompt: str
+
+
+def load_tasks(path: Path) -> List[BatchTask]:
+    """从 JSONL 文件加载任务
+
+    每行一个 JSON 对象，必须包含 prompt 字段，可选 id 字段（默认为行号），空行会被忽略
+
+    Args:
+        path: 任务文件路径
+
+    Returns:
+        List[BatchTask]: 任务列表
+
+    Raises:
+        ValueError: 当文件格式不正确时抛出
+    """
+    tasks: List[BatchTask] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"任务文件第 {line_number} 行不是合法的 JSON: {e}") from e
+            if not isinstance(data, dict) or not isinstance(data.get("prompt"), str) or not data["prompt"].strip():
+                raise ValueError(f"任务文件第 {line_number} 行缺少 prompt 字段")
+            task_id = data.get("id")
+            tasks.append(
+                BatchTask(
+                    index=len(tasks),
+                    id=str(task_id) if task_id is not None else str(line_number),
+                    prompt=data["prompt"],
+                )
+            )
+    return tasks
+
+
+def _create_default_agent() -> BaseAgent:
+    """使用当前配置创建 Agent"""
+    from eflycode.cli.main import create_agent
+    from eflycode.core.config.config_manager import ConfigManager
+
+    return create_agent(ConfigManager.get_instance().get_config())
+
+
+def _close_agent(agent: Optional[BaseAgent]) -> None:
+    """断开 MCP 连接并关闭 Agent"""
+    if agent is None:
+        return
+    for mcp_client in getattr(agent, "_mcp_clients", []):
+        try:
+            mcp_client.disconnect()
+        except Exception as e:
+            logger.warning(f"断开MCP客户端连接失败: {e}")
+    agent.shutdown()
+
+
+def run_task(task: BatchTask, agent_factory: Optional[Callable[[], BaseAgent]] = None) -> Dict[str, Any]:
+    """执行单个任务
+
+    每个任务创建独立的 Agent，因此拥有独立的 Session，任务之间不会共享对话历史
+
+    Args:
+        task: 要执行的任务
+        agent_factory: 创建 Agent 的函数，默认使用当前配置创建
+
+    Returns:
+        Dict[str, Any]: 任务结果，包含状态、响应内容、会话 ID 和统计信息
+    """
+    started_at = time.monotonic()
+    result: Dict[str, Any] = {"index": task.index, "id": task.id}
+    agent = None
+    try:
+        agent = (agent_factory or _create_default_agent)()
+        result["session_id"] = agent.session.id
+        logger.info(f"开始批量任务: id={task.id}, session_id={agent.session.id}")
+
+        task_conversation = AgentRunLoop(agent).run(task.prompt, stream=False)
+        statistics = task_conversation.statistics
+        result["status"] = "ok"
+        result["content"] = task_conversation.content
+    except Exception as e:
+        logger.error(f"批量任务执行失败: id={task.id}, error={type(e).__name__}: {e}", exc_info=True)
+        statistics = TaskStatistics()
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        _close_agent(agent)
+
+    statistics.wall_time = time.monotonic() - started_at
+    result["statistics"] = statistics.to_dict()
+    return result
+
+
+def _error_result(task: BatchTask, error: BaseException) -> Dict[str, Any]:
+    """任务未能返回结果时的错误结果"""
+    logger.error(f"批量任务未返回结果: id={task.id}, error={type(error).__name__}: {error}")
+    return {
+        "index": task.index,
+        "id": task.id,
+        "status": "error",
+        "error": f"{type(error).__name__}: {error}",
+        "statistics": TaskStatistics().to_dict(),
+    }
+
+
+def _initialize_worker_process() -> None:
+    """进程池 worker 的初始化函数，每个进程需要单独加载配置"""
+    from eflycode.cli.main import initialize_application
+
+    initialize_application(setup_ui=False)
+
+
+def run_batch(
+    tasks: List[BatchTask],
+    output: TextIO,
+    workers: int = BATCH_DEFAULT_WORKERS,
+    use_processes: bool = False,
+    agent_factory: Optional[Callable[[], BaseAgent]] = None,
+) -> Tuple[int, int]:
+    """并发执行全部任务，按完成顺序将结果写入 output
+
+    Args:
+        tasks: 任务列表
+        output: 结果输出流，每个任务一行 JSON
+        workers: 并发执行的 worker 数量
+        use_processes: 是否使用进程池，默认使用线程池
+        agent_factory: 创建 Agent 的函数，仅线程池模式可用
+
+    Returns:
+        Tuple[int, int]: 成功和失败的任务数量
+    """
+    workers = max(1, workers)
+    executor: Executor
+    if use_processes:
+        if agent_factory is not None:
+            raise ValueError("进程池模式不支持自定义 agent_factory")
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker_process)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eflycode-batch")
+
+    logger.info(f"开始批量执行: tasks={len(tasks)}, workers={workers}, processes={use_processes}")
+    succeeded = 0
+    failed = 0
+    try:
+        if use_processes:
+            futures = {executor.submit(run_task, task): task for task in tasks}
+        else:
+            futures = {executor.submit(run_task, task, agent_factory): task for task in tasks}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # run_task 自身不会抛出异常，这里是 worker 进程崩溃等执行器层面的错误
+                result = _error_result(futures[future], e)
+            if result["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    logger.info(f"批量执行完成: succeeded={succeeded}, failed={failed}")
+    return succeeded, failed
+
+
+def batch_command(args) -> None:
+    """批量执行 JSONL 文件中的任务"""
+    tasks = load_tasks(Path(args.tasks))
+    if not tasks:
+        print("任务文件中没有任务。", file=sys.stderr)
+        return
+
+    started_at = time.monotonic()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            succeeded, failed = run_batch(tasks, output, workers=args.workers, use_processes=args.processes)
+    else:
+        succeeded, failed = run_batch(tasks, sys.stdout, workers=args.workers, use_processes=args.processes)
+
+    elapsed = time.monotonic() - started_at
+    print(f"批量执行完成: 成功 {succeeded} 个，失败 {failed} 个，耗时 {elapsed:.1f} 秒", file=sys.stderr)
+    if failed:
+        sys.exit(1)
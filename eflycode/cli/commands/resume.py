@@ -8,9 +8,9 @@ from eflycode.cli.main import run_interactive_cli
 from eflycode.core.agent.session_store import SessionStore
 
 
-async def _select_session() -> Optional[str]:
+async def _select_session(query: Optional[str] = None) -> Optional[str]:
     store = SessionStore.get_instance()
-    sessions = store.list_recent()
+    sessions = store.search(query) if query else store.list_recent()
     if not sessions:
         return None
 
@@ -26,8 +26,11 @@ async def _select_session() -> Optional[str]:
         updated_at = session.get("updated_at")
         if updated_at:
             desc_parts.append(f"updated {updated_at}")
+        snippet = session.get("snippet")
         last_user_preview = session.get("last_user_message_preview")
-        if last_user_preview:
+        if snippet:
+            desc_parts.append(" ".join(snippet.split()))
+        elif last_user_preview:
             desc_parts.append(last_user_preview)
 
         description = " | ".join(desc_parts) if desc_parts else None
@@ -41,7 +44,7 @@ async def _select_session() -> Optional[str]:
 
     select_component = SelectComponent()
     selected = await select_component.show(
-        title="Select session to resume",
+        title=f"Sessions matching \"{query}\"" if query else "Select session to resume",
         options=options,
         default_key=sessions[0]["id"],
     )
@@ -54,9 +57,13 @@ def resume_command(args) -> None:
         asyncio.run(run_interactive_cli(resume_session_id=args.session_id))
         return
 
+    query = getattr(args, "search", None)
+
     async def _run() -> None:
-        selected = await _select_session()
+        selected = await _select_session(query)
         if not selected:
+            if query:
+                raise ValueError(f"没有匹配的会话: {query}")
             raise ValueError("没有可恢复的会话")
         await run_interactive_cli(resume_session_id=selected)
 
@@ -16,15 +16,19 @@ from eflycode.core.agent.run_loop import AgentRunLoop
 from eflycode.core.config import Config
 from eflycode.core.config.config_manager import ConfigManager, get_user_config_dir
 from eflycode.core.context.manager import ContextManager
+from eflycode.core.context.strategies import SummaryCheckpoint
+from eflycode.core.context.tokenizer import configure_encoding_cache
 from eflycode.core.agent.session_store import SessionStore
 from eflycode.core.llm.advisors.request_log_advisor import RequestLogAdvisor
 from eflycode.core.llm.providers.openai import OpenAiProvider
+from eflycode.core.llm.providers.recording import LLM_RECORD_ENV_VAR, RecordingProvider
 from eflycode.core.mcp import MCPClient, MCPToolGroup, load_mcp_config
 from eflycode.core.mcp.errors import MCPConnectionError, MCPConfigError
 from eflycode.core.skills import SkillsManager
 from eflycode.core.skills.activate_tool import ActivateSkillTool
 from eflycode.core.skills.skills_advisor import SkillsAdvisor
 from eflycode.core.tool.execute_command_tool import ExecuteCommandTool
+from eflycode.core.tool.read_tool_output_tool import ReadToolOutputTool
 from eflycode.core.tool.file_system_tool import FILE_SYSTEM_TOOL_GROUP
 from eflycode.core.ui.bridge import EventBridge
 from eflycode.core.ui.errors import UserCanceledError
@@ -55,6 +59,9 @@ def initialize_application(setup_ui: bool = False) -> ApplicationContext:
         ApplicationContext: 应用上下文
     """
     logger.info("初始化应用程序")
+
+    # 设置分词编码的缓存目录，之后的 token 计算只从该目录加载编码
+    configure_encoding_cache()
     
     # 加载配置
     config_manager = ConfigManager.get_instance()
@@ -65,6 +72,13 @@ def initialize_application(setup_ui: bool = False) -> ApplicationContext:
     if config.workspace_dir:
         os.chdir(config.workspace_dir)
         logger.info(f"切换到工作区目录: {config.workspace_dir}")
+
+    SessionStore.get_instance().configure(
+        durability=config.session.durability,
+        flush_interval=config.session.flush_interval,
+        fsync=config.session.fsync,
+        blob_compression=config.session.blob_compression,
+    )
     
     app_context = ApplicationContext(config=config)
 
@@ -231,6 +245,10 @@ def create_agent(config: Config) -> BaseAgent:
 
     # 创建最终的 LLM Provider
     provider = OpenAiProvider(config.llm_config)
+    record_path = os.getenv(LLM_RECORD_ENV_VAR)
+    if record_path:
+        provider = RecordingProvider(provider, record_path)
+        logger.info(f"LLM 调用录制已开启: path={record_path}")
 
     # 创建 HookSystem
     from eflycode.core.hooks.system import HookSystem
@@ -240,7 +258,7 @@ def create_agent(config: Config) -> BaseAgent:
     hook_system = HookSystem(workspace_dir=workspace_dir)
 
     # 准备工具列表
-    tools = [execute_command_tool]
+    tools = [execute_command_tool, ReadToolOutputTool()]
     advisors = []
 
     # 如果启用 skills 功能，添加 ActivateSkillTool 和 SkillsAdvisor
@@ -345,6 +363,7 @@ async def run_interactive_cli(
             session_id=session_data["id"],
             messages=session_data["messages"],
             initial_user_question=session_data.get("initial_user_question"),
+            summary_checkpoint=SummaryCheckpoint(**session_data["summary"]) if session_data.get("summary") else None,
         )
         logger.info(f"已恢复会话: {agent.session.id}")
 
@@ -1,3 +1,5 @@
+from eflycode.core.agent.async_base import AsyncBaseAgent
+from eflycode.core.agent.async_run_loop import AsyncAgentRunLoop
 from eflycode.core.agent.base import BaseAgent, ChatConversation, TaskConversation, TaskStatistics
 from eflycode.core.agent.code_agent import CodeAgent
 from eflycode.core.agent.registry import AgentRegistry
@@ -12,6 +14,8 @@ __all__ = [
     "TaskConversation",
     "TaskStatistics",
     "AgentRunLoop",
+    "AsyncBaseAgent",
+    "AsyncAgentRunLoop",
     "Session",
 ]
 
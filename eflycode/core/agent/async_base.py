@@ -0,0 +1,132 @@
+import asyncio
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from eflycode.core.agent.base import BaseAgent, ChatConversation
+from eflycode.core.llm.protocol import ChatCompletionChunk, LLMRequest
+from eflycode.core.llm.stream_accumulator import StreamAccumulator
+from eflycode.core.tool.base import BaseTool
+from eflycode.core.utils.logger import logger
+from eflycode.core.utils.tracing import trace_span
+
+
+class AsyncBaseAgent(BaseAgent):
+    """基于 asyncio 的 Agent，提供与 BaseAgent 对应的异步接口
+
+    LLM 调用通过 Provider 的 acall/astream 原生异步执行，
+    工具调用、同步的 hook 子进程和上下文压缩在线程中执行，不会阻塞事件循环。
+    同步接口 chat、stream、run_tool 仍然可用
+    """
+
+    async def achat(self, message: str = "") -> ChatConversation:
+        """异步发送消息并获取响应
+
+        Args:
+            message: 用户消息，如果为空则使用会话历史
+
+        Returns:
+            ChatConversation: 包含当前响应和全部对话信息的会话对象
+        """
+        request = await self._aprepare_request(message, stream=False)
+
+        if message:
+            self.event_bus.emit("agent.message.start", agent=self, message=message)
+
+        try:
+            request = await asyncio.to_thread(self._fire_before_model_hook, request)
+
+            logger.info(f"异步调用 LLM provider: model={self.model_name}")
+            with trace_span("llm.chat", model=self.model_name):
+                response = await self.provider.acall(request)
+            logger.info(f"LLM 响应完成: id={response.id}, finish_reason={response.finish_reason}, usage={response.usage}")
+
+            await asyncio.to_thread(self._fire_after_model_hook, request, response)
+            return self._finish_chat(response)
+        except Exception as e:
+            self._handle_request_error("chat", e)
+            raise
+
+    async def astream(
+        self, message: str = "", accumulator: Optional[StreamAccumulator] = None
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        """异步流式发送消息并获取响应
+
+        Args:
+            message: 用户消息，如果为空则使用会话历史
+            accumulator: 流式累积器，调用方可以传入并订阅它来复用累积结果，默认新建
+
+        Yields:
+            ChatCompletionChunk: 流式响应块
+        """
+        request = await self._aprepare_request(message, stream=True)
+        request = await asyncio.to_thread(self._fire_before_model_hook, request, True)
+
+        if message:
+            self.event_bus.emit("agent.message.start", agent=self, message=message)
+
+        stream_span = trace_span("llm.stream", model=self.model_name)
+        first_token_span = trace_span("llm.time_to_first_token", model=self.model_name)
+        try:
+            logger.info(f"开始 LLM 异步流式调用: model={self.model_name}")
+            if accumulator is None:
+                accumulator = StreamAccumulator()
+
+            async for chunk in self.provider.astream(request):
+                first_token_span.end()
+                self._handle_stream_chunk(chunk, accumulator)
+                yield chunk
+            stream_span.set(chunks=accumulator.chunk_count)
+            stream_span.end()
+
+            completion = self._finish_stream(accumulator)
+            if completion:
+                await asyncio.to_thread(self._fire_after_model_hook, request, completion, True)
+                self._emit_stream_stop(completion, accumulator)
+        except Exception as e:
+            stream_span.end(e)
+            self._handle_request_error("stream", e)
+            raise
+        finally:
+            stream_span.end()
+
+    async def arun_tool(self, tool_name: str, tool_call_id: str = "", **kwargs) -> str:
+        """异步执行工具
+
+        hook、结果缓存和工具事件与 run_tool 相同，整个调用在线程中执行。
+        重写了 arun 的原生异步工具回到事件循环中执行，其他工具直接在该线程中执行 run
+
+        Args:
+            tool_name: 工具名称
+            tool_call_id: 工具调用 ID
+            **kwargs: 工具参数
+
+        Returns:
+            str: 工具执行结果
+
+        Raises:
+            ToolExecutionError: 当工具执行失败时抛出
+        """
+        loop = asyncio.get_running_loop()
+        futures: List[Future] = []
+
+        def run(tool: BaseTool, tool_kwargs: Dict[str, Any]) -> str:
+            if type(tool).arun is BaseTool.arun:
+                return tool.run(**tool_kwargs)
+            future = asyncio.run_coroutine_threadsafe(tool.arun(**tool_kwargs), loop)
+            futures.append(future)
+            return future.result()
+
+        try:
+            return await asyncio.to_thread(self._run_tool, tool_name, tool_call_id, kwargs, None, run)
+        finally:
+            # 调用被取消时同时取消在事件循环中执行的工具
+            for future in futures:
+                future.cancel()
+
+    async def _aprepare_request(self, message: str, stream: bool) -> LLMRequest:
+        """在线程中构建 LLM 请求
+
+        构建请求时可能触发上下文压缩（调用 LLM 生成摘要）和 BeforeToolSelection hook，
+        这些都是同步阻塞操作
+        """
+        return await asyncio.to_thread(self._prepare_request, message, stream)
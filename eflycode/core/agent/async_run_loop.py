@@ -0,0 +1,298 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from eflycode.core.agent.async_base import AsyncBaseAgent
+from eflycode.core.agent.base import ChatConversation, TaskConversation, TaskStatistics
+from eflycode.core.agent.run_loop import AGENT_MAX_PARALLEL_TOOLS, AgentRunLoop
+from eflycode.core.llm.protocol import ChatCompletion, Message
+from eflycode.core.llm.stream_accumulator import StreamAccumulator
+from eflycode.core.tool.errors import ToolExecutionError
+from eflycode.core.utils.logger import logger
+from eflycode.core.utils.tracing import Tracer
+
+
+class AsyncAgentRunLoop(AgentRunLoop):
+    """基于 asyncio 的 Agent 运行循环
+
+    流程与 AgentRunLoop.run 一致，LLM 调用和工具执行都在事件循环中异步进行，
+    同一轮中相邻的只读工具调用通过 asyncio.gather 并发执行，并发数由信号量限制，
+    多个任务可以在同一个事件循环中并发运行而不需要额外的线程
+    """
+
+    def __init__(
+        self,
+        agent: AsyncBaseAgent,
+        parallel_tool_calls: bool = True,
+        max_parallel_tools: int = AGENT_MAX_PARALLEL_TOOLS,
+    ):
+        """初始化运行循环
+
+        Args:
+            agent: 异步 Agent 实例
+            parallel_tool_calls: 是否并发执行同一轮中相邻的只读工具调用
+            max_parallel_tools: 并发执行工具的最大数量
+        """
+        super().__init__(agent, parallel_tool_calls=parallel_tool_calls, max_parallel_tools=max_parallel_tools)
+        self.agent: AsyncBaseAgent = agent
+
+    async def arun(self, user_input: str, stream: bool = True) -> TaskConversation:
+        """异步主运行循环
+
+        Args:
+            user_input: 用户输入
+            stream: 是否使用流式对话，默认为 True
+
+        Returns:
+            TaskConversation: 包含最终响应、全部对话信息和任务统计的会话对象
+        """
+        with Tracer.get_instance().turn(session_id=self.agent.session.id, stream=stream):
+            return await self._arun(user_input, stream)
+
+    async def _arun(self, user_input: str, stream: bool) -> TaskConversation:
+        """异步执行一次任务的运行循环"""
+        logger.info(f"开始异步执行任务，流式模式: {stream}")
+
+        self.current_iteration = 0
+
+        stop_reason = await asyncio.to_thread(self._fire_start_hooks, user_input)
+        if stop_reason is not None:
+            completion = ChatCompletion(
+                id="",
+                object="chat.completion",
+                created=0,
+                model=self.agent.model_name,
+                message=Message(role="assistant", content=stop_reason),
+            )
+            conversation = ChatConversation(completion=completion, messages=self.agent.session.get_messages())
+            self.agent.event_bus.emit("agent.task.stop", agent=self.agent, result=stop_reason)
+            return TaskConversation(conversation=conversation, statistics=TaskStatistics())
+
+        self.agent.event_bus.emit("agent.task.start", agent=self.agent, user_input=user_input)
+
+        statistics = TaskStatistics()
+        last_conversation = None
+
+        try:
+            while self.current_iteration < self.max_iterations:
+                self.current_iteration += 1
+                statistics.iterations = self.current_iteration
+                logger.debug(f"开始异步迭代 {self.current_iteration}/{self.max_iterations}")
+
+                message = user_input if self.current_iteration == 1 else ""
+                if stream:
+                    conversation, response_content = await self._astream_turn(message, statistics)
+                else:
+                    conversation = await self.agent.achat(message)
+                    response_content = conversation.content
+                    if conversation.completion.usage:
+                        statistics.add_usage(conversation.completion.usage)
+                last_conversation = conversation
+
+                tool_calls = self._parse_tool_calls(conversation.completion)
+                if not tool_calls:
+                    result_content = await asyncio.to_thread(
+                        self._fire_after_agent_hook, user_input, response_content
+                    )
+                    logger.info(f"任务完成: iterations={statistics.iterations}, tool_calls={statistics.tool_calls_count}, total_tokens={statistics.total_tokens}")
+                    self.agent.event_bus.emit("agent.task.stop", agent=self.agent, result=result_content)
+                    return TaskConversation(conversation=conversation, statistics=statistics)
+
+                tool_calls = [tool_call for tool_call in tool_calls if tool_call.get("name")]
+                statistics.tool_calls_count += len(tool_calls)
+
+                tool_results = []
+                tool_results_list = await self._aexecute_tool_calls(tool_calls)
+                for tool_call, tool_result in zip(tool_calls, tool_results_list):
+                    tool_name = tool_call["name"]
+                    tool_result_length = len(tool_result)
+                    logger.info(f"工具 {tool_name} 执行完成，结果长度: {tool_result_length} 字符")
+                    # 工具消息按照原始 tool_calls 的顺序添加，与实际执行完成的先后无关
+                    self.agent.session.add_message("tool", content=tool_result, tool_call_id=tool_call.get("id", ""))
+                    tool_results.append((tool_name, tool_result))
+
+                results_text = "\n\n".join(
+                    f"工具 {name} 的执行结果：\n{result}" for name, result in tool_results
+                )
+                user_input = f"{results_text}\n\n请根据工具执行结果继续处理任务。"
+
+            if not last_conversation:
+                last_conversation = await self.agent.achat("")
+                if last_conversation.completion.usage:
+                    statistics.add_usage(last_conversation.completion.usage)
+            logger.warning(f"达到最大迭代次数: iterations={self.current_iteration}, tool_calls={statistics.tool_calls_count}")
+            self.agent.event_bus.emit("agent.task.stop", agent=self.agent, result="达到最大迭代次数")
+            return TaskConversation(conversation=last_conversation, statistics=statistics)
+
+        except Exception as e:
+            error_type = type(e).__name__
+            error_message = str(e)
+            logger.error(f"异步任务执行失败: iteration={self.current_iteration}, error={error_type}: {error_message}", exc_info=True)
+            self.agent.event_bus.emit("agent.task.error", agent=self.agent, error=e)
+            if last_conversation:
+                return TaskConversation(conversation=last_conversation, statistics=statistics)
+            raise
+        finally:
+            await asyncio.to_thread(self._fire_session_end_hook)
+            # 回合结束，通知后台线程写入会话，不等待磁盘
+            from eflycode.core.agent.session_store import SessionStore
+            SessionStore.get_instance().flush(wait=False)
+
+    async def _astream_turn(self, message: str, statistics: TaskStatistics) -> tuple[ChatConversation, str]:
+        """执行一轮流式对话
+
+        Args:
+            message: 本轮的用户消息
+            statistics: 任务统计信息
+
+        Returns:
+            tuple[ChatConversation, str]: 本轮的会话对象和响应内容
+        """
+        accumulator = StreamAccumulator()
+        async for chunk in self.agent.astream(message, accumulator=accumulator):
+            if chunk.usage:
+                statistics.add_usage(chunk.usage)
+        last_chunk = accumulator.last_chunk
+
+        # AsyncBaseAgent.astream 已经将完整内容添加到 session 并触发了 stop 事件
+        messages = self.agent.session.get_messages()
+        last_message = next((msg for msg in reversed(messages) if msg.role == "assistant"), None)
+        if last_chunk is None or last_message is None:
+            # 没有流式响应，回退到非流式
+            conversation = await self.agent.achat(message)
+            if conversation.completion.usage:
+                statistics.add_usage(conversation.completion.usage)
+            return conversation, conversation.content
+
+        completion = ChatCompletion(
+            id=last_chunk.id,
+            object="chat.completion",
+            created=last_chunk.created,
+            model=last_chunk.model,
+            message=last_message,
+            finish_reason=last_chunk.finish_reason,
+            usage=last_chunk.usage,
+        )
+        conversation = ChatConversation(completion=completion, messages=messages)
+        return conversation, accumulator.content.text or last_message.content or ""
+
+    async def _aexecute_tool_calls(self, tool_calls: List[Dict]) -> List[str]:
+        """异步执行一轮中的全部工具调用
+
+        与 AgentRunLoop._execute_tool_calls 的规则相同：相邻的只读工具调用并发执行，
+        有副作用的工具调用串行执行并作为批次之间的屏障。某个调用抛出异常时取消同一批次中其他的调用
+
+        Args:
+            tool_calls: 解析后的工具调用列表
+
+        Returns:
+            List[str]: 与 tool_calls 顺序一一对应的工具执行结果
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel_tools)
+        results: List[str] = []
+        batch: List[Dict] = []
+
+        async def run_limited(tool_call: Dict) -> str:
+            async with semaphore:
+                return await self._aexecute_tool_call(tool_call)
+
+        async def flush() -> None:
+            if len(batch) > 1:
+                logger.info(f"并发执行只读工具: count={len(batch)}")
+            tasks = [asyncio.create_task(run_limited(tool_call)) for tool_call in batch]
+            try:
+                results.extend(await asyncio.gather(*tasks))
+            except BaseException:
+                # gather 不会取消其他任务，某个调用失败时取消同一批次中还没有完成的调用，等待它们结束后再抛出
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            batch.clear()
+
+        for tool_call in tool_calls:
+            if self.parallel_tool_calls and self._is_concurrency_safe(tool_call["name"]):
+                batch.append(tool_call)
+                continue
+            await flush()
+            results.append(await self._aexecute_tool_call(tool_call))
+
+        await flush()
+        return results
+
+    async def _aexecute_tool_call(self, tool_call: Dict) -> str:
+        """异步执行单个解析后的工具调用
+
+        Args:
+            tool_call: 工具调用信息，格式为 {"name": str, "arguments": dict, "id": str}
+
+        Returns:
+            str: 工具执行结果，如果执行失败则返回错误信息
+
+        Raises:
+            Exception: 如果不是 ToolExecutionError，则重新抛出异常
+        """
+        tool_name = tool_call["name"]
+        arguments = tool_call.get("arguments", {})
+        logger.info(f"执行工具: {tool_name}, 参数: {arguments}")
+        try:
+            return await self.agent.arun_tool(tool_name, tool_call_id=tool_call.get("id", ""), **arguments)
+        except ToolExecutionError as e:
+            # 捕获工具执行错误，将错误信息作为结果返回给模型
+            logger.error(f"工具 {tool_name} 执行失败: {e}")
+            return str(e)
+        except Exception as e:
+            logger.error(f"工具 {tool_name} 执行时发生意外错误: {e}", exc_info=True)
+            raise
+
+    def _fire_start_hooks(self, user_input: str) -> Optional[str]:
+        """触发 SessionStart 和 BeforeAgent hooks
+
+        Args:
+            user_input: 用户输入
+
+        Returns:
+            Optional[str]: 如果 hook 要求停止，返回停止原因，否则返回 None
+        """
+        hook_system = self.agent.hook_system
+        if not hook_system:
+            return None
+
+        workspace_dir = self.agent._get_workspace_dir()
+        logger.debug(f"触发 SessionStart hook: session_id={self.agent.session.id}")
+        hook_system.fire_session_start_event(self.agent.session.id, workspace_dir)
+
+        logger.debug(f"触发 BeforeAgent hook: session_id={self.agent.session.id}")
+        hook_result = hook_system.fire_before_agent_event(user_input, self.agent.session.id, workspace_dir)
+        if not hook_result.continue_:
+            logger.warning(f"BeforeAgent hook 要求停止执行: reason={hook_result.system_message}")
+            return hook_result.system_message or "Task stopped by hook"
+        return None
+
+    def _fire_after_agent_hook(self, user_input: str, result_content: str) -> str:
+        """触发 AfterAgent hook
+
+        Returns:
+            str: 任务结果，如果 hook 返回了系统消息则使用系统消息
+        """
+        hook_system = self.agent.hook_system
+        if not hook_system:
+            return result_content
+
+        logger.debug(f"触发 AfterAgent hook: session_id={self.agent.session.id}")
+        hook_result = hook_system.fire_after_agent_event(
+            user_input, result_content, self.agent.session.id, self.agent._get_workspace_dir()
+        )
+        if hook_result.system_message:
+            message_length = len(hook_result.system_message)
+            logger.debug(f"AfterAgent hook 添加系统消息: message_length={message_length}")
+            return hook_result.system_message
+        return result_content
+
+    def _fire_session_end_hook(self) -> None:
+        """触发 SessionEnd hook"""
+        hook_system = self.agent.hook_system
+        if not hook_system:
+            return
+
+        logger.debug(f"触发 SessionEnd hook: session_id={self.agent.session.id}")
+        hook_system.fire_session_end_event(self.agent.session.id, self.agent._get_workspace_dir())
@@ -1,4 +1,6 @@
-from typing import Any, Dict, Iterator, List, Optional
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from eflycode.core.agent.session import Session
 from eflycode.core.event.event_bus import EventBus, get_global_event_bus
@@ -7,13 +9,20 @@ from eflycode.core.llm.protocol import (
     ChatCompletion,
     ChatCompletionChunk,
     DEFAULT_MAX_CONTEXT_LENGTH,
+    LLMRequest,
     Message,
     ToolDefinition,
 )
 from eflycode.core.llm.providers.base import LLMProvider
+from eflycode.core.llm.stream_accumulator import StreamAccumulator
 from eflycode.core.tool.base import BaseTool, ToolGroup
 from eflycode.core.tool.errors import ToolExecutionError
+from eflycode.core.tool.output_store import TOOL_OUTPUT_SPILL_THRESHOLD, ToolOutputStore
+from eflycode.core.tool.registry import ToolRegistry
+from eflycode.core.tool.result_cache import TOOL_RESULT_CACHED_MARK, ToolResultCache
+from eflycode.core.tool.selection import ToolSelector
 from eflycode.core.utils.logger import logger
+from eflycode.core.utils.tracing import trace_span, traced
 
 
 class ChatConversation:
@@ -50,6 +59,7 @@ class TaskStatistics:
         completion_tokens: int = 0,
         iterations: int = 0,
         tool_calls_count: int = 0,
+        wall_time: float = 0.0,
     ):
         """初始化任务统计信息
 
@@ -59,12 +69,14 @@ class TaskStatistics:
             completion_tokens: 完成 token 数
             iterations: 迭代次数
             tool_calls_count: 工具调用次数
+            wall_time: 任务耗时（秒）
         """
         self.total_tokens = total_tokens
         self.prompt_tokens = prompt_tokens
         self.completion_tokens = completion_tokens
         self.iterations = iterations
         self.tool_calls_count = tool_calls_count
+        self.wall_time = wall_time
 
     def add_usage(self, usage) -> None:
         """添加使用量统计
@@ -77,6 +89,21 @@ class TaskStatistics:
             self.completion_tokens += usage.completion_tokens
             self.total_tokens += usage.total_tokens
 
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典
+
+        Returns:
+            Dict[str, Any]: 统计信息字典
+        """
+        return {
+            "total_tokens": self.total_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "iterations": self.iterations,
+            "tool_calls_count": self.tool_calls_count,
+            "wall_time": round(self.wall_time, 3),
+        }
+
 
 class TaskConversation:
     """任务会话，包含最终的响应、全部对话信息和任务统计"""
@@ -146,18 +173,24 @@ class BaseAgent:
         self._advisors: List[Advisor] = advisors or []
         self.hook_system = hook_system
 
-        self._tools: Dict[str, BaseTool] = {}
+        self._tools = ToolRegistry()
+        self.tool_result_cache = ToolResultCache()
+        # 超过 max_tool_result_chars 的工具结果写入 tool_output_store，为 None 时不限制
+        self.tool_output_store = ToolOutputStore()
+        self.max_tool_result_chars: Optional[int] = TOOL_OUTPUT_SPILL_THRESHOLD
+        # 每轮请求按相关性选择非核心工具，为 None 时发送全部工具
+        self.tool_selector: Optional[ToolSelector] = ToolSelector()
         self._tool_groups: List[ToolGroup] = []
 
         if tools:
             for tool in tools:
-                self._tools[tool.name] = tool
+                self._tools.add(tool)
 
         if tool_groups:
             self._tool_groups.extend(tool_groups)
             for group in tool_groups:
                 for tool in group.tools:
-                    self._tools[tool.name] = tool
+                    self._tools.add(tool)
 
         # 创建 SystemPromptAdvisor 并添加到 advisors
         # 延迟导入以避免循环导入
@@ -171,7 +204,9 @@ class BaseAgent:
         if self._advisors and hasattr(provider, "add_advisors"):
             provider.add_advisors(self._advisors)
 
-        self.event_bus.subscribe("app.config.llm.changed", self._handle_model_changed)
+        # 保存绑定方法，取消订阅时 EventBus 按同一对象匹配 handler
+        self._model_changed_handler = self._handle_model_changed
+        self.event_bus.subscribe("app.config.llm.changed", self._model_changed_handler)
 
         logger.info(
             f"Agent 初始化完成: model={model}, tools={len(self._tools)}, "
@@ -195,280 +230,293 @@ class BaseAgent:
         Returns:
             ChatConversation: 包含当前响应和全部对话信息的会话对象
         """
-        message_length = len(message) if message else 0
-        logger.debug(f"开始 chat 请求: message_length={message_length}, session_id={self.session.id}")
-        
-        if message:
-            self.session.add_message("user", message)
-            message_preview = message[:50]
-            logger.debug(f"添加用户消息到会话: message_preview={message_preview}...")
-
-        request = self.session.get_context(
-            self.model_name,
-            max_context_length=self.max_context_length,
-            provider=self.provider,
-            hook_system=self.hook_system,
-        )
-        request.tools = self.get_available_tools()
-        
-        tools_count = len(request.tools) if request.tools else 0
-        messages_count = len(request.messages)
-        logger.debug(f"准备 LLM 请求: model={self.model_name}, messages_count={messages_count}, tools_count={tools_count}")
+        request = self._prepare_request(message, stream=False)
 
         if message:
             self.event_bus.emit("agent.message.start", agent=self, message=message)
 
         try:
-            # 触发 BeforeModel hook
-            if self.hook_system:
-                logger.debug(f"触发 BeforeModel hook: session_id={self.session.id}")
-                from pathlib import Path
-                from eflycode.core.config.config_manager import ConfigManager
-
-                config_manager = ConfigManager.get_instance()
-                workspace_dir = config_manager.get_workspace_dir() or Path.cwd()
-
-                hook_result, modified_request = self.hook_system.fire_before_model_event(
-                    request, self.session.id, workspace_dir
-                )
-
-                # 如果 hook 返回了修改后的请求，使用修改后的请求
-                if modified_request:
-                    logger.debug("BeforeModel hook 修改了请求")
-                    request = modified_request
-
-                # 如果 hook 要求停止，抛出异常
-                if not hook_result.continue_:
-                    logger.warning(f"BeforeModel hook 要求停止执行: {hook_result.system_message}")
-                    raise RuntimeError(
-                        hook_result.system_message or "Hook requested to stop execution"
-                    )
+            request = self._fire_before_model_hook(request)
 
             logger.info(f"调用 LLM provider: model={self.model_name}")
-            response = self.provider.call(request)
+            with trace_span("llm.chat", model=self.model_name):
+                response = self.provider.call(request)
             logger.info(f"LLM 响应完成: id={response.id}, finish_reason={response.finish_reason}, usage={response.usage}")
 
-            # 触发 AfterModel hook
-            if self.hook_system:
-                logger.debug(f"触发 AfterModel hook: session_id={self.session.id}")
-                from pathlib import Path
-                from eflycode.core.config.config_manager import ConfigManager
+            self._fire_after_model_hook(request, response)
+            return self._finish_chat(response)
+        except Exception as e:
+            self._handle_request_error("chat", e)
+            raise
 
-                config_manager = ConfigManager.get_instance()
-                workspace_dir = config_manager.get_workspace_dir() or Path.cwd()
+    def stream(self, message: str = "", accumulator: Optional[StreamAccumulator] = None) -> Iterator[ChatCompletionChunk]:
+        """流式发送消息并获取响应
 
-                hook_result = self.hook_system.fire_after_model_event(
-                    request, response, self.session.id, workspace_dir
-                )
+        Args:
+            message: 用户消息，如果为空则使用会话历史
+            accumulator: 流式累积器，调用方可以传入并订阅它来复用累积结果，默认新建
 
-                # 如果 hook 要求停止，抛出异常
-                if not hook_result.continue_:
-                    logger.warning(f"AfterModel hook 要求停止执行: {hook_result.system_message}")
-                    raise RuntimeError(
-                        hook_result.system_message or "Hook requested to stop execution"
-                    )
+        Yields:
+            ChatCompletionChunk: 流式响应块
+        """
+        request = self._prepare_request(message, stream=True)
+        request = self._fire_before_model_hook(request, stream=True)
+
+        if message:
+            self.event_bus.emit("agent.message.start", agent=self, message=message)
 
-            content = response.message.content or ""
-            tool_calls = response.message.tool_calls
+        stream_span = trace_span("llm.stream", model=self.model_name)
+        first_token_span = trace_span("llm.time_to_first_token", model=self.model_name)
+        try:
+            logger.info(f"开始 LLM 流式调用: model={self.model_name}")
+            if accumulator is None:
+                accumulator = StreamAccumulator()
 
-            tool_calls_count = len(tool_calls) if tool_calls else 0
-            content_length = len(content)
-            logger.debug(f"添加 assistant 消息到会话: content_length={content_length}, tool_calls_count={tool_calls_count}")
-            self.session.add_message("assistant", content=content, tool_calls=tool_calls)
+            for chunk in self.provider.stream(request):
+                first_token_span.end()
+                self._handle_stream_chunk(chunk, accumulator)
+                yield chunk
+            stream_span.set(chunks=accumulator.chunk_count)
+            stream_span.end()
 
-            self.event_bus.emit("agent.message.stop", agent=self, response=response)
-            
-            logger.debug("chat 请求完成")
-            return ChatConversation(completion=response, messages=self.session.get_messages())
+            completion = self._finish_stream(accumulator)
+            if completion:
+                self._fire_after_model_hook(request, completion, stream=True)
+                self._emit_stream_stop(completion, accumulator)
         except Exception as e:
-            error_type = type(e).__name__
-            error_message = str(e)
-            logger.error(f"chat 请求失败: {error_type}: {error_message}", exc_info=True)
-            self.event_bus.emit("agent.error", agent=self, error=e)
+            stream_span.end(e)
+            self._handle_request_error("stream", e)
             raise
+        finally:
+            stream_span.end()
 
-    def stream(self, message: str = "") -> Iterator[ChatCompletionChunk]:
-        """流式发送消息并获取响应
+    @traced("agent.prepare_request")
+    def _prepare_request(self, message: str, stream: bool) -> LLMRequest:
+        """记录用户消息并构建 LLM 请求
 
         Args:
             message: 用户消息，如果为空则使用会话历史
+            stream: 是否为流式请求，仅用于日志
 
-        Yields:
-            ChatCompletionChunk: 流式响应块
+        Returns:
+            LLMRequest: 包含会话上下文和可用工具的请求
         """
+        mode = "stream" if stream else "chat"
         message_length = len(message) if message else 0
-        logger.debug(f"开始 stream 请求: message_length={message_length}, session_id={self.session.id}")
-        
+        logger.debug(f"开始 {mode} 请求: message_length={message_length}, session_id={self.session.id}")
+
         if message:
             self.session.add_message("user", message)
             message_preview = message[:50]
             logger.debug(f"添加用户消息到会话: message_preview={message_preview}...")
 
+        # 先确定工具列表和 Advisor 将添加的系统提示词，二者占用的 token 计入上下文预算
+        tools = self.get_available_tools()
+        self._update_prompt_components(tools)
         request = self.session.get_context(
             self.model_name,
             max_context_length=self.max_context_length,
             provider=self.provider,
             hook_system=self.hook_system,
+            tools=tools,
         )
-        request.tools = self.get_available_tools()
-        
+
         tools_count = len(request.tools) if request.tools else 0
         messages_count = len(request.messages)
-        logger.debug(f"准备 LLM 流式请求: model={self.model_name}, messages_count={messages_count}, tools_count={tools_count}")
+        request_kind = "流式请求" if stream else "请求"
+        logger.debug(f"准备 LLM {request_kind}: model={self.model_name}, messages_count={messages_count}, tools_count={tools_count}")
+        return request
 
-        # 触发 BeforeModel hook（流式模式）
-        if self.hook_system:
-            logger.debug(f"触发 BeforeModel hook (stream): session_id={self.session.id}")
-            from pathlib import Path
-            from eflycode.core.config.config_manager import ConfigManager
+    def _update_prompt_components(self, tools: List[ToolDefinition]) -> None:
+        """在构建请求之前记录各个 Advisor 将添加到系统提示词中的内容
+
+        Args:
+            tools: 本次请求的工具定义
+        """
+        for advisor in self._advisors:
+            for name, content in advisor.prompt_components(tools).items():
+                self.session.set_prompt_component(name, content)
+
+    def _get_workspace_dir(self) -> Path:
+        """获取当前工作区目录，用于触发 hook 和计算工具缓存指纹"""
+        from eflycode.core.config.config_manager import ConfigManager
+
+        config_manager = ConfigManager.get_instance()
+        return config_manager.get_workspace_dir() or Path.cwd()
+
+    def _fire_before_model_hook(self, request: LLMRequest, stream: bool = False) -> LLMRequest:
+        """触发 BeforeModel hook
+
+        Args:
+            request: LLM 请求
+            stream: 是否为流式请求，仅用于日志
+
+        Returns:
+            LLMRequest: hook 修改后的请求，如果没有修改则返回原请求
+
+        Raises:
+            RuntimeError: 当 hook 要求停止执行时抛出
+        """
+        if not self.hook_system:
+            return request
+
+        suffix = " (stream)" if stream else ""
+        logger.debug(f"触发 BeforeModel hook{suffix}: session_id={self.session.id}")
+        hook_result, modified_request = self.hook_system.fire_before_model_event(
+            request, self.session.id, self._get_workspace_dir()
+        )
 
-            config_manager = ConfigManager.get_instance()
-            workspace_dir = config_manager.get_workspace_dir() or Path.cwd()
+        # 如果 hook 返回了修改后的请求，使用修改后的请求
+        if modified_request:
+            logger.debug(f"BeforeModel hook 修改了请求{suffix}")
+            request = modified_request
 
-            hook_result, modified_request = self.hook_system.fire_before_model_event(
-                request, self.session.id, workspace_dir
+        # 如果 hook 要求停止，抛出异常
+        if not hook_result.continue_:
+            logger.warning(f"BeforeModel hook 要求停止执行{suffix}: {hook_result.system_message}")
+            raise RuntimeError(
+                hook_result.system_message or "Hook requested to stop execution"
             )
+        return request
 
-            # 如果 hook 返回了修改后的请求，使用修改后的请求
-            if modified_request:
-                logger.debug("BeforeModel hook 修改了请求 (stream)")
-                request = modified_request
+    def _fire_after_model_hook(self, request: LLMRequest, response: ChatCompletion, stream: bool = False) -> None:
+        """触发 AfterModel hook
 
-            # 如果 hook 要求停止，抛出异常
-            if not hook_result.continue_:
-                logger.warning(f"BeforeModel hook 要求停止执行 (stream): {hook_result.system_message}")
-                raise RuntimeError(
-                    hook_result.system_message or "Hook requested to stop execution"
-                )
+        Args:
+            request: LLM 请求
+            response: LLM 响应
+            stream: 是否为流式请求，仅用于日志
 
-        if message:
-            self.event_bus.emit("agent.message.start", agent=self, message=message)
+        Raises:
+            RuntimeError: 当 hook 要求停止执行时抛出
+        """
+        if not self.hook_system:
+            return
 
-        try:
-            logger.info(f"开始 LLM 流式调用: model={self.model_name}")
-            full_content = ""
-            last_chunk = None
-            accumulated_tool_calls = {}
-            chunk_count = 0
-            
-            for chunk in self.provider.stream(request):
-                chunk_count += 1
-                # 提取 delta 内容
-                if chunk.delta and chunk.delta.content:
-                    delta_content = chunk.delta.content
-                    full_content += delta_content
-                    # 触发增量事件
-                    self.event_bus.emit("agent.message.delta", agent=self, delta=delta_content)
-                
-                # 累积 tool_calls（流式响应中 tool_calls 可能分布在多个 chunk 中）
-                if chunk.delta and chunk.delta.tool_calls:
-                    for delta_tc in chunk.delta.tool_calls:
-                        if delta_tc.index not in accumulated_tool_calls:
-                            from eflycode.core.llm.protocol import ToolCall, ToolCallFunction
-                            tool_call = ToolCall(
-                                id=delta_tc.id or "",
-                                type=delta_tc.type or "function",
-                                function=ToolCallFunction(
-                                    name=delta_tc.function.name if delta_tc.function else "",
-                                    arguments=delta_tc.function.arguments if delta_tc.function else "",
-                                ),
-                            )
-                            accumulated_tool_calls[delta_tc.index] = tool_call
-                            # 当检测到新的工具调用时，立即触发事件显示工具调用提示
-                            if delta_tc.function and delta_tc.function.name:
-                                self.event_bus.emit(
-                                    "agent.tool.call.start",
-                                    agent=self,
-                                    tool_name=delta_tc.function.name,
-                                    tool_call_id=delta_tc.id or "",
-                                    show_call=False,
-                                )
-                        else:
-                            # 累积 arguments
-                            if delta_tc.function and delta_tc.function.arguments:
-                                existing = accumulated_tool_calls[delta_tc.index]
-                                existing.function.arguments += delta_tc.function.arguments
-                
-                last_chunk = chunk
-                yield chunk
-            
-            # 流式完成后，将完整内容添加到会话
-            if full_content or accumulated_tool_calls:
-                # 将累积的 tool_calls 转换为列表
-                tool_calls_list = None
-                if accumulated_tool_calls:
-                    tool_calls_list = [accumulated_tool_calls[i] for i in sorted(accumulated_tool_calls.keys())]
-                    # 当工具调用完整时，触发工具正在执行事件
-                    for tool_call in tool_calls_list:
-                        display_text = ""
-                        tool = self._tools.get(tool_call.function.name)
-                        if tool:
-                            try:
-                                display_text = tool.display(**tool_call.function.arguments_dict)
-                            except Exception:
-                                display_text = ""
-                        self.event_bus.emit(
-                            "agent.tool.call.ready",
-                            agent=self,
-                            tool_name=tool_call.function.name,
-                            tool_call_id=tool_call.id,
-                            arguments=tool_call.function.arguments_dict,
-                            display=display_text,
-                        )
-                self.session.add_message("assistant", content=full_content, tool_calls=tool_calls_list)
-            
-            # 构建完整的 ChatCompletion 用于触发 stop 事件
-            if last_chunk:
-                from eflycode.core.llm.protocol import ChatCompletion, Message as LLMMessage
-                # 将累积的 tool_calls 转换为列表
-                tool_calls_list = None
-                if accumulated_tool_calls:
-                    tool_calls_list = [accumulated_tool_calls[i] for i in sorted(accumulated_tool_calls.keys())]
-                
-                completion = ChatCompletion(
-                    id=last_chunk.id,
-                    object="chat.completion",
-                    created=last_chunk.created,
-                    model=last_chunk.model,
-                    message=LLMMessage(
-                        role="assistant",
-                        content=full_content,
-                        tool_calls=tool_calls_list,
-                    ),
-                    finish_reason=last_chunk.finish_reason,
-                    usage=last_chunk.usage,
+        suffix = " (stream)" if stream else ""
+        logger.debug(f"触发 AfterModel hook{suffix}: session_id={self.session.id}")
+        hook_result = self.hook_system.fire_after_model_event(
+            request, response, self.session.id, self._get_workspace_dir()
+        )
+
+        # 如果 hook 要求停止，抛出异常
+        if not hook_result.continue_:
+            logger.warning(f"AfterModel hook 要求停止执行{suffix}: {hook_result.system_message}")
+            raise RuntimeError(
+                hook_result.system_message or "Hook requested to stop execution"
+            )
+
+    def _finish_chat(self, response: ChatCompletion) -> ChatConversation:
+        """将非流式响应添加到会话并触发 stop 事件
+
+        Args:
+            response: LLM 响应
+
+        Returns:
+            ChatConversation: 包含当前响应和全部对话信息的会话对象
+        """
+        content = response.message.content or ""
+        tool_calls = response.message.tool_calls
+
+        tool_calls_count = len(tool_calls) if tool_calls else 0
+        content_length = len(content)
+        logger.debug(f"添加 assistant 消息到会话: content_length={content_length}, tool_calls_count={tool_calls_count}")
+        self.session.add_message("assistant", content=content, tool_calls=tool_calls)
+
+        self.event_bus.emit("agent.message.stop", agent=self, response=response)
+
+        logger.debug("chat 请求完成")
+        return ChatConversation(completion=response, messages=self.session.get_messages())
+
+    def _handle_stream_chunk(self, chunk: ChatCompletionChunk, accumulator: StreamAccumulator) -> None:
+        """累积流式响应块并触发增量事件
+
+        Args:
+            chunk: 流式响应块
+            accumulator: 流式累积器
+        """
+        started_indexes = accumulator.feed(chunk)
+
+        # 触发增量事件
+        if chunk.delta and chunk.delta.content:
+            self.event_bus.emit("agent.message.delta", agent=self, delta=chunk.delta.content)
+
+        # 当检测到新的工具调用时，立即触发事件显示工具调用提示
+        for index in started_indexes:
+            tool_name = accumulator.tool_call_name(index)
+            if tool_name:
+                self.event_bus.emit(
+                    "agent.tool.call.start",
+                    agent=self,
+                    tool_name=tool_name,
+                    tool_call_id=accumulator.tool_call_id(index),
+                    show_call=False,
                 )
 
-                # 触发 AfterModel hook（流式模式）
-                if self.hook_system:
-                    logger.debug(f"触发 AfterModel hook (stream): session_id={self.session.id}")
-                    from pathlib import Path
-                    from eflycode.core.config.config_manager import ConfigManager
+    def _finish_stream(self, accumulator: StreamAccumulator) -> Optional[ChatCompletion]:
+        """流式完成后将完整内容添加到会话，并构建完整的 ChatCompletion
 
-                    config_manager = ConfigManager.get_instance()
-                    workspace_dir = config_manager.get_workspace_dir() or Path.cwd()
+        Args:
+            accumulator: 流式累积器
 
-                    hook_result = self.hook_system.fire_after_model_event(
-                        request, completion, self.session.id, workspace_dir
+        Returns:
+            Optional[ChatCompletion]: 完整的响应，如果没有收到任何 chunk 则返回 None
+        """
+        content = accumulator.content.text
+        tool_calls_list = accumulator.tool_calls()
+
+        if content or tool_calls_list:
+            if tool_calls_list:
+                # 当工具调用完整时，触发工具正在执行事件
+                for tool_call in tool_calls_list:
+                    display_text = ""
+                    tool = self._tools.get(tool_call.function.name)
+                    if tool:
+                        try:
+                            display_text = tool.display(**tool_call.function.arguments_dict)
+                        except Exception:
+                            display_text = ""
+                    self.event_bus.emit(
+                        "agent.tool.call.ready",
+                        agent=self,
+                        tool_name=tool_call.function.name,
+                        tool_call_id=tool_call.id,
+                        arguments=tool_call.function.arguments_dict,
+                        display=display_text,
                     )
+            self.session.add_message("assistant", content=content, tool_calls=tool_calls_list)
+
+        # 构建完整的 ChatCompletion 用于触发 stop 事件
+        last_chunk = accumulator.last_chunk
+        if not last_chunk:
+            return None
+        return ChatCompletion(
+            id=last_chunk.id,
+            object="chat.completion",
+            created=last_chunk.created,
+            model=last_chunk.model,
+            message=Message(
+                role="assistant",
+                content=content,
+                tool_calls=tool_calls_list,
+            ),
+            finish_reason=last_chunk.finish_reason,
+            usage=last_chunk.usage,
+        )
 
-                    # 如果 hook 要求停止，抛出异常
-                    if not hook_result.continue_:
-                        logger.warning(f"AfterModel hook 要求停止执行 (stream): {hook_result.system_message}")
-                        raise RuntimeError(
-                            hook_result.system_message or "Hook requested to stop execution"
-                        )
-
-                usage_info = completion.usage if completion.usage else None
-                content_length = len(full_content)
-                logger.info(f"LLM 流式响应完成: chunks={chunk_count}, content_length={content_length}, usage={usage_info}")
-                self.event_bus.emit("agent.message.stop", agent=self, response=completion)
-        except Exception as e:
-            error_type = type(e).__name__
-            error_message = str(e)
-            logger.error(f"stream 请求失败: {error_type}: {error_message}", exc_info=True)
-            self.event_bus.emit("agent.error", agent=self, error=e)
-            raise
+    def _emit_stream_stop(self, completion: ChatCompletion, accumulator: StreamAccumulator) -> None:
+        """流式响应完成后记录日志并触发 stop 事件"""
+        usage_info = completion.usage if completion.usage else None
+        content_length = len(accumulator.content)
+        logger.info(f"LLM 流式响应完成: chunks={accumulator.chunk_count}, content_length={content_length}, usage={usage_info}")
+        self.event_bus.emit("agent.message.stop", agent=self, response=completion)
+
+    def _handle_request_error(self, mode: str, error: Exception) -> None:
+        """记录请求错误并触发错误事件"""
+        error_type = type(error).__name__
+        error_message = str(error)
+        logger.error(f"{mode} 请求失败: {error_type}: {error_message}", exc_info=True)
+        self.event_bus.emit("agent.error", agent=self, error=error)
 
     def run_tool(self, tool_name: str, tool_call_id: str = "", **kwargs) -> str:
         """执行工具
@@ -484,9 +532,120 @@ class BaseAgent:
         Raises:
             ToolExecutionError: 当工具执行失败时抛出
         """
+        return self._run_tool(tool_name, tool_call_id, kwargs)
+
+    def prefetch_tool(self, tool_name: str, **kwargs) -> Tuple[str, bool]:
+        """只执行工具本身，不触发 hook 和工具事件
+
+        用于在流式响应过程中提前执行 speculative_safe 的工具。模型最终确认调用时再通过 run_prefetched_tool
+        触发 hook 和事件；工具本身没有副作用，被丢弃或被 hook 拒绝的提前执行不会产生可见的影响
+
+        Args:
+            tool_name: 工具名称
+            **kwargs: 工具参数
+
+        Returns:
+            Tuple[str, bool]: 工具执行结果和是否命中结果缓存
+
+        Raises:
+            ToolExecutionError: 当工具执行失败时抛出
+        """
+        tool = self._resolve_tool(tool_name, "", kwargs)
+        return self._execute_tool(tool, kwargs)
+
+    def run_prefetched_tool(self, tool_name: str, prefetched: Future, tool_call_id: str = "", **kwargs) -> str:
+        """使用提前执行的结果完成工具调用
+
+        与 run_tool 一样触发 BeforeTool hook、AfterTool hook 和工具事件，只是工具本身已经由 prefetch_tool 执行。
+        BeforeTool hook 拒绝执行时提前执行的结果会被丢弃
+
+        Args:
+            tool_name: 工具名称
+            prefetched: prefetch_tool 的 Future
+            tool_call_id: 工具调用 ID
+            **kwargs: 工具参数
+
+        Returns:
+            str: 工具执行结果
+
+        Raises:
+            ToolExecutionError: 当工具执行失败时抛出
+        """
+        return self._run_tool(tool_name, tool_call_id, kwargs, prefetched)
+
+    def _run_tool(
+        self,
+        tool_name: str,
+        tool_call_id: str,
+        kwargs: Dict[str, Any],
+        prefetched: Optional[Future] = None,
+        run: Optional[Callable[[BaseTool, Dict[str, Any]], str]] = None,
+    ) -> str:
+        """触发 hook 和工具事件并执行工具，有提前执行的结果时直接使用
+
+        Args:
+            tool_name: 工具名称
+            tool_call_id: 工具调用 ID
+            kwargs: 工具参数
+            prefetched: prefetch_tool 的 Future
+            run: 执行工具本身的函数，默认调用 tool.run
+        """
+        tool = self._resolve_tool(tool_name, tool_call_id, kwargs)
+        denied_message = self._fire_before_tool_hook(tool_name, kwargs)
+        if denied_message is not None:
+            return denied_message
+
+        self.event_bus.emit("agent.tool.call", agent=self, tool_name=tool_name, arguments=kwargs, tool_call_id=tool_call_id)
+
+        try:
+            if prefetched is not None:
+                result, cached = prefetched.result()
+            else:
+                result, cached = self._execute_tool(tool, kwargs, run)
+            if cached:
+                return self._finish_cached_tool(tool, kwargs, result, tool_call_id)
+            return self._finish_tool(tool, kwargs, result, tool_call_id)
+        except Exception as e:
+            self._handle_tool_error(tool_name, e, tool_call_id)
+            raise
+
+    def _execute_tool(
+        self,
+        tool: BaseTool,
+        kwargs: Dict[str, Any],
+        run: Optional[Callable[[BaseTool, Dict[str, Any]], str]] = None,
+    ) -> Tuple[str, bool]:
+        """执行工具本身，优先使用结果缓存
+
+        Args:
+            tool: 工具
+            kwargs: 工具参数
+            run: 执行工具本身的函数，默认调用 tool.run
+
+        Returns:
+            Tuple[str, bool]: 工具执行结果和是否命中结果缓存
+        """
+        cached_result, cache_slot = self.tool_result_cache.lookup(tool, kwargs, self._get_workspace_dir())
+        if cached_result is not None:
+            return cached_result, True
+
+        try:
+            with trace_span("tool.run", tool=tool.name):
+                result = self._limit_tool_result(tool, run(tool, kwargs) if run else tool.run(**kwargs))
+            self.tool_result_cache.store(cache_slot, result)
+            return result, False
+        finally:
+            self._invalidate_tool_cache_after(tool)
+
+    def _resolve_tool(self, tool_name: str, tool_call_id: str, kwargs: Dict[str, Any]) -> BaseTool:
+        """查找要执行的工具
+
+        Raises:
+            ToolExecutionError: 当工具不存在时抛出
+        """
         param_names = list(kwargs.keys())
         logger.info(f"开始执行工具: tool_name={tool_name}, tool_call_id={tool_call_id}, params={param_names}")
-        
+
         tool = self._tools.get(tool_name)
         if not tool:
             logger.error(f"工具不存在: {tool_name}")
@@ -494,95 +653,163 @@ class BaseAgent:
                 message=f"工具不存在: {tool_name}",
                 tool_name=tool_name,
             )
+        return tool
 
-        # 触发 BeforeTool hook
-        if self.hook_system:
-            logger.debug(f"触发 BeforeTool hook: tool_name={tool_name}, session_id={self.session.id}")
-            from pathlib import Path
-            from eflycode.core.config.config_manager import ConfigManager
+    def _fire_before_tool_hook(self, tool_name: str, kwargs: Dict[str, Any]) -> Optional[str]:
+        """触发 BeforeTool hook
 
-            config_manager = ConfigManager.get_instance()
-            workspace_dir = config_manager.get_workspace_dir() or Path.cwd()
+        Args:
+            tool_name: 工具名称
+            kwargs: 工具参数
+
+        Returns:
+            Optional[str]: 如果 hook 拒绝执行，返回作为工具结果的拒绝信息，否则返回 None
 
-            hook_result = self.hook_system.fire_before_tool_event(
-                tool_name, kwargs, self.session.id, workspace_dir
+        Raises:
+            ToolExecutionError: 当 hook 阻止工具执行时抛出
+            RuntimeError: 当 hook 要求停止执行时抛出
+        """
+        if not self.hook_system:
+            return None
+
+        logger.debug(f"触发 BeforeTool hook: tool_name={tool_name}, session_id={self.session.id}")
+        hook_result = self.hook_system.fire_before_tool_event(
+            tool_name, kwargs, self.session.id, self._get_workspace_dir()
+        )
+
+        # 检查 decision
+        if hook_result.decision == "block":
+            logger.warning(f"BeforeTool hook 阻止工具执行: tool_name={tool_name}, reason={hook_result.system_message}")
+            raise ToolExecutionError(
+                message=hook_result.system_message or f"Hook blocked tool execution: {tool_name}",
+                tool_name=tool_name,
             )
+        elif hook_result.decision == "deny":
+            # deny 表示拒绝执行，返回错误信息
+            logger.info(f"BeforeTool hook 拒绝工具执行: tool_name={tool_name}, reason={hook_result.system_message}")
+            return hook_result.system_message or f"Tool execution denied: {tool_name}"
+
+        # 如果 hook 要求停止，抛出异常
+        if not hook_result.continue_:
+            logger.warning(f"BeforeTool hook 要求停止执行: tool_name={tool_name}")
+            raise RuntimeError(
+                hook_result.system_message or "Hook requested to stop execution"
+            )
+        return None
 
-            # 检查 decision
-            if hook_result.decision == "block":
-                logger.warning(f"BeforeTool hook 阻止工具执行: tool_name={tool_name}, reason={hook_result.system_message}")
-                raise ToolExecutionError(
-                    message=hook_result.system_message or f"Hook blocked tool execution: {tool_name}",
-                    tool_name=tool_name,
-                )
-            elif hook_result.decision == "deny":
-                # deny 表示拒绝执行，返回错误信息
-                logger.info(f"BeforeTool hook 拒绝工具执行: tool_name={tool_name}, reason={hook_result.system_message}")
-                return hook_result.system_message or f"Tool execution denied: {tool_name}"
-
-            # 如果 hook 要求停止，抛出异常
-            if not hook_result.continue_:
-                logger.warning(f"BeforeTool hook 要求停止执行: tool_name={tool_name}")
-                raise RuntimeError(
-                    hook_result.system_message or "Hook requested to stop execution"
-                )
+    def _fire_after_tool_hook(self, tool_name: str, kwargs: Dict[str, Any], result: str) -> None:
+        """触发 AfterTool hook
 
-        self.event_bus.emit("agent.tool.call", agent=self, tool_name=tool_name, arguments=kwargs, tool_call_id=tool_call_id)
+        Raises:
+            RuntimeError: 当 hook 要求停止执行时抛出
+        """
+        if not self.hook_system:
+            return
 
-        try:
-            result = tool.run(**kwargs)
-            result_length = len(result) if result else 0
-            logger.info(f"工具执行完成: tool_name={tool_name}, result_length={result_length}")
+        logger.debug(f"触发 AfterTool hook: tool_name={tool_name}, session_id={self.session.id}")
+        hook_result = self.hook_system.fire_after_tool_event(
+            tool_name, kwargs, result, self.session.id, self._get_workspace_dir()
+        )
 
-            # 触发 AfterTool hook
-            if self.hook_system:
-                logger.debug(f"触发 AfterTool hook: tool_name={tool_name}, session_id={self.session.id}")
-                from pathlib import Path
-                from eflycode.core.config.config_manager import ConfigManager
+        # 如果 hook 要求停止，抛出异常
+        if not hook_result.continue_:
+            logger.warning(f"AfterTool hook 要求停止执行: tool_name={tool_name}")
+            raise RuntimeError(
+                hook_result.system_message or "Hook requested to stop execution"
+            )
 
-                config_manager = ConfigManager.get_instance()
-                workspace_dir = config_manager.get_workspace_dir() or Path.cwd()
+    def _finish_tool(self, tool: BaseTool, kwargs: Dict[str, Any], result: str, tool_call_id: str) -> str:
+        """工具执行完成后触发 AfterTool hook 和结果事件
 
-                hook_result = self.hook_system.fire_after_tool_event(
-                    tool_name, kwargs, result, self.session.id, workspace_dir
-                )
+        Returns:
+            str: 工具执行结果
+        """
+        result_length = len(result) if result else 0
+        logger.info(f"工具执行完成: tool_name={tool.name}, result_length={result_length}")
 
-                # 如果 hook 要求停止，抛出异常
-                if not hook_result.continue_:
-                    logger.warning(f"AfterTool hook 要求停止执行: tool_name={tool_name}")
-                    raise RuntimeError(
-                        hook_result.system_message or "Hook requested to stop execution"
-                    )
+        self._fire_after_tool_hook(tool.name, kwargs, result)
+        self._emit_tool_result(tool, result, tool_call_id)
+        return result
 
-            show_result = tool.permission in {"edit", "delete"}
-            self.event_bus.emit(
-                "agent.tool.result",
-                agent=self,
-                tool_name=tool_name,
-                result=result,
-                tool_call_id=tool_call_id,
-                show_result=show_result,
-            )
+    def _limit_tool_result(self, tool: BaseTool, result: str) -> str:
+        """过长的工具结果写入磁盘，只在会话中保留预览和 handle
+
+        Args:
+            tool: 工具
+            result: 工具执行结果
+
+        Returns:
+            str: 未超过限制时返回原结果，否则返回预览
+        """
+        if self.max_tool_result_chars is None or not result or len(result) <= self.max_tool_result_chars:
             return result
-        except ToolExecutionError as e:
-            error_message = str(e)
+        try:
+            limited = self.tool_output_store.spill(result, threshold=self.max_tool_result_chars)
+        except OSError as e:
+            # 写入失败时保留完整结果，不影响工具调用
+            logger.warning(f"保存工具输出失败: tool_name={tool.name}, error={e}")
+            return result
+        logger.info(f"工具结果过长已写入磁盘: tool_name={tool.name}, length={len(result)}")
+        return limited
+
+    def _finish_cached_tool(self, tool: BaseTool, kwargs: Dict[str, Any], cached_result: str, tool_call_id: str) -> str:
+        """使用缓存结果完成工具调用，结果前会添加缓存标记
+
+        Returns:
+            str: 带缓存标记的工具执行结果
+        """
+        stats = self.tool_result_cache.stats()
+        logger.info(f"工具结果命中缓存: tool_name={tool.name}, hits={stats['hits']}, misses={stats['misses']}")
+        return self._finish_tool(tool, kwargs, TOOL_RESULT_CACHED_MARK + cached_result, tool_call_id)
+
+    def _invalidate_tool_cache_after(self, tool: BaseTool) -> None:
+        """可能修改工作区的工具执行后清空工具结果缓存，执行失败时也可能已经产生了部分修改"""
+        if tool.mutates_workspace:
+            self.tool_result_cache.invalidate()
+
+    def _emit_tool_result(self, tool: BaseTool, result: str, tool_call_id: str) -> None:
+        """触发工具结果事件"""
+        show_result = tool.permission in {"edit", "delete"}
+        self.event_bus.emit(
+            "agent.tool.result",
+            agent=self,
+            tool_name=tool.name,
+            result=result,
+            tool_call_id=tool_call_id,
+            show_result=show_result,
+        )
+
+    def _handle_tool_error(self, tool_name: str, error: Exception, tool_call_id: str) -> None:
+        """记录工具执行错误并触发错误事件"""
+        if isinstance(error, ToolExecutionError):
+            error_message = str(error)
             logger.error(f"工具执行错误: tool_name={tool_name}, error={error_message}")
-            self.event_bus.emit("agent.tool.error", agent=self, tool_name=tool_name, error=e, tool_call_id=tool_call_id)
-            raise
-        except Exception as e:
-            error_type = type(e).__name__
-            error_message = str(e)
+        else:
+            error_type = type(error).__name__
+            error_message = str(error)
             logger.error(f"工具执行时发生意外错误: tool_name={tool_name}, error={error_type}: {error_message}", exc_info=True)
-            self.event_bus.emit("agent.tool.error", agent=self, tool_name=tool_name, error=e, tool_call_id=tool_call_id)
-            raise
+        self.event_bus.emit("agent.tool.error", agent=self, tool_name=tool_name, error=error, tool_call_id=tool_call_id)
 
     def get_available_tools(self) -> List[ToolDefinition]:
         """获取可用工具列表
 
+        工具较多时保留核心工具、会话中用过的工具和与最近对话最相关的工具，
+        BeforeToolSelection hook 收到的是选择之后的列表
+
         Returns:
             List[ToolDefinition]: 工具定义列表
         """
-        tools = [tool.definition for tool in self._tools.values()]
+        tools = self._tools.get_definitions()
+        if self.tool_selector is not None:
+            registered_count = len(tools)
+            with trace_span("agent.select_tools", tools=registered_count):
+                tools = self.tool_selector.select(
+                    tools,
+                    self.session.get_messages(),
+                    core_tools=(tool.name for tool in self._tools.tools() if tool.core),
+                )
+            if len(tools) != registered_count:
+                logger.debug(f"按相关性选择工具: registered={registered_count}, selected={len(tools)}")
         tool_names = [t.function.name for t in tools if t.function]
         tools_count = len(tools)
         logger.debug(f"获取可用工具列表: count={tools_count}, tool_names={tool_names}")
@@ -590,14 +817,8 @@ class BaseAgent:
         # 触发 BeforeToolSelection hook
         if self.hook_system:
             logger.debug(f"触发 BeforeToolSelection hook: session_id={self.session.id}")
-            from pathlib import Path
-            from eflycode.core.config.config_manager import ConfigManager
-
-            config_manager = ConfigManager.get_instance()
-            workspace_dir = config_manager.get_workspace_dir() or Path.cwd()
-
             hook_result, modified_tools = self.hook_system.fire_before_tool_selection_event(
-                tools, self.session.id, workspace_dir
+                tools, self.session.id, self._get_workspace_dir()
             )
 
             # 如果 hook 返回了修改后的工具列表，使用修改后的列表
@@ -615,7 +836,8 @@ class BaseAgent:
         Args:
             tool: 要添加的工具
         """
-        self._tools[tool.name] = tool
+        self._tools.add(tool)
+        self.tool_result_cache.invalidate()
 
     def remove_tool(self, tool_name: str) -> bool:
         """移除工具
@@ -626,10 +848,10 @@ class BaseAgent:
         Returns:
             bool: 是否成功移除
         """
-        if tool_name in self._tools:
-            del self._tools[tool_name]
-            return True
-        return False
+        removed = self._tools.remove(tool_name)
+        if removed:
+            self.tool_result_cache.invalidate()
+        return removed
 
     def add_tool_group(self, tool_group: ToolGroup) -> None:
         """添加工具组
@@ -639,7 +861,8 @@ class BaseAgent:
         """
         self._tool_groups.append(tool_group)
         for tool in tool_group.tools:
-            self._tools[tool.name] = tool
+            self._tools.add(tool)
+        self.tool_result_cache.invalidate()
 
     def remove_tool_group(self, group_name: str) -> bool:
         """移除工具组
@@ -654,7 +877,8 @@ class BaseAgent:
             if group.name == group_name:
                 removed_group = self._tool_groups.pop(i)
                 for tool in removed_group.tools:
-                    self._tools.pop(tool.name, None)
+                    self._tools.remove(tool.name)
+                self.tool_result_cache.invalidate()
                 return True
         return False
 
@@ -669,6 +893,10 @@ class BaseAgent:
         """
         return self._tools.get(tool_name)
 
+    def invalidate_tools(self) -> None:
+        """使缓存的工具定义失效，工具定义在运行时发生变化时调用"""
+        self._tools.invalidate()
+
     def _set_provider(self, provider: LLMProvider) -> None:
         """设置 Provider 并合并 advisors
 
@@ -700,5 +928,8 @@ class BaseAgent:
 
     def shutdown(self) -> None:
         """关闭 Agent，清理资源"""
+        # 共享全局事件总线时需要取消订阅，否则关闭后的 Agent 会一直留在总线上
+        self.event_bus.unsubscribe("app.config.llm.changed", self._model_changed_handler)
         if self._owns_event_bus:
             self.event_bus.shutdown(wait=True)
+
@@ -1,25 +1,46 @@
-from typing import Dict, Optional
+import contextvars
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from eflycode.core.agent.base import BaseAgent, ChatConversation, TaskConversation, TaskStatistics
+from eflycode.core.llm.protocol import ChatCompletionChunk
+from eflycode.core.llm.stream_accumulator import StreamAccumulator
 from eflycode.core.tool.errors import ToolExecutionError
 from eflycode.core.utils.logger import logger
+from eflycode.core.utils.tracing import Tracer
 
 # Agent 运行配置常量
 AGENT_MAX_ITERATIONS = 50
+AGENT_MAX_PARALLEL_TOOLS = 4  # 并发执行只读工具的最大线程数
 
 
 class AgentRunLoop:
     """Agent 运行循环，处理用户输入、工具调用和对话流程"""
 
-    def __init__(self, agent: BaseAgent):
+    def __init__(
+        self,
+        agent: BaseAgent,
+        parallel_tool_calls: bool = True,
+        max_parallel_tools: int = AGENT_MAX_PARALLEL_TOOLS,
+        speculative_tool_calls: bool = False,
+    ):
         """初始化运行循环
 
         Args:
             agent: Agent 实例
+            parallel_tool_calls: 是否并发执行同一轮中相邻的只读工具调用
+            max_parallel_tools: 并发执行工具的最大线程数
+            speculative_tool_calls: 是否在流式响应过程中提前执行参数已完整的只读工具调用，
+                只对声明了 speculative_safe 的工具生效，parallel_tool_calls 为 False 时不提前执行
         """
         self.agent = agent
         self.max_iterations = AGENT_MAX_ITERATIONS
         self.current_iteration = 0
+        self.parallel_tool_calls = parallel_tool_calls
+        self.max_parallel_tools = max(1, max_parallel_tools)
+        self.speculative_tool_calls = speculative_tool_calls
+        self._tool_executor: Optional[ThreadPoolExecutor] = None
 
     def run(self, user_input: str, stream: bool = True) -> TaskConversation:
         """主运行循环
@@ -31,6 +52,11 @@ class AgentRunLoop:
         Returns:
             TaskConversation: 包含最终响应、全部对话信息和任务统计的会话对象
         """
+        with Tracer.get_instance().turn(session_id=self.agent.session.id, stream=stream):
+            return self._run(user_input, stream)
+
+    def _run(self, user_input: str, stream: bool) -> TaskConversation:
+        """执行一次任务的运行循环"""
         logger.info(f"开始执行任务，流式模式: {stream}")
         
         self.current_iteration = 0
@@ -82,19 +108,20 @@ class AgentRunLoop:
                 self.current_iteration += 1
                 statistics.iterations = self.current_iteration
                 logger.debug(f"开始迭代 {self.current_iteration}/{self.max_iterations}")
+                speculative = None
 
                 if stream:
-                    # 使用流式对话
-                    full_content = ""
-                    last_chunk = None
-                    
-                    for chunk in self.agent.stream(user_input if self.current_iteration == 1 else ""):
-                        if chunk.delta and chunk.delta.content:
-                            full_content += chunk.delta.content
+                    # 使用流式对话，复用 Agent 的流式累积器，不再单独累积内容
+                    accumulator = StreamAccumulator()
+                    if self.speculative_tool_calls and self.parallel_tool_calls:
+                        speculative = _SpeculativeToolCalls(self)
+                        accumulator.subscribe(speculative.feed)
+
+                    for chunk in self.agent.stream(user_input if self.current_iteration == 1 else "", accumulator=accumulator):
                         if chunk.usage:
                             statistics.add_usage(chunk.usage)
-                        last_chunk = chunk
-                    
+                    last_chunk = accumulator.last_chunk
+
                     # 流式完成后，从 session 获取最后的消息来构建 completion
                     # BaseAgent.stream 已经将完整内容添加到 session 并触发了 stop 事件
                     messages = self.agent.session.get_messages()
@@ -119,7 +146,7 @@ class AgentRunLoop:
                             )
                             conversation = ChatConversation(completion=completion, messages=messages)
                             last_conversation = conversation
-                            response_content = full_content or last_message.content or ""
+                            response_content = accumulator.content.text or last_message.content or ""
                         else:
                             # 回退到非流式
                             conversation = self.agent.chat(user_input if self.current_iteration == 1 else "")
@@ -144,7 +171,8 @@ class AgentRunLoop:
 
                 tool_calls = self._parse_tool_calls(conversation.completion)
                 if not tool_calls:
-                    statistics.tool_calls_count = self.current_iteration - 1
+                    if speculative:
+                        speculative.discard()
                     result_content = response_content
 
                     # 触发 AfterAgent hook
@@ -170,25 +198,23 @@ class AgentRunLoop:
                     self.agent.event_bus.emit("agent.task.stop", agent=self.agent, result=result_content)
                     return TaskConversation(conversation=conversation, statistics=statistics)
 
+                tool_calls = [tool_call for tool_call in tool_calls if tool_call.get("name")]
+                statistics.tool_calls_count += len(tool_calls)
+
                 tool_results = []
-                for tool_call in tool_calls:
-                    tool_name = tool_call.get("name")
-                    arguments = tool_call.get("arguments", {})
+                tool_results_list = self._execute_tool_calls(tool_calls, speculative)
+                if speculative:
+                    speculative.discard()
+                for tool_call, tool_result in zip(tool_calls, tool_results_list):
+                    tool_name = tool_call["name"]
                     tool_call_id = tool_call.get("id", "")
 
-                    if not tool_name:
-                        continue
-
-                    logger.info(f"执行工具: {tool_name}, 参数: {arguments}")
-
-                    statistics.tool_calls_count += 1
-                    tool_result = self._execute_tool(tool_name, arguments, tool_call_id)
-
                     tool_result_length = len(tool_result)
                     logger.info(f"工具 {tool_name} 执行完成，结果长度: {tool_result_length} 字符")
 
                     # 将工具执行结果作为工具消息添加到 session 中
                     # 这是 OpenAI API 的要求：当 assistant 消息包含 tool_calls 时，必须紧接着发送工具消息
+                    # 工具消息按照原始 tool_calls 的顺序添加，与实际执行完成的先后无关
                     self.agent.session.add_message("tool", content=tool_result, tool_call_id=tool_call_id)
                     tool_results.append((tool_name, tool_result))
 
@@ -198,7 +224,6 @@ class AgentRunLoop:
                 user_input = f"{results_text}\n\n请根据工具执行结果继续处理任务。"
 
             if last_conversation:
-                statistics.tool_calls_count = self.current_iteration - 1
                 logger.warning(f"达到最大迭代次数: iterations={self.current_iteration}, tool_calls={statistics.tool_calls_count}")
                 self.agent.event_bus.emit("agent.task.stop", agent=self.agent, result="达到最大迭代次数")
                 return TaskConversation(conversation=last_conversation, statistics=statistics)
@@ -206,7 +231,6 @@ class AgentRunLoop:
             final_conversation = self.agent.chat("")
             if final_conversation.completion.usage:
                 statistics.add_usage(final_conversation.completion.usage)
-            statistics.tool_calls_count = self.current_iteration - 1
             logger.warning(f"达到最大迭代次数: iterations={self.current_iteration}, tool_calls={statistics.tool_calls_count}")
             self.agent.event_bus.emit("agent.task.stop", agent=self.agent, result="达到最大迭代次数")
             return TaskConversation(conversation=final_conversation, statistics=statistics)
@@ -220,6 +244,8 @@ class AgentRunLoop:
                 return TaskConversation(conversation=last_conversation, statistics=statistics)
             raise
         finally:
+            self._shutdown_tool_executor()
+
             # 触发 SessionEnd hook
             if self.agent.hook_system:
                 logger.debug(f"触发 SessionEnd hook: session_id={self.agent.session.id}")
@@ -233,6 +259,10 @@ class AgentRunLoop:
                     self.agent.session.id, workspace_dir
                 )
 
+            # 回合结束，通知后台线程写入会话，不等待磁盘
+            from eflycode.core.agent.session_store import SessionStore
+            SessionStore.get_instance().flush(wait=False)
+
     def _parse_tool_calls(self, completion) -> Optional[list[Dict]]:
         """解析响应中的工具调用
 
@@ -264,13 +294,139 @@ class AgentRunLoop:
 
         return parsed_calls or None
 
-    def _execute_tool(self, tool_name: str, arguments: Dict, tool_call_id: str = "") -> str:
+    def _execute_tool_calls(
+        self,
+        tool_calls: List[Dict],
+        speculative: Optional["_SpeculativeToolCalls"] = None,
+    ) -> List[str]:
+        """执行一轮中的全部工具调用
+
+        相邻的可并发工具调用（只读工具）会被合并为一批，在有界线程池中并发执行；
+        有副作用的工具调用（edit、delete 等）单独串行执行，并作为批次之间的屏障，
+        保证其前后的读取能看到正确的工作区状态
+
+        Args:
+            tool_calls: 解析后的工具调用列表
+            speculative: 流式响应过程中已提前执行的工具调用，命中时直接复用其结果
+
+        Returns:
+            List[str]: 与 tool_calls 顺序一一对应的工具执行结果
+        """
+        results: List[str] = []
+        pending: List[Future] = []
+
+        for tool_call in tool_calls:
+            prefetched = speculative.take(tool_call) if speculative else None
+            if prefetched is not None:
+                # 工具已提前执行，hook 和工具事件在确认调用后才触发
+                pending.append(self._submit_tool_call(tool_call, prefetched))
+                continue
+            if self.parallel_tool_calls and self._is_concurrency_safe(tool_call["name"]):
+                pending.append(self._submit_tool_call(tool_call))
+                continue
+            # 有副作用的工具调用需要等待之前的只读工具全部完成
+            results.extend(self._collect_results(pending))
+            pending = []
+            results.append(self._execute_tool_call(tool_call))
+
+        results.extend(self._collect_results(pending))
+        return results
+
+    def _collect_results(self, futures: List[Future]) -> List[str]:
+        """按提交顺序收集工具执行结果
+
+        如果某个工具抛出非 ToolExecutionError 异常，会在这里重新抛出
+
+        Args:
+            futures: 工具执行的 Future 列表
+
+        Returns:
+            List[str]: 与 futures 顺序一一对应的工具执行结果
+        """
+        if len(futures) > 1:
+            logger.info(f"等待并发执行的只读工具完成: count={len(futures)}")
+        return [future.result() for future in futures]
+
+    def _execute_tool_call(self, tool_call: Dict, prefetched: Optional[Future] = None) -> str:
+        """执行单个解析后的工具调用
+
+        Args:
+            tool_call: 工具调用信息，格式为 {"name": str, "arguments": dict, "id": str}
+            prefetched: 提前执行该工具调用的 Future
+
+        Returns:
+            str: 工具执行结果
+        """
+        tool_name = tool_call["name"]
+        arguments = tool_call.get("arguments", {})
+        logger.info(f"执行工具: {tool_name}, 参数: {arguments}")
+        return self._execute_tool(tool_name, arguments, tool_call.get("id", ""), prefetched)
+
+    def _is_concurrency_safe(self, tool_name: str) -> bool:
+        """判断工具是否可以并发执行
+
+        Args:
+            tool_name: 工具名称
+
+        Returns:
+            bool: 工具存在且声明为可并发时返回 True
+        """
+        tool = self.agent.get_tool(tool_name)
+        return bool(tool and tool.concurrency_safe)
+
+    def _is_speculative_safe(self, tool_name: str) -> bool:
+        """判断工具是否可以在模型确认调用之前提前执行
+
+        Args:
+            tool_name: 工具名称
+
+        Returns:
+            bool: 工具存在且声明为可提前执行时返回 True
+        """
+        tool = self.agent.get_tool(tool_name)
+        return bool(tool and tool.speculative_safe)
+
+    def _submit_tool_call(self, tool_call: Dict, prefetched: Optional[Future] = None) -> Future:
+        """提交到工具线程池执行，复制当前上下文以保留链路追踪的回合信息"""
+        context = contextvars.copy_context()
+        return self._get_tool_executor().submit(context.run, self._execute_tool_call, tool_call, prefetched)
+
+    def _submit_prefetch(self, tool_call: Dict) -> Future:
+        """提交到工具线程池提前执行工具本身，不触发 hook 和工具事件"""
+        context = contextvars.copy_context()
+        return self._get_tool_executor().submit(
+            context.run, self.agent.prefetch_tool, tool_call["name"], **tool_call["arguments"]
+        )
+
+    def _get_tool_executor(self) -> ThreadPoolExecutor:
+        """获取工具执行线程池，首次使用时创建"""
+        if self._tool_executor is None:
+            self._tool_executor = ThreadPoolExecutor(
+                max_workers=self.max_parallel_tools,
+                thread_name_prefix="eflycode-tool",
+            )
+        return self._tool_executor
+
+    def _shutdown_tool_executor(self) -> None:
+        """关闭工具执行线程池"""
+        if self._tool_executor is not None:
+            self._tool_executor.shutdown(wait=True)
+            self._tool_executor = None
+
+    def _execute_tool(
+        self,
+        tool_name: str,
+        arguments: Dict,
+        tool_call_id: str = "",
+        prefetched: Optional[Future] = None,
+    ) -> str:
         """执行工具
 
         Args:
             tool_name: 工具名称
             arguments: 工具参数
             tool_call_id: 工具调用 ID
+            prefetched: 提前执行该工具调用的 Future，不为 None 时直接使用其结果
 
         Returns:
             str: 工具执行结果，如果执行失败则返回错误信息
@@ -279,6 +435,8 @@ class AgentRunLoop:
             Exception: 如果不是 ToolExecutionError，则重新抛出异常
         """
         try:
+            if prefetched is not None:
+                return self.agent.run_prefetched_tool(tool_name, prefetched, tool_call_id=tool_call_id, **arguments)
             return self.agent.run_tool(tool_name, tool_call_id=tool_call_id, **arguments)
         except ToolExecutionError as e:
             # 捕获工具执行错误，将错误信息作为结果返回给模型
@@ -298,3 +456,117 @@ class AgentRunLoop:
         """
         return self.current_iteration < self.max_iterations
 
+
+class _SpeculativeToolCalls:
+    """流式响应过程中提前执行的只读工具调用
+
+    订阅本轮的 StreamAccumulator，一旦某个 speculative_safe 工具调用的参数 JSON 完整，
+    就提交到工具线程池执行，让工具执行与剩余 token 的生成重叠。
+    提前执行发生在 BeforeTool hook 之前，因此只用于没有副作用的内置读取工具。
+    结果会保留到本轮响应结束，只有最终的工具调用与提前执行时完全一致才会被复用，
+    否则结果会被丢弃并重新执行。提前执行只运行工具本身，BeforeTool/AfterTool hook 和工具事件
+    在复用结果时才触发，被丢弃的调用不会出现在 hook 和界面中
+    """
+
+    def __init__(self, run_loop: AgentRunLoop):
+        """初始化
+
+        Args:
+            run_loop: 所属的运行循环
+        """
+        self._run_loop = run_loop
+        self._dispatched: Dict[int, tuple[Dict, Future]] = {}  # index -> (工具调用, Future)
+        # 第一个不可并发工具调用的 index，其后的调用需要看到它的执行结果，不能提前执行
+        self._barrier: Optional[int] = None
+
+    def feed(self, chunk: ChatCompletionChunk, accumulator: StreamAccumulator) -> None:
+        """处理一个已被累积的流式 chunk，作为 StreamAccumulator 的订阅者调用
+
+        Args:
+            chunk: 流式响应块
+            accumulator: 累积了该 chunk 的流式累积器
+        """
+        if not chunk.delta or not chunk.delta.tool_calls:
+            return
+
+        for index in sorted({delta_tc.index for delta_tc in chunk.delta.tool_calls}):
+            self._update(index, accumulator)
+
+    def _update(self, index: int, accumulator: StreamAccumulator) -> None:
+        """参数变化后检查工具调用是否可以提前执行
+
+        Args:
+            index: 工具调用 index
+            accumulator: 流式累积器
+        """
+        name = accumulator.tool_call_name(index)
+        if not name:
+            return
+
+        if not self._run_loop._is_concurrency_safe(name):
+            if self._barrier is None or index < self._barrier:
+                self._barrier = index
+                for dispatched_index in [i for i in self._dispatched if i > index]:
+                    self._drop(dispatched_index)
+            return
+
+        if self._barrier is not None and index > self._barrier:
+            return
+        if not self._run_loop._is_speculative_safe(name):
+            return
+
+        # 参数 JSON 只有以 } 结尾时才可能完整，避免每个 chunk 都拼接并解析参数
+        arguments_text = accumulator.tool_call_arguments(index)
+        arguments = None
+        if arguments_text.endswith("}"):
+            try:
+                arguments = json.loads(arguments_text.text)
+            except json.JSONDecodeError:
+                arguments = None
+
+        dispatched = self._dispatched.get(index)
+        if dispatched is not None:
+            if dispatched[0]["arguments"] == arguments:
+                return
+            # 已提前执行的调用参数发生变化，丢弃旧结果
+            self._drop(index)
+
+        if not isinstance(arguments, dict):
+            return
+
+        tool_call_id = accumulator.tool_call_id(index)
+        tool_call = {"name": name, "arguments": arguments, "id": tool_call_id}
+        logger.debug(f"提前执行只读工具: tool_name={name}, tool_call_id={tool_call_id}")
+        future = self._run_loop._submit_prefetch(tool_call)
+        self._dispatched[index] = (tool_call, future)
+
+    def _drop(self, index: int) -> None:
+        """丢弃提前执行的工具调用"""
+        tool_call, future = self._dispatched.pop(index)
+        future.cancel()
+        logger.debug(f"丢弃提前执行的工具结果: tool_name={tool_call['name']}, tool_call_id={tool_call['id']}")
+
+    def take(self, tool_call: Dict) -> Optional[Future]:
+        """取出与最终工具调用一致的提前执行结果
+
+        Args:
+            tool_call: 解析后的最终工具调用
+
+        Returns:
+            Optional[Future]: 提前执行的 Future，如果没有一致的提前执行则返回 None
+        """
+        for index, (dispatched, future) in self._dispatched.items():
+            if (
+                dispatched["id"] == tool_call.get("id", "")
+                and dispatched["name"] == tool_call["name"]
+                and dispatched["arguments"] == tool_call.get("arguments", {})
+            ):
+                del self._dispatched[index]
+                logger.debug(f"复用提前执行的工具结果: tool_name={tool_call['name']}, tool_call_id={dispatched['id']}")
+                return future
+        return None
+
+    def discard(self) -> None:
+        """丢弃所有未被复用的提前执行结果"""
+        for index in list(self._dispatched):
+            self._drop(index)
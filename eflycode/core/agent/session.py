@@ -1,10 +1,13 @@
+import itertools
 import uuid
-from typing import Any, List, Optional
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional, Union
 
-from eflycode.core.llm.protocol import LLMRequest, Message, MessageRole
+from eflycode.core.llm.protocol import LLMRequest, Message, MessageRole, ToolDefinition
 from eflycode.core.llm.providers.base import LLMProvider
 from eflycode.core.context.manager import ContextManager
-from eflycode.core.context.strategies import ContextStrategyConfig
+from eflycode.core.context.tokenizer import Tokenizer
+from eflycode.core.context.strategies import ContextStrategyConfig, SummaryCheckpoint
 from eflycode.core.utils.logger import logger
 
 
@@ -22,7 +25,23 @@ class Session:
             context_config: 上下文管理配置，如果为 None 则不启用上下文管理
         """
         self._id = session_id or str(uuid.uuid4())
+        # 只追加的消息列表，清空或替换历史时换成新的列表，已返回的 MessageHistory 不受影响
         self._messages: List[Message] = []
+        self._history: Optional[MessageHistory] = None
+        # token 数累计值，只在消息追加后计算新增的部分
+        self._token_model: Optional[str] = None
+        self._token_items: Optional[List[Message]] = None
+        self._token_counted: int = 0
+        self._token_total: int = 0
+        # token 数估算值的累计值，只在远离压缩阈值时代替精确值
+        self._estimate_model: Optional[str] = None
+        self._estimate_items: Optional[List[Message]] = None
+        self._estimate_counted: int = 0
+        self._estimate_total: int = 0
+        # 滚动总结检查点，summary 策略压缩时原地更新，随会话一起保存
+        self._summary = SummaryCheckpoint()
+        # 上一次请求的系统提示词组成部分，由 Advisor 记录，计入下一次请求的 token 预算
+        self._prompt_components: Dict[str, str] = {}
         self._initial_user_question: Optional[str] = None
         self.context_config = context_config
         self.context_manager: Optional[ContextManager] = ContextManager() if context_config else None
@@ -41,15 +60,35 @@ class Session:
         """获取初始用户问题"""
         return self._initial_user_question
 
+    @property
+    def summary_checkpoint(self) -> SummaryCheckpoint:
+        """获取滚动总结检查点"""
+        return self._summary
+
+    def set_prompt_component(self, name: str, content: str) -> None:
+        """记录系统提示词的组成部分
+
+        Advisor 在请求发送前把系统提示词、可用技能等内容添加到请求中，
+        记录的内容用于计算之后请求的 token 预算
+
+        Args:
+            name: 组成部分名称，见 eflycode.core.context.budget 中的 PROMPT_COMPONENT_*
+            content: 添加到请求中的内容，为空时表示没有该部分
+        """
+        self._prompt_components[name] = content
+
     def load_state(
         self,
         session_id: str,
         messages: List[Message],
         initial_user_question: Optional[str] = None,
+        summary_checkpoint: Optional[SummaryCheckpoint] = None,
     ) -> None:
         """加载会话状态"""
         self._id = session_id
         self._messages = list(messages)
+        self._history = None
+        self._summary = summary_checkpoint or SummaryCheckpoint()
         if initial_user_question:
             self._initial_user_question = initial_user_question
         else:
@@ -96,18 +135,63 @@ class Session:
         from eflycode.core.agent.session_store import SessionStore
         SessionStore.get_instance().save(self)
 
-    def get_messages(self) -> List[Message]:
+    def get_messages(self) -> "MessageHistory":
         """获取所有消息
 
+        返回当前历史的只读快照，不复制消息列表，之后添加的消息不会出现在已返回的快照中
+
+        Returns:
+            MessageHistory: 消息快照
+        """
+        history = self._history
+        if history is None or history._items is not self._messages or len(history) != len(self._messages):
+            history = MessageHistory(self._messages, len(self._messages))
+            self._history = history
+        return history
+
+    def count_tokens(self, model: str, tokenizer: Tokenizer, exact: bool = True) -> int:
+        """计算当前历史的 token 总数
+
+        累计上次计算之后新增消息的 token 数，模型变化或历史被清空、替换时重新计算
+
+        Args:
+            model: 模型名称
+            tokenizer: Token 计算器
+            exact: 是否精确计算，为 False 时返回按字节数估算的 token 总数，不进行编码
+
         Returns:
-            List[Message]: 消息列表
+            int: token 总数
         """
-        return self._messages.copy()
+        messages = self._messages
+        if not exact:
+            if self._estimate_model != model or self._estimate_items is not messages:
+                self._estimate_model = model
+                self._estimate_items = messages
+                self._estimate_counted = 0
+                self._estimate_total = 0
+            count = len(messages)
+            for i in range(self._estimate_counted, count):
+                self._estimate_total += tokenizer.estimate_message_tokens(messages[i], model)
+            self._estimate_counted = count
+            return self._estimate_total
+
+        if self._token_model != model or self._token_items is not messages:
+            self._token_model = model
+            self._token_items = messages
+            self._token_counted = 0
+            self._token_total = 0
+        count = len(messages)
+        for i in range(self._token_counted, count):
+            self._token_total += tokenizer.count_message_tokens(messages[i], model)
+        self._token_counted = count
+        return self._token_total
 
     def clear(self) -> None:
         """清空会话历史"""
         message_count = len(self._messages)
-        self._messages.clear()
+        self._messages = []
+        self._history = None
+        self._summary = SummaryCheckpoint()
         self._initial_user_question = None
         logger.info(f"清空会话历史: session_id={self._id}, cleared_messages={message_count}")
 
@@ -120,6 +204,7 @@ class Session:
         max_context_length: int,
         provider: Optional[LLMProvider] = None,
         hook_system: Optional[Any] = None,
+        tools: Optional[List[ToolDefinition]] = None,
     ) -> LLMRequest:
         """获取当前上下文，转换为 LLMRequest 格式
 
@@ -128,6 +213,7 @@ class Session:
             max_context_length: 模型的最大上下文长度
             provider: LLM Provider（用于 summary 策略）
             hook_system: Hook 系统实例（可选，用于 PreCompress hook）
+            tools: 本次请求的工具定义（可选），计入 token 预算并设置到请求中
 
         Returns:
             LLMRequest: LLM 请求对象
@@ -144,6 +230,7 @@ class Session:
         # 如果启用了上下文管理，进行压缩
         if self.context_manager and self.context_config:
             logger.debug(f"触发上下文压缩: session_id={self._id}, strategy={self.context_config.strategy_type}")
+            summary_end = self._summary.end
             messages = self.context_manager.manage(
                 messages=messages,
                 model=model,
@@ -153,7 +240,15 @@ class Session:
                 provider=provider,
                 hook_system=hook_system,
                 session_id=self._id,
+                token_counter=self.count_tokens,
+                summary_checkpoint=self._summary,
+                tools=tools,
+                prompt_components=self._prompt_components,
             )
+            if self._summary.end != summary_end:
+                # 生成了新的总结，随会话一起保存
+                from eflycode.core.agent.session_store import SessionStore
+                SessionStore.get_instance().save(self)
             
             compressed_count = len(messages)
             if compressed_count != original_count:
@@ -165,5 +260,51 @@ class Session:
         return LLMRequest(
             model=model,
             messages=messages,
+            tools=tools,
         )
 
+
+class MessageHistory(Sequence):
+    """会话消息的只读快照
+
+    与会话共享只追加的消息列表，只记录快照创建时的长度，创建快照的开销为 O(1)。
+    切片返回新的列表
+    """
+
+    __slots__ = ("_items", "_length")
+
+    def __init__(self, items: List[Message], length: int):
+        self._items = items
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, List[Message]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1:
+                return self._items[start:stop]
+            return [self._items[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("message index out of range")
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[Message]:
+        return itertools.islice(self._items, self._length)
+
+    def __reversed__(self) -> Iterator[Message]:
+        for i in range(self._length - 1, -1, -1):
+            yield self._items[i]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (MessageHistory, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"MessageHistory({list(self)!r})"
@@ -0,0 +1,114 @@
+"""会话内容的按内容寻址存储
+
+较大的消息内容（文件内容、搜索结果等工具输出）以 SHA-256 命名保存在 .eflycode/sessions/blobs 下，
+会话日志中只保存引用。相同的内容在同一会话和不同会话之间只保存一份，可以选择 zlib 压缩
+"""
+
+import hashlib
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from eflycode.core.utils.logger import logger
+
+# blob 存储配置常量
+SESSION_BLOBS_DIR = "blobs"
+SESSION_BLOB_THRESHOLD = 4096  # 超过该字符数的消息内容保存为 blob
+SESSION_BLOB_COMPRESSION_LEVEL = 6
+
+# 压缩方式及对应的文件后缀
+SESSION_BLOB_COMPRESSION_ZLIB = "zlib"
+SESSION_BLOB_COMPRESSION_NONE = "none"
+_BLOB_SUFFIXES = {
+    SESSION_BLOB_COMPRESSION_ZLIB: ".z",
+    SESSION_BLOB_COMPRESSION_NONE: ".txt",
+}
+
+
+class SessionBlobStore:
+    """按内容寻址的会话内容存储"""
+
+    def __init__(self, directory: Path, compression: str = SESSION_BLOB_COMPRESSION_ZLIB):
+        """初始化 blob 存储
+
+        Args:
+            directory: 存储目录
+            compression: 新写入的 blob 的压缩方式，zlib 或 none，读取时两种都支持
+
+        Raises:
+            ValueError: 压缩方式无效
+        """
+        if compression not in _BLOB_SUFFIXES:
+            raise ValueError(f"无效的 blob 压缩方式: {compression}")
+        self.directory = Path(directory)
+        self.compression = compression
+
+    @staticmethod
+    def ref_for(content: str) -> str:
+        """计算内容的引用"""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def put(self, content: str) -> str:
+        """保存内容，已存在相同内容时直接返回引用
+
+        Args:
+            content: 内容
+
+        Returns:
+            str: 内容的引用
+        """
+        data = content.encode("utf-8")
+        ref = hashlib.sha256(data).hexdigest()
+        if self._find(ref) is not None:
+            return ref
+
+        path = self._path(ref, self.compression)
+        if self.compression == SESSION_BLOB_COMPRESSION_ZLIB:
+            data = zlib.compress(data, SESSION_BLOB_COMPRESSION_LEVEL)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写入临时文件再重命名，避免并发写入或中断时留下不完整的文件
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{ref[:16]}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        """读取内容
+
+        Args:
+            ref: 内容的引用
+
+        Returns:
+            Optional[str]: 内容，不存在或已损坏时返回 None
+        """
+        found = self._find(ref)
+        if found is None:
+            return None
+        path, compression = found
+        try:
+            data = path.read_bytes()
+            if compression == SESSION_BLOB_COMPRESSION_ZLIB:
+                data = zlib.decompress(data)
+            return data.decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            logger.warning(f"读取会话 blob 失败: ref={ref}, error={e}")
+            return None
+
+    def _find(self, ref: str):
+        """查找已保存的 blob，返回 (路径, 压缩方式)"""
+        for compression in (self.compression, *(c for c in _BLOB_SUFFIXES if c != self.compression)):
+            path = self._path(ref, compression)
+            if path.exists():
+                return path, compression
+        return None
+
+    def _path(self, ref: str, compression: str) -> Path:
+        # 按引用的前两位分目录，避免单个目录中文件过多
+        return self.directory / ref[:2] / f"{ref}{_BLOB_SUFFIXES[compression]}"
@@ -0,0 +1,311 @@
+"""会话元数据和全文索引
+
+在 .eflycode/sessions/index.sqlite3 中保存：
+- sessions: 每个会话的元数据和对应日志文件的 mtime 与大小，列出会话时只需要 stat 日志文件
+- session_messages / session_fts: 用户提问和助手回答的全文索引（SQLite FTS5），用于按内容搜索历史会话
+- index_state: 索引的状态，记录索引是否已经与全部会话文件同步
+
+索引只是缓存，文件不一致或索引损坏时从原始的会话文件重建
+"""
+
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from eflycode.core.utils.logger import logger
+
+# 索引配置常量
+SESSION_INDEX_FILE = "index.sqlite3"
+SESSION_INDEX_SCHEMA_VERSION = 3
+SESSION_INDEX_TIMEOUT = 5.0  # 等待数据库锁的最长时间（秒）
+
+# 全文索引配置常量
+SESSION_SEARCH_ROLES = ("user", "assistant")  # 参与全文索引的消息角色
+SESSION_SEARCH_MAX_HITS = 1000  # 一次搜索最多读取的匹配消息数，按会话合并前
+SESSION_SEARCH_SNIPPET_TOKENS = 12  # FTS5 摘要的 token 数
+SESSION_SEARCH_SNIPPET_CHARS = 60  # 非 FTS5 搜索时摘要在匹配位置前后保留的字符数
+TRIGRAM_MIN_LENGTH = 3  # trigram 分词器能匹配的最短关键词
+
+# 索引中保存的会话元数据字段
+SESSION_INDEX_FIELDS = (
+    "id",
+    "file_name",
+    "file_mtime_ns",
+    "file_size",
+    "initial_user_question",
+    "message_count",
+    "last_user_message_preview",
+    "created_at",
+    "updated_at",
+)
+
+_SCHEMA = """
+CREATE TABLE sessions (
+    id TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    file_mtime_ns INTEGER NOT NULL,
+    file_size INTEGER NOT NULL,
+    initial_user_question TEXT,
+    message_count INTEGER,
+    last_user_message_preview TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE session_messages (
+    rowid INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX session_messages_session ON session_messages (session_id, seq);
+CREATE TABLE index_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# FTS5 使用 session_messages 作为外部内容表，通过触发器保持同步
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE session_fts USING fts5(
+    content, content='session_messages', content_rowid='rowid', tokenize='{tokenizer}'
+);
+CREATE TRIGGER session_messages_ai AFTER INSERT ON session_messages BEGIN
+    INSERT INTO session_fts (rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER session_messages_ad AFTER DELETE ON session_messages BEGIN
+    INSERT INTO session_fts (session_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+"""
+
+# 按优先顺序尝试的分词器，trigram 支持中文等没有空格分隔的语言
+_FTS_TOKENIZERS = ("trigram", "unicode61")
+
+
+class SessionIndex:
+    """会话元数据和全文索引"""
+
+    def __init__(self, path: Path):
+        """初始化索引，数据库在第一次使用时创建
+
+        Args:
+            path: 数据库文件路径
+        """
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._tokenizer: Optional[str] = None  # 全文索引的分词器，为 None 时不支持 FTS5
+        self._lock = threading.Lock()
+
+    def upsert(
+        self,
+        entry: Dict[str, Any],
+        messages: Optional[Iterable[Tuple[int, str, Optional[str]]]] = None,
+        start: int = 0,
+    ) -> None:
+        """写入或更新一个会话的元数据和全文索引
+
+        Args:
+            entry: 会话元数据，字段见 SESSION_INDEX_FIELDS
+            messages: 需要索引的消息，(序号, 角色, 内容)；为 None 时只更新元数据
+            start: 序号不小于该值的已索引消息会先被删除
+        """
+        values = [entry.get(field) for field in SESSION_INDEX_FIELDS]
+        placeholders = ", ".join("?" for _ in SESSION_INDEX_FIELDS)
+        rows = [
+            (entry["id"], seq, role, content)
+            for seq, role, content in messages or []
+            if role in SESSION_SEARCH_ROLES and content
+        ]
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_INDEX_FIELDS)}) VALUES ({placeholders})",
+                values,
+            )
+            if messages is not None:
+                conn.execute("DELETE FROM session_messages WHERE session_id = ? AND seq >= ?", (entry["id"], start))
+                conn.executemany(
+                    "INSERT INTO session_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)", rows
+                )
+
+        self._run(write)
+
+    def remove(self, session_id: str) -> None:
+        """删除一个会话的元数据和全文索引"""
+
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+
+        self._run(delete)
+
+    def is_synced(self) -> bool:
+        """索引是否已经与全部会话文件同步
+
+        新建或损坏后重建的索引没有同步，其中可能缺少已有的会话
+
+        Returns:
+            bool: 调用过 mark_synced 且之后索引没有被重建时返回 True
+        """
+        row = self._run(lambda conn: conn.execute("SELECT value FROM index_state WHERE name = 'synced'").fetchone())
+        return bool(row and row[0])
+
+    def mark_synced(self) -> None:
+        """记录索引已经与全部会话文件同步"""
+        self._run(lambda conn: conn.execute("INSERT OR REPLACE INTO index_state (name, value) VALUES ('synced', 1)"))
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """读取全部会话的元数据
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 会话 ID 到元数据的映射，索引不可用时返回空字典
+        """
+        rows = self._run(
+            lambda conn: conn.execute(f"SELECT {', '.join(SESSION_INDEX_FIELDS)} FROM sessions").fetchall()
+        )
+        return {row[0]: dict(zip(SESSION_INDEX_FIELDS, row)) for row in rows or []}
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """按内容搜索会话
+
+        多个关键词之间是 AND 关系。支持 FTS5 时按 bm25 排序，
+        否则（或关键词短于 trigram 能匹配的长度时）使用 LIKE 匹配，按会话的更新时间排序
+
+        Args:
+            query: 搜索关键词，以空白分隔
+            limit: 最多返回的会话数量
+
+        Returns:
+            List[Dict[str, Any]]: 匹配的会话元数据，附加 score（越小越相关）和 snippet 字段
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        hits = self._run(lambda conn: self._search_hits(conn, terms)) or []
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for session_id, score, snippet in hits:
+            if session_id not in results:
+                results[session_id] = {"score": score, "snippet": snippet}
+            if len(results) >= limit:
+                break
+        metadata = self.entries()
+        return [
+            {**metadata[session_id], **hit} for session_id, hit in results.items() if session_id in metadata
+        ]
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _search_hits(self, conn: sqlite3.Connection, terms: List[str]) -> List[Tuple[str, float, str]]:
+        """查询匹配的消息，按相关度排序"""
+        use_fts = self._tokenizer is not None and (
+            self._tokenizer != "trigram" or all(len(term) >= TRIGRAM_MIN_LENGTH for term in terms)
+        )
+        if use_fts:
+            match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            return conn.execute(
+                f"""
+                SELECT m.session_id, bm25(session_fts) AS score,
+                       snippet(session_fts, 0, '[', ']', '...', {SESSION_SEARCH_SNIPPET_TOKENS})
+                FROM session_fts JOIN session_messages m ON m.rowid = session_fts.rowid
+                WHERE session_fts MATCH ?
+                ORDER BY score
+                LIMIT {SESSION_SEARCH_MAX_HITS}
+                """,
+                (match,),
+            ).fetchall()
+
+        conditions = " AND ".join("m.content LIKE ? ESCAPE '\\'" for _ in terms)
+        patterns = ["%" + re.sub(r"([%_\\])", r"\\\1", term) + "%" for term in terms]
+        rows = conn.execute(
+            f"""
+            SELECT m.session_id, m.content
+            FROM session_messages m JOIN sessions s ON s.id = m.session_id
+            WHERE {conditions}
+            ORDER BY s.updated_at DESC, m.seq DESC
+            LIMIT {SESSION_SEARCH_MAX_HITS}
+            """,
+            patterns,
+        ).fetchall()
+        return [(session_id, 0.0, _make_snippet(content, terms[0])) for session_id, content in rows]
+
+    def _run(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """在事务中执行操作，索引损坏时删除数据库后重试一次，仍然失败时只记录警告"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    conn = self._connect()
+                    with conn:
+                        return operation(conn)
+                except sqlite3.DatabaseError as e:
+                    if attempt == 0 and not isinstance(e, sqlite3.OperationalError):
+                        logger.warning(f"会话索引已损坏，重建索引: path={self.path}, error={e}")
+                        self._reset()
+                        continue
+                    logger.warning(f"访问会话索引失败: path={self.path}, error={e}")
+                    return None
+        return None
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接，结构版本不一致时清空重建，调用方需要持有 _lock"""
+        if self._conn is not None:
+            return self._conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=SESSION_INDEX_TIMEOUT, check_same_thread=False)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SESSION_INDEX_SCHEMA_VERSION:
+                self._create_schema(conn)
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'session_fts'").fetchone()
+            self._tokenizer = next((t for t in _FTS_TOKENIZERS if row and f"'{t}'" in row[0]), None)
+        except Exception:
+            conn.close()
+            raise
+        self._conn = conn
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        """创建表结构，SQLite 不支持 FTS5 时只创建普通表"""
+        tables = conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for object_type, name in tables:
+            if object_type == "table" and name.startswith("session_fts_"):
+                continue  # FTS5 的影子表随虚拟表一起删除
+            conn.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+        conn.executescript(_SCHEMA)
+        for tokenizer in _FTS_TOKENIZERS:
+            try:
+                conn.executescript(_FTS_SCHEMA.format(tokenizer=tokenizer))
+                break
+            except sqlite3.OperationalError as e:
+                logger.debug(f"创建全文索引失败: tokenizer={tokenizer}, error={e}")
+        conn.execute(f"PRAGMA user_version = {SESSION_INDEX_SCHEMA_VERSION}")
+        conn.commit()
+
+    def _reset(self) -> None:
+        """删除数据库文件，调用方需要持有 _lock"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+
+
+def _make_snippet(content: str, term: str) -> str:
+    """截取关键词前后的内容作为摘要"""
+    position = content.lower().find(term.lower())
+    if position < 0:
+        return content[: SESSION_SEARCH_SNIPPET_CHARS * 2]
+    start = max(0, position - SESSION_SEARCH_SNIPPET_CHARS)
+    end = min(len(content), position + len(term) + SESSION_SEARCH_SNIPPET_CHARS)
+    snippet = f"{content[start:position]}[{content[position:position + len(term)]}]{content[position + len(term):end]}"
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(content) else "")
@@ -1,29 +1,103 @@
 """会话存储
 
 负责保存和恢复会话消息
+
+会话以追加写入的 JSONL 日志保存在 .eflycode/sessions/{id}.jsonl，每行一条记录：
+- header: 第一行，包含格式版本、会话 ID、创建时间和初始提问
+- message: 一条消息，超过 SESSION_BLOB_THRESHOLD 的内容保存在 SessionBlobStore 中，记录中只保存 content_ref
+- truncate: 只保留前 count 条消息，用于清空或改写历史
+- summary: 上下文压缩生成的滚动总结检查点，包含总结内容和已总结的消息数 end，以最后一条为准
+
+每次保存只追加新增的消息，被 truncate 丢弃的记录累积到一定数量后重写整个文件进行压缩
+
+写入由后台线程完成，save 只记录会话的最新快照，同一会话连续的多次保存会合并为一次写入，
+写入时机由 durability 决定：every-message、per-turn 或 interval。
+每次写入后同时增量更新 SessionIndex 中的会话元数据和全文索引，列出和搜索会话时不需要读取会话文件
 """
 
+import atexit
 import datetime
 import json
 import os
+import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from eflycode.core.constants import EFLYCODE_DIR, SESSIONS_DIR
+from eflycode.core.constants import (
+    DEFAULT_SESSION_DURABILITY,
+    DEFAULT_SESSION_FLUSH_INTERVAL,
+    EFLYCODE_DIR,
+    SESSION_DURABILITY_EVERY_MESSAGE,
+    SESSION_DURABILITY_INTERVAL,
+    SESSION_DURABILITY_PER_TURN,
+    SESSIONS_DIR,
+)
+from eflycode.core.agent.session_blobs import (
+    SESSION_BLOB_COMPRESSION_ZLIB,
+    SESSION_BLOB_THRESHOLD,
+    SESSION_BLOBS_DIR,
+    SessionBlobStore,
+)
+from eflycode.core.agent.session_index import SESSION_INDEX_FILE, SESSION_SEARCH_ROLES, SessionIndex
 from eflycode.core.config.config_manager import resolve_workspace_dir
 from eflycode.core.llm.protocol import Message
 from eflycode.core.utils.logger import logger
 
+# 会话日志配置常量
+SESSION_LOG_VERSION = 1
+SESSION_LOG_SUFFIX = ".jsonl"
+LEGACY_SESSION_SUFFIX = ".json"  # 旧版本整体重写的 JSON 格式，只读取
+SESSION_LOG_COMPACT_MIN_DEAD = 64  # 无效记录至少达到该数量才压缩
+SESSION_LOG_COMPACT_RATIO = 1.0  # 无效记录数超过有效消息数的该倍数时压缩
+SESSION_CLOSE_TIMEOUT = 10.0  # 退出时等待写入完成的最长时间（秒）
+SESSION_BLOB_MISSING = "[内容已丢失: blob={ref}]"  # blob 不存在时的消息内容
+
 
 class SessionStore:
     """会话存储单例"""
 
     _instance: Optional["SessionStore"] = None
 
-    def __init__(self, workspace_dir: Optional[Path] = None):
-        """初始化会话存储"""
+    def __init__(
+        self,
+        workspace_dir: Optional[Path] = None,
+        durability: str = DEFAULT_SESSION_DURABILITY,
+        flush_interval: float = DEFAULT_SESSION_FLUSH_INTERVAL,
+        fsync: bool = False,
+        blob_compression: str = SESSION_BLOB_COMPRESSION_ZLIB,
+    ):
+        """初始化会话存储
+
+        Args:
+            workspace_dir: 工作区目录，为 None 时自动解析
+            durability: 写入策略，every-message、per-turn 或 interval
+            flush_interval: interval 策略下的写入间隔（秒）
+            fsync: 写入后是否调用 fsync 确保数据落盘
+            blob_compression: 较大消息内容的压缩方式，zlib 或 none
+        """
         self._workspace_dir = workspace_dir or resolve_workspace_dir()
         self._sessions_dir = self._workspace_dir / EFLYCODE_DIR / SESSIONS_DIR
+        self._logs: Dict[str, _SessionLogState] = {}
+        self._index = SessionIndex(self._sessions_dir / SESSION_INDEX_FILE)
+        self._blobs = SessionBlobStore(self._sessions_dir / SESSION_BLOBS_DIR, blob_compression)
+        self._lock = threading.Lock()
+
+        # 后台写入状态，由 _cond 保护
+        self._cond = threading.Condition()
+        self._pending: Dict[str, _SessionSnapshot] = {}
+        self._pending_since: Optional[float] = None
+        self._flush_requested = False
+        self._writing = False
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+
+        self.durability = DEFAULT_SESSION_DURABILITY
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.configure(durability=durability, flush_interval=flush_interval, fsync=fsync)
         if not self._is_test_environment():
             self._sessions_dir.mkdir(parents=True, exist_ok=True)
 
@@ -35,87 +109,576 @@ class SessionStore:
         return cls._instance
 
     def _get_session_path(self, session_id: str) -> Path:
-        return self._sessions_dir / f"{session_id}.json"
+        return self._sessions_dir / f"{session_id}{SESSION_LOG_SUFFIX}"
+
+    def _get_legacy_session_path(self, session_id: str) -> Path:
+        return self._sessions_dir / f"{session_id}{LEGACY_SESSION_SUFFIX}"
+
+    def configure(
+        self,
+        durability: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        fsync: Optional[bool] = None,
+        blob_compression: Optional[str] = None,
+    ) -> None:
+        """更新写入策略
+
+        Args:
+            durability: 写入策略，every-message、per-turn 或 interval
+            flush_interval: interval 策略下的写入间隔（秒）
+            fsync: 写入后是否调用 fsync
+            blob_compression: 较大消息内容的压缩方式，zlib 或 none
+
+        Raises:
+            ValueError: 写入策略或压缩方式无效
+        """
+        if durability is not None and durability not in (
+            SESSION_DURABILITY_EVERY_MESSAGE,
+            SESSION_DURABILITY_PER_TURN,
+            SESSION_DURABILITY_INTERVAL,
+        ):
+            raise ValueError(f"无效的会话写入策略: {durability}")
+        if blob_compression is not None:
+            self._blobs = SessionBlobStore(self._blobs.directory, blob_compression)
+        with self._cond:
+            if durability is not None:
+                self.durability = durability
+            if flush_interval is not None:
+                self.flush_interval = max(0.0, flush_interval)
+            if fsync is not None:
+                self.fsync = fsync
+            self._cond.notify_all()
 
     def save(self, session: Any) -> None:
-        """保存会话到磁盘"""
+        """保存会话
+
+        只记录会话的最新快照并立即返回，由后台线程按写入策略写入磁盘
+        """
         if self._is_test_environment():
             return
+        checkpoint = session.summary_checkpoint
+        snapshot = _SessionSnapshot(
+            session.id,
+            session.initial_user_question,
+            session.get_messages(),
+            (checkpoint.content, checkpoint.end) if checkpoint.content else None,
+        )
+        with self._cond:
+            if self._closed:
+                # 退出之后的保存直接同步写入
+                self._persist(snapshot)
+                return
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending[snapshot.id] = snapshot
+            self._ensure_writer()
+            if self.durability == SESSION_DURABILITY_EVERY_MESSAGE:
+                self._cond.notify_all()
+
+    def flush(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """立即写入所有待写入的会话
+
+        Args:
+            wait: 是否等待写入完成
+            timeout: 最长等待时间（秒），为 None 时一直等待
+
+        Returns:
+            bool: 不等待时返回 True；等待时返回是否在超时前写入完成
+        """
+        with self._cond:
+            if not self._pending and not self._writing:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            if not wait:
+                return True
+            return self._cond.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def close(self, timeout: float = SESSION_CLOSE_TIMEOUT) -> None:
+        """写入所有待写入的会话并停止后台线程"""
+        self.flush(timeout=timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(timeout)
+
+    def _ensure_writer(self) -> None:
+        """启动后台写入线程，调用方需要持有 _cond"""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        if self._writer is None:
+            atexit.register(self.close)
+        self._writer = threading.Thread(target=self._writer_loop, name="SessionStoreWriter", daemon=True)
+        self._writer.start()
+
+    def _writer_loop(self) -> None:
+        """后台写入循环，每次取出全部待写入的快照一起写入"""
+        while True:
+            with self._cond:
+                while not self._should_write():
+                    if self._closed:
+                        return
+                    self._cond.wait(self._wait_timeout())
+                batch, self._pending = self._pending, {}
+                self._pending_since = None
+                self._flush_requested = False
+                self._writing = True
+            try:
+                for snapshot in batch.values():
+                    self._persist(snapshot)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _should_write(self) -> bool:
+        """是否应该写入待写入的快照，调用方需要持有 _cond"""
+        if not self._pending:
+            return False
+        if self._flush_requested or self._closed or self.durability == SESSION_DURABILITY_EVERY_MESSAGE:
+            return True
+        if self.durability == SESSION_DURABILITY_INTERVAL:
+            return time.monotonic() - self._pending_since >= self.flush_interval
+        return False
+
+    def _wait_timeout(self) -> Optional[float]:
+        """下一次检查前的等待时间，调用方需要持有 _cond"""
+        if self._pending and self.durability == SESSION_DURABILITY_INTERVAL:
+            return max(0.0, self._pending_since + self.flush_interval - time.monotonic())
+        return None
+
+    def _persist(self, session: "_SessionSnapshot") -> None:
+        """将会话快照写入磁盘
+
+        只追加上次写入之后新增的消息；历史被清空或改写时追加 truncate 记录，
+        无效记录过多、日志文件不存在或不是由本实例写入时重写整个文件
+        """
         try:
-            messages = session.get_messages()
-            last_user_message_preview = ""
-            for msg in reversed(messages):
-                if msg.role == "user" and msg.content:
-                    last_user_message_preview = self._summarize_text(msg.content, 200)
-                    break
-            data = {
-                "id": session.id,
-                "initial_user_question": session.initial_user_question,
-                "message_count": len(messages),
-                "last_user_message_preview": last_user_message_preview,
-                "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
-                "messages": [msg.model_dump() for msg in messages],
-            }
-            session_path = self._get_session_path(session.id)
-            session_path.write_text(
-                json.dumps(data, ensure_ascii=True, indent=2),
-                encoding="utf-8",
-            )
+            messages = session.messages
+            with self._lock:
+                state = self._logs.get(session.id)
+                if state is None or not self._get_session_path(session.id).exists():
+                    self._compact(session, messages, state)
+                    return
+
+                keep = state.common_prefix(messages)
+                records: List[Dict[str, Any]] = []
+                timestamp = _now()
+                if keep < len(state.messages):
+                    records.append({"type": "truncate", "ts": timestamp, "count": keep})
+                    state.dead += len(state.messages) - keep + 1
+                    if state.summary is not None and state.summary[1] > keep:
+                        state.summary = None
+                        state.dead += 1
+                records.extend(self._message_record(msg, timestamp) for msg in messages[keep:])
+                if session.summary is not None and session.summary != state.summary:
+                    records.append(self._summary_record(session.summary, timestamp))
+                    if state.summary is not None:
+                        state.dead += 1
+                if not records:
+                    return
+
+                if state.should_compact(len(messages)):
+                    self._compact(session, messages, state)
+                    return
+                self._append(self._get_session_path(session.id), records)
+                del state.messages[keep:]
+                state.messages.extend(messages[keep:])
+                state.summary = session.summary
+                self._update_index(session, state.created_at, timestamp, start=keep)
         except Exception as e:
             logger.warning(f"保存会话失败: session_id={getattr(session, 'id', '')}, error={e}")
 
+    def _update_index(self, session: "_SessionSnapshot", created_at: str, updated_at: str, start: int = 0) -> None:
+        """写入后更新会话索引
+
+        Args:
+            session: 会话快照
+            created_at: 会话创建时间
+            updated_at: 会话更新时间
+            start: 全文索引从该序号开始更新，之前的消息没有变化
+        """
+        session_path = self._get_session_path(session.id)
+        messages = session.messages
+        data = self._build_session_data(session.id, messages, session.initial_user_question, updated_at)
+        self._index.upsert(
+            self._index_entry(session_path, session_path.stat(), data, created_at),
+            messages=((seq, messages[seq].role, messages[seq].content) for seq in range(start, len(messages))),
+            start=start,
+        )
+
+    @staticmethod
+    def _index_entry(session_path: Path, stat: os.stat_result, data: Dict[str, Any], created_at: Optional[str]) -> Dict[str, Any]:
+        return {
+            "id": session_path.stem,
+            "file_name": session_path.name,
+            "file_mtime_ns": stat.st_mtime_ns,
+            "file_size": stat.st_size,
+            "initial_user_question": data.get("initial_user_question"),
+            "message_count": data.get("message_count"),
+            "last_user_message_preview": data.get("last_user_message_preview"),
+            "created_at": created_at,
+            "updated_at": data.get("updated_at"),
+        }
+
     def load(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """加载会话数据"""
+        """加载会话数据
+
+        读取并回放会话日志，日志不存在时读取旧版本的 JSON 文件
+        """
         if self._is_test_environment():
             return None
+        self.flush()
         session_path = self._get_session_path(session_id)
         if not session_path.exists():
-            return None
+            return self._load_legacy(session_id)
 
         try:
-            data = json.loads(session_path.read_text(encoding="utf-8"))
-            raw_messages = data.get("messages", [])
-            messages: List[Message] = [Message(**msg) for msg in raw_messages]
-            return {
-                "id": data.get("id", session_id),
-                "initial_user_question": data.get("initial_user_question"),
-                "message_count": data.get("message_count"),
-                "last_user_message_preview": data.get("last_user_message_preview"),
-                "updated_at": data.get("updated_at"),
-                "messages": messages,
-            }
+            data, state = self._replay(session_path, session_id)
         except Exception as e:
             logger.warning(f"加载会话失败: session_id={session_id}, error={e}")
             return None
+        if state is not None:
+            with self._lock:
+                self._logs[data["id"]] = state
+        return data
 
     def list_recent(self, limit: int = 20) -> List[Dict[str, Any]]:
-        """列出最近的会话"""
+        """列出最近的会话
+
+        按会话文件的修改时间排序，元数据从索引读取，
+        索引中不存在或与文件的 mtime、大小不一致的会话从文件重新读取并更新索引
+        """
         if self._is_test_environment():
             return []
+        self.flush()
+
+        session_files: Dict[str, os.DirEntry] = {}
+        try:
+            with os.scandir(self._sessions_dir) as it:
+                for entry in it:
+                    session_id, suffix = os.path.splitext(entry.name)
+                    if session_id.startswith(".") or not entry.is_file():
+                        continue
+                    if suffix == SESSION_LOG_SUFFIX or (
+                        suffix == LEGACY_SESSION_SUFFIX and session_id not in session_files
+                    ):
+                        session_files[session_id] = entry
+        except FileNotFoundError:
+            return []
+
+        indexed = self._index.entries()
+        for session_id in indexed.keys() - session_files.keys():
+            self._index.remove(session_id)
+
+        stats = {session_id: entry.stat() for session_id, entry in session_files.items()}
         entries: List[Dict[str, Any]] = []
-        for session_path in sorted(
-            self._sessions_dir.glob("*.json"),
-            key=lambda p: p.stat().st_mtime,
-            reverse=True,
-        ):
-            try:
-                raw = json.loads(session_path.read_text(encoding="utf-8"))
-                session_id = raw.get("id") or session_path.stem
-                entries.append(
-                    {
-                        "id": session_id,
-                        "initial_user_question": raw.get("initial_user_question"),
-                        "message_count": raw.get("message_count"),
-                        "last_user_message_preview": raw.get("last_user_message_preview"),
-                        "updated_at": raw.get("updated_at"),
-                    }
-                )
-            except Exception:
-                continue
+        for session_id in sorted(stats, key=lambda sid: stats[sid].st_mtime_ns, reverse=True):
+            entry = session_files[session_id]
+            stat = stats[session_id]
+            metadata = indexed.get(session_id)
+            if (
+                metadata is None
+                or metadata["file_name"] != entry.name
+                or metadata["file_mtime_ns"] != stat.st_mtime_ns
+                or metadata["file_size"] != stat.st_size
+            ):
+                metadata = self._reindex(Path(entry.path), stat)
+                if metadata is None:
+                    continue
+            entries.append(
+                {
+                    "id": session_id,
+                    "initial_user_question": metadata.get("initial_user_question"),
+                    "message_count": metadata.get("message_count"),
+                    "last_user_message_preview": metadata.get("last_user_message_preview"),
+                    "updated_at": metadata.get("updated_at"),
+                }
+            )
             if len(entries) >= limit:
                 break
         return entries
 
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """按内容搜索历史会话
+
+        搜索范围是用户提问和助手回答。只有索引没有与会话文件同步（新建或重建）时才扫描全部会话文件，
+        否则直接搜索索引，命中的会话文件被外部修改或删除时再更新索引并重新搜索
+
+        Args:
+            query: 搜索关键词，多个关键词以空白分隔
+            limit: 最多返回的会话数量
+
+        Returns:
+            List[Dict[str, Any]]: 按相关度排序的会话，字段与 list_recent 相同，另有匹配内容的摘要 snippet
+        """
+        if self._is_test_environment():
+            return []
+        self.flush()
+        if not self._index.is_synced():
+            self._sync_index()
+        results = self._index.search(query, limit)
+        if self._refresh_changed(results):
+            results = self._index.search(query, limit)
+        return [
+            {
+                "id": result["id"],
+                "initial_user_question": result.get("initial_user_question"),
+                "message_count": result.get("message_count"),
+                "last_user_message_preview": result.get("last_user_message_preview"),
+                "updated_at": result.get("updated_at"),
+                "snippet": result.get("snippet"),
+            }
+            for result in results
+        ]
+
+    def rebuild_index(self) -> int:
+        """从会话文件重建索引
+
+        Returns:
+            int: 索引的会话数量
+        """
+        if self._is_test_environment():
+            return 0
+        self.flush()
+        for session_id in self._index.entries():
+            self._index.remove(session_id)
+        return self._sync_index()
+
+    def _sync_index(self) -> int:
+        """扫描全部会话文件更新索引，并记录索引已经同步
+
+        Returns:
+            int: 索引的会话数量
+        """
+        count = len(self.list_recent(limit=sys.maxsize))
+        self._index.mark_synced()
+        return count
+
+    def _refresh_changed(self, entries: List[Dict[str, Any]]) -> bool:
+        """检查索引中的会话文件是否被外部修改或删除，并更新索引
+
+        Args:
+            entries: 索引中的会话元数据
+
+        Returns:
+            bool: 是否有会话的索引被更新
+        """
+        changed = False
+        for metadata in entries:
+            session_path = self._sessions_dir / metadata["file_name"]
+            try:
+                stat = session_path.stat()
+            except FileNotFoundError:
+                self._index.remove(metadata["id"])
+                changed = True
+                continue
+            if metadata["file_mtime_ns"] != stat.st_mtime_ns or metadata["file_size"] != stat.st_size:
+                self._reindex(session_path, stat)
+                changed = True
+        return changed
+
+    def _reindex(self, session_path: Path, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """从会话文件读取元数据并更新索引"""
+        try:
+            if session_path.suffix == SESSION_LOG_SUFFIX:
+                data, state = self._replay(session_path, session_path.stem, rehydrate=False)
+                created_at = state.created_at if state is not None else None
+            else:
+                data = self._read_legacy(session_path, session_path.stem)
+                created_at = None
+        except Exception as e:
+            logger.debug(f"读取会话元数据失败: path={session_path}, error={e}")
+            return None
+        metadata = self._index_entry(session_path, stat, data, created_at)
+        self._index.upsert(
+            metadata, messages=((seq, msg.role, msg.content) for seq, msg in enumerate(data["messages"])), start=0
+        )
+        return metadata
+
+    def _compact(self, session: "_SessionSnapshot", messages: Sequence[Message], state: Optional["_SessionLogState"]) -> None:
+        """重写整个会话日志，只保留 header 和当前消息
+
+        先写入临时文件再重命名，避免中断时留下不完整的日志
+        """
+        created_at = state.created_at if state is not None else _now()
+        header = {
+            "type": "header",
+            "version": SESSION_LOG_VERSION,
+            "id": session.id,
+            "created_at": created_at,
+            "initial_user_question": session.initial_user_question,
+        }
+        timestamp = _now()
+        session_path = self._get_session_path(session.id)
+        session_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=session_path.parent, prefix=f".{session.id}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(_dumps(header))
+                for msg in messages:
+                    f.write(_dumps(self._message_record(msg, timestamp)))
+                if session.summary is not None:
+                    f.write(_dumps(self._summary_record(session.summary, timestamp)))
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_path, session_path)
+        except Exception:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+        self._logs[session.id] = _SessionLogState(list(messages), created_at, summary=session.summary)
+        self._get_legacy_session_path(session.id).unlink(missing_ok=True)
+        self._update_index(session, created_at, timestamp, start=0)
+        if state is not None and state.dead:
+            logger.debug(f"会话日志已压缩: session_id={session.id}, dropped_records={state.dead}")
+
+    def _append(self, session_path: Path, records: List[Dict[str, Any]]) -> None:
+        """追加记录到会话日志"""
+        with open(session_path, "a", encoding="utf-8") as f:
+            f.write("".join(_dumps(record) for record in records))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _message_record(self, message: Message, timestamp: str) -> Dict[str, Any]:
+        """生成消息记录，较大的内容保存为 blob"""
+        data = message.model_dump(mode="json", exclude_none=True)
+        record = {"type": "message", "ts": timestamp, "message": data}
+        if message.content and len(message.content) > SESSION_BLOB_THRESHOLD:
+            record["content_ref"] = self._blobs.put(message.content)
+            del data["content"]
+        return record
+
+    @staticmethod
+    def _summary_record(summary: Tuple[str, int], timestamp: str) -> Dict[str, Any]:
+        """生成滚动总结检查点记录"""
+        content, end = summary
+        return {"type": "summary", "ts": timestamp, "content": content, "end": end}
+
+    def _replay(
+        self, session_path: Path, session_id: str, rehydrate: bool = True
+    ) -> Tuple[Dict[str, Any], Optional["_SessionLogState"]]:
+        """回放会话日志
+
+        Args:
+            session_path: 会话日志路径
+            session_id: 会话 ID
+            rehydrate: 是否从 blob 读取全部消息内容，为 False 时只读取参与全文索引的 user 和 assistant 消息的内容，
+                用于只需要更新索引的场景
+
+        Returns:
+            Tuple[Dict[str, Any], Optional[_SessionLogState]]: 会话数据和日志状态，
+                日志有损坏的记录时状态为 None，下次保存时重写整个文件
+        """
+        header: Dict[str, Any] = {}
+        messages: List[Message] = []
+        summary: Optional[Tuple[str, int]] = None
+        updated_at = None
+        dead = 0
+        corrupted = False
+        blobs: Dict[str, str] = {}  # 同一日志中重复引用的内容只读取一次
+        with open(session_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 写入中断时最后一行可能不完整，跳过
+                    logger.warning(f"跳过损坏的会话记录: path={session_path}")
+                    corrupted = True
+                    continue
+                record_type = record.get("type")
+                if record_type == "message":
+                    data = record["message"]
+                    ref = record.get("content_ref")
+                    if ref and (rehydrate or data.get("role") in SESSION_SEARCH_ROLES):
+                        if ref not in blobs:
+                            blobs[ref] = self._blobs.get(ref)
+                            if blobs[ref] is None:
+                                logger.warning(f"会话内容的 blob 不存在: session_id={session_id}, ref={ref}")
+                                blobs[ref] = SESSION_BLOB_MISSING.format(ref=ref)
+                        data["content"] = blobs[ref]
+                    messages.append(Message(**data))
+                    updated_at = record.get("ts", updated_at)
+                elif record_type == "truncate":
+                    count = record.get("count", 0)
+                    dead += len(messages) - count + 1
+                    del messages[count:]
+                    if summary is not None and summary[1] > count:
+                        summary = None
+                        dead += 1
+                    updated_at = record.get("ts", updated_at)
+                elif record_type == "summary":
+                    if summary is not None:
+                        dead += 1
+                    summary = (record.get("content") or "", record.get("end", 0))
+                elif record_type == "header":
+                    header = record
+
+        data = self._build_session_data(
+            header.get("id", session_id),
+            messages,
+            header.get("initial_user_question"),
+            updated_at or header.get("created_at"),
+        )
+        if summary is not None and summary[1] > len(messages):
+            summary = None
+        data["summary"] = {"content": summary[0], "end": summary[1]} if summary is not None else None
+        if corrupted:
+            return data, None
+        return data, _SessionLogState(list(messages), header.get("created_at") or _now(), dead, summary)
+
+    def _load_legacy(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """读取旧版本的 JSON 会话文件，下次保存时会转换为日志格式"""
+        legacy_path = self._get_legacy_session_path(session_id)
+        if not legacy_path.exists():
+            return None
+        try:
+            return self._read_legacy(legacy_path, session_id)
+        except Exception as e:
+            logger.warning(f"加载会话失败: session_id={session_id}, error={e}")
+            return None
+
+    def _read_legacy(self, session_path: Path, session_id: str) -> Dict[str, Any]:
+        data = json.loads(session_path.read_text(encoding="utf-8"))
+        messages = [Message(**msg) for msg in data.get("messages", [])]
+        return {
+            "id": data.get("id", session_id),
+            "initial_user_question": data.get("initial_user_question"),
+            "message_count": data.get("message_count"),
+            "last_user_message_preview": data.get("last_user_message_preview"),
+            "updated_at": data.get("updated_at"),
+            "messages": messages,
+        }
+
+    def _build_session_data(
+        self,
+        session_id: str,
+        messages: List[Message],
+        initial_user_question: Optional[str],
+        updated_at: Optional[str],
+    ) -> Dict[str, Any]:
+        last_user_message_preview = ""
+        for msg in reversed(messages):
+            if msg.role == "user" and msg.content:
+                last_user_message_preview = self._summarize_text(msg.content, 200)
+                break
+        if not initial_user_question:
+            initial_user_question = next((msg.content for msg in messages if msg.role == "user" and msg.content), None)
+        return {
+            "id": session_id,
+            "initial_user_question": initial_user_question,
+            "message_count": len(messages),
+            "last_user_message_preview": last_user_message_preview,
+            "updated_at": updated_at,
+            "messages": messages,
+        }
+
     @staticmethod
     def _summarize_text(text: str, limit: int) -> str:
         if not text:
@@ -127,3 +690,65 @@ class SessionStore:
     @staticmethod
     def _is_test_environment() -> bool:
         return os.getenv("EFLYCODE_TESTING") == "1"
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _dumps(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class _SessionSnapshot:
+    """保存时的会话快照，后台线程写入时不再访问 Session 对象
+
+    messages 是 Session.get_messages 返回的 MessageHistory，创建快照不复制消息列表
+    """
+
+    __slots__ = ("id", "initial_user_question", "messages", "summary")
+
+    def __init__(
+        self,
+        session_id: str,
+        initial_user_question: Optional[str],
+        messages: Sequence[Message],
+        summary: Optional[Tuple[str, int]] = None,
+    ):
+        self.id = session_id
+        self.initial_user_question = initial_user_question
+        self.messages = messages
+        self.summary = summary  # 滚动总结检查点 (内容, 已总结的消息数)
+
+
+class _SessionLogState:
+    """已写入日志的会话状态
+
+    messages 保存已持久化的消息对象引用，用于按对象身份判断新的消息列表与日志的公共前缀
+    """
+
+    def __init__(
+        self,
+        messages: List[Message],
+        created_at: str,
+        dead: int = 0,
+        summary: Optional[Tuple[str, int]] = None,
+    ):
+        self.messages = messages
+        self.created_at = created_at
+        self.dead = dead  # 日志中已失效的记录数
+        self.summary = summary  # 已写入的滚动总结检查点
+
+    def common_prefix(self, messages: Sequence[Message]) -> int:
+        """计算与已持久化消息的公共前缀长度，消息只追加时为 O(1)"""
+        persisted = len(self.messages)
+        if len(messages) >= persisted and (persisted == 0 or messages[persisted - 1] is self.messages[-1]):
+            return persisted
+        limit = min(persisted, len(messages))
+        for i in range(limit):
+            if messages[i] is not self.messages[i]:
+                return i
+        return limit
+
+    def should_compact(self, live: int) -> bool:
+        return self.dead >= SESSION_LOG_COMPACT_MIN_DEAD and self.dead > live * SESSION_LOG_COMPACT_RATIO
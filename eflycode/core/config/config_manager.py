@@ -21,7 +21,12 @@ from eflycode.core.constants import (
     CONFIG_FILE,
     WORKSPACE_SEARCH_MAX_DEPTH,
 )
-from eflycode.core.context.strategies import ContextStrategyConfig
+from eflycode.core.context.strategies import (
+    OUTPUT_RESERVE_RATIO,
+    SUMMARY_PRECOMPRESS_THRESHOLD,
+    TOOL_OUTPUT_KEEP_RECENT,
+    ContextStrategyConfig,
+)
 from eflycode.core.llm.protocol import DEFAULT_MAX_CONTEXT_LENGTH, LLMConfig
 from eflycode.core.config.models import Config, ConfigMeta
 from eflycode.core.utils.logger import logger
@@ -276,13 +281,19 @@ def parse_context_config(config_data: dict) -> Optional[ContextStrategyConfig]:
     strategy_type = context_section.get("strategy", "summary")
     summary_section = context_section.get("summary", {})
     sliding_window_section = context_section.get("sliding_window", {})
+    elision_section = context_section.get("tool_output_elision", {})
 
     return ContextStrategyConfig(
         strategy_type=strategy_type,
         summary_threshold=summary_section.get("threshold", 0.8),
         summary_keep_recent=summary_section.get("keep_recent", 10),
         summary_model=summary_section.get("model"),
+        summary_precompress_threshold=summary_section.get("precompress_threshold", SUMMARY_PRECOMPRESS_THRESHOLD),
         sliding_window_size=sliding_window_section.get("size", 10),
+        sliding_window_token_ratio=sliding_window_section.get("token_ratio"),
+        tool_output_elision=elision_section.get("enabled", True),
+        tool_output_keep_recent=elision_section.get("keep_recent", TOOL_OUTPUT_KEEP_RECENT),
+        output_reserve_ratio=context_section.get("output_reserve_ratio", OUTPUT_RESERVE_RATIO),
     )
 
 
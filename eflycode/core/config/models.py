@@ -12,13 +12,18 @@ from eflycode.core.constants import (
     DEFAULT_MAX_RETRIES,
     DEFAULT_MODEL,
     DEFAULT_TIMEOUT,
+    DEFAULT_SESSION_DURABILITY,
+    DEFAULT_SESSION_FLUSH_INTERVAL,
     DEFAULT_SYSTEM_VERSION,
 )
 from eflycode.core.context.strategies import (
     ContextStrategyConfig,
+    OUTPUT_RESERVE_RATIO,
     SLIDING_WINDOW_SIZE,
     SUMMARY_KEEP_RECENT,
+    SUMMARY_PRECOMPRESS_THRESHOLD,
     SUMMARY_THRESHOLD,
+    TOOL_OUTPUT_KEEP_RECENT,
 )
 from eflycode.core.llm.protocol import LLMConfig
 
@@ -45,16 +50,25 @@ class SummaryConfig(BaseModel):
     threshold: float = SUMMARY_THRESHOLD
     keep_recent: int = SUMMARY_KEEP_RECENT
     model: Optional[str] = None
+    precompress_threshold: Optional[float] = SUMMARY_PRECOMPRESS_THRESHOLD
 
 
 class SlidingWindowConfig(BaseModel):
     size: int = SLIDING_WINDOW_SIZE
+    token_ratio: Optional[float] = None
+
+
+class ToolOutputElisionConfig(BaseModel):
+    enabled: bool = True
+    keep_recent: int = TOOL_OUTPUT_KEEP_RECENT
 
 
 class ContextSection(BaseModel):
     strategy: Literal["summary", "sliding_window"] = "summary"
     summary: SummaryConfig = Field(default_factory=SummaryConfig)
     sliding_window: SlidingWindowConfig = Field(default_factory=SlidingWindowConfig)
+    tool_output_elision: ToolOutputElisionConfig = Field(default_factory=ToolOutputElisionConfig)
+    output_reserve_ratio: float = OUTPUT_RESERVE_RATIO
 
 
 class CheckpointingSection(BaseModel):
@@ -65,6 +79,13 @@ class SkillsSection(BaseModel):
     enabled: bool = False
 
 
+class SessionSection(BaseModel):
+    durability: Literal["every-message", "per-turn", "interval"] = DEFAULT_SESSION_DURABILITY
+    flush_interval: float = DEFAULT_SESSION_FLUSH_INTERVAL
+    fsync: bool = False
+    blob_compression: Literal["zlib", "none"] = "zlib"
+
+
 class WorkspaceSection(BaseModel):
     workspace_dir: Optional[str] = None
     settings_dir: Optional[str] = None
@@ -86,6 +107,7 @@ class Config(BaseModel):
     checkpointing: Optional[CheckpointingSection] = None
     workspace: Optional[Union[WorkspaceSection, str]] = None
     skills: Optional[SkillsSection] = None
+    session: SessionSection = Field(default_factory=SessionSection)
     meta: ConfigMeta
 
     @property
@@ -127,7 +149,12 @@ class Config(BaseModel):
             summary_threshold=self.context.summary.threshold,
             summary_keep_recent=self.context.summary.keep_recent,
             summary_model=self.context.summary.model,
+            summary_precompress_threshold=self.context.summary.precompress_threshold,
             sliding_window_size=self.context.sliding_window.size,
+            sliding_window_token_ratio=self.context.sliding_window.token_ratio,
+            tool_output_elision=self.context.tool_output_elision.enabled,
+            tool_output_keep_recent=self.context.tool_output_elision.keep_recent,
+            output_reserve_ratio=self.context.output_reserve_ratio,
         )
 
     @property
@@ -27,6 +27,9 @@ LOG_DIR = "logs"
 VERBOSE_DIR = "verbose"
 REQUESTS_DIR = "requests"
 SESSIONS_DIR = "sessions"
+TOOL_OUTPUTS_DIR = "tool_outputs"  # 过长的工具输出
+TRACES_DIR = "traces"  # 链路追踪输出
+TIKTOKEN_CACHE_DIR = "tiktoken"  # 分词编码缓存（用户目录下）
 
 # ============================================================================
 # 日志配置常量
@@ -64,6 +67,17 @@ DEFAULT_MAX_RETRIES = 3
 DEFAULT_SYSTEM_VERSION = "0.1.0"
 WORKSPACE_SEARCH_MAX_DEPTH = 3
 
+# ============================================================================
+# 会话持久化常量
+# ============================================================================
+
+# 会话写入策略
+SESSION_DURABILITY_EVERY_MESSAGE = "every-message"  # 每条消息后立即写入
+SESSION_DURABILITY_PER_TURN = "per-turn"  # 回合结束时写入
+SESSION_DURABILITY_INTERVAL = "interval"  # 最早未写入的消息超过间隔后写入
+DEFAULT_SESSION_DURABILITY = SESSION_DURABILITY_INTERVAL
+DEFAULT_SESSION_FLUSH_INTERVAL = 1.0  # 秒
+
 # ============================================================================
 # 默认模型配置常量
 # ============================================================================
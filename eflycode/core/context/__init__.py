@@ -8,7 +8,9 @@ from eflycode.core.context.strategies import (
     ContextStrategy,
     ContextStrategyConfig,
     SlidingWindowStrategy,
+    SummaryCheckpoint,
     SummaryCompressionStrategy,
+    ToolOutputElisionStrategy,
 )
 from eflycode.core.context.tokenizer import Tokenizer
 
@@ -17,7 +19,9 @@ __all__ = [
     "ContextStrategy",
     "ContextStrategyConfig",
     "SlidingWindowStrategy",
+    "SummaryCheckpoint",
     "SummaryCompressionStrategy",
+    "ToolOutputElisionStrategy",
     "Tokenizer",
 ]
 
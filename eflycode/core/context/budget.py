@@ -0,0 +1,135 @@
+"""请求 token 预算
+
+把模型的最大上下文长度分配给最终请求的各个组成部分：系统提示词、工具定义、可用技能、
+总结、最近的历史和预留的输出。压缩策略按分配给消息的部分（总结和最近的历史）判断和执行压缩，
+系统提示词和工具定义占用的 token 不会再被忽略
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from eflycode.core.llm.protocol import Message, ToolDefinition
+
+from eflycode.core.context.strategies import SummaryCheckpoint
+from eflycode.core.context.tokenizer import Tokenizer
+from eflycode.core.utils.logger import logger
+
+# 预算分配常量
+BUDGET_MIN_MESSAGE_RATIO = 0.25  # 分配给消息的 token 数至少占最大上下文长度的比例
+
+# 请求组成部分的名称，由添加系统提示词的 Advisor 记录
+PROMPT_COMPONENT_SYSTEM = "system"
+PROMPT_COMPONENT_SKILLS = "skills"
+
+
+@dataclass
+class TokenBudget:
+    """一次请求的 token 预算"""
+
+    total: int  # 模型的最大上下文长度
+    output: int  # 预留给模型输出
+    system: int  # 系统提示词
+    tools: int  # 工具定义
+    skills: int  # 可用技能列表
+    summary: int  # 总结检查点
+    history: int  # 最近的历史
+
+    @property
+    def messages(self) -> int:
+        """分配给会话消息的 token 数，包括总结和最近的历史"""
+        return self.summary + self.history
+
+
+class TokenBudgetAllocator:
+    """请求 token 预算分配器
+
+    固定部分（系统提示词、工具定义、可用技能和预留的输出）按实际 token 数分配，剩余部分分配给消息。
+    固定部分过大时消息至少保留 BUDGET_MIN_MESSAGE_RATIO，请求仍可能超出上下文长度，此时记录警告
+    """
+
+    def __init__(self, tokenizer: Tokenizer):
+        """初始化分配器
+
+        Args:
+            tokenizer: Token 计算器
+        """
+        self.tokenizer = tokenizer
+        # 上次计算的模型、工具定义和 token 数，工具定义对象都没有变化时复用
+        self._counted_model: Optional[str] = None
+        self._counted_tools: List[ToolDefinition] = []
+        self._tool_tokens = 0
+
+    def allocate(
+        self,
+        model: str,
+        max_context_length: int,
+        output_tokens: int,
+        tools: Optional[List[ToolDefinition]] = None,
+        prompt_components: Optional[Dict[str, str]] = None,
+        summary: Optional[SummaryCheckpoint] = None,
+    ) -> TokenBudget:
+        """分配 token 预算
+
+        Args:
+            model: 模型名称
+            max_context_length: 模型的最大上下文长度
+            output_tokens: 预留给模型输出的 token 数
+            tools: 本次请求的工具定义
+            prompt_components: 系统提示词的组成部分，键为 PROMPT_COMPONENT_SYSTEM 或 PROMPT_COMPONENT_SKILLS
+            summary: 总结检查点
+
+        Returns:
+            TokenBudget: token 预算
+        """
+        components = prompt_components or {}
+        system = self._count_text(components.get(PROMPT_COMPONENT_SYSTEM), model)
+        skills = self._count_text(components.get(PROMPT_COMPONENT_SKILLS), model)
+        tool_tokens = self._count_tools(tools, model)
+
+        fixed = output_tokens + system + skills + tool_tokens
+        minimum = int(max_context_length * BUDGET_MIN_MESSAGE_RATIO)
+        messages = max_context_length - fixed
+        if messages < minimum:
+            logger.warning(
+                f"系统提示词和工具定义占用的 token 过多: fixed={fixed}, max_context_length={max_context_length}, "
+                f"system={system}, tools={tool_tokens}, skills={skills}, output={output_tokens}"
+            )
+            messages = minimum
+
+        summary_tokens = self._count_text(summary.content if summary else None, model)
+        summary_tokens = min(summary_tokens, messages)
+        return TokenBudget(
+            total=max_context_length,
+            output=output_tokens,
+            system=system,
+            tools=tool_tokens,
+            skills=skills,
+            summary=summary_tokens,
+            history=messages - summary_tokens,
+        )
+
+    def _count_text(self, text: Optional[str], model: str) -> int:
+        """计算一段文本作为系统消息的 token 数"""
+        if not text:
+            return 0
+        return self.tokenizer.count_message_tokens(Message(role="system", content=text), model)
+
+    def _count_tools(self, tools: Optional[List[ToolDefinition]], model: str) -> int:
+        """按发送给模型的 JSON 格式计算工具定义的 token 数
+
+        工具注册表缓存了工具定义对象，定义未变化时每次请求得到的是同一批对象，
+        按对象身份判断是否可以复用上次的结果，避免每次请求都重新序列化和计算
+        """
+        if not tools:
+            return 0
+        if (
+            model != self._counted_model
+            or len(tools) != len(self._counted_tools)
+            or any(a is not b for a, b in zip(tools, self._counted_tools))
+        ):
+            text = json.dumps([tool.model_dump(exclude_none=True) for tool in tools], ensure_ascii=False)
+            self._tool_tokens = self._count_text(text, model)
+            self._counted_model = model
+            self._counted_tools = list(tools)
+        return self._tool_tokens
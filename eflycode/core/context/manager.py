@@ -1,16 +1,31 @@
 """上下文管理器
 
-协调 Tokenizer 和 Strategy，管理上下文压缩
+协调 Tokenizer 和 Strategy，管理上下文压缩。
+先为最终请求的各个组成部分分配 token 预算，策略按分配给消息的部分判断和执行压缩。
+配置的策略执行之前先用 ToolOutputElisionStrategy 省略过期和过旧的工具输出。
+上下文达到提前压缩阈值时在后台线程生成总结，下一次请求时替换调用方的总结检查点，
+当前请求继续使用未压缩的历史，避免在达到压缩阈值时同步等待 LLM 生成总结
 """
 
-from typing import Any, List, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional
 
-from eflycode.core.llm.protocol import Message
+from eflycode.core.llm.protocol import Message, ToolDefinition
 from eflycode.core.llm.providers.base import LLMProvider
 
-from eflycode.core.context.strategies import ContextStrategy, ContextStrategyConfig
+from eflycode.core.context.budget import TokenBudget, TokenBudgetAllocator
+from eflycode.core.context.strategies import (
+    ContextStrategy,
+    ContextStrategyConfig,
+    SummaryCheckpoint,
+    ToolOutputElisionStrategy,
+)
 from eflycode.core.context.tokenizer import Tokenizer
 from eflycode.core.utils.logger import logger
+from eflycode.core.utils.tracing import trace_span, traced
+
+# 需要同步压缩时等待正在进行的后台压缩的最长时间（秒）
+PRECOMPRESS_WAIT_TIMEOUT = 120.0
 
 
 class ContextManager:
@@ -19,7 +34,17 @@ class ContextManager:
     def __init__(self):
         """初始化上下文管理器"""
         self.tokenizer = Tokenizer()
+        self.budget_allocator = TokenBudgetAllocator(self.tokenizer)
+        # 最近一次请求的 token 预算
+        self.budget: Optional[TokenBudget] = None
+        # 后台提前压缩的状态
+        self._precompress_lock = threading.Lock()
+        self._precompress_thread: Optional[threading.Thread] = None
+        self._precompressed: Optional[_PrecompressResult] = None
+        # 工具输出省略策略，每次请求复用以便只解析新增的工具调用
+        self._elision: Optional[ToolOutputElisionStrategy] = None
 
+    @traced("context.manage")
     def manage(
         self,
         messages: List[Message],
@@ -30,6 +55,10 @@ class ContextManager:
         provider: Optional[LLMProvider] = None,
         hook_system: Optional[Any] = None,
         session_id: Optional[str] = None,
+        token_counter: Optional[Callable[..., int]] = None,
+        summary_checkpoint: Optional[SummaryCheckpoint] = None,
+        tools: Optional[List[ToolDefinition]] = None,
+        prompt_components: Optional[Dict[str, str]] = None,
     ) -> List[Message]:
         """管理上下文，返回优化后的消息列表
 
@@ -42,6 +71,13 @@ class ContextManager:
             provider: LLM Provider（用于 summary 策略）
             hook_system: Hook 系统实例（可选）
             session_id: 会话 ID（可选，用于 hooks）
+            token_counter: 计算消息列表 token 总数的函数（可选），参数为模型名称、Tokenizer 和
+                关键字参数 exact，由调用方累计 token 数时传入，避免每次重新计算整个消息列表。
+                exact 为 False 时返回估算值，估算值远离策略的 token 阈值时不进行精确计算
+            summary_checkpoint: 滚动总结检查点（可选，用于 summary 策略），
+                由调用方保存，生成新的总结或后台压缩完成时原地更新；为 None 时不进行后台压缩
+            tools: 本次请求的工具定义（可选），计入 token 预算
+            prompt_components: 系统提示词的组成部分（可选），键为组成部分名称，计入 token 预算
 
         Returns:
             List[Message]: 优化后的消息列表
@@ -62,11 +98,51 @@ class ContextManager:
         # 创建策略实例
         strategy = self._create_strategy(config)
 
+        # 分配请求的 token 预算，之后的压缩按分配给消息的部分进行
+        self.budget = self.budget_allocator.allocate(
+            model,
+            max_context_length,
+            self._output_tokens(config, max_context_length, provider),
+            tools=tools,
+            prompt_components=prompt_components,
+            summary=summary_checkpoint,
+        )
+        max_context_length = self.budget.messages
+        logger.debug(f"请求 token 预算: {self.budget}")
+
+        # 替换上一次请求之后完成的后台压缩结果
+        if summary_checkpoint is not None:
+            self._apply_precompressed(summary_checkpoint, messages)
+
+        # 省略过期和过旧的工具输出，消息的数量和位置不变，检查点的位置仍然有效
+        history = messages
+        if config.tool_output_elision:
+            if self._elision is None:
+                self._elision = ToolOutputElisionStrategy(config)
+            self._elision.config = config
+            with trace_span("context.elide_tool_outputs", messages=len(messages)):
+                messages = self._elision.compress(messages, model, self.tokenizer, max_context_length)
+            if messages is not history:
+                logger.debug(f"已省略过期的工具输出: count={len(self._elision.elided)}")
+                if token_counter is not None:
+                    token_counter = self._elided_token_counter(
+                        token_counter, history, messages, list(self._elision.elided)
+                    )
+
         # 检查是否需要压缩
-        should_compress = strategy.should_compress(messages, model, self.tokenizer, max_context_length)
+        with trace_span("context.should_compress", messages=len(messages)):
+            token_count = None
+            if token_counter is not None and strategy.counts_tokens:
+                token_count = self._count_tokens(strategy, token_counter, model, max_context_length)
+            should_compress = strategy.should_compress(
+                messages, model, self.tokenizer, max_context_length, token_count=token_count
+            )
         logger.debug(f"压缩检查结果: should_compress={should_compress}")
         
         if not should_compress:
+            self._start_precompress(
+                strategy, messages, history, model, max_context_length, provider, summary_checkpoint, token_count
+            )
             return messages
 
         # 触发 PreCompress hook
@@ -85,17 +161,23 @@ class ContextManager:
                 logger.warning(f"PreCompress hook 要求停止压缩: session_id={session_id}")
                 return messages
 
+        # 后台压缩正在进行时等待其完成，避免重复生成总结
+        if summary_checkpoint is not None and self._wait_precompress():
+            self._apply_precompressed(summary_checkpoint, history)
+
         # 执行压缩
         original_count = len(messages)
         logger.info(f"执行上下文压缩: strategy={config.strategy_type}, original_messages={original_count}")
-        compressed_messages = strategy.compress(
-            messages,
-            model,
-            self.tokenizer,
-            max_context_length,
-            initial_user_question,
-            provider,
-        )
+        with trace_span("context.compress", strategy=config.strategy_type, messages=original_count):
+            compressed_messages = strategy.compress(
+                messages,
+                model,
+                self.tokenizer,
+                max_context_length,
+                initial_user_question,
+                provider,
+                checkpoint=summary_checkpoint,
+            )
         
         original_count = len(messages)
         compressed_count = len(compressed_messages)
@@ -106,8 +188,147 @@ class ContextManager:
             f"reduction={reduction}"
         )
 
+        self._start_precompress(strategy, messages, history, model, max_context_length, provider, summary_checkpoint)
         return compressed_messages
 
+    @staticmethod
+    def _output_tokens(config: ContextStrategyConfig, max_context_length: int, provider: Optional[LLMProvider]) -> int:
+        """预留给模型输出的 token 数，模型配置了 max_tokens 时使用 max_tokens"""
+        max_tokens = getattr(getattr(provider, "config", None), "max_tokens", None)
+        if isinstance(max_tokens, int) and max_tokens > 0:
+            return max_tokens
+        return int(max_context_length * config.output_reserve_ratio)
+
+    def _count_tokens(
+        self, strategy: ContextStrategy, token_counter: Callable[..., int], model: str, max_context_length: int
+    ) -> int:
+        """计算用于压缩检查的 token 总数，估算值远离策略的 token 阈值时直接使用估算值"""
+        threshold = strategy.token_threshold(max_context_length)
+        if threshold is not None:
+            estimate = token_counter(model, self.tokenizer, exact=False)
+            if not self.tokenizer.needs_exact_count(estimate, threshold):
+                logger.debug(f"使用估算的 token 数: estimate={estimate}, threshold={threshold}")
+                return estimate
+        return token_counter(model, self.tokenizer, exact=True)
+
+    @staticmethod
+    def _elided_token_counter(
+        token_counter: Callable[..., int], history: List[Message], messages: List[Message], elided: List[int]
+    ) -> Callable[..., int]:
+        """在调用方累计的 token 总数上扣除被省略的工具输出减少的 token 数，只计算 elided 位置的消息"""
+
+        def count(model: str, tokenizer: Tokenizer, exact: bool = True) -> int:
+            measure = tokenizer.count_message_tokens if exact else tokenizer.estimate_message_tokens
+            total = token_counter(model, tokenizer, exact=exact)
+            for i in elided:
+                total += measure(messages[i], model) - measure(history[i], model)
+            return total
+
+        return count
+
+    def _start_precompress(
+        self,
+        strategy: ContextStrategy,
+        messages: List[Message],
+        history: List[Message],
+        model: str,
+        max_context_length: int,
+        provider: Optional[LLMProvider],
+        checkpoint: Optional[SummaryCheckpoint],
+        token_count: Optional[int] = None,
+    ) -> None:
+        """上下文达到提前压缩阈值时启动后台压缩，已有后台压缩在进行或结果尚未使用时不启动
+
+        messages 是省略工具输出后用于生成总结的消息，history 是调用方的原始消息，用于之后判断结果是否仍然适用
+        """
+        if checkpoint is None or provider is None:
+            return
+        with self._precompress_lock:
+            if self._precompressed is not None or (
+                self._precompress_thread is not None and self._precompress_thread.is_alive()
+            ):
+                return
+        if not strategy.should_precompress(
+            messages, model, self.tokenizer, max_context_length, checkpoint, token_count=token_count
+        ):
+            return
+
+        # 后台线程使用消息列表和检查点的副本，调用方之后的修改不影响本次压缩
+        base = SummaryCheckpoint(checkpoint.content, checkpoint.end)
+        snapshot = list(messages)
+        anchors = snapshot if history is messages else list(history)
+        thread = threading.Thread(
+            target=self._precompress,
+            args=(strategy, snapshot, anchors, model, provider, base),
+            name="ContextPrecompress",
+            daemon=True,
+        )
+        with self._precompress_lock:
+            self._precompress_thread = thread
+        logger.info(f"启动后台上下文压缩: messages_count={len(messages)}, summarized={base.end}")
+        thread.start()
+
+    def _precompress(
+        self,
+        strategy: ContextStrategy,
+        messages: List[Message],
+        history: List[Message],
+        model: str,
+        provider: LLMProvider,
+        base: SummaryCheckpoint,
+    ) -> None:
+        """后台线程中生成总结"""
+        try:
+            with trace_span("context.precompress", messages=len(messages)):
+                result = strategy.summarize(messages, model, provider, base)
+        except Exception as e:
+            logger.warning(f"后台上下文压缩失败: error={e}")
+            return
+        if result is None:
+            return
+        with self._precompress_lock:
+            self._precompressed = _PrecompressResult(base, result, history[result.end - 1])
+        logger.info(f"后台上下文压缩完成: summarized={result.end}")
+
+    def _wait_precompress(self) -> bool:
+        """等待正在进行的后台压缩
+
+        Returns:
+            bool: 是否有后台压缩在进行
+        """
+        with self._precompress_lock:
+            thread = self._precompress_thread
+        if thread is None or not thread.is_alive():
+            return False
+        logger.info("等待后台上下文压缩完成")
+        with trace_span("context.precompress_wait"):
+            thread.join(PRECOMPRESS_WAIT_TIMEOUT)
+        return True
+
+    def _apply_precompressed(self, checkpoint: SummaryCheckpoint, messages: List[Message]) -> bool:
+        """用后台压缩的结果更新检查点
+
+        检查点在后台压缩期间被修改，或消息历史被清空、改写时丢弃结果
+
+        Returns:
+            bool: 是否更新了检查点
+        """
+        with self._precompress_lock:
+            pending, self._precompressed = self._precompressed, None
+        if pending is None:
+            return False
+        end = pending.result.end
+        if (
+            (checkpoint.content, checkpoint.end) != (pending.base.content, pending.base.end)
+            or end > len(messages)
+            or messages[end - 1] is not pending.anchor
+        ):
+            logger.debug("丢弃过期的后台上下文压缩结果")
+            return False
+        checkpoint.content = pending.result.content
+        checkpoint.end = end
+        return True
+
     def _create_strategy(self, config: ContextStrategyConfig) -> ContextStrategy:
         """创建策略实例
 
@@ -132,3 +353,16 @@ class ContextManager:
             logger.error(f"未知的策略类型: {config.strategy_type}")
             raise ValueError(f"未知的策略类型: {config.strategy_type}")
 
+
+class _PrecompressResult:
+    """后台压缩的结果
+
+    base 是开始压缩时的检查点，anchor 是最后一条被总结的消息，用于判断结果是否仍然适用于当前历史
+    """
+
+    __slots__ = ("base", "result", "anchor")
+
+    def __init__(self, base: SummaryCheckpoint, result: SummaryCheckpoint, anchor: Message):
+        self.base = base
+        self.result = result
+        self.anchor = anchor
@@ -3,9 +3,13 @@
 实现不同的上下文压缩策略
 """
 
+import json
+import os
 from abc import ABC, abstractmethod
+from bisect import bisect_left
 from dataclasses import dataclass
-from typing import List, Literal, Optional
+from itertools import accumulate
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 from eflycode.core.llm.protocol import LLMRequest, Message
 from eflycode.core.llm.providers.base import LLMProvider
@@ -15,7 +19,30 @@ from eflycode.core.context.tokenizer import Tokenizer
 # 上下文策略默认配置常量
 SUMMARY_THRESHOLD = 0.8  # token 阈值比例
 SUMMARY_KEEP_RECENT = 10  # 保留最新消息数
+SUMMARY_PRECOMPRESS_THRESHOLD = 0.7  # 后台提前压缩的 token 阈值比例
 SLIDING_WINDOW_SIZE = 10  # 窗口大小
+TOOL_OUTPUT_KEEP_RECENT = 20  # 最近的消息中的工具输出不因过旧被省略
+TOOL_OUTPUT_ELISION_MIN_CHARS = 2000  # 过旧的工具输出超过该字符数才省略
+# 过旧的范围按该消息数分段推进，已发送过的历史前缀不会每轮都变化，便于模型服务复用前缀缓存
+TOOL_OUTPUT_ELISION_STEP = 10
+TOOL_OUTPUT_ELIDED = "[已省略: {tool} {target}, {lines} 行; 如有需要请重新读取]"
+OUTPUT_RESERVE_RATIO = 0.05  # 模型没有配置 max_tokens 时为输出预留的 token 比例
+
+# 可以省略输出的只读工具及标识读取对象的参数，相同参数的后一次调用使前一次的输出过期
+_ELIDABLE_TOOLS: Dict[str, Tuple[str, ...]] = {
+    "read_file": ("file_path", "offset", "limit"),
+    "read_many_files": ("include", "exclude"),
+    "list_directory": ("dir_path", "ignore"),
+    "search_file_content": ("pattern", "dir_path", "include"),
+    "glob_search": ("pattern", "dir_path"),
+}
+# 修改文件的工具及文件路径参数，之后 read_file 读取到的该文件的旧输出已过期
+_FILE_EDIT_TOOLS: Dict[str, Tuple[str, ...]] = {
+    "write_file": ("file_path",),
+    "replace": ("file_path",),
+    "delete_file": ("file_path",),
+    "move_file": ("source_path", "target_path"),
+}
 
 
 @dataclass
@@ -27,13 +54,49 @@ class ContextStrategyConfig:
     summary_threshold: float = SUMMARY_THRESHOLD  # token 阈值比例
     summary_keep_recent: int = SUMMARY_KEEP_RECENT  # 保留最新消息数
     summary_model: Optional[str] = None  # 用于 summary 的模型，None 表示使用相同模型
+    summary_precompress_threshold: Optional[float] = SUMMARY_PRECOMPRESS_THRESHOLD  # None 表示不提前压缩
     # Sliding Window 策略配置
     sliding_window_size: int = SLIDING_WINDOW_SIZE  # 窗口大小
+    # 窗口的 token 数占模型最大上下文长度的最大比例，None 表示只按消息数限制
+    sliding_window_token_ratio: Optional[float] = None
+    # 工具输出省略配置，在其他策略之前执行
+    tool_output_elision: bool = True
+    tool_output_keep_recent: int = TOOL_OUTPUT_KEEP_RECENT  # 最近的消息中的工具输出不因过旧被省略
+    # 请求预算配置，模型配置了 max_tokens 时按 max_tokens 预留输出
+    output_reserve_ratio: float = OUTPUT_RESERVE_RATIO
+
+
+@dataclass
+class SummaryCheckpoint:
+    """滚动总结检查点
+
+    messages[:end] 的内容都已包含在 content 中，之后的压缩只需要把新移出保留范围的消息合并到总结，
+    不需要重新总结全部旧消息
+    """
+
+    content: str = ""  # 总结内容
+    end: int = 0  # 已总结的消息数
 
 
 class ContextStrategy(ABC):
     """上下文压缩策略基类"""
 
+    # should_compress 是否使用消息列表的 token 总数，为 False 时调用方不需要计算
+    counts_tokens: bool = False
+
+    def token_threshold(self, max_context_length: int) -> Optional[int]:
+        """should_compress 比较的 token 阈值
+
+        token 总数的估算值远离该阈值时，调用方可以传入估算值代替精确值，返回 None 时总是需要精确值
+
+        Args:
+            max_context_length: 模型的最大上下文长度
+
+        Returns:
+            Optional[int]: token 阈值
+        """
+        return None
+
     @abstractmethod
     def should_compress(
         self,
@@ -41,6 +104,7 @@ class ContextStrategy(ABC):
         model: str,
         tokenizer: Tokenizer,
         max_context_length: int,
+        token_count: Optional[int] = None,
     ) -> bool:
         """判断是否需要压缩
 
@@ -49,6 +113,8 @@ class ContextStrategy(ABC):
             model: 模型名称
             tokenizer: Token 计算器
             max_context_length: 模型的最大上下文长度
+            token_count: 消息列表的 token 总数，为 None 时由策略自行计算；
+                远离 token_threshold 时可以是估算值
 
         Returns:
             bool: 是否需要压缩
@@ -64,6 +130,7 @@ class ContextStrategy(ABC):
         max_context_length: int,
         initial_user_question: Optional[str] = None,
         provider: Optional[LLMProvider] = None,
+        checkpoint: Optional[SummaryCheckpoint] = None,
     ) -> List[Message]:
         """压缩消息列表
 
@@ -74,12 +141,57 @@ class ContextStrategy(ABC):
             max_context_length: 模型的最大上下文长度
             initial_user_question: 用户最初的提问（用于滑动窗口策略）
             provider: LLM Provider（用于 summary 策略）
+            checkpoint: 滚动总结检查点（用于 summary 策略），生成新的总结时原地更新
 
         Returns:
             List[Message]: 压缩后的消息列表
         """
         pass
 
+    def should_precompress(
+        self,
+        messages: List[Message],
+        model: str,
+        tokenizer: Tokenizer,
+        max_context_length: int,
+        checkpoint: Optional[SummaryCheckpoint] = None,
+        token_count: Optional[int] = None,
+    ) -> bool:
+        """判断是否需要在后台提前生成总结，默认不需要
+
+        Args:
+            messages: 消息列表
+            model: 模型名称
+            tokenizer: Token 计算器
+            max_context_length: 模型的最大上下文长度
+            checkpoint: 当前的滚动总结检查点
+            token_count: 消息列表的 token 总数，为 None 时由策略自行计算
+
+        Returns:
+            bool: 是否需要提前生成总结
+        """
+        return False
+
+    def summarize(
+        self,
+        messages: List[Message],
+        model: str,
+        provider: LLMProvider,
+        checkpoint: Optional[SummaryCheckpoint] = None,
+    ) -> Optional[SummaryCheckpoint]:
+        """生成新的滚动总结检查点，不修改传入的检查点，默认不支持
+
+        Args:
+            messages: 消息列表
+            model: 模型名称
+            provider: LLM Provider
+            checkpoint: 当前的滚动总结检查点
+
+        Returns:
+            Optional[SummaryCheckpoint]: 新的检查点，没有需要总结的消息时返回 None
+        """
+        return None
+
 
 class SummaryCompressionStrategy(ContextStrategy):
     """Summary 压缩策略
@@ -87,6 +199,8 @@ class SummaryCompressionStrategy(ContextStrategy):
     当 token 数达到模型窗口的 80% 时，使用 LLM 对旧消息进行总结压缩
     """
 
+    counts_tokens = True
+
     def __init__(self, config: ContextStrategyConfig):
         """初始化策略
 
@@ -101,15 +215,22 @@ class SummaryCompressionStrategy(ContextStrategy):
         model: str,
         tokenizer: Tokenizer,
         max_context_length: int,
+        token_count: Optional[int] = None,
     ) -> bool:
         """判断是否需要压缩"""
         if not messages:
             return False
 
-        total_tokens = tokenizer.count_tokens(messages, model)
-        threshold = int(max_context_length * self.config.summary_threshold)
+        threshold = self._threshold(max_context_length)
+        total_tokens = (
+            token_count if token_count is not None else tokenizer.count_tokens_for_threshold(messages, model, threshold)
+        )
         return total_tokens >= threshold
 
+    def token_threshold(self, max_context_length: int) -> Optional[int]:
+        """触发压缩的 token 数"""
+        return self._threshold(max_context_length)
+
     def compress(
         self,
         messages: List[Message],
@@ -118,6 +239,7 @@ class SummaryCompressionStrategy(ContextStrategy):
         max_context_length: int,
         initial_user_question: Optional[str] = None,
         provider: Optional[LLMProvider] = None,
+        checkpoint: Optional[SummaryCheckpoint] = None,
     ) -> List[Message]:
         """压缩消息列表"""
         if not messages:
@@ -128,16 +250,98 @@ class SummaryCompressionStrategy(ContextStrategy):
         if len(messages) <= keep_recent:
             return messages
 
-        recent_messages = messages[-keep_recent:]
-        old_messages = messages[:-keep_recent]
+        split = len(messages) - keep_recent
 
-        # 如果没有 provider，无法进行 summary，返回原始消息
+        # 已有检查点时先使用已有总结加上之后的原始消息，仍未超过阈值时不调用 LLM，
+        # 超过时只把检查点之后新移出保留范围的消息合并到总结
+        fallback = messages
+        if self._can_resume(checkpoint, split):
+            fallback = self._apply_checkpoint(messages, checkpoint)
+            threshold = self._threshold(max_context_length)
+            if checkpoint.end == split or tokenizer.count_tokens_for_threshold(fallback, model, threshold) < threshold:
+                return fallback
+
+        # 如果没有 provider，无法进行 summary
         if not provider:
-            return messages
+            return fallback
 
-        # 构建 summary 提示词
-        old_messages_text = self._format_messages_for_summary(old_messages)
-        summary_prompt = f"""请总结以下对话历史，保留关键信息和上下文，以便后续对话能够理解：
+        try:
+            result = self.summarize(messages, model, provider, checkpoint)
+        except Exception:
+            # 如果 summary 失败，回退到原始消息或已有的总结
+            return fallback
+
+        if checkpoint is not None:
+            checkpoint.content = result.content
+            checkpoint.end = result.end
+
+        # 构建压缩后的消息列表
+        return self._apply_checkpoint(messages, result)
+
+    def should_precompress(
+        self,
+        messages: List[Message],
+        model: str,
+        tokenizer: Tokenizer,
+        max_context_length: int,
+        checkpoint: Optional[SummaryCheckpoint] = None,
+        token_count: Optional[int] = None,
+    ) -> bool:
+        """判断是否需要在后台提前生成总结
+
+        压缩后的上下文（已有总结加上之后的原始消息）达到提前压缩阈值，且有新移出保留范围的消息时需要
+        """
+        watermark = self.config.summary_precompress_threshold
+        split = len(messages) - self.config.summary_keep_recent
+        if not watermark or split <= 0:
+            return False
+
+        threshold = int(max_context_length * watermark)
+        if self._can_resume(checkpoint, split):
+            if checkpoint.end == split:
+                return False
+            messages = self._apply_checkpoint(messages, checkpoint)
+        elif token_count is not None:
+            return token_count >= threshold
+        return tokenizer.count_tokens_for_threshold(messages, model, threshold) >= threshold
+
+    def summarize(
+        self,
+        messages: List[Message],
+        model: str,
+        provider: LLMProvider,
+        checkpoint: Optional[SummaryCheckpoint] = None,
+    ) -> Optional[SummaryCheckpoint]:
+        """生成新的滚动总结检查点
+
+        检查点可用时只把之后新移出保留范围的消息合并到已有总结，否则总结全部旧消息
+
+        Raises:
+            Exception: LLM 调用失败
+        """
+        split = len(messages) - self.config.summary_keep_recent
+        if split <= 0:
+            return None
+
+        if self._can_resume(checkpoint, split):
+            summary_prompt = f"""以下是之前对话的总结：
+
+{checkpoint.content}
+
+以下是之后的对话内容：
+
+{self._format_messages_for_summary(messages[checkpoint.end:split])}
+
+请将之后的对话内容合并到总结中，输出更新后的完整总结，包括：
+1. 用户的主要问题和需求
+2. 重要的讨论点和决策
+3. 需要保留的上下文信息
+
+总结："""
+        else:
+            # 构建 summary 提示词
+            old_messages_text = self._format_messages_for_summary(messages[:split])
+            summary_prompt = f"""请总结以下对话历史，保留关键信息和上下文，以便后续对话能够理解：
 
 {old_messages_text}
 
@@ -159,24 +363,25 @@ class SummaryCompressionStrategy(ContextStrategy):
             ],
         )
 
-        try:
-            # 调用 LLM 进行 summary
-            response = provider.call(summary_request)
-            summary_content = response.message.content or ""
-
-            # 构建压缩后的消息列表
-            compressed_messages = [
-                Message(
-                    role="system",
-                    content=f"[对话历史总结] {summary_content}",
-                ),
-            ]
-            compressed_messages.extend(recent_messages)
+        # 调用 LLM 进行 summary
+        response = provider.call(summary_request)
+        return SummaryCheckpoint(response.message.content or "", split)
 
-            return compressed_messages
-        except Exception:
-            # 如果 summary 失败，回退到原始消息
-            return messages
+    @staticmethod
+    def _can_resume(checkpoint: Optional[SummaryCheckpoint], split: int) -> bool:
+        """检查点是否可以在此基础上继续总结"""
+        return checkpoint is not None and bool(checkpoint.content) and checkpoint.end <= split
+
+    def _threshold(self, max_context_length: int) -> int:
+        """触发压缩的 token 数"""
+        return int(max_context_length * self.config.summary_threshold)
+
+    @staticmethod
+    def _apply_checkpoint(messages: List[Message], checkpoint: SummaryCheckpoint) -> List[Message]:
+        """用总结替换检查点之前的消息"""
+        compressed_messages = [Message(role="system", content=f"[对话历史总结] {checkpoint.content}")]
+        compressed_messages.extend(messages[checkpoint.end:])
+        return compressed_messages
 
     def _format_messages_for_summary(self, messages: List[Message]) -> str:
         """格式化消息用于 summary
@@ -202,7 +407,10 @@ class SummaryCompressionStrategy(ContextStrategy):
 class SlidingWindowStrategy(ContextStrategy):
     """滑动窗口策略
 
-    只保留最新的 N 条消息，但保留用户最初的提问
+    只保留最新的 N 条消息，但保留用户最初的提问。
+    配置了 sliding_window_token_ratio 时窗口同时受 token 预算限制，
+    用消息 token 数的前缀和二分查找满足预算的起点。
+    窗口不会从 tool 消息开始，助手的 tool_calls 消息和对应的工具结果总是一起保留或丢弃
     """
 
     def __init__(self, config: ContextStrategyConfig):
@@ -219,10 +427,28 @@ class SlidingWindowStrategy(ContextStrategy):
         model: str,
         tokenizer: Tokenizer,
         max_context_length: int,
+        token_count: Optional[int] = None,
     ) -> bool:
         """判断是否需要压缩"""
         window_size = self.config.sliding_window_size
-        return len(messages) > window_size
+        if len(messages) > window_size:
+            return True
+        budget = self._token_budget(max_context_length)
+        if budget is None:
+            return False
+        total_tokens = (
+            token_count if token_count is not None else tokenizer.count_tokens_for_threshold(messages, model, budget)
+        )
+        return total_tokens > budget
+
+    @property
+    def counts_tokens(self) -> bool:
+        """配置了 token 预算时需要消息列表的 token 总数"""
+        return self.config.sliding_window_token_ratio is not None
+
+    def token_threshold(self, max_context_length: int) -> Optional[int]:
+        """窗口的 token 预算"""
+        return self._token_budget(max_context_length)
 
     def compress(
         self,
@@ -232,17 +458,25 @@ class SlidingWindowStrategy(ContextStrategy):
         max_context_length: int,
         initial_user_question: Optional[str] = None,
         provider: Optional[LLMProvider] = None,
+        checkpoint: Optional[SummaryCheckpoint] = None,
     ) -> List[Message]:
         """压缩消息列表"""
         if not messages:
             return messages
 
+        # 保留最新的 N 条消息
         window_size = self.config.sliding_window_size
-        if len(messages) <= window_size:
+        start = max(0, len(messages) - window_size)
+        budget = self._token_budget(max_context_length)
+        if budget is not None:
+            if initial_user_question:
+                # 为可能插入的初始提问预留 token
+                budget -= tokenizer.count_message_tokens(self._initial_question_message(initial_user_question), model)
+            start = self._budget_start(messages, start, budget, model, tokenizer)
+        start = _turn_start(messages, start)
+        if start == 0:
             return messages
-
-        # 保留最新的 N 条消息
-        recent_messages = messages[-window_size:]
+        recent_messages = list(messages[start:])
 
         # 检查初始提问是否在最新消息中
         has_initial_question = False
@@ -254,14 +488,234 @@ class SlidingWindowStrategy(ContextStrategy):
 
         # 如果初始提问不在最新消息中，将其作为第一条消息插入
         if initial_user_question and not has_initial_question:
-            compressed_messages = [
-                Message(
-                    role="system",
-                    content=f"[用户最初的问题] {initial_user_question}",
-                ),
-            ]
+            compressed_messages = [self._initial_question_message(initial_user_question)]
             compressed_messages.extend(recent_messages)
             return compressed_messages
 
         return recent_messages
 
+    def _token_budget(self, max_context_length: int) -> Optional[int]:
+        """窗口的 token 预算，未配置时返回 None"""
+        ratio = self.config.sliding_window_token_ratio
+        if ratio is None:
+            return None
+        return int(max_context_length * ratio)
+
+    @staticmethod
+    def _budget_start(
+        messages: List[Message], start: int, budget: int, model: str, tokenizer: Tokenizer
+    ) -> int:
+        """在 start 之后查找 messages[i:] 的 token 数不超过预算的最小 i
+
+        prefix[k] 是 messages[start:start + k] 的 token 数，随 k 单调不减，
+        messages[start + k:] 的 token 数为 total - prefix[k]，二分查找 prefix[k] >= total - budget 的最小 k
+        """
+        counts = [tokenizer.count_message_tokens(messages[i], model) for i in range(start, len(messages))]
+        prefix = list(accumulate(counts, initial=0))
+        return start + bisect_left(prefix, prefix[-1] - budget)
+
+    @staticmethod
+    def _initial_question_message(initial_user_question: str) -> Message:
+        """生成插入窗口开头的初始提问消息"""
+        return Message(role="system", content=f"[用户最初的问题] {initial_user_question}")
+
+
+class ToolOutputElisionStrategy(ContextStrategy):
+    """工具输出省略策略
+
+    把已过期或过旧的只读工具输出替换为一行说明，不调用 LLM，消息数量和位置保持不变：
+    - 过期：之后用相同参数再次调用了同一工具，或 read_file 读取的文件之后被修改
+    - 过旧：不在最近 tool_output_keep_recent 条消息中，且内容超过 TOOL_OUTPUT_ELISION_MIN_CHARS 个字符
+    """
+
+    def __init__(self, config: ContextStrategyConfig):
+        """初始化策略
+
+        同一会话的每次请求复用同一个实例：解析过的工具调用按 tool_call_id 缓存，
+        消息列表只在末尾追加时只解析新消息，不会每轮都重新解析整个历史的工具参数
+
+        Args:
+            config: 策略配置
+        """
+        self.config = config
+        # tool_call_id -> 解析后的工具调用
+        self._calls: Dict[str, _ParsedCall] = {}
+        # 已解析的消息数和其中最后一条消息，用于判断消息列表是否只在末尾追加
+        self._scanned = 0
+        self._scanned_last: Optional[Message] = None
+        # tool_call_id -> (原工具输出消息, 省略后的消息)，同一条输出每轮生成相同的消息对象
+        self._stubs: Dict[str, Tuple[Message, Message]] = {}
+        # 最近一次 compress 省略的消息位置
+        self.elided: List[int] = []
+
+    def should_compress(
+        self,
+        messages: List[Message],
+        model: str,
+        tokenizer: Tokenizer,
+        max_context_length: int,
+        token_count: Optional[int] = None,
+    ) -> bool:
+        """判断是否需要压缩，有工具输出时需要检查"""
+        return any(msg.role == "tool" for msg in messages)
+
+    def compress(
+        self,
+        messages: List[Message],
+        model: str,
+        tokenizer: Tokenizer,
+        max_context_length: int,
+        initial_user_question: Optional[str] = None,
+        provider: Optional[LLMProvider] = None,
+        checkpoint: Optional[SummaryCheckpoint] = None,
+    ) -> List[Message]:
+        """压缩消息列表，没有需要省略的工具输出时返回原列表，省略的位置记录在 elided 中"""
+        self.elided = []
+        calls = self._collect_calls(messages)
+        if not calls:
+            return messages
+
+        step = TOOL_OUTPUT_ELISION_STEP
+        aged_before = (len(messages) - self.config.tool_output_keep_recent) // step * step
+        later_reads = set()
+        edited_paths = set()
+        result: Optional[List[Message]] = None
+
+        # 从后向前遍历，记录之后出现过的读取和修改
+        for i in range(len(messages) - 1, -1, -1):
+            msg = messages[i]
+            call = calls.get(msg.tool_call_id) if msg.role == "tool" else None
+            if call is None:
+                continue
+            if call.name in _FILE_EDIT_TOOLS:
+                edited_paths.update(call.paths)
+                continue
+
+            superseded = call.key in later_reads or (call.name == "read_file" and call.paths[0] in edited_paths)
+            later_reads.add(call.key)
+            content = msg.content or ""
+            aged = i < aged_before and len(content) > TOOL_OUTPUT_ELISION_MIN_CHARS
+            if not (superseded or aged):
+                continue
+
+            stub = self._stub(msg, call)
+            if stub is None:
+                continue
+            if result is None:
+                result = list(messages)
+            result[i] = stub
+            self.elided.append(i)
+
+        return result if result is not None else messages
+
+    def _collect_calls(self, messages: List[Message]) -> Dict[str, "_ParsedCall"]:
+        """收集可省略或修改文件的工具调用，返回 tool_call_id 到解析结果的映射
+
+        消息列表在上次解析的基础上只在末尾追加时只解析新消息，否则重新遍历全部消息，
+        参数未变的工具调用复用缓存的解析结果
+        """
+        start = 0
+        if 0 < self._scanned <= len(messages) and messages[self._scanned - 1] is self._scanned_last:
+            start = self._scanned
+        for msg in messages[start:]:
+            if msg.role != "assistant" or not msg.tool_calls:
+                continue
+            for tool_call in msg.tool_calls:
+                name = tool_call.function.name if tool_call.function else None
+                if name not in _ELIDABLE_TOOLS and name not in _FILE_EDIT_TOOLS:
+                    continue
+                raw = tool_call.function.arguments or "{}"
+                cached = self._calls.get(tool_call.id)
+                if cached is not None and cached.name == name and cached.raw == raw:
+                    continue
+                parsed = _parse_call(name, raw)
+                if parsed is not None:
+                    self._calls[tool_call.id] = parsed
+                else:
+                    self._calls.pop(tool_call.id, None)
+        if messages:
+            self._scanned = len(messages)
+            self._scanned_last = messages[-1]
+        return self._calls
+
+    def _stub(self, msg: Message, call: "_ParsedCall") -> Optional[Message]:
+        """省略后的工具输出消息，说明不比原输出短时返回 None"""
+        cached = self._stubs.get(msg.tool_call_id)
+        if cached is not None and cached[0] is msg:
+            return cached[1]
+        content = msg.content or ""
+        text = TOOL_OUTPUT_ELIDED.format(
+            tool=call.name, target=self._describe_target(call.name, call.arguments), lines=content.count("\n") + 1
+        )
+        if len(text) >= len(content):
+            return None
+        stub = Message(role="tool", content=text, tool_call_id=msg.tool_call_id)
+        self._stubs[msg.tool_call_id] = (msg, stub)
+        return stub
+
+    @staticmethod
+    def _describe_target(name: str, arguments: Dict[str, Any]) -> str:
+        """说明中显示的读取对象，即标识读取对象的第一个参数"""
+        value = arguments.get(_ELIDABLE_TOOLS[name][0])
+        return ",".join(map(str, value)) if isinstance(value, list) else str(value or "")
+
+
+@dataclass
+class _ParsedCall:
+    """解析后的可省略或修改文件的工具调用"""
+
+    name: str  # 工具名称
+    raw: str  # 原始参数 JSON，用于判断缓存是否仍然适用
+    arguments: Dict[str, Any]  # 解析后的参数
+    key: Optional[Tuple[str, str]]  # 读取对象的键，相同的键表示相同的读取；修改文件的工具为 None
+    paths: Tuple[Optional[str], ...]  # read_file 读取或修改文件的工具修改的规范化文件路径
+
+
+def _parse_call(name: str, raw: str) -> Optional[_ParsedCall]:
+    """解析工具调用的参数 JSON，不是合法的 JSON 对象时返回 None"""
+    try:
+        arguments = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(arguments, dict):
+        return None
+    if name in _FILE_EDIT_TOOLS:
+        paths = tuple(
+            path for path in (_normalize_path(arguments.get(key)) for key in _FILE_EDIT_TOOLS[name]) if path
+        )
+        return _ParsedCall(name, raw, arguments, None, paths)
+    key = (name, json.dumps([arguments.get(arg) for arg in _ELIDABLE_TOOLS[name]], sort_keys=True))
+    paths = (_normalize_path(arguments.get("file_path")),) if name == "read_file" else ()
+    return _ParsedCall(name, raw, arguments, key, paths)
+
+
+def _turn_start(messages: List[Message], start: int) -> int:
+    """调整窗口起点，避免 tool 消息与发起调用的助手消息分离
+
+    起点是 tool 消息时向后跳过这些工具结果；之后没有其他消息时退回到最后一组工具调用的助手消息，
+    此时窗口可能超出 token 预算，但不会发送缺少 tool_calls 的工具结果
+
+    Args:
+        messages: 消息列表
+        start: 窗口起点
+
+    Returns:
+        int: 调整后的起点
+    """
+    index = start
+    while index < len(messages) and messages[index].role == "tool":
+        index += 1
+    if index < len(messages):
+        return index
+    index = min(start, len(messages) - 1)
+    while index > 0 and messages[index].role == "tool":
+        index -= 1
+    return index
+
+
+def _normalize_path(path: Any) -> Optional[str]:
+    """规范化工具参数中的文件路径，用于比较是否为同一文件"""
+    if not isinstance(path, str) or not path:
+        return None
+    return os.path.normpath(path)
+
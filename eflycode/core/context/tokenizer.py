@@ -1,14 +1,52 @@
 """Token 计算模块
 
-基于 tiktoken 实现 token 数量计算
-"""
+基于 tiktoken 实现 token 数量计算，并提供按 UTF-8 字节数估算 token 数的快速估算器。
+估算器用精确计算的结果校准每个 token 对应的字节数并记录估算误差，
+只有估算值接近阈值时才需要精确计算。
 
-from typing import List
+tiktoken 在第一次计算时才导入和加载编码。默认只加载 tiktoken 缓存目录中已有的编码文件，
+不会在计算 token 数时联网下载；设置 EFLYCODE_TOKENIZER_DOWNLOAD 后才下载缺少的编码。
+编码无法加载时使用估算值，同一进程中不再重试
+"""
 
-import tiktoken
-from tiktoken import Encoding
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Hashable, List, Optional, Tuple
 
+from eflycode.core.constants import EFLYCODE_DIR, TIKTOKEN_CACHE_DIR
 from eflycode.core.llm.protocol import Message
+from eflycode.core.utils.logger import logger
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+# 单条消息 token 数缓存的最大条目数
+TOKEN_CACHE_MAX_ENTRIES = 8192
+
+# token 估算配置常量
+TOKEN_ESTIMATE_BYTES_PER_TOKEN = 4.0  # 校准前每个 token 对应的 UTF-8 字节数
+TOKEN_ESTIMATE_MESSAGE_OVERHEAD = 5  # 每条消息的角色和格式 token 数
+TOKEN_ESTIMATE_INITIAL_ERROR = 0.5  # 没有校准样本时假定的估算误差
+TOKEN_ESTIMATE_MIN_MARGIN = 0.1  # 估算值与阈值的相对差距小于该比例时使用精确计数
+TOKEN_ESTIMATE_DECAY = 0.98  # 校准样本的衰减系数，越小越偏向最近的样本
+TOKEN_ESTIMATE_SAMPLE_INTERVAL = 16  # 估算时每隔多少条消息精确计算一条，用于持续校准
+
+# 设置后允许下载缓存目录中缺少的编码文件
+TOKENIZER_DOWNLOAD_ENV = "EFLYCODE_TOKENIZER_DOWNLOAD"
+
+# 编码文件的下载地址，tiktoken 以地址的 SHA-1 作为缓存文件名
+_ENCODING_URLS = {
+    "cl100k_base": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+    "o200k_base": "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+}
+
+# 无法加载的编码，进程内共享，之后创建的 Tokenizer 也不再重试
+_unavailable_encodings: set[str] = set()
+_unavailable_lock = threading.Lock()
 
 
 class Tokenizer:
@@ -20,18 +58,30 @@ class Tokenizer:
         "default": "cl100k_base",
     }
 
-    def __init__(self):
-        """初始化 Tokenizer"""
-        self._encodings: dict[str, Encoding] = {}
+    def __init__(self, cache_size: int = TOKEN_CACHE_MAX_ENTRIES):
+        """初始化 Tokenizer
+
+        Args:
+            cache_size: 单条消息 token 数缓存的最大条目数，为 0 时不缓存
+        """
+        self._encodings: dict[str, "Encoding"] = {}
+        self.cache_size = cache_size
+        self._message_cache: "OrderedDict[Tuple[Hashable, ...], int]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # 估算器的校准状态，均为按 TOKEN_ESTIMATE_DECAY 衰减的累计值
+        self._sample_bytes = 0.0  # 样本的字节数
+        self._sample_tokens = 0.0  # 样本去掉消息格式开销后的 token 数
+        self._sample_error = 0.0  # 样本的估算误差（token 数）
+        self._estimated = 0  # 已估算的消息数，用于定期精确计算
 
-    def get_encoding_for_model(self, model: str) -> Encoding:
+    def get_encoding_for_model(self, model: str) -> Optional["Encoding"]:
         """获取模型的编码器
 
         Args:
             model: 模型名称
 
         Returns:
-            Encoding: tiktoken 编码器
+            Optional[Encoding]: tiktoken 编码器，编码无法加载时返回 None
         """
         # 查找模型对应的编码器名称
         encoding_name = self.MODEL_ENCODING_MAP.get(model, self.MODEL_ENCODING_MAP["default"])
@@ -44,18 +94,44 @@ class Tokenizer:
 
         # 缓存编码器
         if encoding_name not in self._encodings:
-            try:
-                self._encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
-            except Exception:
+            encoding = self._load_encoding(encoding_name)
+            if encoding is None and encoding_name != self.MODEL_ENCODING_MAP["default"]:
                 # 如果获取失败，使用默认编码器
                 encoding_name = self.MODEL_ENCODING_MAP["default"]
-                self._encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+                encoding = self._encodings.get(encoding_name) or self._load_encoding(encoding_name)
+            if encoding is None:
+                return None
+            self._encodings[encoding_name] = encoding
 
         return self._encodings[encoding_name]
 
+    def _load_encoding(self, encoding_name: str) -> Optional["Encoding"]:
+        """加载编码，缓存中没有且不允许下载或加载失败时记录并返回 None，之后不再重试"""
+        if encoding_name in _unavailable_encodings:
+            return None
+        cache_file = _encoding_cache_file(encoding_name)
+        if (cache_file is None or not cache_file.is_file()) and not os.environ.get(TOKENIZER_DOWNLOAD_ENV):
+            logger.warning(
+                f"没有缓存的分词编码，使用估算的 token 数: encoding={encoding_name}, cache_file={cache_file}，"
+                f"设置 {TOKENIZER_DOWNLOAD_ENV}=1 后允许下载"
+            )
+            _mark_unavailable(encoding_name)
+            return None
+        try:
+            import tiktoken
+
+            return tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.warning(f"加载分词编码失败，使用估算的 token 数: encoding={encoding_name}, error={e}")
+            _mark_unavailable(encoding_name)
+            return None
+
     def count_message_tokens(self, message: Message, model: str) -> int:
         """计算单条消息的 token 数
 
+        结果按编码器和消息内容缓存，同一条消息在每次请求前重复计算时不再重新编码。
+        字符串的哈希值由 Python 缓存在字符串对象上，查找缓存不需要重新扫描内容
+
         Args:
             message: 消息对象
             model: 模型名称
@@ -64,6 +140,138 @@ class Tokenizer:
             int: token 数量
         """
         encoding = self.get_encoding_for_model(model)
+        if encoding is None:
+            return self._estimate_message(message)
+        if self.cache_size <= 0:
+            tokens = self._encode_message(message, encoding)
+            with self._cache_lock:
+                self._calibrate(message, tokens)
+            return tokens
+
+        key = (
+            encoding.name,
+            message.role,
+            message.content,
+            message.tool_call_id,
+            tuple(
+                (tool_call.function.name, tool_call.function.arguments) if tool_call.function else None
+                for tool_call in message.tool_calls or ()
+            ),
+        )
+        with self._cache_lock:
+            tokens = self._message_cache.get(key)
+            if tokens is not None:
+                self._message_cache.move_to_end(key)
+                return tokens
+
+        tokens = self._encode_message(message, encoding)
+        with self._cache_lock:
+            self._message_cache[key] = tokens
+            while len(self._message_cache) > self.cache_size:
+                self._message_cache.popitem(last=False)
+            self._calibrate(message, tokens)
+        return tokens
+
+    def estimate_message_tokens(self, message: Message, model: str) -> int:
+        """估算单条消息的 token 数
+
+        按消息内容的 UTF-8 字节数和校准的每个 token 字节数估算，不进行编码。
+        每估算 TOKEN_ESTIMATE_SAMPLE_INTERVAL 条消息精确计算一条，用于持续校准
+
+        Args:
+            message: 消息对象
+            model: 模型名称
+
+        Returns:
+            int: 估算的 token 数量
+        """
+        with self._cache_lock:
+            self._estimated += 1
+            sample = self._estimated % TOKEN_ESTIMATE_SAMPLE_INTERVAL == 0
+        if sample:
+            return self.count_message_tokens(message, model)
+        return self._estimate_message(message)
+
+    def estimate_tokens(self, messages: List[Message], model: str) -> int:
+        """估算消息列表的 token 数
+
+        Args:
+            messages: 消息列表
+            model: 模型名称
+
+        Returns:
+            int: 估算的总 token 数量
+        """
+        return sum(self.estimate_message_tokens(message, model) for message in messages)
+
+    @property
+    def estimate_error(self) -> float:
+        """估算值的相对误差，按 token 数加权，没有校准样本时为 TOKEN_ESTIMATE_INITIAL_ERROR"""
+        with self._cache_lock:
+            if self._sample_tokens <= 0:
+                return TOKEN_ESTIMATE_INITIAL_ERROR
+            return self._sample_error / self._sample_tokens
+
+    def needs_exact_count(self, estimate: int, threshold: int) -> bool:
+        """判断估算值是否接近阈值，需要精确计算才能确定是否达到阈值
+
+        Args:
+            estimate: 估算的 token 数
+            threshold: 阈值
+
+        Returns:
+            bool: 估算值与阈值的差距在误差范围内时返回 True
+        """
+        margin = max(TOKEN_ESTIMATE_MIN_MARGIN, 2 * self.estimate_error)
+        return abs(estimate - threshold) <= margin * max(estimate, threshold)
+
+    def count_tokens_for_threshold(self, messages: List[Message], model: str, threshold: Optional[int]) -> int:
+        """计算用于和阈值比较的 token 数
+
+        估算值远离阈值时直接返回估算值，接近阈值或没有阈值时精确计算
+
+        Args:
+            messages: 消息列表
+            model: 模型名称
+            threshold: 阈值
+
+        Returns:
+            int: token 数量
+        """
+        if threshold is not None:
+            estimate = self.estimate_tokens(messages, model)
+            if not self.needs_exact_count(estimate, threshold):
+                return estimate
+        return self.count_tokens(messages, model)
+
+    def _estimate_message(self, message: Message) -> int:
+        """按校准的每个 token 字节数估算单条消息的 token 数"""
+        with self._cache_lock:
+            bytes_per_token = self._bytes_per_token()
+        return TOKEN_ESTIMATE_MESSAGE_OVERHEAD + round(_message_bytes(message) / bytes_per_token)
+
+    def _bytes_per_token(self) -> float:
+        """校准的每个 token 对应的字节数，调用方需要持有 _cache_lock"""
+        if self._sample_tokens <= 0:
+            return TOKEN_ESTIMATE_BYTES_PER_TOKEN
+        return self._sample_bytes / self._sample_tokens
+
+    def _calibrate(self, message: Message, tokens: int) -> None:
+        """用精确计算的结果校准估算器，调用方需要持有 _cache_lock
+
+        误差使用校准前的字节数比例计算，即样本外误差
+        """
+        size = _message_bytes(message)
+        content_tokens = tokens - TOKEN_ESTIMATE_MESSAGE_OVERHEAD
+        if size <= 0 or content_tokens <= 0:
+            return
+        estimated = size / self._bytes_per_token()
+        self._sample_bytes = self._sample_bytes * TOKEN_ESTIMATE_DECAY + size
+        self._sample_tokens = self._sample_tokens * TOKEN_ESTIMATE_DECAY + content_tokens
+        self._sample_error = self._sample_error * TOKEN_ESTIMATE_DECAY + abs(estimated - content_tokens)
+
+    def _encode_message(self, message: Message, encoding: "Encoding") -> int:
+        """编码消息并计算 token 数"""
         tokens = 0
 
         # 计算 role 的 token（通常每个 role 是 1-2 个 token）
@@ -107,3 +315,54 @@ class Tokenizer:
             total += self.count_message_tokens(message, model)
         return total
 
+
+def configure_encoding_cache() -> None:
+    """启动时设置 tiktoken 的编码缓存目录
+
+    没有设置 TIKTOKEN_CACHE_DIR 时使用 ~/.eflycode/tiktoken，下载的编码文件保存在该目录，之后离线加载。
+    可以从其他机器复制该目录
+    """
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(Path.home() / EFLYCODE_DIR / TIKTOKEN_CACHE_DIR))
+
+
+def _encoding_cache_dir() -> Optional[Path]:
+    """tiktoken 读取编码文件的缓存目录，与 tiktoken 的查找顺序一致，缓存被禁用时返回 None"""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    return Path(cache_dir) if cache_dir else None
+
+
+def _encoding_cache_file(encoding_name: str) -> Optional[Path]:
+    """编码在 tiktoken 缓存目录中的文件，未知的编码或缓存被禁用时返回 None"""
+    url = _ENCODING_URLS.get(encoding_name)
+    cache_dir = _encoding_cache_dir()
+    if url is None or cache_dir is None:
+        return None
+    return cache_dir / hashlib.sha1(url.encode()).hexdigest()
+
+
+def _mark_unavailable(encoding_name: str) -> None:
+    """记录无法加载的编码"""
+    with _unavailable_lock:
+        _unavailable_encodings.add(encoding_name)
+
+
+def _text_bytes(text: Optional[str]) -> int:
+    """文本的 UTF-8 字节数，ASCII 文本不需要编码"""
+    if not text:
+        return 0
+    return len(text) if text.isascii() else len(text.encode("utf-8", "surrogatepass"))
+
+
+def _message_bytes(message: Message) -> int:
+    """消息中参与 token 计算的文本的字节数，不包括角色"""
+    size = _text_bytes(message.content) + _text_bytes(message.tool_call_id)
+    for tool_call in message.tool_calls or ():
+        if tool_call.function:
+            size += _text_bytes(tool_call.function.name) + _text_bytes(tool_call.function.arguments)
+    return size
+
@@ -19,6 +19,7 @@ from eflycode.core.hooks.types import (
 )
 from eflycode.core.llm.protocol import LLMRequest, ToolDefinition
 from eflycode.core.utils.logger import logger
+from eflycode.core.utils.tracing import trace_span
 
 
 class HookEventHandler:
@@ -369,38 +370,39 @@ class HookEventHandler:
         groups_count = len(hook_groups)
         logger.debug(f"开始执行 hooks: event={event_name}, groups={groups_count}, total_hooks={total_hooks}")
 
-        # 制定执行计划
-        execution_plan = self.planner.plan_execution(hook_groups)
-
-        all_results = []
-        current_input = input_data.copy()
-
-        # 执行每个组
-        for hooks, sequential in execution_plan.groups:
-            hooks_count = len(hooks)
-            logger.debug(f"执行 hook 组: hooks_count={hooks_count}, sequential={sequential}")
-            if sequential:
-                # 串行执行
-                results = self.runner.execute_hooks_sequential(
-                    hooks, event_name, current_input, session_id, workspace_dir
-                )
-                # 更新输入，将最后一个 hook 的输出合并到输入中
-                if results and results[-1].success and results[-1].stdout:
-                    try:
-                        from eflycode.core.hooks.types import HookOutput
-
-                        hook_output = HookOutput.from_json(results[-1].stdout)
-                        if hook_output.hook_specific_output:
-                            current_input.update(hook_output.hook_specific_output)
-                    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
-                        logger.warning(f"解析 hook 输出失败: {e}")
-            else:
-                # 并行执行
-                results = self.runner.execute_hooks_parallel(
-                    hooks, event_name, current_input, session_id, workspace_dir
-                )
+        with trace_span("hooks.execute", event=event_name.value, hooks=total_hooks):
+            # 制定执行计划
+            execution_plan = self.planner.plan_execution(hook_groups)
+
+            all_results = []
+            current_input = input_data.copy()
+
+            # 执行每个组
+            for hooks, sequential in execution_plan.groups:
+                hooks_count = len(hooks)
+                logger.debug(f"执行 hook 组: hooks_count={hooks_count}, sequential={sequential}")
+                if sequential:
+                    # 串行执行
+                    results = self.runner.execute_hooks_sequential(
+                        hooks, event_name, current_input, session_id, workspace_dir
+                    )
+                    # 更新输入，将最后一个 hook 的输出合并到输入中
+                    if results and results[-1].success and results[-1].stdout:
+                        try:
+                            from eflycode.core.hooks.types import HookOutput
+
+                            hook_output = HookOutput.from_json(results[-1].stdout)
+                            if hook_output.hook_specific_output:
+                                current_input.update(hook_output.hook_specific_output)
+                        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                            logger.warning(f"解析 hook 输出失败: {e}")
+                else:
+                    # 并行执行
+                    results = self.runner.execute_hooks_parallel(
+                        hooks, event_name, current_input, session_id, workspace_dir
+                    )
 
-            all_results.extend(results)
+                all_results.extend(results)
 
         # 聚合所有结果
         aggregated = self.aggregator.aggregate_results(all_results)
@@ -1,12 +1,25 @@
+import time
 from abc import ABC
-from typing import Callable, Iterator, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
 
-from eflycode.core.llm.protocol import ChatCompletion, ChatCompletionChunk, LLMRequest
+from eflycode.core.llm.protocol import ChatCompletion, ChatCompletionChunk, LLMRequest, ToolDefinition
+from eflycode.core.utils.tracing import Tracer, trace_span
 
 
 class Advisor(ABC):
     """Advisor 抽象基类，提供钩子方法用于拦截和修改 LLM 请求和响应"""
 
+    def prompt_components(self, tools: List[ToolDefinition]) -> Dict[str, str]:
+        """在构建请求之前给出将要添加到系统提示词中的内容，计入本次请求的 token 预算
+
+        Args:
+            tools: 本次请求的工具定义
+
+        Returns:
+            Dict[str, str]: 键为 eflycode.core.context.budget 中的 PROMPT_COMPONENT_*，默认不添加内容
+        """
+        return {}
+
     def before_call(self, request: LLMRequest) -> LLMRequest:
         """在请求发送前调用，可用于修改请求参数
 
@@ -113,11 +126,13 @@ class AdvisorChain:
             Exception: 如果错误处理钩子重新抛出异常
         """
         processed_request = request
-        for advisor in self.advisors:
-            processed_request = advisor.before_call(processed_request)
+        with trace_span("advisor.before_call", advisors=len(self.advisors)):
+            for advisor in self.advisors:
+                processed_request = advisor.before_call(processed_request)
 
         try:
-            response = api_call(processed_request)
+            with trace_span("llm.api_call"):
+                response = api_call(processed_request)
         except Exception as error:
             for advisor in reversed(self.advisors):
                 try:
@@ -126,8 +141,9 @@ class AdvisorChain:
                     continue
             raise
 
-        for advisor in reversed(self.advisors):
-            response = advisor.after_call(processed_request, response)
+        with trace_span("advisor.after_call", advisors=len(self.advisors)):
+            for advisor in reversed(self.advisors):
+                response = advisor.after_call(processed_request, response)
 
         return response
 
@@ -149,14 +165,18 @@ class AdvisorChain:
             Exception: 如果错误处理钩子重新抛出异常
         """
         processed_request = request
-        for advisor in self.advisors:
-            processed_request = advisor.before_stream(processed_request)
+        with trace_span("advisor.before_stream", advisors=len(self.advisors)):
+            for advisor in self.advisors:
+                processed_request = advisor.before_stream(processed_request)
 
+        after_stream_timer = _AfterStreamTimer()
         try:
             for chunk in api_stream(processed_request):
+                after_stream_timer.start()
                 processed_chunk = chunk
                 for advisor in reversed(self.advisors):
                     processed_chunk = advisor.after_stream(processed_request, processed_chunk)
+                after_stream_timer.stop()
                 yield processed_chunk
         except Exception as error:
             for advisor in reversed(self.advisors):
@@ -166,4 +186,125 @@ class AdvisorChain:
                 except Exception:
                     continue
             raise
+        finally:
+            after_stream_timer.record(len(self.advisors))
+
+    async def acall(
+        self,
+        request: LLMRequest,
+        api_call: Callable[[LLMRequest], Awaitable[ChatCompletion]],
+    ) -> ChatCompletion:
+        """异步执行调用，钩子执行顺序与 call 相同
+
+        Advisor 的钩子都是轻量的同步方法，直接在事件循环中执行
+
+        Args:
+            request: LLM请求
+            api_call: 实际的异步 API 调用函数
+
+        Returns:
+            ChatCompletion: 处理后的响应
+
+        Raises:
+            Exception: 如果错误处理钩子重新抛出异常
+        """
+        processed_request = request
+        with trace_span("advisor.before_call", advisors=len(self.advisors)):
+            for advisor in self.advisors:
+                processed_request = advisor.before_call(processed_request)
+
+        try:
+            with trace_span("llm.api_call"):
+                response = await api_call(processed_request)
+        except Exception as error:
+            for advisor in reversed(self.advisors):
+                try:
+                    return advisor.on_call_error(processed_request, error)
+                except Exception:
+                    continue
+            raise
 
+        with trace_span("advisor.after_call", advisors=len(self.advisors)):
+            for advisor in reversed(self.advisors):
+                response = advisor.after_call(processed_request, response)
+
+        return response
+
+    async def astream(
+        self,
+        request: LLMRequest,
+        api_stream: Callable[[LLMRequest], AsyncIterator[ChatCompletionChunk]],
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        """异步执行流式调用，钩子执行顺序与 stream 相同
+
+        Args:
+            request: LLM请求
+            api_stream: 实际的异步流式 API 调用函数
+
+        Yields:
+            ChatCompletionChunk: 处理后的流式响应块
+
+        Raises:
+            Exception: 如果错误处理钩子重新抛出异常
+        """
+        processed_request = request
+        with trace_span("advisor.before_stream", advisors=len(self.advisors)):
+            for advisor in self.advisors:
+                processed_request = advisor.before_stream(processed_request)
+
+        after_stream_timer = _AfterStreamTimer()
+        try:
+            async for chunk in api_stream(processed_request):
+                after_stream_timer.start()
+                processed_chunk = chunk
+                for advisor in reversed(self.advisors):
+                    processed_chunk = advisor.after_stream(processed_request, processed_chunk)
+                after_stream_timer.stop()
+                yield processed_chunk
+        except Exception as error:
+            for advisor in reversed(self.advisors):
+                try:
+                    yield advisor.on_stream_error(processed_request, error)
+                    return
+                except Exception:
+                    continue
+            raise
+        finally:
+            after_stream_timer.record(len(self.advisors))
+
+
+class _AfterStreamTimer:
+    """累计每个 chunk 上 after_stream 钩子的耗时，流结束时记录为一个 span
+
+    逐个 chunk 记录 span 会产生大量事件，因此只记录累计耗时和 chunk 数量
+    """
+
+    __slots__ = ("_tracer", "_first_start_ns", "_start_ns", "_total_ns", "_chunks")
+
+    def __init__(self):
+        tracer = Tracer.get_instance()
+        self._tracer = tracer if tracer.enabled else None
+        self._first_start_ns = 0
+        self._start_ns = 0
+        self._total_ns = 0
+        self._chunks = 0
+
+    def start(self) -> None:
+        if self._tracer is None:
+            return
+        self._start_ns = time.perf_counter_ns()
+        if not self._first_start_ns:
+            self._first_start_ns = self._start_ns
+
+    def stop(self) -> None:
+        if self._tracer is None:
+            return
+        self._total_ns += time.perf_counter_ns() - self._start_ns
+        self._chunks += 1
+
+    def record(self, advisors: int) -> None:
+        if self._tracer is None or not self._chunks:
+            return
+        self._tracer.add_span(
+            "advisor.after_stream", self._first_start_ns, self._total_ns, advisors=advisors, chunks=self._chunks
+        )
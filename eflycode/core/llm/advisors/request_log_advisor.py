@@ -9,6 +9,7 @@ from typing import Dict, List, Optional
 
 from eflycode.core.constants import EFLYCODE_DIR, VERBOSE_DIR, REQUESTS_DIR
 from eflycode.core.llm.advisor import Advisor
+from eflycode.core.llm.stream_accumulator import StreamAccumulator
 from eflycode.core.llm.protocol import (
     ChatCompletion,
     ChatCompletionChunk,
@@ -230,32 +231,8 @@ Tool Calls:
         if state is None:
             return chunk
         
-        # 累积内容
-        if chunk.delta and chunk.delta.content:
-            state.content += chunk.delta.content
-        
-        # 累积工具调用
-        if chunk.delta and chunk.delta.tool_calls:
-            for delta_tc in chunk.delta.tool_calls:
-                index = delta_tc.index
-                if index not in state.tool_calls:
-                    state.tool_calls[index] = {
-                        "id": delta_tc.id or "",
-                        "name": "",
-                        "arguments": "",
-                    }
-                
-                tc_state = state.tool_calls[index]
-                if delta_tc.function:
-                    if delta_tc.function.name:
-                        tc_state["name"] = delta_tc.function.name
-                    if delta_tc.function.arguments:
-                        tc_state["arguments"] += delta_tc.function.arguments
-        
-        # 记录 finish_reason
-        if chunk.finish_reason:
-            state.finish_reason = chunk.finish_reason
-        
+        state.accumulator.feed(chunk)
+
         # 如果流式响应结束，记录完整响应
         if chunk.finish_reason is not None:
             self._log_stream_response(state)
@@ -269,18 +246,19 @@ Tool Calls:
         Args:
             state: 流式状态
         """
-        content = state.content
+        accumulator = state.accumulator
+        content = accumulator.content.text
         
         # 格式化工具调用
         tool_calls_str = "None"
-        if state.tool_calls:
+        if accumulator.tool_call_indexes:
             lines = []
-            for index in sorted(state.tool_calls.keys()):
-                tc = state.tool_calls[index]
-                lines.append(f"  - {tc['name']}")
-                args = tc["arguments"]
-                if len(args) > 200:
-                    args = args[:200] + "..."
+            for index in accumulator.tool_call_indexes:
+                lines.append(f"  - {accumulator.tool_call_name(index)}")
+                arguments = accumulator.tool_call_arguments(index)
+                args = arguments.slice(0, 200)
+                if len(arguments) > 200:
+                    args = args + "..."
                 lines.append(f"    Args: {args}")
             tool_calls_str = "\n".join(lines)
         
@@ -290,7 +268,7 @@ Tool Calls:
 {'=' * 60}
 Time: {self._get_timestamp()}
 Tokens: N/A (stream mode)
-Finish Reason: {state.finish_reason or 'N/A'}
+Finish Reason: {accumulator.finish_reason or 'N/A'}
 Content:
 {content}
 Tool Calls:
@@ -318,7 +296,5 @@ class _StreamLogState:
 
     def __init__(self):
         """初始化流式状态"""
-        self.content: str = ""
-        self.tool_calls: Dict[int, Dict[str, str]] = {}  # index -> {id, name, arguments}
-        self.finish_reason: Optional[str] = None
+        self.accumulator = StreamAccumulator()
 
@@ -3,12 +3,13 @@
 在每次请求时动态渲染并添加系统提示词
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 from eflycode.core.agent.base import BaseAgent
 from eflycode.core.config.config_manager import ConfigManager
+from eflycode.core.context.budget import PROMPT_COMPONENT_SYSTEM
 from eflycode.core.llm.advisor import Advisor
-from eflycode.core.llm.protocol import LLMRequest, Message
+from eflycode.core.llm.protocol import LLMRequest, Message, ToolDefinition
 from eflycode.core.prompt.loader import PromptLoader
 from eflycode.core.utils.logger import logger
 
@@ -23,12 +24,17 @@ class SystemPromptAdvisor(Advisor):
             agent: Agent 实例
         """
         self.agent = agent
+        # 构建请求之前渲染的系统提示词和渲染时使用的工具定义，发送请求时直接复用
+        self._prepared: Optional[Tuple[List[ToolDefinition], str]] = None
 
-    def _get_prompt_variables(self) -> Dict[str, Any]:
+    def _get_prompt_variables(self, tool_definitions: Optional[List[ToolDefinition]] = None) -> Dict[str, Any]:
         """获取提示词变量
 
         从 ConfigManager 获取静态信息，从 agent 获取动态信息
 
+        Args:
+            tool_definitions: 本次请求的工具定义，为 None 时从 agent 获取
+
         Returns:
             Dict[str, Any]: 变量字典
         """
@@ -40,8 +46,10 @@ class SystemPromptAdvisor(Advisor):
         environment_info = config_manager.get_environment_info()
 
         # 从 agent 获取动态信息
+        if tool_definitions is None:
+            tool_definitions = self.agent.get_available_tools()
         tools = []
-        for tool_def in self.agent.get_available_tools():
+        for tool_def in tool_definitions:
             tools.append(
                 {
                     "name": tool_def.function.name,
@@ -54,9 +62,11 @@ class SystemPromptAdvisor(Advisor):
         if self.agent.session.context_config:
             context_strategy = self.agent.session.context_config.strategy_type
 
+        # 使用实际调用模型的 Provider 的名称，例如录制时使用被包装的 Provider
+        provider = self.agent.provider.unwrap()
         model_provider = "unknown"
-        if hasattr(self.agent.provider, "__class__"):
-            model_provider = self.agent.provider.__class__.__name__.replace("Provider", "").lower()
+        if hasattr(provider, "__class__"):
+            model_provider = provider.__class__.__name__.replace("Provider", "").lower()
 
         return {
             "tools": tools,
@@ -76,6 +86,19 @@ class SystemPromptAdvisor(Advisor):
             },
         }
 
+    def prompt_components(self, tools: List[ToolDefinition]) -> Dict[str, str]:
+        """在构建请求之前渲染系统提示词，计入本次请求的 token 预算
+
+        Args:
+            tools: 本次请求的工具定义
+
+        Returns:
+            Dict[str, str]: 渲染的系统提示词
+        """
+        system_prompt = self._render_system_prompt(tools)
+        self._prepared = (tools, system_prompt)
+        return {PROMPT_COMPONENT_SYSTEM: system_prompt}
+
     def _add_system_prompt(self, request: LLMRequest) -> LLMRequest:
         """添加系统提示词到请求
 
@@ -90,6 +113,35 @@ class SystemPromptAdvisor(Advisor):
             # 已有 system message，不添加
             return request
 
+        # 请求中的工具列表已经过 BeforeToolSelection hook 处理，与构建请求之前渲染时相同则直接复用
+        tools = request.tools or []
+        prepared, self._prepared = self._prepared, None
+        if prepared is not None and prepared[0] == tools:
+            system_prompt = prepared[1]
+        else:
+            system_prompt = self._render_system_prompt(tools)
+
+        if not system_prompt:
+            return request
+
+        # 在消息列表开头插入 system message
+        system_message = Message(role="system", content=system_prompt)
+        request.messages.insert(0, system_message)
+
+        prompt_length = len(system_prompt)
+        logger.debug(f"已添加系统提示词，长度: {prompt_length} 字符")
+
+        return request
+
+    def _render_system_prompt(self, tools: List[ToolDefinition]) -> str:
+        """加载并渲染系统提示词模板
+
+        Args:
+            tools: 本次请求的工具定义
+
+        Returns:
+            str: 渲染的系统提示词，没有模板或渲染失败时返回空字符串
+        """
         config_manager = ConfigManager.get_instance()
         prompt_loader = PromptLoader.get_instance()
 
@@ -106,27 +158,17 @@ class SystemPromptAdvisor(Advisor):
         if not template:
             # 没有找到模板，不添加 system message
             logger.debug("未找到系统提示词模板，跳过添加")
-            return request
-
-        # 获取变量
-        variables = self._get_prompt_variables()
+            return ""
 
         # 渲染模板
-        system_prompt = prompt_loader.render(template, variables)
+        system_prompt = prompt_loader.render(template, self._get_prompt_variables(tools))
 
         if not system_prompt:
             # 渲染失败，不添加 system message
             logger.warning("系统提示词渲染失败，跳过添加")
-            return request
-
-        # 在消息列表开头插入 system message
-        system_message = Message(role="system", content=system_prompt)
-        request.messages.insert(0, system_message)
+            return ""
 
-        prompt_length = len(system_prompt)
-        logger.debug(f"已添加系统提示词，长度: {prompt_length} 字符")
-
-        return request
+        return system_prompt
 
     def before_call(self, request: LLMRequest) -> LLMRequest:
         """在请求发送前添加系统提示词
@@ -1,6 +1,7 @@
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 from eflycode.core.llm.protocol import ChatCompletion, ChatCompletionChunk, LLMRequest
 
@@ -23,3 +24,45 @@ class LLMProvider(ABC):
     @abstractmethod
     def stream(self, request: LLMRequest) -> Iterator[ChatCompletionChunk]:
         raise NotImplementedError
+
+    def unwrap(self) -> "LLMProvider":
+        """获取实际调用模型的 Provider
+
+        包装其他 Provider 的 Provider（例如录制）应重写此方法返回被包装的 Provider
+
+        Returns:
+            LLMProvider: 实际调用模型的 Provider，默认为自身
+        """
+        return self
+
+    async def acall(self, request: LLMRequest) -> ChatCompletion:
+        """异步调用 LLM
+
+        默认在线程中执行同步的 call，支持原生异步客户端的 Provider 应重写此方法
+
+        Args:
+            request: LLM 请求
+
+        Returns:
+            ChatCompletion: LLM 响应
+        """
+        return await asyncio.to_thread(self.call, request)
+
+    async def astream(self, request: LLMRequest) -> AsyncIterator[ChatCompletionChunk]:
+        """异步流式调用 LLM
+
+        默认在线程中逐个拉取同步 stream 的响应块，支持原生异步客户端的 Provider 应重写此方法
+
+        Args:
+            request: LLM 请求
+
+        Yields:
+            ChatCompletionChunk: 流式响应块
+        """
+        iterator = iter(self.stream(request))
+        sentinel = object()
+        while True:
+            chunk = await asyncio.to_thread(next, iterator, sentinel)
+            if chunk is sentinel:
+                break
+            yield chunk
@@ -1,6 +1,6 @@
-from typing import Iterator, List, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from eflycode.core.llm.advisor import Advisor, AdvisorChain
 from eflycode.core.llm.protocol import (
@@ -40,6 +40,9 @@ class OpenAiProvider(LLMProvider):
             timeout=config.timeout,
             max_retries=config.max_retries,
         )
+        self._async_client: Optional[AsyncOpenAI] = None
+        # 上一次请求中工具定义的 OpenAI 格式缓存: id(ToolDefinition) -> (ToolDefinition, dict)
+        self._tool_wire_cache: Dict[int, Tuple[ToolDefinition, dict]] = {}
         get_global_event_bus().subscribe(
             "app.config.llm.changed", self._handle_model_changed
         )
@@ -62,6 +65,21 @@ class OpenAiProvider(LLMProvider):
             timeout=config.timeout,
             max_retries=config.max_retries,
         )
+        self._async_client = None
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """获取异步客户端，首次使用时创建
+
+        异步客户端内部绑定事件循环相关的连接池，只在异步路径中按需创建
+        """
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.config.api_key,
+                base_url=self.config.base_url,
+                timeout=self.config.timeout,
+                max_retries=self.config.max_retries,
+            )
+        return self._async_client
 
     def _handle_model_changed(self, **kwargs) -> None:
         event = kwargs.get("event")
@@ -96,6 +114,29 @@ class OpenAiProvider(LLMProvider):
         """
         yield from self.advisor_chain.stream(request, self._stream_api)
 
+    async def acall(self, request: LLMRequest) -> ChatCompletion:
+        """异步调用 OpenAI API 并返回响应
+
+        Args:
+            request: LLM 请求
+
+        Returns:
+            ChatCompletion: 处理后的响应
+        """
+        return await self.advisor_chain.acall(request, self._acall_api)
+
+    async def astream(self, request: LLMRequest) -> AsyncIterator[ChatCompletionChunk]:
+        """异步流式调用 OpenAI API 并返回响应流
+
+        Args:
+            request: LLM 请求
+
+        Yields:
+            ChatCompletionChunk: 处理后的流式响应块
+        """
+        async for chunk in self.advisor_chain.astream(request, self._astream_api):
+            yield chunk
+
     def _build_api_kwargs(
         self, request: LLMRequest, stream: bool = False
     ) -> dict:
@@ -168,6 +209,34 @@ class OpenAiProvider(LLMProvider):
         for chunk in stream:
             yield self._convert_chunk(chunk)
 
+    async def _acall_api(self, request: LLMRequest) -> ChatCompletion:
+        """实际异步调用 OpenAI API
+
+        Args:
+            request: LLM 请求
+
+        Returns:
+            ChatCompletion: OpenAI 响应转换后的 ChatCompletion
+        """
+        kwargs = self._build_api_kwargs(request, stream=False)
+        response = await self._get_async_client().chat.completions.create(**kwargs)
+        return self._convert_completion(response)
+
+    async def _astream_api(self, request: LLMRequest) -> AsyncIterator[ChatCompletionChunk]:
+        """实际异步流式调用 OpenAI API
+
+        Args:
+            request: LLM 请求
+
+        Yields:
+            ChatCompletionChunk: OpenAI 响应转换后的 ChatCompletionChunk
+        """
+        kwargs = self._build_api_kwargs(request, stream=True)
+        stream = await self._get_async_client().chat.completions.create(**kwargs)
+
+        async for chunk in stream:
+            yield self._convert_chunk(chunk)
+
     def _convert_messages(self, messages: List[Message]) -> List[dict]:
         """转换消息格式为 OpenAI API 格式
 
@@ -202,27 +271,48 @@ class OpenAiProvider(LLMProvider):
     def _convert_tools(self, tools: List[ToolDefinition]) -> List[dict]:
         """转换工具定义格式为 OpenAI API 格式
 
+        ToolRegistry 在工具未变化时返回同一组 ToolDefinition 对象，
+        因此按对象缓存转换结果，只转换新出现的定义。缓存只保留本次请求用到的定义
+
         Args:
             tools: 工具定义列表
 
         Returns:
             List[dict]: OpenAI 格式的工具列表
         """
-        return [
-            {
-                "type": tool.type,
-                "function": {
-                    "name": tool.function.name,
-                    "description": tool.function.description,
-                    "parameters": {
-                        "type": tool.function.parameters.type,
-                        "properties": tool.function.parameters.properties,
-                        "required": tool.function.parameters.required or [],
-                    },
+        previous_cache = self._tool_wire_cache
+        cache: Dict[int, Tuple[ToolDefinition, dict]] = {}
+        result = []
+        for tool in tools:
+            cached = previous_cache.get(id(tool))
+            if cached is None or cached[0] is not tool:
+                cached = (tool, self._convert_tool(tool))
+            cache[id(tool)] = cached
+            result.append(cached[1])
+        self._tool_wire_cache = cache
+        return result
+
+    def _convert_tool(self, tool: ToolDefinition) -> dict:
+        """转换单个工具定义为 OpenAI API 格式
+
+        Args:
+            tool: 工具定义
+
+        Returns:
+            dict: OpenAI 格式的工具
+        """
+        return {
+            "type": tool.type,
+            "function": {
+                "name": tool.function.name,
+                "description": tool.function.description,
+                "parameters": {
+                    "type": tool.function.parameters.type,
+                    "properties": tool.function.parameters.properties,
+                    "required": tool.function.parameters.required or [],
                 },
-            }
-            for tool in tools
-        ]
+            },
+        }
 
     def _convert_completion(self, response) -> ChatCompletion:
         """转换 OpenAI 响应为 ChatCompletion
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+
+from eflycode.core.llm.advisor import Advisor, AdvisorChain
+from eflycode.core.llm.protocol import ChatCompletion, ChatCompletionChunk, LLMRequest
+from eflycode.core.llm.providers.base import LLMProvider, ProviderCapabilities
+from eflycode.core.utils.logger import logger
+
+# 录制文件格式版本
+CASSETTE_VERSION = 1
+
+# 设置该环境变量为文件路径时，CLI 创建的 Provider 会录制所有 LLM 调用
+LLM_RECORD_ENV_VAR = "EFLYCODE_RECORD_LLM"
+
+
+class ReplayMissError(LookupError):
+    """回放时找不到匹配的录制记录"""
+
+
+def request_key(request: LLMRequest) -> str:
+    """计算请求的匹配键
+
+    system 消息包含时间、工作区等每次运行都会变化的信息，不参与计算，
+    工具只比较名称
+
+    Args:
+        request: LLM 请求
+
+    Returns:
+        str: 请求的 SHA-256 摘要
+    """
+    payload = {
+        "model": request.model,
+        "messages": [
+            message.model_dump(mode="json", exclude_none=True)
+            for message in request.messages
+            if message.role != "system"
+        ],
+        "tools": sorted(tool.function.name for tool in request.tools or []),
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def load_cassette(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """读取录制文件
+
+    Args:
+        path: 录制文件路径，JSONL 格式，每行一次调用
+
+    Returns:
+        List[Dict[str, Any]]: 按录制顺序排列的调用记录
+    """
+    interactions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                interactions.append(json.loads(line))
+    return interactions
+
+
+class RecordingProvider(LLMProvider):
+    """录制 LLM 调用的 Provider
+
+    包装任意 Provider，将每次请求和完整响应（非流式的 ChatCompletion 或流式的 chunk 序列及其时间间隔）
+    追加写入 JSONL 录制文件，供 ReplayProvider 离线回放。
+    Agent 的 Advisor 在本 Provider 上执行，录制的是经过 Advisor 处理后实际发给被包装 Provider 的请求
+    """
+
+    def __init__(self, provider: LLMProvider, path: Union[str, Path], advisors: Optional[List[Advisor]] = None):
+        """初始化录制 Provider
+
+        Args:
+            provider: 被包装的 Provider
+            path: 录制文件路径，已存在时追加
+            advisors: Advisor 列表
+        """
+        self.provider = provider
+        self.path = Path(path)
+        self._advisors: List[Advisor] = advisors or []
+        self.advisor_chain = AdvisorChain(self._advisors.copy())
+        self._lock = threading.Lock()
+
+    def add_advisors(self, advisors: List[Advisor]) -> None:
+        """添加 Advisor 到现有列表并更新 AdvisorChain
+
+        Args:
+            advisors: 要添加的 Advisor 列表
+        """
+        self._advisors.extend(advisors)
+        self.advisor_chain = AdvisorChain(self._advisors.copy())
+
+    def unwrap(self) -> LLMProvider:
+        """获取被包装的实际调用模型的 Provider"""
+        return self.provider.unwrap()
+
+    @property
+    def capabilities(self) -> ProviderCapabilities:
+        return self.provider.capabilities
+
+    def call(self, request: LLMRequest) -> ChatCompletion:
+        return self.advisor_chain.call(request, self._record_call)
+
+    def stream(self, request: LLMRequest) -> Iterator[ChatCompletionChunk]:
+        yield from self.advisor_chain.stream(request, self._record_stream)
+
+    async def acall(self, request: LLMRequest) -> ChatCompletion:
+        return await self.advisor_chain.acall(request, self._arecord_call)
+
+    async def astream(self, request: LLMRequest) -> AsyncIterator[ChatCompletionChunk]:
+        async for chunk in self.advisor_chain.astream(request, self._arecord_stream):
+            yield chunk
+
+    def _record_call(self, request: LLMRequest) -> ChatCompletion:
+        start = time.perf_counter()
+        response = self.provider.call(request)
+        self._write_call(request, response, start)
+        return response
+
+    async def _arecord_call(self, request: LLMRequest) -> ChatCompletion:
+        start = time.perf_counter()
+        response = await self.provider.acall(request)
+        self._write_call(request, response, start)
+        return response
+
+    def _record_stream(self, request: LLMRequest) -> Iterator[ChatCompletionChunk]:
+        recorder = _StreamRecorder()
+        for chunk in self.provider.stream(request):
+            recorder.add(chunk)
+            yield chunk
+        self._write(recorder.interaction(request))
+
+    async def _arecord_stream(self, request: LLMRequest) -> AsyncIterator[ChatCompletionChunk]:
+        recorder = _StreamRecorder()
+        async for chunk in self.provider.astream(request):
+            recorder.add(chunk)
+            yield chunk
+        self._write(recorder.interaction(request))
+
+    def _write_call(self, request: LLMRequest, response: ChatCompletion, start: float) -> None:
+        self._write(
+            {
+                "version": CASSETTE_VERSION,
+                "mode": "call",
+                "key": request_key(request),
+                "request": request.model_dump(mode="json", exclude_none=True),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "response": response.model_dump(mode="json", exclude_none=True),
+            }
+        )
+
+    def _write(self, interaction: Dict[str, Any]) -> None:
+        """追加一条调用记录，录制失败不影响正常调用"""
+        line = json.dumps(interaction, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            logger.warning(f"写入 LLM 录制文件失败: path={self.path}, error={e}")
+
+
+class ReplayProvider(LLMProvider):
+    """回放录制文件的 Provider
+
+    优先按请求匹配键查找未使用的录制记录，找不到时按录制顺序使用下一条同类型记录，
+    strict 为 True 时找不到匹配直接抛出 ReplayMissError。
+    time_scale 大于 0 时按录制的耗时等比例模拟首 token 延迟和 chunk 间隔，为 0 时立即返回
+    """
+
+    def __init__(
+        self,
+        cassette: Union[str, Path, List[Dict[str, Any]]],
+        time_scale: float = 0.0,
+        strict: bool = False,
+        advisors: Optional[List[Advisor]] = None,
+    ):
+        """初始化回放 Provider
+
+        Args:
+            cassette: 录制文件路径，或已加载的调用记录列表
+            time_scale: 时间缩放系数，1.0 为按录制时的速度回放
+            strict: 是否要求请求严格匹配
+            advisors: Advisor 列表
+        """
+        interactions = cassette if isinstance(cassette, list) else load_cassette(cassette)
+        self._interactions = interactions
+        self._used = [False] * len(interactions)
+        self.time_scale = time_scale
+        self.strict = strict
+        self.emulated_ms: float = 0.0  # 模拟 LLM 延迟累计等待的毫秒数
+        self._advisors: List[Advisor] = advisors or []
+        self.advisor_chain = AdvisorChain(self._advisors.copy())
+        self._lock = threading.Lock()
+
+    def add_advisors(self, advisors: List[Advisor]) -> None:
+        """添加 Advisor 到现有列表并更新 AdvisorChain
+
+        Args:
+            advisors: 要添加的 Advisor 列表
+        """
+        self._advisors.extend(advisors)
+        self.advisor_chain = AdvisorChain(self._advisors.copy())
+
+    @property
+    def capabilities(self) -> ProviderCapabilities:
+        return ProviderCapabilities(supports_streaming=True, supports_tools=True)
+
+    @property
+    def remaining(self) -> int:
+        """尚未回放的记录数量"""
+        return self._used.count(False)
+
+    def reset(self) -> None:
+        """将所有记录标记为未使用，用于重复回放"""
+        with self._lock:
+            self._used = [False] * len(self._interactions)
+            self.emulated_ms = 0.0
+
+    def call(self, request: LLMRequest) -> ChatCompletion:
+        return self.advisor_chain.call(request, self._replay_call)
+
+    def stream(self, request: LLMRequest) -> Iterator[ChatCompletionChunk]:
+        yield from self.advisor_chain.stream(request, self._replay_stream)
+
+    def _replay_call(self, request: LLMRequest) -> ChatCompletion:
+        interaction = self._take(request, "call")
+        self._sleep(interaction.get("duration_ms", 0))
+        return ChatCompletion.model_validate(interaction["response"])
+
+    def _replay_stream(self, request: LLMRequest) -> Iterator[ChatCompletionChunk]:
+        interaction = self._take(request, "stream")
+        for recorded in interaction["chunks"]:
+            self._sleep(recorded.get("delay_ms", 0))
+            yield ChatCompletionChunk.model_validate(recorded["chunk"])
+
+    def _take(self, request: LLMRequest, mode: str) -> Dict[str, Any]:
+        """取出与请求匹配的记录"""
+        key = request_key(request)
+        with self._lock:
+            fallback = None
+            for i, interaction in enumerate(self._interactions):
+                if self._used[i] or interaction.get("mode") != mode:
+                    continue
+                if interaction.get("key") == key:
+                    self._used[i] = True
+                    return interaction
+                if fallback is None:
+                    fallback = i
+
+            if fallback is None or self.strict:
+                raise ReplayMissError(f"没有匹配的录制记录: mode={mode}, key={key[:12]}")
+            logger.debug(f"录制记录的请求不匹配，按顺序回放: mode={mode}, index={fallback}")
+            self._used[fallback] = True
+            return self._interactions[fallback]
+
+    def _sleep(self, delay_ms: float) -> None:
+        if self.time_scale > 0 and delay_ms > 0:
+            scaled_ms = delay_ms * self.time_scale
+            self.emulated_ms += scaled_ms
+            time.sleep(scaled_ms / 1000)
+
+
+class _StreamRecorder:
+    """记录流式响应的 chunk 及其与上一个 chunk 的时间间隔，第一个间隔即首 token 延迟"""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._last = self._start
+        self._chunks: List[Dict[str, Any]] = []
+
+    def add(self, chunk: ChatCompletionChunk) -> None:
+        now = time.perf_counter()
+        self._chunks.append(
+            {
+                "delay_ms": round((now - self._last) * 1000, 3),
+                "chunk": chunk.model_dump(mode="json", exclude_none=True),
+            }
+        )
+        self._last = now
+
+    def interaction(self, request: LLMRequest) -> Dict[str, Any]:
+        return {
+            "version": CASSETTE_VERSION,
+            "mode": "stream",
+            "key": request_key(request),
+            "request": request.model_dump(mode="json", exclude_none=True),
+            "duration_ms": round((self._last - self._start) * 1000, 3),
+            "chunks": self._chunks,
+        }
@@ -0,0 +1,207 @@
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional
+
+from eflycode.core.llm.protocol import ChatCompletionChunk, ToolCall, ToolCallFunction
+
+
+class TextAccumulator:
+    """线性时间的文本累积器
+
+    追加时只保存片段，读取完整文本时才拼接一次并缓存，
+    避免 `text += delta` 在长文本上反复复制造成的平方级开销
+    """
+
+    def __init__(self, text: str = ""):
+        """初始化文本累积器
+
+        Args:
+            text: 初始文本
+        """
+        self._parts: List[str] = []
+        self._offsets: List[int] = []  # 每个片段在完整文本中的起始位置
+        self._length: int = 0
+        if text:
+            self.append(text)
+
+    def append(self, text: str) -> None:
+        """追加文本片段
+
+        Args:
+            text: 要追加的文本
+        """
+        if not text:
+            return
+        self._offsets.append(self._length)
+        self._parts.append(text)
+        self._length += len(text)
+
+    @property
+    def text(self) -> str:
+        """获取完整文本，拼接结果会被缓存直到下一次追加"""
+        if len(self._parts) > 1:
+            joined = "".join(self._parts)
+            self._parts = [joined]
+            self._offsets = [0]
+        return self._parts[0] if self._parts else ""
+
+    def slice(self, start: int, end: Optional[int] = None) -> str:
+        """获取 [start, end) 范围内的文本，只拼接涉及的片段
+
+        Args:
+            start: 起始位置
+            end: 结束位置，默认为文本末尾
+
+        Returns:
+            str: 范围内的文本
+        """
+        end = self._length if end is None else min(end, self._length)
+        if start >= end:
+            return ""
+        first = bisect_right(self._offsets, start) - 1
+        pieces = []
+        for i in range(first, len(self._parts)):
+            part_start = self._offsets[i]
+            if part_start >= end:
+                break
+            part = self._parts[i]
+            pieces.append(part[max(0, start - part_start):end - part_start])
+        return "".join(pieces)
+
+    def endswith(self, suffix: str) -> bool:
+        """判断去掉末尾空白后的文本是否以 suffix 结尾，不会触发拼接
+
+        Args:
+            suffix: 后缀
+
+        Returns:
+            bool: 是否以 suffix 结尾
+        """
+        for part in reversed(self._parts):
+            stripped = part.rstrip()
+            if stripped:
+                return stripped.endswith(suffix)
+        return False
+
+    def clear(self) -> None:
+        """清空文本"""
+        self._parts = []
+        self._offsets = []
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class StreamAccumulator:
+    """流式响应累积器
+
+    一次流式响应只由一个累积器处理每个 chunk：累积 content 和工具调用参数，
+    其他需要完整内容的组件订阅该累积器，而不是各自再累积一份
+
+    订阅者在每个 chunk 被累积之后调用，可以通过累积器读取当前状态
+    """
+
+    def __init__(self):
+        """初始化流式累积器"""
+        self.content = TextAccumulator()
+        self._tool_calls: Dict[int, _ToolCallAccumulator] = {}
+        self.last_chunk: Optional[ChatCompletionChunk] = None
+        self.finish_reason: Optional[str] = None
+        self.chunk_count: int = 0
+        self._subscribers: List[Callable[[ChatCompletionChunk, "StreamAccumulator"], None]] = []
+
+    def subscribe(self, callback: Callable[[ChatCompletionChunk, "StreamAccumulator"], None]) -> None:
+        """订阅累积后的 chunk
+
+        Args:
+            callback: 回调函数，参数为 chunk 和累积器本身
+        """
+        self._subscribers.append(callback)
+
+    def feed(self, chunk: ChatCompletionChunk) -> List[int]:
+        """累积一个流式 chunk 并通知订阅者
+
+        Args:
+            chunk: 流式响应块
+
+        Returns:
+            List[int]: 本 chunk 中新出现的工具调用 index
+        """
+        self.chunk_count += 1
+        started: List[int] = []
+        delta = chunk.delta
+        if delta and delta.content:
+            self.content.append(delta.content)
+
+        # 流式响应中 tool_calls 可能分布在多个 chunk 中
+        if delta and delta.tool_calls:
+            for delta_tc in delta.tool_calls:
+                tool_call = self._tool_calls.get(delta_tc.index)
+                if tool_call is None:
+                    tool_call = _ToolCallAccumulator(
+                        id=delta_tc.id or "",
+                        type=delta_tc.type or "function",
+                        name=delta_tc.function.name if delta_tc.function and delta_tc.function.name else "",
+                    )
+                    self._tool_calls[delta_tc.index] = tool_call
+                    started.append(delta_tc.index)
+                if delta_tc.function and delta_tc.function.arguments:
+                    tool_call.arguments.append(delta_tc.function.arguments)
+
+        if chunk.finish_reason:
+            self.finish_reason = chunk.finish_reason
+        self.last_chunk = chunk
+
+        for callback in self._subscribers:
+            callback(chunk, self)
+        return started
+
+    @property
+    def tool_call_indexes(self) -> List[int]:
+        """已出现的工具调用 index，按 index 排序"""
+        return sorted(self._tool_calls)
+
+    def tool_call_id(self, index: int) -> str:
+        """获取工具调用 ID"""
+        return self._tool_calls[index].id
+
+    def tool_call_name(self, index: int) -> str:
+        """获取工具名称"""
+        return self._tool_calls[index].name
+
+    def tool_call_arguments(self, index: int) -> TextAccumulator:
+        """获取工具调用参数的累积器"""
+        return self._tool_calls[index].arguments
+
+    def tool_calls(self) -> Optional[List[ToolCall]]:
+        """构建完整的工具调用列表
+
+        Returns:
+            Optional[List[ToolCall]]: 按 index 排序的工具调用，没有工具调用时返回 None
+        """
+        if not self._tool_calls:
+            return None
+        return [
+            ToolCall(
+                id=tool_call.id,
+                type=tool_call.type,
+                function=ToolCallFunction(name=tool_call.name, arguments=tool_call.arguments.text),
+            )
+            for _, tool_call in sorted(self._tool_calls.items())
+        ]
+
+
+class _ToolCallAccumulator:
+    """单个工具调用的累积状态"""
+
+    def __init__(self, id: str, type: str, name: str):
+        self.id = id
+        self.type = type
+        self.name = name
+        self.arguments = TextAccumulator()
@@ -75,6 +75,11 @@ class MCPTool(BaseTool):
         """工具类型"""
         return ToolType.FUNCTION
 
+    @property
+    def core(self) -> bool:
+        """MCP 工具不是核心工具，按与对话的相关性选择是否发送给模型"""
+        return False
+
     @property
     def permission(self) -> str:
         """工具的操作权限
@@ -83,6 +88,11 @@ class MCPTool(BaseTool):
         """
         return "read"
 
+    @property
+    def concurrency_safe(self) -> bool:
+        """MCP 工具可能有副作用，且 MCPClient 的请求和响应队列不支持并发调用"""
+        return False
+
     @property
     def description(self) -> str:
         """工具描述"""
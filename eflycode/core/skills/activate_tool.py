@@ -34,6 +34,16 @@ class ActivateSkillTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def mutates_workspace(self) -> bool:
+        # 只读取技能文件，不修改工作区
+        return False
+
+    @property
+    def definition_version(self) -> int:
+        # 描述和参数依赖可用技能列表，技能变化时定义需要重新构建
+        return self._manager.version
+
     @property
     def description(self) -> str:
         # 动态生成描述，包含可用技能列表
@@ -31,6 +31,8 @@ class SkillsManager:
         self.manifest_file_path: Optional[Path] = None
         self.manifest = SkillManifest()
         self.skills_cache: Dict[str, SkillMetadata] = {}
+        # 技能列表或启用状态每次变化时递增，用于使依赖技能列表的工具定义失效
+        self.version: int = 0
 
     @classmethod
     def get_instance(cls) -> "SkillsManager":
@@ -158,6 +160,7 @@ class SkillsManager:
 
         # 更新缓存
         self.skills_cache = new_skills
+        self.version += 1
 
         return changes
 
@@ -211,6 +214,7 @@ class SkillsManager:
             return True
 
         skill.disabled = False
+        self.version += 1
         self.manifest.add_skill(skill)
         self._save_manifest()
         logger.info(f"启用技能: {name}")
@@ -235,6 +239,7 @@ class SkillsManager:
             return True
 
         skill.disabled = True
+        self.version += 1
         self.manifest.add_skill(skill)
         self._save_manifest()
         logger.info(f"禁用技能: {name}")
@@ -3,12 +3,13 @@
 在系统提示词中注入 <available_skills>
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from eflycode.core.agent.base import BaseAgent
 from eflycode.core.config.models import Config
+from eflycode.core.context.budget import PROMPT_COMPONENT_SKILLS
 from eflycode.core.llm.advisor import Advisor
-from eflycode.core.llm.protocol import LLMRequest, Message
+from eflycode.core.llm.protocol import LLMRequest, Message, ToolDefinition
 from eflycode.core.skills.manager import SkillsManager
 from eflycode.core.utils.logger import logger
 
@@ -69,25 +70,40 @@ class SkillsAdvisor(Advisor):
 
         return "\n".join(lines)
 
-    def _add_available_skills(self, request: LLMRequest) -> LLMRequest:
-        """添加可用技能到请求
-
-        Args:
-            request: LLM 请求
+    def _build_skills_addition(self) -> str:
+        """构建追加到系统提示词末尾的技能说明
 
         Returns:
-            LLMRequest: 修改后的请求
+            str: 技能说明，未启用 skills 功能或没有可用技能时返回空字符串
         """
         # 检查是否启用了 skills 功能
         if not self.config.skills_enabled:
             logger.debug("Skills 功能未启用，跳过添加 <available_skills>")
-            return request
+            return ""
 
         # 获取可用技能块
         skills_block = self._build_available_skills_block()
 
         if not skills_block:
             logger.debug("没有可用的技能，跳过添加 <available_skills>")
+            return ""
+
+        addition = "\n\n" + skills_block + "\n\n"
+        addition += "当任务匹配某个技能时，请使用 activate_skill 工具激活该技能。\n"
+        addition += "激活后，请严格优先遵循 <activated_skill> 中的指令。"
+        return addition
+
+    def _add_available_skills(self, request: LLMRequest) -> LLMRequest:
+        """添加可用技能到请求
+
+        Args:
+            request: LLM 请求
+
+        Returns:
+            LLMRequest: 修改后的请求
+        """
+        addition = self._build_skills_addition()
+        if not addition:
             return request
 
         # 查找现有的 system message
@@ -100,11 +116,6 @@ class SkillsAdvisor(Advisor):
                 system_index = i
                 break
 
-        # 构建要添加的内容
-        addition = "\n\n" + skills_block + "\n\n"
-        addition += "当任务匹配某个技能时，请使用 activate_skill 工具激活该技能。\n"
-        addition += "激活后，请严格优先遵循 <activated_skill> 中的指令。"
-
         if system_message:
             # 在现有 system message 末尾添加
             if isinstance(system_message.content, str):
@@ -116,12 +127,23 @@ class SkillsAdvisor(Advisor):
         else:
             # 创建新的 system message
             request.messages.insert(
-                0, Message(role="system", content=skills_block + addition)
+                0, Message(role="system", content=addition.lstrip("\n"))
             )
             logger.debug(f"创建新的系统提示词并添加 <available_skills>")
 
         return request
 
+    def prompt_components(self, tools: List[ToolDefinition]) -> Dict[str, str]:
+        """在构建请求之前给出追加到系统提示词末尾的技能说明，计入本次请求的 token 预算
+
+        Args:
+            tools: 本次请求的工具定义
+
+        Returns:
+            Dict[str, str]: 技能说明
+        """
+        return {PROMPT_COMPONENT_SKILLS: self._build_skills_addition()}
+
     def before_call(self, request: LLMRequest) -> LLMRequest:
         """在请求发送前添加可用技能
 
@@ -13,6 +13,8 @@ from eflycode.core.tool.file_system_tool import (
     WriteFileTool,
     FILE_SYSTEM_TOOL_GROUP,
 )
+from eflycode.core.tool.output_store import ToolOutputStore
+from eflycode.core.tool.read_tool_output_tool import ReadToolOutputTool
 
 __all__ = [
     "BaseTool",
@@ -31,5 +33,7 @@ __all__ = [
     "MoveFileTool",
     "FILE_SYSTEM_TOOL_GROUP",
     "ExecuteCommandTool",
+    "ToolOutputStore",
+    "ReadToolOutputTool",
 ]
 
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 
@@ -128,6 +129,47 @@ class BaseTool(ABC):
         """工具描述"""
         pass
 
+    @property
+    def concurrency_safe(self) -> bool:
+        """工具是否可以与其他工具并发执行
+
+        permission 只用于权限确认，不能说明工具是否有副作用或可以重入，默认不并发执行。
+        只有没有副作用且可以重入的工具显式重写为 True
+        """
+        return False
+
+    @property
+    def speculative_safe(self) -> bool:
+        """工具是否可以在模型确认调用之前、BeforeTool hook 之前提前执行
+
+        提前执行的调用可能被丢弃或被 hook 拒绝，只有没有任何副作用的工具可以声明为 True，默认不提前执行
+        """
+        return False
+
+    @property
+    def cacheable(self) -> bool:
+        """工具结果是否可以缓存
+
+        只有结果完全由参数和工作区文件决定的工具才能缓存，默认不缓存
+        """
+        return False
+
+    @property
+    def mutates_workspace(self) -> bool:
+        """工具执行是否可能修改工作区，执行后会使缓存的工具结果失效
+
+        默认不能并发执行的工具都视为会修改工作区
+        """
+        return not self.concurrency_safe
+
+    @property
+    def core(self) -> bool:
+        """是否为核心工具，核心工具每次请求都发送给模型，其他工具按与对话的相关性选择
+
+        默认内置工具都是核心工具
+        """
+        return True
+
     @property
     def display_name(self) -> str:
         """工具显示名称"""
@@ -155,6 +197,14 @@ class BaseTool(ABC):
         """工具示例"""
         return None
 
+    @property
+    def definition_version(self) -> int:
+        """工具定义的版本号
+
+        ToolRegistry 会缓存工具定义，描述或参数在运行时变化的工具需要在变化时返回新的版本号
+        """
+        return 0
+
     @property
     def definition(self) -> ToolDefinition:
         """获取工具的 schema 定义
@@ -246,6 +296,24 @@ class BaseTool(ABC):
                 error_details=e,
             ) from e
 
+    async def arun(self, *args, **kwargs) -> str:
+        """异步执行工具
+
+        默认在线程中执行 run，避免阻塞事件循环，原生支持异步的工具可以重写此方法
+
+        Args:
+            *args: 位置参数
+            **kwargs: 工具执行所需的参数
+
+        Returns:
+            str: 工具执行结果
+
+        Raises:
+            ToolParameterError: 当参数错误时抛出
+            ToolExecutionError: 当工具执行失败时抛出
+        """
+        return await asyncio.to_thread(self.run, *args, **kwargs)
+
     def __call__(self, *args, **kwargs) -> str:
         """使工具实例可以像函数一样被调用
 
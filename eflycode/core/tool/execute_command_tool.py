@@ -152,6 +152,11 @@ class ExecuteCommandTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def concurrency_safe(self) -> bool:
+        # 白名单中的 git、make、pip 等命令可能修改工作区，不能与其他工具并发执行
+        return False
+
     @property
     def description(self) -> str:
         return (
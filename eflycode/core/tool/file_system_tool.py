@@ -105,6 +105,14 @@ class ListDirectoryTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def speculative_safe(self) -> bool:
+        return True
+
     @property
     def description(self) -> str:
         return "直接列出指定目录路径下的文件和子目录的名称。可以选择性地忽略与提供的通配符模式匹配的条目。文本文件会显示行数，文件夹会显示包含的项目数量。"
@@ -361,6 +369,19 @@ class ReadFileTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def speculative_safe(self) -> bool:
+        return True
+
+    @property
+    def cacheable(self) -> bool:
+        """结果只取决于参数中的文件，文件的 mtime 和大小记录在缓存指纹中"""
+        return True
+
     @property
     def description(self) -> str:
         return "读取并返回指定文件的内容。如果文件很大，内容将被截断。工具响应会清楚地指示是否发生了截断，并提供如何使用 'offset' 和 'limit' 参数读取更多文件的详细信息。处理文本、图片（PNG、JPG、GIF、WEBP、SVG、BMP）、音频文件（MP3、WAV、AIFF、AAC、OGG、FLAC）和 PDF 文件。对于文本文件，可以读取特定的行范围。"
@@ -536,6 +557,14 @@ class SearchFileContentTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def speculative_safe(self) -> bool:
+        return True
+
     @property
     def description(self) -> str:
         return "在文件内容中搜索正则表达式模式，并可通过 glob 过滤。"
@@ -775,6 +804,14 @@ class ReadManyFilesTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def speculative_safe(self) -> bool:
+        return True
+
     @property
     def description(self) -> str:
         return "从配置的目标目录中读取由 glob 模式指定的多个文件的内容。"
@@ -967,6 +1004,14 @@ class GlobSearchTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def speculative_safe(self) -> bool:
+        return True
+
     @property
     def description(self) -> str:
         return "高效地查找匹配特定 glob 模式的文件，会返回按\"最近修改优先\"排序的绝对路径列表。"
@@ -23,6 +23,10 @@ class FinishTaskTool(BaseTool):
     def permission(self) -> str:
         return "read"
 
+    @property
+    def mutates_workspace(self) -> bool:
+        return False
+
     @property
     def description(self) -> str:
         return (
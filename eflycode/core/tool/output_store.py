@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+from eflycode.core.config.config_manager import resolve_workspace_dir
+from eflycode.core.constants import EFLYCODE_DIR, TOOL_OUTPUTS_DIR
+from eflycode.core.utils.logger import logger
+
+# 工具输出大小配置常量
+TOOL_OUTPUT_SPILL_THRESHOLD = 32000  # 超过该字符数的工具结果会写入磁盘
+TOOL_OUTPUT_PREVIEW_HEAD = 4000  # 预览保留的开头字符数
+TOOL_OUTPUT_PREVIEW_TAIL = 2000  # 预览保留的结尾字符数
+
+# handle 为内容 SHA-256 的前 16 位十六进制字符
+TOOL_OUTPUT_HANDLE_LENGTH = 16
+_HANDLE_PATTERN = re.compile(rf"^[0-9a-f]{{{TOOL_OUTPUT_HANDLE_LENGTH}}}$")
+
+
+class ToolOutputStore:
+    """按内容寻址的工具输出存储
+
+    过长的工具结果以内容哈希命名保存在 .eflycode/tool_outputs 目录下，
+    相同内容只保存一份，会话和提示词中只保留预览和 handle，需要时再通过 read_tool_output 分页读取
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        """初始化工具输出存储
+
+        Args:
+            directory: 存储目录，为 None 时使用工作区下的 .eflycode/tool_outputs
+        """
+        self._directory = Path(directory) if directory is not None else None
+
+    @property
+    def directory(self) -> Path:
+        """存储目录"""
+        if self._directory is not None:
+            return self._directory
+        return resolve_workspace_dir() / EFLYCODE_DIR / TOOL_OUTPUTS_DIR
+
+    def put(self, content: str) -> str:
+        """保存工具输出
+
+        Args:
+            content: 工具输出
+
+        Returns:
+            str: 输出的 handle
+        """
+        handle = hashlib.sha256(content.encode("utf-8")).hexdigest()[:TOOL_OUTPUT_HANDLE_LENGTH]
+        path = self._path(handle)
+        if path.exists():
+            return handle
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写入临时文件再重命名，避免并发写入或中断时留下不完整的文件
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{handle}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except Exception:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        logger.info(f"工具输出已保存: handle={handle}, length={len(content)}")
+        return handle
+
+    def read(self, handle: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[str, int]:
+        """分页读取工具输出
+
+        Args:
+            handle: 输出的 handle
+            offset: 起始字符位置
+            limit: 最多读取的字符数，为 None 时读取到末尾
+
+        Returns:
+            Tuple[str, int]: 读取的内容和输出总字符数
+
+        Raises:
+            ValueError: handle 格式不正确
+            FileNotFoundError: handle 对应的输出不存在
+        """
+        if not _HANDLE_PATTERN.match(handle or ""):
+            raise ValueError(f"无效的 handle: {handle}")
+        content = self._path(handle).read_text(encoding="utf-8")
+        offset = max(0, offset)
+        end = len(content) if limit is None else offset + max(0, limit)
+        return content[offset:end], len(content)
+
+    def spill(
+        self,
+        content: str,
+        threshold: int = TOOL_OUTPUT_SPILL_THRESHOLD,
+        head: int = TOOL_OUTPUT_PREVIEW_HEAD,
+        tail: int = TOOL_OUTPUT_PREVIEW_TAIL,
+    ) -> str:
+        """超过阈值的输出写入磁盘，返回开头和结尾的预览以及 handle
+
+        Args:
+            content: 工具输出
+            threshold: 阈值字符数
+            head: 预览保留的开头字符数
+            tail: 预览保留的结尾字符数
+
+        Returns:
+            str: 未超过阈值时返回原输出，否则返回预览
+        """
+        if not content or len(content) <= threshold:
+            return content
+
+        if head + tail > threshold:
+            # 阈值小于默认预览长度时按比例缩小预览
+            head, tail = threshold * 2 // 3, threshold // 3
+        handle = self.put(content)
+        omitted = len(content) - head - tail
+        return (
+            f"[输出过长，共 {len(content)} 个字符，已保存为 handle={handle}。"
+            f"以下只显示开头 {head} 和结尾 {tail} 个字符，"
+            f"使用 read_tool_output 工具按 offset 分页读取被省略的部分]\n"
+            f"{content[:head]}\n"
+            f"... 省略 {omitted} 个字符（offset {head} 到 {len(content) - tail}） ...\n"
+            f"{content[len(content) - tail:]}"
+        )
+
+    def _path(self, handle: str) -> Path:
+        return self.directory / f"{handle}.txt"
@@ -0,0 +1,109 @@
+from typing import Optional
+
+from eflycode.core.llm.protocol import ToolFunctionParameters
+from eflycode.core.tool.base import BaseTool, ToolType
+from eflycode.core.tool.errors import ToolExecutionError
+from eflycode.core.tool.output_store import TOOL_OUTPUT_SPILL_THRESHOLD, ToolOutputStore
+
+# 每页最多读取的字符数，需要小于写入磁盘的阈值，避免分页结果再次被写入磁盘
+TOOL_OUTPUT_PAGE_SIZE = TOOL_OUTPUT_SPILL_THRESHOLD // 2
+
+
+class ReadToolOutputTool(BaseTool):
+    """分页读取过长的工具输出
+
+    过长的工具结果会被保存到磁盘，只在会话中保留预览和 handle，
+    模型通过此工具按 offset 读取被省略的部分
+    """
+
+    def __init__(self, store: Optional[ToolOutputStore] = None):
+        """初始化工具
+
+        Args:
+            store: 工具输出存储，为 None 时使用工作区下的默认存储
+        """
+        self._store = store or ToolOutputStore()
+
+    @property
+    def name(self) -> str:
+        return "read_tool_output"
+
+    @property
+    def type(self) -> str:
+        return ToolType.FUNCTION
+
+    @property
+    def permission(self) -> str:
+        return "read"
+
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def description(self) -> str:
+        return (
+            "分页读取被保存到磁盘的过长工具输出。"
+            "当工具结果中出现 handle 时，使用该 handle 和 offset 读取被省略的内容，"
+            f"每次最多读取 {TOOL_OUTPUT_PAGE_SIZE} 个字符。"
+        )
+
+    @property
+    def display_name(self) -> str:
+        return "ReadOutput"
+
+    def display(self, handle: str = "", **kwargs) -> str:
+        """工具显示名称"""
+        if handle:
+            return f"{self.display_name} {handle}"
+        return self.display_name
+
+    @property
+    def parameters(self) -> ToolFunctionParameters:
+        return ToolFunctionParameters(
+            type="object",
+            properties={
+                "handle": {
+                    "type": "string",
+                    "description": "工具结果中给出的输出 handle",
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "起始字符位置，默认 0",
+                    "minimum": 0,
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": f"最多读取的字符数，默认且最大为 {TOOL_OUTPUT_PAGE_SIZE}",
+                    "minimum": 1,
+                },
+            },
+            required=["handle"],
+        )
+
+    def do_run(self, handle: str, offset: int = 0, limit: Optional[int] = None, **kwargs) -> str:
+        """执行分页读取
+
+        Args:
+            handle: 输出的 handle
+            offset: 起始字符位置
+            limit: 最多读取的字符数
+
+        Returns:
+            str: 读取的内容，开头附带分页信息
+        """
+        offset = max(0, offset or 0)
+        limit = min(limit or TOOL_OUTPUT_PAGE_SIZE, TOOL_OUTPUT_PAGE_SIZE)
+        try:
+            content, total = self._store.read(handle, offset, limit)
+        except ValueError as e:
+            raise ToolExecutionError(message=str(e), tool_name=self.name) from e
+        except FileNotFoundError as e:
+            raise ToolExecutionError(message=f"工具输出不存在: {handle}", tool_name=self.name, error_details=e) from e
+
+        end = offset + len(content)
+        if end < total:
+            header = f"[handle={handle} 第 {offset}-{end} 个字符，共 {total} 个字符，下一页 offset={end}]"
+        else:
+            header = f"[handle={handle} 第 {offset}-{end} 个字符，共 {total} 个字符，已读取到末尾]"
+        return f"{header}\n{content}"
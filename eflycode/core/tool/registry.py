@@ -0,0 +1,113 @@
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from eflycode.core.llm.protocol import ToolDefinition
+from eflycode.core.tool.base import BaseTool
+
+
+class ToolRegistry:
+    """带版本号的工具注册表
+
+    缓存工具的 ToolDefinition，只有注册表版本或工具自身的 definition_version 变化时才重新构建。
+    每次增删工具都会使版本号递增，工具定义在运行时变化的场景可以调用 invalidate 显式失效。
+    缓存返回的是同一组 ToolDefinition 对象，调用方不应修改它们
+    """
+
+    def __init__(self, tools: Optional[List[BaseTool]] = None):
+        """初始化工具注册表
+
+        Args:
+            tools: 初始工具列表
+        """
+        self._tools: Dict[str, BaseTool] = {}
+        self._version: int = 0
+        self._lock = threading.Lock()
+        self._definitions: Dict[str, Tuple[int, ToolDefinition]] = {}  # name -> (definition_version, 定义)
+        self._cache_key: Optional[Tuple] = None
+        self._cached_definitions: List[ToolDefinition] = []
+        for tool in tools or []:
+            self.add(tool)
+
+    @property
+    def version(self) -> int:
+        """注册表版本号"""
+        return self._version
+
+    def add(self, tool: BaseTool) -> None:
+        """添加工具，同名工具会被替换
+
+        Args:
+            tool: 要添加的工具
+        """
+        with self._lock:
+            self._tools[tool.name] = tool
+            self._definitions.pop(tool.name, None)
+            self._version += 1
+
+    def remove(self, tool_name: str) -> bool:
+        """移除工具
+
+        Args:
+            tool_name: 工具名称
+
+        Returns:
+            bool: 是否成功移除
+        """
+        with self._lock:
+            if tool_name not in self._tools:
+                return False
+            del self._tools[tool_name]
+            self._definitions.pop(tool_name, None)
+            self._version += 1
+            return True
+
+    def invalidate(self) -> None:
+        """使全部缓存的工具定义失效"""
+        with self._lock:
+            self._definitions.clear()
+            self._version += 1
+
+    def get(self, tool_name: str) -> Optional[BaseTool]:
+        """获取工具
+
+        Args:
+            tool_name: 工具名称
+
+        Returns:
+            Optional[BaseTool]: 找到的工具，如果不存在则返回 None
+        """
+        return self._tools.get(tool_name)
+
+    def tools(self) -> List[BaseTool]:
+        """获取所有工具，按注册顺序排列"""
+        return list(self._tools.values())
+
+    def get_definitions(self) -> List[ToolDefinition]:
+        """获取所有工具的定义
+
+        Returns:
+            List[ToolDefinition]: 工具定义列表，按注册顺序排列
+        """
+        with self._lock:
+            tools = list(self._tools.values())
+            cache_key = (self._version, tuple(tool.definition_version for tool in tools))
+            if cache_key != self._cache_key:
+                definitions = []
+                for tool, definition_version in zip(tools, cache_key[1]):
+                    cached = self._definitions.get(tool.name)
+                    if cached is None or cached[0] != definition_version:
+                        cached = (definition_version, tool.definition)
+                        self._definitions[tool.name] = cached
+                    definitions.append(cached[1])
+                self._cached_definitions = definitions
+                self._cache_key = cache_key
+            return list(self._cached_definitions)
+
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self._tools
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._tools))
+
+    def __len__(self) -> int:
+        return len(self._tools)
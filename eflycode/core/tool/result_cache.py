@@ -0,0 +1,155 @@
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from eflycode.core.tool.base import BaseTool
+
+# 缓存配置常量
+TOOL_RESULT_CACHE_MAX_ENTRIES = 256  # 最多缓存的工具结果数量
+
+# 命中缓存时添加在工具结果前的标记，提示模型该结果来自之前的相同调用
+TOOL_RESULT_CACHED_MARK = "[缓存结果：自上次相同调用以来工作区未变化]\n"
+
+
+class ToolResultCache:
+    """只读工具的结果缓存
+
+    缓存键由工具名称和规范化后的参数组成，每条缓存同时记录调用时的工作区指纹
+    （参数中涉及的路径和工作区根目录的 mtime 与大小），指纹变化时缓存失效。
+    指纹只覆盖参数中的路径本身，因此只有结果完全由这些路径决定的工具可以声明为 cacheable
+    （目前只有 read_file；搜索和列目录类工具的结果取决于目录中文件的内容，原地修改文件不会改变目录的 mtime）。
+    只有 cacheable 的工具会被缓存，mutates_workspace 的工具执行后清空全部缓存。
+    max_entries 为 0 时禁用缓存
+    """
+
+    def __init__(self, max_entries: int = TOOL_RESULT_CACHE_MAX_ENTRIES):
+        """初始化结果缓存
+
+        Args:
+            max_entries: 最多缓存的结果数量，超过时淘汰最久未使用的结果
+        """
+        self.max_entries = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: "OrderedDict[str, Tuple[Tuple, str]]" = OrderedDict()
+        self._generation: int = 0
+        self._lock = threading.Lock()
+
+    def lookup(
+        self, tool: BaseTool, kwargs: Dict[str, Any], workspace_dir: Optional[Path] = None
+    ) -> Tuple[Optional[str], Optional["_CacheSlot"]]:
+        """查找缓存的工具结果
+
+        Args:
+            tool: 工具
+            kwargs: 工具参数
+            workspace_dir: 工作区目录，用于计算工作区指纹
+
+        Returns:
+            Tuple[Optional[str], Optional[_CacheSlot]]: 命中时返回 (结果, None)；
+                未命中时返回 (None, slot)，执行完成后通过 store 写入；工具不可缓存时返回 (None, None)
+        """
+        if self.max_entries <= 0 or not tool.cacheable:
+            return None, None
+
+        key = _make_key(tool.name, kwargs)
+        fingerprint = _fingerprint(kwargs, workspace_dir)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], None
+            self.misses += 1
+            return None, _CacheSlot(key, fingerprint, self._generation)
+
+    def store(self, slot: Optional["_CacheSlot"], result: str) -> None:
+        """写入工具结果
+
+        执行期间缓存被清空过时不写入，避免缓存修改之前读取到的结果
+
+        Args:
+            slot: lookup 返回的缓存槽，为 None 时忽略
+            result: 工具执行结果
+        """
+        if slot is None:
+            return
+        with self._lock:
+            if slot.generation != self._generation:
+                return
+            self._entries[slot.key] = (slot.fingerprint, result)
+            self._entries.move_to_end(slot.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """清空全部缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        """获取缓存统计信息
+
+        Returns:
+            Dict[str, int]: 命中次数、未命中次数和当前缓存数量
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _is_path_argument(name: str, value: Any) -> bool:
+    """参数名以 path 结尾的字符串参数视为路径"""
+    return name.endswith("path") and isinstance(value, str) and bool(value)
+
+
+def _resolve_path(value: str) -> str:
+    """将路径参数规范化为绝对路径"""
+    try:
+        return str(Path(value).resolve())
+    except (OSError, RuntimeError):
+        return value
+
+
+def _make_key(tool_name: str, kwargs: Dict[str, Any]) -> str:
+    """生成缓存键，路径参数会被规范化为绝对路径"""
+    normalized = {
+        name: _resolve_path(value) if _is_path_argument(name, value) else value for name, value in kwargs.items()
+    }
+    arguments = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{tool_name}:{arguments}"
+
+
+def _fingerprint(kwargs: Dict[str, Any], workspace_dir: Optional[Path]) -> Tuple:
+    """计算工作区指纹
+
+    包含路径参数和工作区根目录的 mtime 与大小，不存在的路径记为 None
+    """
+    paths: List[Path] = [
+        Path(_resolve_path(value)) for name, value in sorted(kwargs.items()) if _is_path_argument(name, value)
+    ]
+    if workspace_dir is not None:
+        paths.append(Path(workspace_dir))
+
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            fingerprint.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except (OSError, ValueError):
+            fingerprint.append((str(path), None, None))
+    return tuple(fingerprint)
+
+
+class _CacheSlot:
+    """一次未命中的查找，记录写入缓存所需的信息"""
+
+    def __init__(self, key: str, fingerprint: Tuple, generation: int):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.generation = generation
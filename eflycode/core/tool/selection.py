@@ -0,0 +1,149 @@
+"""按相关性选择每轮请求发送的工具
+
+注册的工具较多（例如接入了多个 MCP 服务）时，每次请求都发送全部工具定义会占用大量 prompt token。
+ToolSelector 保留核心工具和会话中已经使用过的工具，其余工具按最近对话的词法相关性（BM25）
+只保留前 top_k 个。选出的工具保持注册顺序，相同的选择结果产生相同的请求前缀
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from eflycode.core.llm.protocol import Message, ToolDefinition
+
+# 工具选择配置常量
+TOOL_SELECTION_TOP_K = 8  # 核心工具和已使用的工具之外最多保留的工具数
+TOOL_SELECTION_RECENT_MESSAGES = 6  # 计算相关性时使用的最近消息数
+# BM25 参数
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+# 英文和数字按单词切分，下划线和驼峰视为分隔；中文按单字切分
+_TERM_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+_CAMEL_PATTERN = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+class ToolSelector:
+    """每轮请求的工具选择器"""
+
+    def __init__(self, top_k: int = TOOL_SELECTION_TOP_K, recent_messages: int = TOOL_SELECTION_RECENT_MESSAGES):
+        """初始化工具选择器
+
+        Args:
+            top_k: 核心工具和已使用的工具之外最多保留的工具数
+            recent_messages: 计算相关性时使用的最近消息数
+        """
+        self.top_k = top_k
+        self.recent_messages = recent_messages
+        # 工具定义的词项索引，工具定义列表不变时复用
+        self._indexed: List[ToolDefinition] = []
+        self._index: Optional[_ToolIndex] = None
+
+    def select(
+        self,
+        tools: List[ToolDefinition],
+        messages: Sequence[Message],
+        core_tools: Iterable[str] = (),
+    ) -> List[ToolDefinition]:
+        """选择本轮请求发送的工具
+
+        Args:
+            tools: 全部可用工具的定义，按注册顺序排列
+            messages: 会话消息
+            core_tools: 总是保留的核心工具名称
+
+        Returns:
+            List[ToolDefinition]: 选出的工具定义，保持原来的顺序
+        """
+        keep = set(core_tools) | _used_tools(messages)
+        candidates = [tool for tool in tools if tool.function.name not in keep]
+        if len(candidates) <= self.top_k:
+            return tools
+
+        scores = self._get_index(tools).score(_query_terms(messages, self.recent_messages))
+        ranked = sorted(
+            (tool for tool in candidates if scores.get(tool.function.name, 0.0) > 0),
+            key=lambda tool: scores[tool.function.name],
+            reverse=True,
+        )
+        keep.update(tool.function.name for tool in ranked[: self.top_k])
+        return [tool for tool in tools if tool.function.name in keep]
+
+    def _get_index(self, tools: List[ToolDefinition]) -> "_ToolIndex":
+        """获取工具定义的索引，工具定义对象都没有变化时复用"""
+        if (
+            self._index is None
+            or len(tools) != len(self._indexed)
+            or any(a is not b for a, b in zip(tools, self._indexed))
+        ):
+            self._indexed = list(tools)
+            self._index = _ToolIndex(tools)
+        return self._index
+
+
+class _ToolIndex:
+    """工具定义的 BM25 索引"""
+
+    def __init__(self, tools: List[ToolDefinition]):
+        self.terms: Dict[str, Counter] = {tool.function.name: Counter(_tool_terms(tool)) for tool in tools}
+        self.lengths = {name: sum(counts.values()) for name, counts in self.terms.items()}
+        self.average_length = sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+        document_frequency: Counter = Counter()
+        for counts in self.terms.values():
+            document_frequency.update(counts.keys())
+        total = len(self.terms)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def score(self, query: Set[str]) -> Dict[str, float]:
+        """计算每个工具与查询词项的相关性"""
+        scores: Dict[str, float] = {}
+        for name, counts in self.terms.items():
+            norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self.lengths[name] / (self.average_length or 1))
+            score = 0.0
+            for term in query:
+                frequency = counts.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (_BM25_K1 + 1) / (frequency + norm)
+            scores[name] = score
+        return scores
+
+
+def _terms(text: Optional[str]) -> List[str]:
+    """切分文本为词项"""
+    if not text:
+        return []
+    return _TERM_PATTERN.findall(_CAMEL_PATTERN.sub(" ", text).lower())
+
+
+def _tool_terms(tool: ToolDefinition) -> List[str]:
+    """工具名称、描述和参数中的词项"""
+    function = tool.function
+    terms = _terms(function.name) + _terms(function.description)
+    for name, schema in function.parameters.properties.items():
+        terms += _terms(name)
+        if isinstance(schema, dict):
+            terms += _terms(schema.get("description"))
+    return terms
+
+
+def _query_terms(messages: Sequence[Message], recent: int) -> Set[str]:
+    """最近的用户和助手消息中的词项，工具输出不参与"""
+    query: Set[str] = set()
+    for message in messages[-recent:] if recent > 0 else ():
+        if message.role in ("user", "assistant"):
+            query.update(_terms(message.content if isinstance(message.content, str) else None))
+    return query
+
+
+def _used_tools(messages: Sequence[Message]) -> Set[str]:
+    """会话中已经调用过的工具名称"""
+    used: Set[str] = set()
+    for message in messages:
+        for tool_call in message.tool_calls or ():
+            if tool_call.function:
+                used.add(tool_call.function.name)
+    return used
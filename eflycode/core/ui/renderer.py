@@ -3,6 +3,7 @@ from typing import Optional
 
 from prompt_toolkit.utils import get_cwidth
 
+from eflycode.core.llm.stream_accumulator import TextAccumulator
 from eflycode.core.ui.output import UIOutput
 from eflycode.core.ui.ui_event_queue import UIEventQueue
 
@@ -35,7 +36,7 @@ class Renderer:
         self._task_started: bool = False
         
         # 用于打字机效果的缓冲区
-        self._message_buffer: str = ""
+        self._message_buffer = TextAccumulator()
         self._message_index: int = 0
         self._chars_per_tick: int = TYPEWRITER_CHARS_PER_TICK
         self._last_output_time: float = 0.0
@@ -59,10 +60,10 @@ class Renderer:
     def _flush_message_buffer(self) -> None:
         """立即输出缓冲区中的所有内容"""
         if self._message_buffer and self._message_index < len(self._message_buffer):
-            chunk = self._message_buffer[self._message_index:]
+            chunk = self._message_buffer.slice(self._message_index)
             if chunk:
                 self._output.write(chunk)
-        self._message_buffer = ""
+        self._message_buffer.clear()
         self._message_index = 0
 
     def _format_banner(self, title: str, body_lines: list[str]) -> str:
@@ -100,7 +101,7 @@ class Renderer:
         self.current_task = task_name
         self._task_started = False
         # 清空消息缓冲区
-        self._message_buffer = ""
+        self._message_buffer.clear()
         self._message_index = 0
         self._last_output_time = 0.0
 
@@ -138,7 +139,7 @@ class Renderer:
         """
         delta = kwargs.get("delta", "")
         if delta:
-            self._message_buffer += delta
+            self._message_buffer.append(delta)
 
     def handle_message_stop(self, **kwargs) -> None:
         """处理消息结束事件
@@ -223,14 +224,14 @@ class Renderer:
                 remaining = len(self._message_buffer) - self._message_index
                 chunk_size = min(self._chars_per_tick, remaining)
                 
-                chunk = self._message_buffer[self._message_index:self._message_index + chunk_size]
+                chunk = self._message_buffer.slice(self._message_index, self._message_index + chunk_size)
                 self._output.write(chunk)
                 self._message_index += chunk_size
                 self._last_output_time = current_time
                 
                 # 输出完成，清空缓冲区
                 if self._message_index >= len(self._message_buffer):
-                    self._message_buffer = ""
+                    self._message_buffer.clear()
                     self._message_index = 0
                     
             if start_time is not None:
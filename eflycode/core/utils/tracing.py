@@ -0,0 +1,342 @@
+"""轻量的链路追踪
+
+记录一次 Agent 回合中各阶段的耗时：上下文管理、hook 子进程、advisor 链、
+首 token 延迟、流式响应和每个工具的执行。默认关闭，设置环境变量 EFLYCODE_TRACE=1
+或调用 Tracer.enable 开启。关闭时 trace_span 返回共享的空 span，几乎没有开销
+
+开启后输出到 .eflycode/traces 目录：
+- trace-<时间>-<pid>.json: Chrome trace event 格式，可以在 chrome://tracing 或 Perfetto 中打开
+- turns.jsonl: 每个回合一行的耗时汇总
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from eflycode.core.constants import EFLYCODE_DIR, TRACES_DIR
+from eflycode.core.utils.logger import logger
+
+# 追踪配置常量
+TRACE_ENV_VAR = "EFLYCODE_TRACE"
+TRACE_TURNS_FILE = "turns.jsonl"
+TRACE_DEFAULT_CATEGORY = "eflycode"
+TRACE_FLUSH_EVENTS = 1000  # 不在回合内的事件累积到该数量时写出
+
+# 当前回合 ID，span 开始时读取，用于按回合汇总
+_current_turn: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("eflycode_trace_turn", default=None)
+
+
+class Span:
+    """一次计时区间，可以作为上下文管理器使用，也可以手动调用 end"""
+
+    __slots__ = ("_tracer", "name", "category", "attrs", "start_ns", "thread_id", "turn_id", "_ended")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, attrs: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.start_ns = time.perf_counter_ns()
+        self.thread_id = threading.get_ident()
+        self.turn_id = _current_turn.get()
+        self._ended = False
+
+    def set(self, **attrs: Any) -> None:
+        """添加属性"""
+        self.attrs.update(attrs)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """结束计时并记录，重复调用只记录一次
+
+        Args:
+            error: 区间内发生的异常
+        """
+        if self._ended:
+            return
+        self._ended = True
+        if error is not None:
+            self.attrs["error"] = type(error).__name__
+        self._tracer._record(self, time.perf_counter_ns() - self.start_ns)
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end(exc)
+
+
+class _NoopSpan:
+    """追踪关闭时使用的空 span"""
+
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """链路追踪器，全局单例"""
+
+    _instance: Optional["Tracer"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        """初始化追踪器，根据环境变量 EFLYCODE_TRACE 决定是否开启"""
+        self.enabled: bool = False
+        self._directory: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._epoch_ns = time.perf_counter_ns()
+        self._pending_events: List[Dict[str, Any]] = []
+        self._trace_file: Optional[Path] = None
+        self._turns: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._atexit_registered = False
+
+        if os.getenv(TRACE_ENV_VAR, "").strip().lower() in {"1", "true", "yes", "y", "on"}:
+            self.enable()
+
+    @classmethod
+    def get_instance(cls) -> "Tracer":
+        """获取追踪器单例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def directory(self) -> Path:
+        """输出目录，默认为工作区下的 .eflycode/traces"""
+        if self._directory is not None:
+            return self._directory
+        from eflycode.core.config.config_manager import resolve_workspace_dir
+
+        return resolve_workspace_dir() / EFLYCODE_DIR / TRACES_DIR
+
+    @property
+    def trace_file(self) -> Optional[Path]:
+        """当前的 Chrome trace 文件，第一次写入之前为 None"""
+        return self._trace_file
+
+    def enable(self, directory: Optional[Path] = None) -> None:
+        """开启追踪
+
+        Args:
+            directory: 输出目录，为 None 时使用工作区下的 .eflycode/traces
+        """
+        with self._lock:
+            self._directory = Path(directory) if directory is not None else None
+            self._trace_file = None
+            self.enabled = True
+            if not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+        logger.info("链路追踪已开启")
+
+    def disable(self) -> None:
+        """关闭追踪，并写出尚未写出的事件"""
+        self.flush()
+        self.enabled = False
+
+    def span(self, name: str, category: str = TRACE_DEFAULT_CATEGORY, **attrs: Any) -> Span:
+        """开始一个 span
+
+        Args:
+            name: span 名称
+            category: 分类，对应 Chrome trace 中的 cat 字段
+            **attrs: 附加属性
+
+        Returns:
+            Span: 新的 span
+        """
+        return Span(self, name, category, attrs)
+
+    def add_span(self, name: str, start_ns: int, duration_ns: int, category: str = TRACE_DEFAULT_CATEGORY, **attrs: Any) -> None:
+        """记录一个已知开始时间和时长的 span，用于累计多段耗时的场景
+
+        Args:
+            name: span 名称
+            start_ns: 开始时间，time.perf_counter_ns 的值
+            duration_ns: 时长（纳秒）
+            category: 分类
+            **attrs: 附加属性
+        """
+        span = Span(self, name, category, attrs)
+        span.start_ns = start_ns
+        span._ended = True
+        self._record(span, duration_ns)
+
+    @contextmanager
+    def turn(self, **attrs: Any) -> Iterator[Optional[str]]:
+        """追踪一个回合，回合结束时写出汇总和 trace 事件
+
+        Args:
+            **attrs: 回合属性，例如 session_id
+
+        Yields:
+            Optional[str]: 回合 ID，追踪关闭时为 None
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        turn_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._turns[turn_id] = {}
+        token = _current_turn.set(turn_id)
+        started_at = datetime.now().isoformat()
+        span = self.span("agent.turn", **attrs)
+        error: Optional[BaseException] = None
+        try:
+            yield turn_id
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            span.end(error)
+            _current_turn.reset(token)
+            with self._lock:
+                summary = self._turns.pop(turn_id, {})
+            self._write_turn_summary(turn_id, started_at, span.attrs, summary)
+            self.flush()
+
+    def flush(self) -> None:
+        """将缓存的事件追加到 Chrome trace 文件
+
+        文件是一个不闭合的 JSON 数组，Chrome trace 格式允许省略结尾的 ]，因此可以只追加不重写
+        """
+        with self._lock:
+            events, self._pending_events = self._pending_events, []
+            if not events:
+                return
+            try:
+                if self._trace_file is None:
+                    directory = self.directory
+                    directory.mkdir(parents=True, exist_ok=True)
+                    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+                    self._trace_file = directory / f"trace-{timestamp}-{os.getpid()}.json"
+                    self._trace_file.write_text("[\n", encoding="utf-8")
+                with open(self._trace_file, "a", encoding="utf-8") as f:
+                    for event in events:
+                        f.write(json.dumps(event, ensure_ascii=False, default=str))
+                        f.write(",\n")
+            except OSError as e:
+                logger.warning(f"写入 trace 文件失败: {e}")
+
+    def _record(self, span: Span, duration_ns: int) -> None:
+        """记录结束的 span"""
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": (span.start_ns - self._epoch_ns) / 1000,
+            "dur": duration_ns / 1000,
+            "pid": os.getpid(),
+            "tid": span.thread_id,
+            "args": span.attrs,
+        }
+        with self._lock:
+            self._pending_events.append(event)
+            summary = self._turns.get(span.turn_id) if span.turn_id is not None else None
+            if summary is None:
+                should_flush = len(self._pending_events) >= TRACE_FLUSH_EVENTS
+            else:
+                should_flush = False
+                self._add_to_summary(summary, span.name, duration_ns)
+        if should_flush:
+            self.flush()
+
+    @staticmethod
+    def _add_to_summary(summary: Dict[str, Dict[str, float]], name: str, duration_ns: int) -> None:
+        """将 span 时长累计到回合汇总"""
+        duration_ms = duration_ns / 1_000_000
+        stats = summary.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+
+    def _write_turn_summary(
+        self, turn_id: str, started_at: str, attrs: Dict[str, Any], summary: Dict[str, Dict[str, float]]
+    ) -> None:
+        """追加一行回合汇总"""
+        turn_stats = summary.pop("agent.turn", {"total_ms": 0.0})
+        record = {
+            "turn_id": turn_id,
+            "started_at": started_at,
+            "duration_ms": round(turn_stats["total_ms"], 3),
+            **attrs,
+            "spans": {
+                name: {
+                    "count": stats["count"],
+                    "total_ms": round(stats["total_ms"], 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                }
+                for name, stats in sorted(summary.items(), key=lambda item: -item[1]["total_ms"])
+            },
+        }
+        try:
+            directory = self.directory
+            directory.mkdir(parents=True, exist_ok=True)
+            with open(directory / TRACE_TURNS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"写入回合汇总失败: {e}")
+
+
+def trace_span(name: str, category: str = TRACE_DEFAULT_CATEGORY, **attrs: Any):
+    """开始一个 span，追踪关闭时返回空 span
+
+    Args:
+        name: span 名称
+        category: 分类
+        **attrs: 附加属性
+
+    Returns:
+        Span: 可以作为上下文管理器使用的 span
+    """
+    tracer = Tracer.get_instance()
+    if not tracer.enabled:
+        return _NOOP_SPAN
+    return tracer.span(name, category, **attrs)
+
+
+def traced(name: str, category: str = TRACE_DEFAULT_CATEGORY) -> Callable:
+    """用 span 包裹函数调用的装饰器，追踪关闭时直接调用原函数
+
+    Args:
+        name: span 名称
+        category: 分类
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = Tracer.get_instance()
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,179 @@
+"""CLI batch 命令测试"""
+
+import io
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest.mock import patch
+
+from eflycode.cli.commands.batch import BatchTask, load_tasks, run_batch, run_task
+from eflycode.core.agent.base import BaseAgent
+from eflycode.core.event.event_bus import get_global_event_bus
+from eflycode.core.llm.protocol import ChatCompletion, Message, ToolCall, ToolCallFunction, Usage
+from tests.core.agent.test_run_loop import MockStreamProvider, MockTool
+
+
+def _completion(content=None, tool_calls=None):
+    return ChatCompletion(
+        id="chatcmpl-1",
+        object="chat.completion",
+        created=1234567890,
+        model="gpt-4",
+        message=Message(role="assistant", content=content, tool_calls=tool_calls),
+        usage=Usage(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+    )
+
+
+class TestLoadTasks(unittest.TestCase):
+    """任务文件解析测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.tasks_file = self.temp_dir / "tasks.jsonl"
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_load_tasks(self):
+        """测试解析任务，空行被忽略，缺省 id 使用行号"""
+        self.tasks_file.write_text(
+            '{"id": "a", "prompt": "first"}\n\n{"prompt": "second"}\n',
+            encoding="utf-8",
+        )
+
+        tasks = load_tasks(self.tasks_file)
+
+        self.assertEqual([(t.index, t.id, t.prompt) for t in tasks], [(0, "a", "first"), (1, "3", "second")])
+
+    def test_load_tasks_invalid_json(self):
+        """测试非法 JSON 报告行号"""
+        self.tasks_file.write_text('{"prompt": "ok"}\nnot json\n', encoding="utf-8")
+
+        with self.assertRaises(ValueError) as context:
+            load_tasks(self.tasks_file)
+        self.assertIn("第 2 行", str(context.exception))
+
+    def test_load_tasks_missing_prompt(self):
+        """测试缺少 prompt 字段"""
+        self.tasks_file.write_text('{"id": "x"}\n', encoding="utf-8")
+
+        with self.assertRaises(ValueError):
+            load_tasks(self.tasks_file)
+
+
+class TestRunBatch(unittest.TestCase):
+    """批量执行测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.agents = []
+        self.lock = threading.Lock()
+
+    def _agent_factory(self, responses_by_prompt):
+        """按 prompt 返回预设响应的 Agent 工厂"""
+
+        def factory():
+            provider = MockStreamProvider()
+
+            def mock_call(request):
+                prompt = next(m.content for m in request.messages if m.role == "user")
+                responses = provider._responses
+                if not responses:
+                    responses.extend(responses_by_prompt[prompt])
+                return responses.pop(0)
+
+            provider.call = mock_call
+            agent = BaseAgent(provider=provider, model="gpt-4", tools=[MockTool()])
+            with self.lock:
+                self.agents.append(agent)
+            return agent
+
+        return factory
+
+    def test_run_task_collects_statistics(self):
+        """测试单个任务的结果和统计信息"""
+        tool_call = ToolCall(id="call_1", function=ToolCallFunction(name="mock_tool", arguments="{}"))
+        factory = self._agent_factory(
+            {"do it": [_completion(tool_calls=[tool_call]), _completion(content="Done")]}
+        )
+
+        result = run_task(BatchTask(index=0, id="t1", prompt="do it"), agent_factory=factory)
+
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(result["content"], "Done")
+        self.assertEqual(result["session_id"], self.agents[0].session.id)
+        statistics = result["statistics"]
+        self.assertEqual(statistics["iterations"], 2)
+        self.assertEqual(statistics["tool_calls_count"], 1)
+        self.assertEqual(statistics["total_tokens"], 30)
+        self.assertGreaterEqual(statistics["wall_time"], 0)
+
+    def test_run_task_reports_error(self):
+        """测试创建 Agent 失败时返回错误结果"""
+
+        def failing_factory():
+            raise RuntimeError("boom")
+
+        result = run_task(BatchTask(index=0, id="t1", prompt="x"), agent_factory=failing_factory)
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("boom", result["error"])
+        self.assertIn("statistics", result)
+
+    def test_run_batch_isolated_sessions(self):
+        """测试每个任务使用独立的 Session，结果逐行输出"""
+        prompts = [f"task {i}" for i in range(5)]
+        factory = self._agent_factory({prompt: [_completion(content=f"answer {prompt}")] for prompt in prompts})
+        tasks = [BatchTask(index=i, id=str(i), prompt=prompt) for i, prompt in enumerate(prompts)]
+        output = io.StringIO()
+
+        succeeded, failed = run_batch(tasks, output, workers=3, agent_factory=factory)
+
+        self.assertEqual((succeeded, failed), (5, 0))
+        results = sorted((json.loads(line) for line in output.getvalue().splitlines()), key=lambda r: r["index"])
+        self.assertEqual([r["content"] for r in results], [f"answer {p}" for p in prompts])
+        self.assertEqual(len({r["session_id"] for r in results}), 5)
+        for agent in self.agents:
+            user_messages = [m for m in agent.session.get_messages() if m.role == "user"]
+            self.assertEqual(len(user_messages), 1)
+
+    def test_run_batch_unsubscribes_agents(self):
+        """测试任务结束后 Agent 不再订阅全局事件总线"""
+        factory = self._agent_factory({"task": [_completion(content="answer")]})
+        tasks = [BatchTask(index=i, id=str(i), prompt="task") for i in range(3)]
+
+        run_batch(tasks, io.StringIO(), workers=2, agent_factory=factory)
+
+        handlers = get_global_event_bus()._handlers.get("app.config.llm.changed", [])
+        subscribed = {getattr(info.handler, "__self__", None) for info in handlers}
+        for agent in self.agents:
+            self.assertNotIn(agent, subscribed)
+
+    def test_run_batch_executor_error(self):
+        """测试 worker 异常时写入错误结果并继续执行其他任务"""
+        tasks = [BatchTask(index=i, id=str(i), prompt=f"task {i}") for i in range(3)]
+
+        def flaky_run_task(task, agent_factory=None):
+            if task.id == "1":
+                raise BrokenProcessPool("worker died")
+            return {"index": task.index, "id": task.id, "status": "ok", "content": "done"}
+
+        output = io.StringIO()
+        with patch("eflycode.cli.commands.batch.run_task", side_effect=flaky_run_task):
+            succeeded, failed = run_batch(tasks, output, workers=2)
+
+        self.assertEqual((succeeded, failed), (2, 1))
+        results = {r["id"]: r for r in (json.loads(line) for line in output.getvalue().splitlines())}
+        self.assertEqual(results["1"]["status"], "error")
+        self.assertIn("worker died", results["1"]["error"])
+        self.assertIn("statistics", results["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""create_agent 测试用例"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from eflycode.cli.main import create_agent
+from eflycode.core.config.models import Config, ConfigMeta, SkillsSection
+from eflycode.core.context.budget import PROMPT_COMPONENT_SKILLS
+from eflycode.core.llm.protocol import Message
+from eflycode.core.skills import SkillsManager
+from eflycode.core.skills.skills_advisor import SkillsAdvisor
+
+
+class TestCreateAgentSkills(unittest.TestCase):
+    """create_agent 创建的 SkillsAdvisor 测试类"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.user_config_dir = self.test_dir / "user" / ".eflycode"
+        self.workspace_dir = self.test_dir / "project"
+        self.workspace_dir.mkdir(parents=True)
+        skill_dir = self.user_config_dir / "skills"
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "review-helper.md").write_text(
+            "---\ndescription: 代码审查助手\n---\n\n# Review\n", encoding="utf-8"
+        )
+        SkillsManager.reset_instance()
+        self.config = Config(
+            meta=ConfigMeta(workspace_dir=self.workspace_dir, source="default"),
+            skills=SkillsSection(enabled=True),
+        )
+
+    def tearDown(self):
+        """清理测试环境"""
+        SkillsManager.reset_instance()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_skills_block_recorded_in_session(self):
+        """测试 create_agent 创建的 Agent 在构建请求之前记录技能列表"""
+        with patch("eflycode.cli.main.get_user_config_dir", return_value=self.user_config_dir), patch(
+            "eflycode.cli.main.load_mcp_config", return_value=[]
+        ), patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"}):
+            agent = create_agent(self.config)
+        self.addCleanup(agent.shutdown)
+
+        advisor = next(a for a in agent.get_advisors() if isinstance(a, SkillsAdvisor))
+
+        # 构建上下文之前已经记录了技能列表，计入第一次请求的 token 预算
+        recorded = {}
+        original_get_context = agent.session.get_context
+
+        def get_context(*args, **kwargs):
+            recorded.update(agent.session._prompt_components)
+            return original_get_context(*args, **kwargs)
+
+        with patch.object(agent.session, "get_context", side_effect=get_context):
+            request = agent._prepare_request("你好", stream=False)
+
+        self.assertIn("review-helper", recorded[PROMPT_COMPONENT_SKILLS])
+
+        request.messages.insert(0, Message(role="system", content="系统提示词"))
+        request = advisor.before_call(request)
+        # 记录的内容恰好是追加到系统提示词末尾的部分
+        self.assertEqual(request.messages[0].content, "系统提示词" + recorded[PROMPT_COMPONENT_SKILLS])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -182,6 +182,38 @@ class TestSession(unittest.TestCase):
         self.assertEqual(context.model, "gpt-4")
         self.assertEqual(len(context.messages), 2)
 
+    def test_get_messages_snapshot(self):
+        """get_messages 返回不复制列表的只读快照"""
+        self.session.add_message("user", "Hello")
+        snapshot = self.session.get_messages()
+        self.assertIs(self.session.get_messages(), snapshot)
+
+        self.session.add_message("assistant", "Hi")
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual([msg.content for msg in snapshot], ["Hello"])
+        with self.assertRaises(IndexError):
+            snapshot[1]
+
+        messages = self.session.get_messages()
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[-1].content, "Hi")
+        self.assertEqual([msg.content for msg in reversed(messages)], ["Hi", "Hello"])
+        self.assertEqual(messages[-1:], [messages[1]])
+        self.assertEqual(messages, list(messages))
+        with self.assertRaises(TypeError):
+            messages[0] = Message(role="user", content="changed")
+
+    def test_snapshot_survives_clear(self):
+        """清空会话不影响已返回的快照"""
+        self.session.add_message("user", "Hello")
+        snapshot = self.session.get_messages()
+
+        self.session.clear()
+        self.session.add_message("user", "New")
+
+        self.assertEqual([msg.content for msg in snapshot], ["Hello"])
+        self.assertEqual([msg.content for msg in self.session.get_messages()], ["New"])
+
 
 class TestBaseAgent(unittest.TestCase):
     """BaseAgent 测试类"""
@@ -225,6 +257,30 @@ class TestBaseAgent(unittest.TestCase):
         self.assertIsNotNone(agent.get_tool("tool2"))
         agent.shutdown()
 
+    def test_get_available_tools_selects_non_core_tools(self):
+        """测试非核心工具较多时按相关性选择，核心工具始终保留"""
+
+        class ExternalTool(MockTool):
+            @property
+            def core(self) -> bool:
+                return False
+
+            @property
+            def description(self) -> str:
+                return f"External {self.name.replace('_', ' ')}"
+
+        external = [ExternalTool(f"service_{topic}") for topic in ("weather", "calendar", "email", "music")]
+        agent = BaseAgent(provider=self.provider, tools=[MockTool("tool1")] + external, model="gpt-4")
+        agent.tool_selector.top_k = 1
+        agent.session.add_message("user", "check the weather")
+
+        names = [tool.function.name for tool in agent.get_available_tools()]
+        self.assertEqual(names, ["tool1", "service_weather"])
+
+        agent.tool_selector = None
+        self.assertEqual(len(agent.get_available_tools()), 5)
+        agent.shutdown()
+
     def test_chat(self):
         """测试聊天功能"""
         conversation = self.agent.chat("Hello")
@@ -0,0 +1,330 @@
+"""AsyncBaseAgent 和 AsyncAgentRunLoop 测试用例"""
+
+import asyncio
+import threading
+import time
+
+from eflycode.core.agent.async_base import AsyncBaseAgent
+from eflycode.core.agent.async_run_loop import AsyncAgentRunLoop
+from eflycode.core.agent.base import TaskConversation
+from eflycode.core.llm.advisor import Advisor, AdvisorChain
+from eflycode.core.llm.protocol import (
+    ChatCompletion,
+    ChatCompletionChunk,
+    DeltaMessage,
+    LLMRequest,
+    Message,
+    ToolCall,
+    ToolCallFunction,
+    Usage,
+)
+from eflycode.core.tool.result_cache import TOOL_RESULT_CACHED_MARK
+from tests.core.agent.test_run_loop import MockStreamProvider, MockTool, SlowTool
+from tests.utils.async_test_case import AsyncTestCase
+
+
+class _AsyncTool(MockTool):
+    """重写了 arun 的原生异步工具"""
+
+    def __init__(self, name: str = "async_tool", delay: float = 0.0):
+        super().__init__(name=name, result=f"{name}_result")
+        self.delay = delay
+        self.threads = []
+        self.cancelled = False
+
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def cacheable(self) -> bool:
+        return True
+
+    async def arun(self, *args, **kwargs) -> str:
+        self.threads.append(threading.current_thread())
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self._result
+
+
+class _CrashingTool(MockTool):
+    """抛出意外异常的只读工具"""
+
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    def run(self, *args, **kwargs) -> str:
+        raise RuntimeError("crash")
+
+
+def _tool_call_completion(tool_names):
+    """构造包含多个工具调用的响应"""
+    return ChatCompletion(
+        id="chatcmpl-tools",
+        object="chat.completion",
+        created=1234567890,
+        model="gpt-4",
+        message=Message(
+            role="assistant",
+            content=None,
+            tool_calls=[
+                ToolCall(id=f"call_{i}", function=ToolCallFunction(name=name, arguments="{}"))
+                for i, name in enumerate(tool_names)
+            ],
+        ),
+        usage=Usage(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+    )
+
+
+def _text_completion(content):
+    """构造纯文本响应"""
+    return ChatCompletion(
+        id="chatcmpl-text",
+        object="chat.completion",
+        created=1234567890,
+        model="gpt-4",
+        message=Message(role="assistant", content=content),
+        usage=Usage(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+    )
+
+
+class TestAsyncBaseAgent(AsyncTestCase):
+    """AsyncBaseAgent 测试"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.provider = MockStreamProvider()
+        self.agent = AsyncBaseAgent(provider=self.provider, model="gpt-4", tools=[MockTool(result="tool_ok")])
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.agent.shutdown()
+
+    @AsyncTestCase.async_test
+    async def test_achat(self):
+        """测试异步聊天"""
+        self.provider._responses = [_text_completion("Hello")]
+
+        conversation = await self.agent.achat("Hi")
+
+        self.assertEqual(conversation.content, "Hello")
+        messages = self.agent.session.get_messages()
+        self.assertEqual([msg.role for msg in messages], ["user", "assistant"])
+
+    @AsyncTestCase.async_test
+    async def test_astream(self):
+        """测试异步流式聊天"""
+        self.provider._responses = [_text_completion("Hey")]
+
+        chunks = [chunk async for chunk in self.agent.astream("Hi")]
+
+        self.assertEqual(len(chunks), 3)
+        messages = self.agent.session.get_messages()
+        self.assertEqual(messages[-1].role, "assistant")
+        self.assertEqual(messages[-1].content, "Hey")
+
+    @AsyncTestCase.async_test
+    async def test_arun_tool(self):
+        """测试异步执行工具"""
+        result = await self.agent.arun_tool("mock_tool", tool_call_id="call_1")
+        self.assertEqual(result, "tool_ok")
+
+    @AsyncTestCase.async_test
+    async def test_arun_tool_native_async_tool_runs_on_loop(self):
+        """测试原生异步工具在事件循环中执行"""
+        tool = _AsyncTool()
+        self.agent.add_tool(tool)
+
+        result = await self.agent.arun_tool("async_tool", tool_call_id="call_1")
+
+        self.assertEqual(result, "async_tool_result")
+        self.assertEqual(tool.threads, [threading.current_thread()])
+
+    @AsyncTestCase.async_test
+    async def test_arun_tool_uses_result_cache(self):
+        """测试异步执行工具与 run_tool 共用结果缓存"""
+        tool = _AsyncTool()
+        self.agent.add_tool(tool)
+        self.agent.run_tool("async_tool", tool_call_id="call_1")
+
+        result = await self.agent.arun_tool("async_tool", tool_call_id="call_2")
+
+        self.assertEqual(result, TOOL_RESULT_CACHED_MARK + "async_tool_result")
+        self.assertEqual(tool.threads, [])
+
+
+class TestAsyncAgentRunLoop(AsyncTestCase):
+    """AsyncAgentRunLoop 测试"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.provider = MockStreamProvider()
+        self.agent = AsyncBaseAgent(provider=self.provider, model="gpt-4")
+        self.tracker = {"lock": threading.Lock(), "running": 0, "max_running": 0, "order": []}
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.agent.shutdown()
+
+    @AsyncTestCase.async_test
+    async def test_arun_without_tools(self):
+        """测试没有工具调用时直接完成"""
+        self.provider._responses = [_text_completion("Done")]
+        run_loop = AsyncAgentRunLoop(self.agent)
+
+        result = await run_loop.arun("Hi", stream=False)
+
+        self.assertIsInstance(result, TaskConversation)
+        self.assertEqual(result.content, "Done")
+        self.assertEqual(result.statistics.iterations, 1)
+        self.assertEqual(result.statistics.total_tokens, 15)
+
+    @AsyncTestCase.async_test
+    async def test_arun_streaming(self):
+        """测试流式模式运行"""
+        self.provider._responses = [_text_completion("Done")]
+        run_loop = AsyncAgentRunLoop(self.agent)
+
+        result = await run_loop.arun("Hi", stream=True)
+
+        self.assertEqual(result.content, "Done")
+        self.assertEqual(self.provider._stream_count, 1)
+
+    @AsyncTestCase.async_test
+    async def test_read_tools_run_concurrently_in_order(self):
+        """测试只读工具并发执行，结果按原始顺序添加"""
+        for name in ["read_a", "read_b", "read_c"]:
+            self.agent.add_tool(SlowTool(name, "read", self.tracker, delay=0.1))
+        self.provider._responses = [_tool_call_completion(["read_a", "read_b", "read_c"]), _text_completion("Done")]
+        run_loop = AsyncAgentRunLoop(self.agent)
+
+        result = await run_loop.arun("Read files", stream=False)
+
+        self.assertEqual(result.content, "Done")
+        self.assertEqual(result.statistics.tool_calls_count, 3)
+        self.assertGreater(self.tracker["max_running"], 1)
+        tool_messages = [msg for msg in self.agent.session.get_messages() if msg.role == "tool"]
+        self.assertEqual([msg.tool_call_id for msg in tool_messages], ["call_0", "call_1", "call_2"])
+        self.assertEqual([msg.content for msg in tool_messages], ["read_a_result", "read_b_result", "read_c_result"])
+
+    @AsyncTestCase.async_test
+    async def test_edit_tool_is_barrier(self):
+        """测试有副作用的工具作为屏障串行执行"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker))
+        self.agent.add_tool(SlowTool("edit_b", "edit", self.tracker))
+        self.agent.add_tool(SlowTool("read_c", "read", self.tracker))
+        self.provider._responses = [_tool_call_completion(["read_a", "edit_b", "read_c"]), _text_completion("Done")]
+        run_loop = AsyncAgentRunLoop(self.agent)
+
+        await run_loop.arun("Edit", stream=False)
+
+        self.assertEqual(self.tracker["max_running"], 1)
+        self.assertEqual(
+            self.tracker["order"],
+            ["start:read_a", "end:read_a", "start:edit_b", "end:edit_b", "start:read_c", "end:read_c"],
+        )
+
+    @AsyncTestCase.async_test
+    async def test_max_parallel_tools_bound(self):
+        """测试并发数不超过 max_parallel_tools"""
+        names = [f"read_{i}" for i in range(4)]
+        for name in names:
+            self.agent.add_tool(SlowTool(name, "read", self.tracker))
+        self.provider._responses = [_tool_call_completion(names), _text_completion("Done")]
+        run_loop = AsyncAgentRunLoop(self.agent, max_parallel_tools=2)
+
+        await run_loop.arun("Read", stream=False)
+
+        self.assertLessEqual(self.tracker["max_running"], 2)
+
+    @AsyncTestCase.async_test
+    async def test_failed_tool_cancels_batch(self):
+        """测试同一批次中某个调用抛出异常时取消其他的调用"""
+        slow_tool = _AsyncTool("slow_read", delay=5)
+        self.agent.add_tool(slow_tool)
+        self.agent.add_tool(_CrashingTool("crash_read"))
+        run_loop = AsyncAgentRunLoop(self.agent)
+        tool_calls = [
+            {"name": "slow_read", "arguments": {}, "id": "call_0"},
+            {"name": "crash_read", "arguments": {}, "id": "call_1"},
+        ]
+
+        started = time.monotonic()
+        with self.assertRaises(RuntimeError):
+            await run_loop._aexecute_tool_calls(tool_calls)
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertTrue(slow_tool.cancelled)
+
+    @AsyncTestCase.async_test
+    async def test_multiple_tasks_on_one_event_loop(self):
+        """测试同一个事件循环中并发运行多个任务"""
+        other_provider = MockStreamProvider(responses=[_text_completion("Second")])
+        other_agent = AsyncBaseAgent(provider=other_provider, model="gpt-4")
+        self.provider._responses = [_text_completion("First")]
+        try:
+            results = await asyncio.gather(
+                AsyncAgentRunLoop(self.agent).arun("one"),
+                AsyncAgentRunLoop(other_agent).arun("two"),
+            )
+        finally:
+            other_agent.shutdown()
+
+        self.assertEqual([result.content for result in results], ["First", "Second"])
+
+
+class _RecordingAdvisor(Advisor):
+    """记录钩子调用的 Advisor"""
+
+    def __init__(self):
+        self.calls = []
+
+    def before_stream(self, request):
+        self.calls.append("before_stream")
+        return request
+
+    def after_stream(self, request, response):
+        self.calls.append("after_stream")
+        return response
+
+
+class TestAdvisorChainAsync(AsyncTestCase):
+    """AdvisorChain 异步接口测试"""
+
+    @AsyncTestCase.async_test
+    async def test_acall(self):
+        """测试异步调用执行 before/after 钩子"""
+        chain = AdvisorChain([])
+
+        async def api_call(request):
+            return _text_completion("ok")
+
+        request = LLMRequest(model="gpt-4", messages=[Message(role="user", content="Hi")])
+        response = await chain.acall(request, api_call)
+        self.assertEqual(response.message.content, "ok")
+
+    @AsyncTestCase.async_test
+    async def test_astream(self):
+        """测试异步流式调用对每个 chunk 执行 after_stream"""
+        advisor = _RecordingAdvisor()
+        chain = AdvisorChain([advisor])
+
+        async def api_stream(request):
+            for content in ["a", "b"]:
+                yield ChatCompletionChunk(
+                    id="chatcmpl-1",
+                    object="chat.completion.chunk",
+                    created=1234567890,
+                    model="gpt-4",
+                    delta=DeltaMessage(content=content),
+                )
+
+        request = LLMRequest(model="gpt-4", messages=[Message(role="user", content="Hi")])
+        chunks = [chunk async for chunk in chain.astream(request, api_stream)]
+
+        self.assertEqual([chunk.delta.content for chunk in chunks], ["a", "b"])
+        self.assertEqual(advisor.calls, ["before_stream", "after_stream", "after_stream"])
@@ -1,9 +1,12 @@
 """AgentRunLoop 测试用例"""
 
+import threading
+import time
 import unittest
+from unittest.mock import MagicMock, patch
 
 from eflycode.core.agent.base import BaseAgent, TaskConversation
-from eflycode.core.agent.run_loop import AgentRunLoop
+from eflycode.core.agent.run_loop import AgentRunLoop, _SpeculativeToolCalls
 from eflycode.core.llm.protocol import (
     ChatCompletion,
     ChatCompletionChunk,
@@ -17,6 +20,7 @@ from eflycode.core.llm.protocol import (
     DeltaToolCallFunction,
 )
 from eflycode.core.llm.providers.base import LLMProvider, ProviderCapabilities
+from eflycode.core.llm.stream_accumulator import StreamAccumulator
 from eflycode.core.tool.base import BaseTool
 
 
@@ -551,6 +555,373 @@ class TestAgentRunLoopDetailed(unittest.TestCase):
         self.assertEqual(result.statistics.total_tokens, 15)
 
 
+class SlowTool(BaseTool):
+    """记录并发度的慢速工具"""
+
+    def __init__(self, name: str, permission: str, tracker: dict, delay: float = 0.05, speculative: bool = True):
+        self._name = name
+        self._permission = permission
+        self._speculative = speculative
+        self._tracker = tracker
+        self._delay = delay
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def type(self) -> str:
+        return "function"
+
+    @property
+    def permission(self) -> str:
+        return self._permission
+
+    @property
+    def concurrency_safe(self) -> bool:
+        return self._permission == "read"
+
+    @property
+    def speculative_safe(self) -> bool:
+        return self._speculative and self._permission == "read"
+
+    @property
+    def description(self) -> str:
+        return "Slow tool for testing"
+
+    @property
+    def parameters(self):
+        return ToolFunctionParameters(properties={})
+
+    def do_run(self, **kwargs) -> str:
+        with self._tracker["lock"]:
+            self._tracker["running"] += 1
+            self._tracker["max_running"] = max(self._tracker["max_running"], self._tracker["running"])
+            self._tracker["order"].append(f"start:{self._name}")
+        time.sleep(self._delay)
+        with self._tracker["lock"]:
+            self._tracker["running"] -= 1
+            self._tracker["order"].append(f"end:{self._name}")
+        return f"{self._name}_result"
+
+
+class TestAgentRunLoopParallelTools(unittest.TestCase):
+    """AgentRunLoop 并发执行只读工具测试"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.provider = MockStreamProvider()
+        self.agent = BaseAgent(provider=self.provider, model="gpt-4")
+        self.tracker = {"lock": threading.Lock(), "running": 0, "max_running": 0, "order": []}
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.agent.shutdown()
+
+    def _set_tool_call_responses(self, tool_names):
+        """第一次响应返回多个工具调用，第二次返回最终结果"""
+        call_count = [0]
+
+        def mock_call(request):
+            call_count[0] += 1
+            if call_count[0] == 1:
+                return ChatCompletion(
+                    id="chatcmpl-1",
+                    object="chat.completion",
+                    created=1234567890,
+                    model="gpt-4",
+                    message=Message(
+                        role="assistant",
+                        content=None,
+                        tool_calls=[
+                            ToolCall(id=f"call_{i}", function=ToolCallFunction(name=name, arguments="{}"))
+                            for i, name in enumerate(tool_names)
+                        ],
+                    ),
+                )
+            return ChatCompletion(
+                id="chatcmpl-2",
+                object="chat.completion",
+                created=1234567890,
+                model="gpt-4",
+                message=Message(role="assistant", content="Done"),
+            )
+
+        self.provider.call = mock_call
+
+    def _tool_messages(self):
+        return [msg for msg in self.agent.session.get_messages() if msg.role == "tool"]
+
+    def test_read_tools_run_concurrently_and_keep_order(self):
+        """测试只读工具并发执行，工具消息保持原始顺序"""
+        for name in ["read_a", "read_b", "read_c"]:
+            self.agent.add_tool(SlowTool(name, "read", self.tracker, delay=0.1))
+        self._set_tool_call_responses(["read_c", "read_a", "read_b"])
+
+        result = AgentRunLoop(self.agent).run("Read files", stream=False)
+
+        self.assertEqual(result.content, "Done")
+        self.assertEqual(self.tracker["max_running"], 3)
+        tool_messages = self._tool_messages()
+        self.assertEqual([msg.tool_call_id for msg in tool_messages], ["call_0", "call_1", "call_2"])
+        self.assertEqual(
+            [msg.content for msg in tool_messages],
+            ["read_c_result", "read_a_result", "read_b_result"],
+        )
+
+    def test_edit_tools_act_as_barrier(self):
+        """测试有副作用的工具串行执行，并将前后的只读工具分隔为不同批次"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker))
+        self.agent.add_tool(SlowTool("read_b", "read", self.tracker))
+        self.agent.add_tool(SlowTool("write_a", "edit", self.tracker))
+        self.agent.add_tool(SlowTool("read_c", "read", self.tracker))
+        self._set_tool_call_responses(["read_a", "read_b", "write_a", "read_c"])
+
+        AgentRunLoop(self.agent).run("Edit files", stream=False)
+
+        order = self.tracker["order"]
+        write_start = order.index("start:write_a")
+        write_end = order.index("end:write_a")
+        self.assertGreater(write_start, order.index("end:read_a"))
+        self.assertGreater(write_start, order.index("end:read_b"))
+        self.assertLess(write_end, order.index("start:read_c"))
+        self.assertEqual(
+            [msg.tool_call_id for msg in self._tool_messages()],
+            ["call_0", "call_1", "call_2", "call_3"],
+        )
+
+    def test_parallel_disabled_runs_sequentially(self):
+        """测试关闭并发模式后顺序执行"""
+        for name in ["read_a", "read_b"]:
+            self.agent.add_tool(SlowTool(name, "read", self.tracker))
+        self._set_tool_call_responses(["read_a", "read_b"])
+
+        AgentRunLoop(self.agent, parallel_tool_calls=False).run("Read files", stream=False)
+
+        self.assertEqual(self.tracker["max_running"], 1)
+
+    def test_max_parallel_tools_bounds_concurrency(self):
+        """测试线程池大小限制并发度"""
+        names = [f"read_{i}" for i in range(4)]
+        for name in names:
+            self.agent.add_tool(SlowTool(name, "read", self.tracker))
+        self._set_tool_call_responses(names)
+
+        AgentRunLoop(self.agent, max_parallel_tools=2).run("Read files", stream=False)
+
+        self.assertEqual(self.tracker["max_running"], 2)
+        self.assertEqual(len(self._tool_messages()), 4)
+
+
+def _tool_call_chunk(index, tool_call_id=None, name=None, arguments=None, finish_reason=None):
+    """构造只包含工具调用增量的 chunk"""
+    return ChatCompletionChunk(
+        id="chatcmpl-1",
+        object="chat.completion.chunk",
+        created=1234567890,
+        model="gpt-4",
+        delta=DeltaMessage(
+            tool_calls=[
+                DeltaToolCall(
+                    index=index,
+                    id=tool_call_id,
+                    type="function" if tool_call_id else None,
+                    function=DeltaToolCallFunction(name=name, arguments=arguments),
+                )
+            ]
+        ),
+        finish_reason=finish_reason,
+    )
+
+
+class TestAgentRunLoopSpeculativeTools(unittest.TestCase):
+    """AgentRunLoop 流式过程中提前执行只读工具测试"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.provider = MockStreamProvider()
+        self.agent = BaseAgent(provider=self.provider, model="gpt-4")
+        self.tracker = {"lock": threading.Lock(), "running": 0, "max_running": 0, "order": []}
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.agent.shutdown()
+
+    def _set_stream(self, first_turn):
+        """第一轮返回给定的 chunk 序列（可包含 callable 作为流中的动作），第二轮返回最终结果"""
+        stream_count = [0]
+
+        def mock_stream(request):
+            stream_count[0] += 1
+            if stream_count[0] == 1:
+                for item in first_turn:
+                    if callable(item):
+                        item()
+                    else:
+                        yield item
+                return
+            yield ChatCompletionChunk(
+                id="chatcmpl-2",
+                object="chat.completion.chunk",
+                created=1234567890,
+                model="gpt-4",
+                delta=DeltaMessage(content="Done"),
+                finish_reason="stop",
+            )
+
+        self.provider.stream = mock_stream
+
+    def test_read_tool_starts_before_stream_ends(self):
+        """测试参数完整后只读工具在流结束前开始执行，且只执行一次"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker))
+        self._set_stream([
+            _tool_call_chunk(0, "call_0", "read_a", '{"path":'),
+            _tool_call_chunk(0, arguments=' "a.py"}'),
+            lambda: time.sleep(0.2),
+            lambda: self.tracker["order"].append("stream_end"),
+            _tool_call_chunk(0, finish_reason="tool_calls"),
+        ])
+
+        result = AgentRunLoop(self.agent, speculative_tool_calls=True).run("Read", stream=True)
+
+        order = self.tracker["order"]
+        self.assertEqual(result.content, "Done")
+        self.assertLess(order.index("end:read_a"), order.index("stream_end"))
+        self.assertEqual(order.count("start:read_a"), 1)
+        tool_messages = [msg for msg in self.agent.session.get_messages() if msg.role == "tool"]
+        self.assertEqual([msg.content for msg in tool_messages], ["read_a_result"])
+
+    def test_disabled_by_default(self):
+        """测试默认不提前执行工具"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker))
+        self._set_stream([
+            _tool_call_chunk(0, "call_0", "read_a", "{}"),
+            lambda: self.tracker["order"].append("stream_end"),
+            _tool_call_chunk(0, finish_reason="tool_calls"),
+        ])
+
+        AgentRunLoop(self.agent).run("Read", stream=True)
+
+        order = self.tracker["order"]
+        self.assertLess(order.index("stream_end"), order.index("start:read_a"))
+
+    def test_reads_after_edit_are_not_speculated(self):
+        """测试有副作用的工具调用之后的只读调用不会被提前执行"""
+        self.agent.add_tool(SlowTool("write_a", "edit", self.tracker))
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker))
+        self._set_stream([
+            _tool_call_chunk(0, "call_0", "write_a", "{}"),
+            _tool_call_chunk(1, "call_1", "read_a", "{}"),
+            lambda: self.tracker["order"].append("stream_end"),
+            _tool_call_chunk(1, finish_reason="tool_calls"),
+        ])
+
+        AgentRunLoop(self.agent, speculative_tool_calls=True).run("Edit", stream=True)
+
+        order = self.tracker["order"]
+        self.assertLess(order.index("stream_end"), order.index("start:write_a"))
+        self.assertLess(order.index("end:write_a"), order.index("start:read_a"))
+
+    def test_only_speculative_safe_tools_are_prefetched(self):
+        """测试可并发但未声明 speculative_safe 的工具不提前执行"""
+        self.agent.add_tool(SlowTool("mcp_read", "read", self.tracker, speculative=False))
+        self._set_stream([
+            _tool_call_chunk(0, "call_0", "mcp_read", "{}"),
+            lambda: time.sleep(0.2),
+            lambda: self.tracker["order"].append("stream_end"),
+            _tool_call_chunk(0, finish_reason="tool_calls"),
+        ])
+
+        AgentRunLoop(self.agent, speculative_tool_calls=True).run("Read", stream=True)
+
+        order = self.tracker["order"]
+        self.assertLess(order.index("stream_end"), order.index("start:mcp_read"))
+
+    def test_no_prefetch_without_parallel_tool_calls(self):
+        """测试关闭并发执行时不提前执行工具"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker))
+        self._set_stream([
+            _tool_call_chunk(0, "call_0", "read_a", "{}"),
+            lambda: time.sleep(0.2),
+            lambda: self.tracker["order"].append("stream_end"),
+            _tool_call_chunk(0, finish_reason="tool_calls"),
+        ])
+
+        AgentRunLoop(self.agent, parallel_tool_calls=False, speculative_tool_calls=True).run("Read", stream=True)
+
+        order = self.tracker["order"]
+        self.assertLess(order.index("stream_end"), order.index("start:read_a"))
+
+    def test_changed_arguments_discard_result(self):
+        """测试参数在提前执行后发生变化时不复用结果"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker, delay=0))
+        run_loop = AgentRunLoop(self.agent)
+        speculative = _SpeculativeToolCalls(run_loop)
+        accumulator = StreamAccumulator()
+        accumulator.subscribe(speculative.feed)
+        try:
+            accumulator.feed(_tool_call_chunk(0, "call_0", "read_a", '{"n": 1}'))
+            accumulator.feed(_tool_call_chunk(0, arguments="2}"))
+
+            self.assertIsNone(speculative.take({"name": "read_a", "arguments": {"n": 1}, "id": "call_0"}))
+        finally:
+            speculative.discard()
+            run_loop._shutdown_tool_executor()
+
+    def _track_tool_hooks(self):
+        """记录 BeforeTool/AfterTool hook 的触发顺序"""
+        before = MagicMock(side_effect=lambda tool_name, kwargs: self.tracker["order"].append(f"before:{tool_name}"))
+        after = MagicMock(
+            side_effect=lambda tool_name, kwargs, result: self.tracker["order"].append(f"after:{tool_name}")
+        )
+        self.agent._fire_before_tool_hook = before
+        self.agent._fire_after_tool_hook = after
+        return before, after
+
+    def test_hooks_fire_when_result_is_reused(self):
+        """测试提前执行的工具在流结束、结果被复用时才触发 hook"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker))
+        before, after = self._track_tool_hooks()
+        self._set_stream([
+            _tool_call_chunk(0, "call_0", "read_a", "{}"),
+            lambda: time.sleep(0.2),
+            lambda: self.tracker["order"].append("stream_end"),
+            _tool_call_chunk(0, finish_reason="tool_calls"),
+        ])
+
+        AgentRunLoop(self.agent, speculative_tool_calls=True).run("Read", stream=True)
+
+        order = self.tracker["order"]
+        self.assertLess(order.index("end:read_a"), order.index("stream_end"))
+        self.assertLess(order.index("stream_end"), order.index("before:read_a"))
+        self.assertLess(order.index("before:read_a"), order.index("after:read_a"))
+        self.assertEqual(before.call_count, 1)
+        self.assertEqual(after.call_count, 1)
+
+    def test_discarded_call_fires_no_hooks_or_events(self):
+        """测试被丢弃的提前执行不触发 hook 和工具事件"""
+        self.agent.add_tool(SlowTool("read_a", "read", self.tracker, delay=0))
+        before, after = self._track_tool_hooks()
+        run_loop = AgentRunLoop(self.agent)
+        speculative = _SpeculativeToolCalls(run_loop)
+        accumulator = StreamAccumulator()
+        accumulator.subscribe(speculative.feed)
+        with patch.object(self.agent.event_bus, "emit") as mock_emit:
+            try:
+                accumulator.feed(_tool_call_chunk(0, "call_0", "read_a", "{}"))
+            finally:
+                # 等待提前执行完成后再丢弃
+                run_loop._shutdown_tool_executor()
+                speculative.discard()
+
+        self.assertIn("end:read_a", self.tracker["order"])
+        before.assert_not_called()
+        after.assert_not_called()
+        emitted = [call.args[0] for call in mock_emit.call_args_list]
+        self.assertNotIn("agent.tool.call", emitted)
+        self.assertNotIn("agent.tool.result", emitted)
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,57 @@
+"""SessionBlobStore 测试用例"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from eflycode.core.agent.session_blobs import SessionBlobStore
+
+
+class TestSessionBlobStore(unittest.TestCase):
+    """blob 存储测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name) / "blobs"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        """保存后按引用读取，相同内容只保存一份"""
+        store = SessionBlobStore(self.directory)
+        content = "def foo():\n    return 1\n" * 500
+
+        ref = store.put(content)
+        self.assertEqual(store.put(content), ref)
+        self.assertEqual(ref, SessionBlobStore.ref_for(content))
+        self.assertEqual(store.get(ref), content)
+
+        files = [path for path in self.directory.rglob("*") if path.is_file()]
+        self.assertEqual(len(files), 1)
+        self.assertLess(files[0].stat().st_size, len(content))
+
+    def test_read_other_compression(self):
+        """读取时支持以其他压缩方式保存的 blob"""
+        content = "x" * 10000
+        ref = SessionBlobStore(self.directory, compression="none").put(content)
+
+        self.assertEqual(SessionBlobStore(self.directory).get(ref), content)
+
+    def test_missing_and_corrupted(self):
+        """不存在或损坏的 blob 返回 None"""
+        store = SessionBlobStore(self.directory)
+        self.assertIsNone(store.get("0" * 64))
+
+        ref = store.put("content")
+        next(path for path in self.directory.rglob("*") if path.is_file()).write_bytes(b"broken")
+        self.assertIsNone(store.get(ref))
+
+    def test_invalid_compression(self):
+        """无效的压缩方式抛出异常"""
+        with self.assertRaises(ValueError):
+            SessionBlobStore(self.directory, compression="lz4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,497 @@
+"""SessionStore 测试用例"""
+
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from eflycode.core.agent import session_store as session_store_module
+from eflycode.core.agent.session import Session
+from eflycode.core.agent.session_store import SessionStore
+
+
+class TestSessionStore(unittest.TestCase):
+    """会话日志测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch.object(SessionStore, "_is_test_environment", staticmethod(lambda: False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = SessionStore(workspace_dir=Path(self.temp_dir.name))
+        self.addCleanup(self.store._index.close)
+        self.addCleanup(self.store.close)
+        instance_patcher = patch.object(SessionStore, "_instance", self.store)
+        instance_patcher.start()
+        self.addCleanup(instance_patcher.stop)
+
+    def _records(self, session_id):
+        self.store.flush()
+        path = self.store._get_session_path(session_id)
+        return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+    def test_add_message_appends_one_record(self):
+        """每条消息追加一行，不重写已有内容"""
+        session = Session()
+        session.add_message("user", "hello")
+        self.store.flush()
+        path = self.store._get_session_path(session.id)
+        first_content = path.read_text(encoding="utf-8")
+
+        session.add_message("assistant", "hi")
+        self.store.flush()
+        session.add_message("user", "again")
+        self.store.flush()
+
+        content = path.read_text(encoding="utf-8")
+        self.assertTrue(content.startswith(first_content))
+        records = self._records(session.id)
+        self.assertEqual([r["type"] for r in records], ["header", "message", "message", "message"])
+        self.assertEqual(records[0]["initial_user_question"], "hello")
+
+    def test_load_replays_log(self):
+        """加载时回放日志"""
+        session = Session()
+        session.add_message("user", "hello")
+        session.add_message("assistant", "hi")
+        self.store.flush()
+
+        store = SessionStore(workspace_dir=Path(self.temp_dir.name))
+        self.addCleanup(store.close)
+        data = store.load(session.id)
+        self.assertEqual(data["id"], session.id)
+        self.assertEqual(data["message_count"], 2)
+        self.assertEqual([m.content for m in data["messages"]], ["hello", "hi"])
+        self.assertEqual(data["initial_user_question"], "hello")
+        self.assertEqual(data["last_user_message_preview"], "hello")
+
+    def test_clear_appends_truncate(self):
+        """清空会话追加 truncate 记录，回放后消息为空"""
+        session = Session()
+        session.add_message("user", "hello")
+        self.store.flush()
+        session.clear()
+        self.store.flush()
+        session.add_message("user", "new question")
+
+        records = self._records(session.id)
+        self.assertEqual(records[2], {"type": "truncate", "ts": records[2]["ts"], "count": 0})
+        data = self.store.load(session.id)
+        self.assertEqual([m.content for m in data["messages"]], ["new question"])
+
+    def test_load_state_rewrites_diverged_history(self):
+        """load_state 替换历史后只保留公共前缀"""
+        session = Session()
+        session.add_message("user", "a")
+        session.add_message("assistant", "b")
+        self.store.flush()
+        messages = session.get_messages()
+
+        session.load_state(session.id, messages[:1])
+        session.add_message("assistant", "c")
+
+        data = self.store.load(session.id)
+        self.assertEqual([m.content for m in data["messages"]], ["a", "c"])
+
+    def test_compaction(self):
+        """无效记录过多时重写日志"""
+        session = Session()
+        with patch.object(session_store_module, "SESSION_LOG_COMPACT_MIN_DEAD", 4):
+            for i in range(2):
+                session.add_message("user", f"message {i}")
+                self.store.flush()
+                session.clear()
+                self.store.flush()
+            session.add_message("user", "final")
+
+        records = self._records(session.id)
+        self.assertEqual([r["type"] for r in records], ["header", "message"])
+        self.assertEqual(self.store.load(session.id)["messages"][0].content, "final")
+
+    def test_truncated_last_line(self):
+        """写入中断留下的不完整记录被跳过，下次保存时重写日志"""
+        session = Session()
+        session.add_message("user", "hello")
+        self.store.flush()
+        path = self.store._get_session_path(session.id)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"type": "message", "mess')
+
+        store = SessionStore(workspace_dir=Path(self.temp_dir.name))
+        self.addCleanup(store.close)
+        data = store.load(session.id)
+        self.assertEqual([m.content for m in data["messages"]], ["hello"])
+
+        resumed = Session()
+        resumed.load_state(data["id"], data["messages"])
+        with patch.object(SessionStore, "_instance", store):
+            resumed.add_message("assistant", "hi")
+        self.assertEqual([m.content for m in store.load(session.id)["messages"]], ["hello", "hi"])
+
+    def test_legacy_json(self):
+        """读取旧格式的会话文件，保存后转换为日志格式"""
+        sessions_dir = Path(self.temp_dir.name) / ".eflycode" / "sessions"
+        legacy_path = sessions_dir / "legacy.json"
+        legacy_path.write_text(
+            json.dumps(
+                {
+                    "id": "legacy",
+                    "initial_user_question": "old",
+                    "message_count": 1,
+                    "messages": [{"role": "user", "content": "old"}],
+                }
+            ),
+            encoding="utf-8",
+        )
+
+        self.assertEqual([s["id"] for s in self.store.list_recent()], ["legacy"])
+        data = self.store.load("legacy")
+        session = Session()
+        session.load_state(data["id"], data["messages"], data["initial_user_question"])
+        session.add_message("assistant", "new")
+        self.store.flush()
+
+        self.assertFalse(legacy_path.exists())
+        self.assertEqual([m.content for m in self.store.load("legacy")["messages"]], ["old", "new"])
+        self.assertEqual(self.store.list_recent()[0]["message_count"], 2)
+
+    def test_large_content_stored_as_blob(self):
+        """较大的内容保存为 blob，加载时还原"""
+        payload = "line of a large file\n" * 1000
+        first = Session()
+        first.add_message("user", "read it")
+        first.add_message("tool", payload, tool_call_id="call_1")
+        first.add_message("tool", payload, tool_call_id="call_2")
+        second = Session()
+        second.add_message("user", "read it again")
+        second.add_message("tool", payload, tool_call_id="call_3")
+
+        records = self._records(first.id)
+        self.assertNotIn("content", records[2]["message"])
+        self.assertEqual(records[2]["content_ref"], records[3]["content_ref"])
+        self.assertEqual(records[1]["message"]["content"], "read it")
+        self.assertLess(self.store._get_session_path(first.id).stat().st_size, len(payload))
+
+        blob_files = [path for path in self.store._blobs.directory.rglob("*") if path.is_file()]
+        self.assertEqual(len(blob_files), 1)
+
+        data = self.store.load(first.id)
+        self.assertEqual(data["messages"][1].content, payload)
+        self.assertEqual(data["messages"][1].tool_call_id, "call_1")
+
+    def test_missing_blob(self):
+        """blob 丢失时使用占位内容"""
+        session = Session()
+        session.add_message("tool", "x" * 10000, tool_call_id="call_1")
+        self.store.flush()
+        for path in self.store._blobs.directory.rglob("*"):
+            if path.is_file():
+                path.unlink()
+
+        content = self.store.load(session.id)["messages"][0].content
+        self.assertIn("内容已丢失", content)
+
+    def test_summary_checkpoint_persisted(self):
+        """滚动总结检查点随会话保存，只保留最后一条"""
+        session = Session()
+        for i in range(4):
+            session.add_message("user", f"q{i}")
+        session.summary_checkpoint.content = "first"
+        session.summary_checkpoint.end = 2
+        self.store.save(session)
+        self.store.flush()
+        session.summary_checkpoint.content = "second"
+        session.summary_checkpoint.end = 3
+        self.store.save(session)
+
+        records = self._records(session.id)
+        self.assertEqual([r["type"] for r in records][-2:], ["summary", "summary"])
+        self.assertEqual(self.store.load(session.id)["summary"], {"content": "second", "end": 3})
+
+    def test_summary_checkpoint_dropped_by_truncate(self):
+        """历史被截断到检查点之前时丢弃检查点"""
+        session = Session()
+        for i in range(3):
+            session.add_message("user", f"q{i}")
+        session.summary_checkpoint.content = "summary"
+        session.summary_checkpoint.end = 2
+        self.store.save(session)
+        self.store.flush()
+
+        messages = list(session.get_messages())
+        session.load_state(session.id, messages[:1])
+        self.store.save(session)
+        self.store.flush()
+        self.assertIsNone(self.store.load(session.id)["summary"])
+
+
+class TestSessionIndex(unittest.TestCase):
+    """会话元数据索引测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch.object(SessionStore, "_is_test_environment", staticmethod(lambda: False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = SessionStore(workspace_dir=Path(self.temp_dir.name))
+        self.addCleanup(self.store._index.close)
+        self.addCleanup(self.store.close)
+        instance_patcher = patch.object(SessionStore, "_instance", self.store)
+        instance_patcher.start()
+        self.addCleanup(instance_patcher.stop)
+
+    def _create_session(self, *contents):
+        session = Session()
+        for content in contents:
+            session.add_message("user", content)
+        self.store.flush()
+        return session
+
+    def test_list_recent_reads_index_only(self):
+        """索引是最新的时候不读取会话文件"""
+        session = self._create_session("first question", "second question")
+
+        with patch.object(self.store, "_replay") as mock_replay:
+            entries = self.store.list_recent()
+        mock_replay.assert_not_called()
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["id"], session.id)
+        self.assertEqual(entries[0]["message_count"], 2)
+        self.assertEqual(entries[0]["initial_user_question"], "first question")
+        self.assertEqual(entries[0]["last_user_message_preview"], "second question")
+
+    def test_stale_entry_is_reindexed(self):
+        """会话文件被外部修改后从文件重新读取"""
+        session = self._create_session("question")
+        path = self.store._get_session_path(session.id)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"type": "message", "message": {"role": "user", "content": "external"}}) + "\n")
+
+        entries = self.store.list_recent()
+        self.assertEqual(entries[0]["message_count"], 2)
+        self.assertEqual(entries[0]["last_user_message_preview"], "external")
+        self.assertEqual(self.store._index.entries()[session.id]["message_count"], 2)
+
+    def test_deleted_session_removed_from_index(self):
+        """会话文件被删除后从索引中移除"""
+        first = self._create_session("first")
+        second = self._create_session("second")
+        self.store._get_session_path(first.id).unlink()
+
+        self.assertEqual([entry["id"] for entry in self.store.list_recent()], [second.id])
+        self.assertNotIn(first.id, self.store._index.entries())
+
+    def test_rebuild_corrupted_index(self):
+        """索引损坏时从会话文件重建"""
+        session = self._create_session("question")
+        self.store._index.close()
+        self.store._index.path.write_bytes(b"not a database" * 100)
+
+        entries = self.store.list_recent()
+        self.assertEqual([entry["id"] for entry in entries], [session.id])
+        self.assertEqual(self.store.rebuild_index(), 1)
+
+
+class TestSessionSearch(unittest.TestCase):
+    """会话全文搜索测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch.object(SessionStore, "_is_test_environment", staticmethod(lambda: False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = SessionStore(workspace_dir=Path(self.temp_dir.name))
+        self.addCleanup(self.store._index.close)
+        self.addCleanup(self.store.close)
+        instance_patcher = patch.object(SessionStore, "_instance", self.store)
+        instance_patcher.start()
+        self.addCleanup(instance_patcher.stop)
+
+    def _create_session(self, *messages):
+        session = Session()
+        for role, content in messages:
+            session.add_message(role, content, tool_call_id="call_1" if role == "tool" else None)
+        self.store.flush()
+        return session
+
+    def test_search_user_and_assistant_messages(self):
+        """搜索用户提问和助手回答，不搜索工具输出"""
+        first = self._create_session(("user", "how to configure the tokenizer cache"), ("assistant", "use lru_cache"))
+        second = self._create_session(("user", "fix the login bug"), ("tool", "tokenizer appears in tool output"))
+
+        results = self.store.search("tokenizer")
+        self.assertEqual([r["id"] for r in results], [first.id])
+        self.assertIn("[tokenizer]", results[0]["snippet"])
+        self.assertEqual([r["id"] for r in self.store.search("lru_cache")], [first.id])
+        self.assertEqual([r["id"] for r in self.store.search("login bug")], [second.id])
+        self.assertEqual(self.store.search("login tokenizer"), [])
+
+    def test_search_ranking(self):
+        """匹配次数更多的会话排在前面"""
+        weak = self._create_session(("user", "refactor session store"), ("assistant", "done"))
+        strong = self._create_session(
+            ("user", "session store is slow"), ("assistant", "the session store rewrites the session file")
+        )
+
+        self.assertEqual([r["id"] for r in self.store.search("session")], [strong.id, weak.id])
+
+    def test_search_cjk_and_short_terms(self):
+        """支持中文和短关键词"""
+        session = self._create_session(("user", "帮我优化会话存储的性能"))
+
+        self.assertEqual([r["id"] for r in self.store.search("会话存储")], [session.id])
+        self.assertEqual([r["id"] for r in self.store.search("性能")], [session.id])
+
+    def test_search_updates_incrementally(self):
+        """新消息和清空的历史会同步到索引"""
+        session = self._create_session(("user", "first topic"))
+        session.add_message("assistant", "second topic appears later")
+        self.store.flush()
+        self.assertEqual([r["id"] for r in self.store.search("later")], [session.id])
+
+        session.clear()
+        session.add_message("user", "unrelated")
+        self.store.flush()
+        self.assertEqual(self.store.search("later"), [])
+        self.assertEqual([r["id"] for r in self.store.search("unrelated")], [session.id])
+
+    def test_search_rebuilds_from_files(self):
+        """索引丢失后从会话文件重建"""
+        session = self._create_session(("user", "rebuild me please"))
+        self.store._index.close()
+        self.store._index.path.unlink()
+
+        self.assertEqual([r["id"] for r in self.store.search("rebuild")], [session.id])
+
+    def test_search_scans_files_only_when_index_not_synced(self):
+        """索引已经同步时搜索不扫描会话目录"""
+        session = self._create_session(("user", "index only search"))
+        self.assertEqual([r["id"] for r in self.store.search("index")], [session.id])
+        self.assertTrue(self.store._index.is_synced())
+
+        with patch("eflycode.core.agent.session_store.os.scandir") as mock_scandir:
+            results = self.store.search("search")
+        mock_scandir.assert_not_called()
+        self.assertEqual([r["id"] for r in results], [session.id])
+
+    def test_search_refreshes_changed_sessions(self):
+        """命中的会话文件被外部修改或删除后更新索引"""
+        changed = self._create_session(("user", "shared topic"))
+        deleted = self._create_session(("user", "shared topic again"))
+        self.store.search("shared")
+
+        path = self.store._get_session_path(changed.id)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"type": "message", "message": {"role": "user", "content": "external note"}}) + "\n")
+        self.store._get_session_path(deleted.id).unlink()
+
+        results = self.store.search("shared")
+        self.assertEqual([r["id"] for r in results], [changed.id])
+        self.assertEqual(results[0]["message_count"], 2)
+        self.assertNotIn(deleted.id, self.store._index.entries())
+        self.assertEqual([r["id"] for r in self.store.search("external")], [changed.id])
+
+    def test_search_quotes_special_characters(self):
+        """关键词中的 FTS5 语法字符按普通字符处理"""
+        session = self._create_session(("user", 'run "pytest -k foo" AND check'))
+
+        self.assertEqual([r["id"] for r in self.store.search('"pytest')], [session.id])
+        self.assertEqual(self.store.search("NOT"), [])
+
+
+class TestSessionStoreWriteBehind(unittest.TestCase):
+    """后台写入测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch.object(SessionStore, "_is_test_environment", staticmethod(lambda: False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _store(self, **kwargs):
+        store = SessionStore(workspace_dir=Path(self.temp_dir.name), **kwargs)
+        self.addCleanup(store.close)
+        instance_patcher = patch.object(SessionStore, "_instance", store)
+        instance_patcher.start()
+        self.addCleanup(instance_patcher.stop)
+        return store
+
+    def test_per_turn_coalesces_until_flush(self):
+        """per-turn 策略下消息在 flush 时合并为一次写入"""
+        store = self._store(durability="per-turn")
+        session = Session()
+        path = store._get_session_path(session.id)
+
+        with patch.object(store, "_append", wraps=store._append) as mock_append:
+            session.add_message("user", "hello")
+            store.flush()
+            for i in range(5):
+                session.add_message("tool", f"result {i}", tool_call_id=f"call_{i}")
+            time.sleep(0.05)
+            self.assertEqual(len(path.read_text(encoding="utf-8").splitlines()), 2)
+
+            store.flush()
+            self.assertEqual(mock_append.call_count, 1)
+        self.assertEqual(len(path.read_text(encoding="utf-8").splitlines()), 7)
+
+    def test_every_message_does_not_wait_for_flush(self):
+        """every-message 策略下后台线程立即写入"""
+        store = self._store(durability="every-message")
+        session = Session()
+        session.add_message("user", "hello")
+
+        path = store._get_session_path(session.id)
+        deadline = time.monotonic() + 5
+        while not path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(path.exists())
+
+    def test_interval(self):
+        """interval 策略下超过间隔后写入"""
+        store = self._store(durability="interval", flush_interval=0.05)
+        session = Session()
+        session.add_message("user", "hello")
+        path = store._get_session_path(session.id)
+        self.assertFalse(path.exists())
+
+        deadline = time.monotonic() + 5
+        while not path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(path.exists())
+
+    def test_fsync(self):
+        """开启 fsync 时写入后调用 fsync"""
+        store = self._store(durability="per-turn", fsync=True)
+        session = Session()
+        with patch("eflycode.core.agent.session_store.os.fsync") as mock_fsync:
+            session.add_message("user", "hello")
+            session.add_message("assistant", "hi")
+            store.flush()
+        self.assertEqual(mock_fsync.call_count, 1)
+
+    def test_close_flushes_and_saves_synchronously_afterwards(self):
+        """close 写入未写入的消息，之后的保存同步写入"""
+        store = self._store(durability="per-turn")
+        session = Session()
+        session.add_message("user", "hello")
+        store.close()
+        self.assertEqual(len(store.load(session.id)["messages"]), 1)
+
+        session.add_message("assistant", "hi")
+        self.assertEqual(len(store.load(session.id)["messages"]), 2)
+
+    def test_invalid_durability(self):
+        """无效的写入策略抛出异常"""
+        store = self._store()
+        with self.assertRaises(ValueError):
+            store.configure(durability="never")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""TokenBudgetAllocator 测试用例"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from eflycode.core.context.budget import (
+    PROMPT_COMPONENT_SKILLS,
+    PROMPT_COMPONENT_SYSTEM,
+    TokenBudgetAllocator,
+)
+from eflycode.core.context.manager import ContextManager
+from eflycode.core.context.strategies import ContextStrategyConfig, SummaryCheckpoint
+from eflycode.core.llm.protocol import Message, ToolDefinition, ToolFunction, ToolFunctionParameters
+
+
+def _char_tokenizer():
+    """每条消息的 token 数等于内容长度的 Tokenizer"""
+    tokenizer = MagicMock()
+    tokenizer.count_message_tokens.side_effect = lambda message, model: len(message.content or "")
+    tokenizer.count_tokens.side_effect = lambda messages, model: sum(len(m.content or "") for m in messages)
+    tokenizer.count_tokens_for_threshold.side_effect = lambda messages, model, threshold: sum(
+        len(m.content or "") for m in messages
+    )
+    return tokenizer
+
+
+def _tool(name, description="x" * 100):
+    return ToolDefinition(
+        function=ToolFunction(name=name, description=description, parameters=ToolFunctionParameters())
+    )
+
+
+class TestTokenBudgetAllocator(unittest.TestCase):
+    """TokenBudgetAllocator 测试类"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.allocator = TokenBudgetAllocator(_char_tokenizer())
+
+    def test_fixed_components_are_subtracted(self):
+        """测试系统提示词、工具定义、技能和预留输出从消息预算中扣除"""
+        budget = self.allocator.allocate(
+            "gpt-4",
+            10000,
+            500,
+            tools=[_tool("read_file")],
+            prompt_components={PROMPT_COMPONENT_SYSTEM: "s" * 1000, PROMPT_COMPONENT_SKILLS: "k" * 200},
+        )
+        self.assertEqual(budget.output, 500)
+        self.assertEqual(budget.system, 1000)
+        self.assertEqual(budget.skills, 200)
+        self.assertGreater(budget.tools, 100)
+        self.assertEqual(budget.messages, 10000 - 500 - 1000 - 200 - budget.tools)
+
+    def test_summary_share(self):
+        """测试总结检查点占用消息预算的一部分"""
+        budget = self.allocator.allocate("gpt-4", 10000, 0, summary=SummaryCheckpoint("s" * 300, 4))
+        self.assertEqual(budget.summary, 300)
+        self.assertEqual(budget.history, 10000 - 300)
+        self.assertEqual(budget.messages, 10000)
+
+    def test_messages_keep_minimum_share(self):
+        """测试固定部分超过上下文长度时消息仍保留最小份额"""
+        budget = self.allocator.allocate(
+            "gpt-4", 1000, 100, prompt_components={PROMPT_COMPONENT_SYSTEM: "s" * 2000}
+        )
+        self.assertEqual(budget.messages, 250)
+
+    def test_tool_tokens_reused_for_same_definitions(self):
+        """测试工具定义对象没有变化时复用上次计算的 token 数"""
+        tokenizer = self.allocator.tokenizer
+        tools = [_tool("read_file"), _tool("write_file")]
+        first = self.allocator.allocate("gpt-4", 10000, 0, tools=tools)
+        calls = tokenizer.count_message_tokens.call_count
+
+        # 同一批定义对象组成的新列表
+        second = self.allocator.allocate("gpt-4", 10000, 0, tools=list(tools))
+        self.assertEqual(second.tools, first.tools)
+        self.assertEqual(tokenizer.count_message_tokens.call_count, calls)
+
+        # 定义对象变化或模型变化时重新计算
+        self.allocator.allocate("gpt-4", 10000, 0, tools=[tools[0], _tool("write_file", "y" * 50)])
+        self.assertEqual(tokenizer.count_message_tokens.call_count, calls + 1)
+        self.allocator.allocate("gpt-4o", 10000, 0, tools=[tools[0], _tool("write_file", "y" * 50)])
+        self.assertEqual(tokenizer.count_message_tokens.call_count, calls + 2)
+
+
+class TestContextManagerBudget(unittest.TestCase):
+    """ContextManager 按请求预算压缩的测试类"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.manager = ContextManager()
+        self.manager.tokenizer = _char_tokenizer()
+        self.manager.budget_allocator = TokenBudgetAllocator(self.manager.tokenizer)
+        self.config = ContextStrategyConfig(
+            strategy_type="sliding_window",
+            sliding_window_size=100,
+            sliding_window_token_ratio=0.5,
+            output_reserve_ratio=0.0,
+        )
+        self.messages = [Message(role="user", content="m" * 100) for _ in range(9)]
+
+    def test_system_prompt_triggers_compression(self):
+        """测试消息本身未超过预算，加上系统提示词后触发压缩"""
+        result = self.manager.manage(self.messages, "gpt-4", self.config, 2000)
+        self.assertEqual(len(result), 9)
+
+        result = self.manager.manage(
+            self.messages,
+            "gpt-4",
+            self.config,
+            2000,
+            prompt_components={PROMPT_COMPONENT_SYSTEM: "s" * 400},
+        )
+        self.assertEqual(self.manager.budget.messages, 1600)
+        self.assertLessEqual(sum(len(m.content) for m in result), 800)
+
+    def test_output_reserve_uses_provider_max_tokens(self):
+        """测试模型配置了 max_tokens 时按 max_tokens 预留输出"""
+        provider = SimpleNamespace(config=SimpleNamespace(max_tokens=300))
+        self.manager.manage(self.messages, "gpt-4", self.config, 2000, provider=provider)
+        self.assertEqual(self.manager.budget.output, 300)
+        self.assertEqual(self.manager.budget.messages, 1700)
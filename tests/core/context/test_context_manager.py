@@ -1,10 +1,12 @@
 """ContextManager 测试用例"""
 
+import threading
 import unittest
+from unittest.mock import MagicMock
 
 from eflycode.core.context.manager import ContextManager
-from eflycode.core.context.strategies import ContextStrategyConfig
-from eflycode.core.llm.protocol import Message
+from eflycode.core.context.strategies import ContextStrategyConfig, SummaryCheckpoint
+from eflycode.core.llm.protocol import Message, ToolCall, ToolCallFunction
 from eflycode.core.llm.providers.base import LLMProvider
 
 
@@ -149,3 +151,116 @@ class TestContextManager(unittest.TestCase):
         # 验证 provider 被调用
         self.assertEqual(provider.call.call_count, 1) if hasattr(provider.call, 'call_count') else None
 
+    def test_manage_elides_tool_outputs_before_strategy(self):
+        """测试执行策略之前省略过期的工具输出，并扣除省略的 token 数"""
+        config = ContextStrategyConfig(strategy_type="sliding_window", sliding_window_size=100)
+        messages = []
+        for call_id in ("call_1", "call_2"):
+            tool_call = ToolCall(
+                id=call_id,
+                type="function",
+                function=ToolCallFunction(name="read_file", arguments='{"file_path": "a.py"}'),
+            )
+            messages.append(Message(role="assistant", tool_calls=[tool_call]))
+            messages.append(Message(role="tool", content="code\n" * 100, tool_call_id=call_id))
+        self.manager.tokenizer = MagicMock()
+        self.manager.tokenizer.count_message_tokens.side_effect = lambda message, model: len(message.content or "")
+        counted = []
+
+        def token_counter(model, tokenizer, exact=True):
+            counted.append(True)
+            return 1000
+
+        result = self.manager.manage(messages, "gpt-4", config, 100000, token_counter=token_counter)
+        self.assertIn("已省略", result[1].content)
+        self.assertIs(result[3], messages[3])
+        self.assertEqual(counted, [])
+
+        elided_counter = self.manager._elided_token_counter(token_counter, messages, result, [1])
+        self.assertEqual(elided_counter("gpt-4", self.manager.tokenizer), 1000 - 500 + len(result[1].content))
+
+
+class _BlockingProvider(MockProvider):
+    """收到 release 信号前不返回的 Provider，记录调用次数"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.call_count = 0
+
+    def call(self, request):
+        self.call_count += 1
+        self.release.wait(5)
+        return super().call(request)
+
+
+class TestContextManagerPrecompress(unittest.TestCase):
+    """后台提前压缩测试类"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.manager = ContextManager()
+        self.manager.tokenizer = MagicMock()
+        self.manager.tokenizer.count_tokens.return_value = 10
+        self.manager.tokenizer.count_tokens_for_threshold.return_value = 10
+        self.config = ContextStrategyConfig(
+            strategy_type="summary",
+            summary_threshold=0.8,
+            summary_keep_recent=2,
+            summary_precompress_threshold=0.7,
+        )
+        self.messages = [Message(role="user", content=f"Q{i}") for i in range(6)]
+        self.provider = _BlockingProvider()
+        self.checkpoint = SummaryCheckpoint()
+
+    def _manage(self, messages, token_count):
+        return self.manager.manage(
+            messages,
+            "gpt-4",
+            self.config,
+            1000,
+            provider=self.provider,
+            token_counter=lambda model, tokenizer, exact=True: token_count,
+            summary_checkpoint=self.checkpoint,
+        )
+
+    def _finish_background(self):
+        self.provider.release.set()
+        self.manager._precompress_thread.join(5)
+
+    def test_below_watermark_does_not_start(self):
+        """测试未达到提前压缩阈值时不启动后台压缩"""
+        result = self._manage(self.messages, 600)
+        self.assertEqual(result, self.messages)
+        self.assertIsNone(self.manager._precompress_thread)
+
+    def test_precompress_applied_on_next_request(self):
+        """测试后台压缩不阻塞当前请求，结果在下一次请求时更新检查点"""
+        result = self._manage(self.messages, 750)
+        self.assertEqual(result, self.messages)
+        self.assertEqual(self.checkpoint.end, 0)
+        self._finish_background()
+        self.assertEqual(self.provider.call_count, 1)
+
+        messages = self.messages + [Message(role="assistant", content="A6")]
+        self._manage(messages, 760)
+        self.assertEqual(self.checkpoint, SummaryCheckpoint("Summary", 4))
+
+    def test_compress_uses_precompressed_summary(self):
+        """测试达到压缩阈值时使用后台生成的总结，不再同步调用 LLM"""
+        self._manage(self.messages, 750)
+        self._finish_background()
+
+        result = self._manage(self.messages, 850)
+        self.assertEqual(self.provider.call_count, 1)
+        self.assertIn("Summary", result[0].content)
+        self.assertEqual([m.content for m in result[1:]], ["Q4", "Q5"])
+
+    def test_stale_result_discarded(self):
+        """测试历史被替换后丢弃后台压缩的结果"""
+        self._manage(self.messages, 750)
+        self._finish_background()
+
+        replaced = [Message(role="user", content=f"R{i}") for i in range(6)]
+        self._manage(replaced, 100)
+        self.assertEqual(self.checkpoint, SummaryCheckpoint())
+
@@ -1,15 +1,18 @@
 """上下文管理策略测试用例"""
 
+import json
 import unittest
-from unittest.mock import MagicMock, Mock
+from unittest.mock import MagicMock, Mock, patch
 
 from eflycode.core.context.strategies import (
     ContextStrategyConfig,
     SlidingWindowStrategy,
+    SummaryCheckpoint,
     SummaryCompressionStrategy,
+    ToolOutputElisionStrategy,
 )
 from eflycode.core.context.tokenizer import Tokenizer
-from eflycode.core.llm.protocol import ChatCompletion, Message, Usage
+from eflycode.core.llm.protocol import ChatCompletion, Message, ToolCall, ToolCallFunction, Usage
 from eflycode.core.llm.providers.base import LLMProvider
 
 
@@ -184,6 +187,52 @@ class TestSummaryCompressionStrategy(unittest.TestCase):
         self.assertIn("Question 1", formatted)
         self.assertIn("Answer 1", formatted)
 
+    def test_compress_updates_checkpoint(self):
+        """测试生成总结时更新检查点"""
+        messages = [Message(role="user", content=f"Q{i}") for i in range(6)]
+        checkpoint = SummaryCheckpoint()
+        provider = MockProvider("Summary of Q0-Q2")
+        compressed = self.strategy.compress(
+            messages, "gpt-4", self.tokenizer, 100000, None, provider, checkpoint=checkpoint
+        )
+        self.assertEqual(provider.call_count, 1)
+        self.assertEqual(checkpoint, SummaryCheckpoint("Summary of Q0-Q2", 3))
+        self.assertEqual([m.content for m in compressed[1:]], ["Q3", "Q4", "Q5"])
+
+    def test_compress_reuses_checkpoint_below_threshold(self):
+        """测试已有总结加上之后的消息未超过阈值时不调用 LLM"""
+        messages = [Message(role="user", content=f"Q{i}") for i in range(8)]
+        checkpoint = SummaryCheckpoint("Summary of Q0-Q2", 3)
+        tokenizer = MagicMock()
+        tokenizer.count_tokens_for_threshold.return_value = 10
+        provider = MockProvider()
+        compressed = self.strategy.compress(
+            messages, "gpt-4", tokenizer, 100000, None, provider, checkpoint=checkpoint
+        )
+        self.assertEqual(provider.call_count, 0)
+        self.assertIn("Summary of Q0-Q2", compressed[0].content)
+        self.assertEqual([m.content for m in compressed[1:]], ["Q3", "Q4", "Q5", "Q6", "Q7"])
+        self.assertEqual(checkpoint.end, 3)
+
+    def test_compress_folds_new_messages_into_checkpoint(self):
+        """测试超过阈值时只把新移出保留范围的消息合并到总结"""
+        messages = [Message(role="user", content=f"Q{i}") for i in range(8)]
+        checkpoint = SummaryCheckpoint("Summary of Q0-Q2", 3)
+        tokenizer = MagicMock()
+        tokenizer.count_tokens_for_threshold.return_value = 90000
+        provider = MockProvider("Summary of Q0-Q4")
+        provider.call = Mock(wraps=provider.call)
+        compressed = self.strategy.compress(
+            messages, "gpt-4", tokenizer, 100000, None, provider, checkpoint=checkpoint
+        )
+        prompt = provider.call.call_args[0][0].messages[0].content
+        self.assertIn("Summary of Q0-Q2", prompt)
+        self.assertIn("Q3", prompt)
+        self.assertIn("Q4", prompt)
+        self.assertNotIn("Q0", prompt.replace("Summary of Q0-Q2", ""))
+        self.assertEqual(checkpoint, SummaryCheckpoint("Summary of Q0-Q4", 5))
+        self.assertEqual([m.content for m in compressed[1:]], ["Q5", "Q6", "Q7"])
+
 
 class TestSlidingWindowStrategy(unittest.TestCase):
     """SlidingWindowStrategy 测试类"""
@@ -281,3 +330,173 @@ class TestSlidingWindowStrategy(unittest.TestCase):
         )
         self.assertEqual(len(compressed), 0)
 
+
+class TestSlidingWindowTokenBudget(unittest.TestCase):
+    """SlidingWindowStrategy token 预算和工具调用完整性测试类"""
+
+    def setUp(self):
+        """设置测试环境，每条消息的 token 数等于内容长度"""
+        self.tokenizer = MagicMock()
+        self.tokenizer.count_message_tokens.side_effect = lambda message, model: len(message.content or "")
+        self.tokenizer.count_tokens.side_effect = lambda messages, model: sum(
+            len(message.content or "") for message in messages
+        )
+        self.tokenizer.count_tokens_for_threshold.side_effect = lambda messages, model, threshold: sum(
+            len(message.content or "") for message in messages
+        )
+
+    def _strategy(self, size=100, token_ratio=None):
+        return SlidingWindowStrategy(
+            ContextStrategyConfig(
+                strategy_type="sliding_window",
+                sliding_window_size=size,
+                sliding_window_token_ratio=token_ratio,
+            )
+        )
+
+    @staticmethod
+    def _tool_call_messages(result: str):
+        tool_call = ToolCall(id="call_1", type="function", function=ToolCallFunction(name="read", arguments="{}"))
+        return [
+            Message(role="assistant", content="a", tool_calls=[tool_call]),
+            Message(role="tool", content=result, tool_call_id="call_1"),
+        ]
+
+    def test_window_does_not_start_with_tool_message(self):
+        """测试按消息数截断时不从工具结果开始"""
+        messages = [Message(role="user", content="q")] + self._tool_call_messages("r") + [
+            Message(role="assistant", content="done"),
+            Message(role="user", content="next"),
+        ]
+        compressed = self._strategy(size=3).compress(messages, "gpt-4", self.tokenizer, 1000)
+        self.assertEqual([m.content for m in compressed], ["done", "next"])
+
+    def test_token_budget_limits_window(self):
+        """测试窗口不超过 token 预算"""
+        messages = [Message(role="user", content=c) for c in ("x" * 100, "y" * 100, "a" * 10, "b" * 10, "c" * 10)]
+        strategy = self._strategy(token_ratio=0.3)
+        self.assertTrue(strategy.counts_tokens)
+        self.assertTrue(strategy.should_compress(messages, "gpt-4", self.tokenizer, 100))
+        compressed = strategy.compress(messages, "gpt-4", self.tokenizer, 100)
+        self.assertEqual([m.content for m in compressed], ["a" * 10, "b" * 10, "c" * 10])
+
+    def test_token_budget_reserves_initial_question(self):
+        """测试插入初始提问时预留 token"""
+        messages = [Message(role="user", content="question")] + [
+            Message(role="user", content=c * 10) for c in "abcde"
+        ]
+        compressed = self._strategy(token_ratio=0.5).compress(messages, "gpt-4", self.tokenizer, 100, "question")
+        self.assertEqual(compressed[0].role, "system")
+        self.assertLessEqual(sum(len(m.content) for m in compressed), 50)
+
+    def test_token_budget_keeps_tool_call_pair(self):
+        """测试单个工具结果超过预算时保留完整的工具调用"""
+        messages = [Message(role="user", content="q")] + self._tool_call_messages("r" * 500)
+        compressed = self._strategy(token_ratio=0.5).compress(messages, "gpt-4", self.tokenizer, 100)
+        self.assertEqual([m.role for m in compressed], ["assistant", "tool"])
+
+    def test_within_budget_not_compressed(self):
+        """测试未超过预算和窗口大小时不压缩"""
+        messages = [Message(role="user", content="hello")]
+        strategy = self._strategy(token_ratio=0.5)
+        self.assertFalse(strategy.should_compress(messages, "gpt-4", self.tokenizer, 100))
+        self.assertFalse(self._strategy().counts_tokens)
+
+
+class TestToolOutputElisionStrategy(unittest.TestCase):
+    """ToolOutputElisionStrategy 测试类"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.tokenizer = Tokenizer()
+        self.config = ContextStrategyConfig(strategy_type="summary", tool_output_keep_recent=4)
+        self.strategy = ToolOutputElisionStrategy(self.config)
+        self._next_id = 0
+
+    def _call(self, name, arguments, result):
+        """生成一次工具调用及其结果"""
+        self._next_id += 1
+        call_id = f"call_{self._next_id}"
+        tool_call = ToolCall(
+            id=call_id, type="function", function=ToolCallFunction(name=name, arguments=json.dumps(arguments))
+        )
+        return [
+            Message(role="assistant", tool_calls=[tool_call]),
+            Message(role="tool", content=result, tool_call_id=call_id),
+        ]
+
+    def _compress(self, messages):
+        return self.strategy.compress(messages, "gpt-4", self.tokenizer, 100000)
+
+    def test_reread_supersedes_earlier_read(self):
+        """测试再次读取同一文件后省略之前的输出"""
+        content = "\n".join(f"line {i}" for i in range(50))
+        messages = self._call("read_file", {"file_path": "src/x.py"}, content) + self._call(
+            "read_file", {"file_path": "src/x.py"}, content
+        )
+        compressed = self._compress(messages)
+        self.assertEqual(compressed[1].content, "[已省略: read_file src/x.py, 50 行; 如有需要请重新读取]")
+        self.assertEqual(compressed[1].tool_call_id, messages[1].tool_call_id)
+        self.assertIs(compressed[3], messages[3])
+        self.assertEqual(len(compressed), len(messages))
+
+    def test_edit_supersedes_read(self):
+        """测试文件被修改后省略之前读取的输出"""
+        content = "x = 1\n" * 40
+        messages = self._call("read_file", {"file_path": "./src/x.py"}, content) + self._call(
+            "replace", {"file_path": "src/x.py", "old_string": "x", "new_string": "y"}, "ok"
+        )
+        compressed = self._compress(messages)
+        self.assertIn("已省略", compressed[1].content)
+        self.assertEqual(compressed[3].content, "ok")
+
+    def test_different_arguments_not_superseded(self):
+        """测试参数不同的调用互不影响"""
+        content = "entry\n" * 40
+        messages = self._call("list_directory", {"dir_path": "src"}, content) + self._call(
+            "list_directory", {"dir_path": "tests"}, content
+        )
+        self.assertIs(self._compress(messages), messages)
+
+    def test_aged_large_output_elided(self):
+        """测试不在最近消息中的较大输出被省略，较小的输出保留"""
+        large = "match\n" * 1000
+        messages = self._call("search_file_content", {"pattern": "foo"}, large)
+        messages += self._call("glob_search", {"pattern": "*.py"}, "a.py")
+        messages += [Message(role="user", content=f"Q{i}") for i in range(20)]
+        compressed = self._compress(messages)
+        self.assertEqual(compressed[1].content, "[已省略: search_file_content foo, 1001 行; 如有需要请重新读取]")
+        self.assertEqual(compressed[3].content, "a.py")
+
+    def test_no_tool_calls(self):
+        """测试没有工具调用时返回原列表"""
+        messages = [Message(role="user", content="hello")]
+        self.assertIs(self._compress(messages), messages)
+
+    def test_only_new_messages_are_parsed(self):
+        """测试消息只在末尾追加时只解析新增的工具调用，省略的消息对象每轮相同"""
+        content = "line\n" * 50
+        messages = self._call("read_file", {"file_path": "a.py"}, content)
+        messages += self._call("read_file", {"file_path": "a.py"}, content)
+        first = self._compress(messages)
+        self.assertEqual(self.strategy.elided, [1])
+
+        messages += self._call("list_directory", {"dir_path": "src"}, "a.py")
+        with patch("eflycode.core.context.strategies.json.loads", wraps=json.loads) as mock_loads:
+            second = self._compress(messages)
+        self.assertEqual(mock_loads.call_count, 1)
+        self.assertIs(second[1], first[1])
+        self.assertEqual(self.strategy.elided, [1])
+
+    def test_rewritten_history_is_rescanned(self):
+        """测试消息列表被替换后重新遍历全部消息"""
+        content = "line\n" * 50
+        self._compress(self._call("read_file", {"file_path": "a.py"}, content))
+
+        messages = [Message(role="user", content="summary")]
+        messages += self._call("read_file", {"file_path": "b.py"}, content)
+        messages += self._call("read_file", {"file_path": "b.py"}, content)
+        compressed = self._compress(messages)
+        self.assertIn("b.py", compressed[2].content)
+        self.assertEqual(self.strategy.elided, [2])
+
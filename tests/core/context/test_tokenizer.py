@@ -1,8 +1,19 @@
 """Tokenizer 测试用例"""
 
+import os
+import tempfile
 import unittest
+from pathlib import Path
+from unittest.mock import patch
 
-from eflycode.core.context.tokenizer import Tokenizer
+from eflycode.core.context import tokenizer as tokenizer_module
+from eflycode.core.context.tokenizer import (
+    TOKENIZER_DOWNLOAD_ENV,
+    Tokenizer,
+    _encoding_cache_dir,
+    _encoding_cache_file,
+    configure_encoding_cache,
+)
 from eflycode.core.llm.protocol import Message, ToolCall, ToolCallFunction
 
 
@@ -10,7 +21,12 @@ class TestTokenizer(unittest.TestCase):
     """Tokenizer 测试类"""
 
     def setUp(self):
-        """设置测试环境"""
+        """设置测试环境，允许下载编码"""
+        patcher = patch.dict(os.environ, {TOKENIZER_DOWNLOAD_ENV: "1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tokenizer_module._unavailable_encodings.clear()
+        self.addCleanup(tokenizer_module._unavailable_encodings.clear)
         self.tokenizer = Tokenizer()
 
     def test_get_encoding_for_model(self):
@@ -110,3 +126,158 @@ class TestTokenizer(unittest.TestCase):
         # 应该是同一个对象（缓存）
         self.assertIs(encoding1, encoding2)
 
+
+class _FakeEncoding:
+    """按字符计数的编码器，记录 encode 调用次数"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return list(text)
+
+
+class TestTokenizerCache(unittest.TestCase):
+    """消息 token 数缓存测试类"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.encoding = _FakeEncoding()
+        self.tokenizer = Tokenizer(cache_size=2)
+        patcher = patch.object(self.tokenizer, "get_encoding_for_model", return_value=self.encoding)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_count_uses_cache(self):
+        """测试相同内容的消息只编码一次"""
+        first = self.tokenizer.count_message_tokens(Message(role="user", content="hello"), "gpt-4")
+        calls = self.encoding.calls
+        second = self.tokenizer.count_message_tokens(Message(role="user", content="hello"), "gpt-4")
+        self.assertEqual(first, second)
+        self.assertEqual(self.encoding.calls, calls)
+
+    def test_different_content_is_counted(self):
+        """测试内容不同的消息分别计算"""
+        short = self.tokenizer.count_message_tokens(Message(role="user", content="hi"), "gpt-4")
+        long = self.tokenizer.count_message_tokens(Message(role="user", content="hello"), "gpt-4")
+        self.assertEqual(long - short, 3)
+
+    def test_cache_is_bounded(self):
+        """测试缓存超过容量时淘汰最久未使用的条目"""
+        for content in ("a", "b", "c"):
+            self.tokenizer.count_message_tokens(Message(role="user", content=content), "gpt-4")
+        calls = self.encoding.calls
+        self.tokenizer.count_message_tokens(Message(role="user", content="a"), "gpt-4")
+        self.assertGreater(self.encoding.calls, calls)
+
+
+class TestTokenEstimator(unittest.TestCase):
+    """token 数估算器测试类"""
+
+    def setUp(self):
+        """设置测试环境，编码器每个字符对应一个 token"""
+        self.encoding = _FakeEncoding()
+        self.tokenizer = Tokenizer()
+        patcher = patch.object(self.tokenizer, "get_encoding_for_model", return_value=self.encoding)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _calibrate(self):
+        for i in range(20):
+            self.tokenizer.count_message_tokens(Message(role="user", content=f"{i}" + "x" * 1000), "gpt-4")
+
+    def test_estimate_does_not_encode(self):
+        """测试估算不调用编码器"""
+        self.tokenizer.estimate_message_tokens(Message(role="user", content="x" * 400), "gpt-4")
+        self.assertEqual(self.encoding.calls, 0)
+
+    def test_calibration_reduces_error(self):
+        """测试精确计数校准每个 token 的字节数，估算误差随之下降"""
+        message = Message(role="user", content="y" * 1000)
+        before = self.tokenizer.estimate_message_tokens(message, "gpt-4")
+        self._calibrate()
+        after = self.tokenizer.estimate_message_tokens(message, "gpt-4")
+        exact = self.tokenizer.count_message_tokens(message, "gpt-4")
+        self.assertLess(abs(after - exact), abs(before - exact))
+        self.assertLess(self.tokenizer.estimate_error, 0.5)
+
+    def test_needs_exact_count_near_threshold(self):
+        """测试估算值接近阈值时需要精确计数，远离阈值时不需要"""
+        self._calibrate()
+        self.assertTrue(self.tokenizer.needs_exact_count(9800, 10000))
+        self.assertFalse(self.tokenizer.needs_exact_count(2000, 10000))
+        self.assertFalse(self.tokenizer.needs_exact_count(50000, 10000))
+
+    def test_count_for_threshold_skips_encoding_far_from_threshold(self):
+        """测试远离阈值时返回估算值，接近阈值时精确计数"""
+        self._calibrate()
+        messages = [Message(role="user", content=f"{i}" + "z" * 100) for i in range(10)]
+        calls = self.encoding.calls
+        self.tokenizer.count_tokens_for_threshold(messages, "gpt-4", 100000)
+        self.assertEqual(self.encoding.calls, calls)
+
+        exact = self.tokenizer.count_tokens_for_threshold(messages, "gpt-4", 1000)
+        self.assertGreater(self.encoding.calls, calls)
+        self.assertEqual(exact, self.tokenizer.count_tokens(messages, "gpt-4"))
+
+
+class TestEncodingLoading(unittest.TestCase):
+    """编码延迟加载和离线回退测试类"""
+
+    def setUp(self):
+        """设置测试环境，使用临时缓存目录"""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = Path(temp_dir.name)
+        patcher = patch.dict(os.environ, {"TIKTOKEN_CACHE_DIR": temp_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ.pop(TOKENIZER_DOWNLOAD_ENV, None)
+        tokenizer_module._unavailable_encodings.clear()
+        self.addCleanup(tokenizer_module._unavailable_encodings.clear)
+
+    def test_load_failure_falls_back_to_estimate(self):
+        """测试编码加载失败时使用估算值，之后创建的 Tokenizer 也不再重试"""
+        os.environ[TOKENIZER_DOWNLOAD_ENV] = "1"
+        tokenizer = Tokenizer()
+        message = Message(role="user", content="hello world")
+        with patch("tiktoken.get_encoding", side_effect=ConnectionError("offline")) as get_encoding:
+            first = tokenizer.count_message_tokens(message, "gpt-4")
+            second = tokenizer.count_message_tokens(message, "gpt-4")
+            Tokenizer().count_message_tokens(message, "gpt-4")
+        self.assertEqual(get_encoding.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first, tokenizer._estimate_message(message))
+        self.assertIsNone(tokenizer.get_encoding_for_model("gpt-4"))
+
+    def test_missing_encoding_file_does_not_download(self):
+        """测试缓存目录中没有该编码的文件时不加载编码，其他文件不算"""
+        (self.cache_dir / "other").write_bytes(b"")
+        tokenizer = Tokenizer()
+        with patch("tiktoken.get_encoding") as get_encoding:
+            tokens = tokenizer.count_message_tokens(Message(role="user", content="hello"), "gpt-4")
+        get_encoding.assert_not_called()
+        self.assertGreater(tokens, 0)
+
+    def test_cached_encoding_file_loads_encoding(self):
+        """测试缓存目录中有该编码的文件时加载编码"""
+        cache_file = _encoding_cache_file("cl100k_base")
+        self.assertEqual(cache_file.parent, self.cache_dir)
+        cache_file.write_bytes(b"")
+        encoding = _FakeEncoding()
+        with patch("tiktoken.get_encoding", return_value=encoding):
+            tokens = Tokenizer().count_message_tokens(Message(role="user", content="hello"), "gpt-4")
+        self.assertEqual(tokens, len("user") + len("hello") + 4)
+
+    def test_configure_encoding_cache(self):
+        """测试启动时把缓存目录设置到用户目录，查找缓存目录不修改环境变量"""
+        del os.environ["TIKTOKEN_CACHE_DIR"]
+        _encoding_cache_dir()
+        self.assertNotIn("TIKTOKEN_CACHE_DIR", os.environ)
+
+        with patch("pathlib.Path.home", return_value=self.cache_dir):
+            configure_encoding_cache()
+        self.assertEqual(_encoding_cache_dir(), self.cache_dir / ".eflycode" / "tiktoken")
@@ -153,6 +153,33 @@ class TestOpenAiProvider(unittest.TestCase):
             self.assertEqual(len(kwargs["tools"]), 1)
             self.assertEqual(kwargs["tools"][0]["function"]["name"], "test_tool")
 
+    def test_convert_tools_reuses_wire_format(self):
+        """测试同一 ToolDefinition 对象的转换结果被复用"""
+        from eflycode.core.llm.protocol import ToolDefinition, ToolFunction, ToolFunctionParameters
+
+        def make_tool(name):
+            return ToolDefinition(
+                function=ToolFunction(
+                    name=name,
+                    description="Test tool",
+                    parameters=ToolFunctionParameters(properties={}),
+                )
+            )
+
+        with patch("eflycode.core.llm.providers.openai.OpenAI"):
+            provider = OpenAiProvider(self.config)
+            tool_a = make_tool("a")
+            first = provider._convert_tools([tool_a])
+            second = provider._convert_tools([tool_a, make_tool("b")])
+
+            self.assertIs(second[0], first[0])
+            self.assertEqual(second[1]["function"]["name"], "b")
+
+            # 定义对象被替换后重新转换
+            third = provider._convert_tools([make_tool("a")])
+            self.assertIsNot(third[0], first[0])
+            self.assertEqual(len(provider._tool_wire_cache), 1)
+
     @patch("eflycode.core.llm.providers.openai.OpenAI")
     def test_call(self, mock_openai_class):
         """测试 call 方法"""
@@ -0,0 +1,157 @@
+"""录制与回放 Provider 测试用例"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from eflycode.core.agent.base import BaseAgent
+from eflycode.core.agent.run_loop import AgentRunLoop
+from eflycode.core.llm.advisors.system_prompt_advisor import SystemPromptAdvisor
+from eflycode.core.llm.protocol import ChatCompletion, LLMRequest, Message, Usage
+from eflycode.core.llm.providers.recording import (
+    RecordingProvider,
+    ReplayMissError,
+    ReplayProvider,
+    load_cassette,
+    request_key,
+)
+from tests.core.agent.test_run_loop import MockStreamProvider
+
+
+def _completion(content: str) -> ChatCompletion:
+    return ChatCompletion(
+        id="chatcmpl-1",
+        object="chat.completion",
+        created=1234567890,
+        model="gpt-4",
+        message=Message(role="assistant", content=content),
+        usage=Usage(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+    )
+
+
+def _request(content: str, system: str = "system prompt") -> LLMRequest:
+    return LLMRequest(
+        model="gpt-4",
+        messages=[Message(role="system", content=system), Message(role="user", content=content)],
+    )
+
+
+class TestRecordingProvider(unittest.TestCase):
+    """录制与回放测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "cassette.jsonl"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _record(self):
+        provider = RecordingProvider(MockStreamProvider([_completion("first"), _completion("second")]), self.path)
+        provider.call(_request("hello"))
+        chunks = list(provider.stream(_request("world")))
+        return chunks
+
+    def test_record_writes_call_and_stream(self):
+        """录制非流式和流式调用"""
+        chunks = self._record()
+
+        interactions = load_cassette(self.path)
+        self.assertEqual([item["mode"] for item in interactions], ["call", "stream"])
+        self.assertEqual(interactions[0]["response"]["message"]["content"], "first")
+        self.assertEqual(len(interactions[1]["chunks"]), len(chunks))
+        self.assertTrue(all("delay_ms" in item for item in interactions[1]["chunks"]))
+
+    def test_request_key_ignores_system_messages(self):
+        """匹配键不受 system 消息影响"""
+        self.assertEqual(request_key(_request("hi", "a")), request_key(_request("hi", "b")))
+        self.assertNotEqual(request_key(_request("hi")), request_key(_request("bye")))
+
+    def test_replay_by_key(self):
+        """按请求匹配回放，与调用顺序无关"""
+        self._record()
+        provider = ReplayProvider(self.path)
+
+        content = "".join(chunk.delta.content or "" for chunk in provider.stream(_request("world", "changed")))
+        self.assertEqual(content, "second")
+        self.assertEqual(provider.call(_request("hello")).message.content, "first")
+        self.assertEqual(provider.remaining, 0)
+
+    def test_replay_falls_back_to_order(self):
+        """请求不匹配时按录制顺序回放，strict 模式下抛出异常"""
+        self._record()
+
+        provider = ReplayProvider(self.path)
+        self.assertEqual(provider.call(_request("different")).message.content, "first")
+
+        strict_provider = ReplayProvider(self.path, strict=True)
+        with self.assertRaises(ReplayMissError):
+            strict_provider.call(_request("different"))
+
+    def test_replay_exhausted(self):
+        """记录用完后抛出异常，reset 后可以重新回放"""
+        self._record()
+        provider = ReplayProvider(self.path)
+        provider.call(_request("hello"))
+        with self.assertRaises(ReplayMissError):
+            provider.call(_request("hello"))
+
+        provider.reset()
+        self.assertEqual(provider.call(_request("hello")).message.content, "first")
+
+    def test_time_scale(self):
+        """time_scale 按比例模拟录制时的延迟"""
+        interactions = [
+            {
+                "mode": "call",
+                "key": "",
+                "duration_ms": 200.0,
+                "response": _completion("slow").model_dump(mode="json", exclude_none=True),
+            }
+        ]
+        provider = ReplayProvider(interactions, time_scale=0.5)
+        with patch("eflycode.core.llm.providers.recording.time.sleep") as mock_sleep:
+            provider.call(_request("hello"))
+        mock_sleep.assert_called_once_with(0.1)
+        self.assertEqual(provider.emulated_ms, 100.0)
+
+        provider = ReplayProvider(interactions)
+        with patch("eflycode.core.llm.providers.recording.time.sleep") as mock_sleep:
+            provider.call(_request("hello"))
+        mock_sleep.assert_not_called()
+
+    def test_system_prompt_uses_inner_provider_name(self):
+        """系统提示词中的 Provider 名称使用被包装的 Provider"""
+        inner = MockStreamProvider([_completion("answer")])
+        provider = RecordingProvider(inner, self.path)
+        self.assertIs(provider.unwrap(), inner)
+        self.assertIs(RecordingProvider(provider, self.path).unwrap(), inner)
+
+        agent = BaseAgent(model="gpt-4", provider=provider)
+        try:
+            advisor = next(a for a in agent.get_advisors() if isinstance(a, SystemPromptAdvisor))
+            variables = advisor._get_prompt_variables(tool_definitions=[])
+            self.assertEqual(variables["model"]["provider"], "mockstream")
+        finally:
+            agent.shutdown()
+
+    def test_replay_through_run_loop(self):
+        """通过 AgentRunLoop 回放录制的会话"""
+        agent = BaseAgent(model="gpt-4", provider=RecordingProvider(MockStreamProvider([_completion("answer")]), self.path))
+        try:
+            AgentRunLoop(agent).run("question", stream=True)
+        finally:
+            agent.shutdown()
+
+        agent = BaseAgent(model="gpt-4", provider=ReplayProvider(self.path, strict=True))
+        try:
+            AgentRunLoop(agent).run("question", stream=True)
+            messages = agent.session.get_messages()
+            self.assertEqual(messages[-1].content, "answer")
+        finally:
+            agent.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
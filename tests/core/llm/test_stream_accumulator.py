@@ -0,0 +1,128 @@
+"""StreamAccumulator 测试用例"""
+
+import unittest
+
+from eflycode.core.llm.protocol import (
+    ChatCompletionChunk,
+    DeltaMessage,
+    DeltaToolCall,
+    DeltaToolCallFunction,
+)
+from eflycode.core.llm.stream_accumulator import StreamAccumulator, TextAccumulator
+
+
+def _chunk(content=None, tool_calls=None, finish_reason=None):
+    return ChatCompletionChunk(
+        id="chatcmpl-1",
+        object="chat.completion.chunk",
+        created=1234567890,
+        model="gpt-4",
+        delta=DeltaMessage(content=content, tool_calls=tool_calls),
+        finish_reason=finish_reason,
+    )
+
+
+def _tool_delta(index, tool_call_id=None, name=None, arguments=None):
+    return DeltaToolCall(
+        index=index,
+        id=tool_call_id,
+        type="function" if tool_call_id else None,
+        function=DeltaToolCallFunction(name=name, arguments=arguments),
+    )
+
+
+class TestTextAccumulator(unittest.TestCase):
+    """TextAccumulator 测试"""
+
+    def test_append_and_text(self):
+        """测试追加和拼接"""
+        text = TextAccumulator()
+        self.assertFalse(text)
+        self.assertEqual(text.text, "")
+
+        for part in ["Hel", "lo", "", " World"]:
+            text.append(part)
+
+        self.assertTrue(text)
+        self.assertEqual(len(text), 11)
+        self.assertEqual(text.text, "Hello World")
+        self.assertEqual(str(text), "Hello World")
+
+    def test_slice_across_parts(self):
+        """测试跨片段切片，与字符串切片结果一致"""
+        text = TextAccumulator()
+        full = ""
+        for part in ["abc", "d", "efgh", "ij"]:
+            text.append(part)
+            full += part
+
+        for start in range(len(full) + 1):
+            for end in range(start, len(full) + 2):
+                self.assertEqual(text.slice(start, end), full[start:end])
+        self.assertEqual(text.slice(3), full[3:])
+
+    def test_slice_after_join(self):
+        """测试拼接后继续追加和切片"""
+        text = TextAccumulator("abc")
+        text.append("def")
+        self.assertEqual(text.text, "abcdef")
+        text.append("gh")
+        self.assertEqual(text.slice(4, 7), "efg")
+        self.assertEqual(text.text, "abcdefgh")
+
+    def test_endswith(self):
+        """测试忽略末尾空白的后缀判断"""
+        text = TextAccumulator('{"a": 1')
+        self.assertFalse(text.endswith("}"))
+        text.append("}")
+        text.append("  ")
+        self.assertTrue(text.endswith("}"))
+
+    def test_clear(self):
+        """测试清空"""
+        text = TextAccumulator("abc")
+        text.clear()
+        self.assertEqual(len(text), 0)
+        self.assertEqual(text.text, "")
+
+
+class TestStreamAccumulator(unittest.TestCase):
+    """StreamAccumulator 测试"""
+
+    def test_content_and_tool_calls(self):
+        """测试累积内容和工具调用"""
+        accumulator = StreamAccumulator()
+
+        self.assertEqual(accumulator.feed(_chunk(content="Hi")), [])
+        self.assertEqual(accumulator.feed(_chunk(tool_calls=[_tool_delta(0, "call_0", "read", '{"pa')])), [0])
+        self.assertEqual(accumulator.feed(_chunk(tool_calls=[_tool_delta(0, arguments='th": "a"}')])), [])
+        accumulator.feed(_chunk(tool_calls=[_tool_delta(1, "call_1", "list", "{}")], finish_reason="tool_calls"))
+
+        self.assertEqual(accumulator.content.text, "Hi")
+        self.assertEqual(accumulator.chunk_count, 4)
+        self.assertEqual(accumulator.finish_reason, "tool_calls")
+        tool_calls = accumulator.tool_calls()
+        self.assertEqual([tc.id for tc in tool_calls], ["call_0", "call_1"])
+        self.assertEqual(tool_calls[0].function.name, "read")
+        self.assertEqual(tool_calls[0].function.arguments_dict, {"path": "a"})
+
+    def test_no_tool_calls(self):
+        """测试没有工具调用时返回 None"""
+        accumulator = StreamAccumulator()
+        accumulator.feed(_chunk(content="Hi"))
+        self.assertIsNone(accumulator.tool_calls())
+
+    def test_subscribers_see_accumulated_state(self):
+        """测试订阅者在 chunk 累积之后被调用"""
+        accumulator = StreamAccumulator()
+        seen = []
+        accumulator.subscribe(lambda chunk, acc: seen.append(acc.content.text))
+
+        accumulator.feed(_chunk(content="a"))
+        accumulator.feed(_chunk(content="b"))
+
+        self.assertEqual(seen, ["a", "ab"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -133,6 +133,24 @@ class TestMCPTool(unittest.TestCase):
         # 验证工具名称包含命名空间前缀，使用下划线分隔
         self.assertEqual(tool.name, "test_server_test_tool")
 
+    def test_tool_not_concurrency_safe(self):
+        """测试MCP工具不并发执行，且视为可能修改工作区"""
+        from eflycode.core.mcp.tool import MCPTool
+
+        mock_client = MagicMock()
+        mock_client.server_name = "test_server"
+
+        tool = MCPTool(
+            client=mock_client,
+            tool_name="test_tool",
+            description="Test tool",
+            input_schema={"type": "object", "properties": {}},
+        )
+
+        self.assertEqual(tool.permission, "read")
+        self.assertFalse(tool.concurrency_safe)
+        self.assertTrue(tool.mutates_workspace)
+
     def test_tool_name_sanitization(self):
         """测试工具名称清理，处理特殊字符"""
         from eflycode.core.mcp.tool import MCPTool
@@ -4,9 +4,11 @@ import os
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 from eflycode.core.agent.base import BaseAgent
 from eflycode.core.config.config_manager import ConfigManager
+from eflycode.core.context.budget import PROMPT_COMPONENT_SYSTEM
 from eflycode.core.llm.protocol import LLMRequest, Message
 from eflycode.core.llm.providers.base import LLMProvider
 from eflycode.core.llm.advisors.system_prompt_advisor import SystemPromptAdvisor
@@ -271,3 +273,23 @@ class TestSystemPromptAdvisor(unittest.TestCase):
         self.assertEqual(result.messages[2].content, "Response")
         self.assertEqual(result.messages[3].content, "Second message")
 
+    def test_first_request_budget_counts_system_prompt(self):
+        """测试第一次请求构建上下文时已经记录了系统提示词，且发送时复用渲染结果"""
+        advisor = next(a for a in self.agent.get_advisors() if isinstance(a, SystemPromptAdvisor))
+        session = self.agent.session
+        recorded = {}
+        original_get_context = session.get_context
+
+        def get_context(*args, **kwargs):
+            recorded.update(session._prompt_components)
+            return original_get_context(*args, **kwargs)
+
+        with patch.object(session, "get_context", side_effect=get_context), patch.object(
+            advisor, "_render_system_prompt", wraps=advisor._render_system_prompt
+        ) as render:
+            request = self.agent._prepare_request("Hello", stream=False)
+            result = advisor.before_call(request)
+
+        self.assertTrue(recorded[PROMPT_COMPONENT_SYSTEM])
+        self.assertEqual(result.messages[0].content, recorded[PROMPT_COMPONENT_SYSTEM])
+        render.assert_called_once()
@@ -29,6 +29,7 @@ class TestExecuteCommandTool(unittest.TestCase):
         self.assertEqual(self.tool.name, "execute_command")
         self.assertEqual(self.tool.type, "function")
         self.assertEqual(self.tool.permission, "read")
+        self.assertFalse(self.tool.concurrency_safe)
         self.assertIsNotNone(self.tool.description)
         self.assertIsNotNone(self.tool.parameters)
 
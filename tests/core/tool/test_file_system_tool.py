@@ -38,6 +38,14 @@ class TestFileSystemTools(unittest.TestCase):
         tool = ListDirectoryTool()
         self.assertEqual(tool.permission, "read")
 
+    def test_concurrency_safe_tools(self):
+        """测试只有内置的只读工具声明为可并发执行"""
+        for tool_class in (ListDirectoryTool, ReadFileTool, SearchFileContentTool, ReadManyFilesTool, GlobSearchTool):
+            self.assertTrue(tool_class().concurrency_safe, tool_class.__name__)
+        for tool_class in (WriteFileTool, ReplaceTool, DeleteFileTool, MoveFileTool):
+            self.assertFalse(tool_class().concurrency_safe, tool_class.__name__)
+            self.assertTrue(tool_class().mutates_workspace, tool_class.__name__)
+
     def test_list_directory_tool_display(self):
         """测试 ListDirectoryTool 的 display 方法"""
         tool = ListDirectoryTool()
@@ -0,0 +1,129 @@
+"""工具输出存储和 ReadToolOutputTool 测试用例"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from eflycode.core.agent.base import BaseAgent
+from eflycode.core.tool.errors import ToolExecutionError
+from eflycode.core.tool.output_store import ToolOutputStore
+from eflycode.core.tool.read_tool_output_tool import ReadToolOutputTool
+from tests.core.agent.test_agent import MockProvider
+from tests.core.agent.test_run_loop import MockTool
+
+
+class TestToolOutputStore(unittest.TestCase):
+    """ToolOutputStore 测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = ToolOutputStore(self.temp_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_put_is_content_addressed(self):
+        """测试相同内容只保存一份"""
+        handle = self.store.put("abc")
+
+        self.assertEqual(self.store.put("abc"), handle)
+        self.assertNotEqual(self.store.put("abd"), handle)
+        self.assertEqual(len(list(self.temp_dir.iterdir())), 2)
+
+    def test_read_pages(self):
+        """测试按 offset 分页读取"""
+        handle = self.store.put("0123456789")
+
+        self.assertEqual(self.store.read(handle, 2, 3), ("234", 10))
+        self.assertEqual(self.store.read(handle, 8), ("89", 10))
+
+    def test_read_invalid_handle(self):
+        """测试非法 handle 不会访问目录外的文件"""
+        with self.assertRaises(ValueError):
+            self.store.read("../config")
+
+    def test_spill(self):
+        """测试超过阈值时返回开头和结尾的预览"""
+        self.assertEqual(self.store.spill("short", threshold=10), "short")
+
+        content = "H" * 5 + "M" * 20 + "T" * 5
+        preview = self.store.spill(content, threshold=10, head=5, tail=5)
+
+        self.assertIn("HHHHH\n", preview)
+        self.assertTrue(preview.endswith("\nTTTTT"))
+        self.assertNotIn("M", preview.split("\n", 1)[1])
+        handle = preview.split("handle=", 1)[1][:16]
+        self.assertEqual(self.store.read(handle)[0], content)
+
+
+class TestReadToolOutputTool(unittest.TestCase):
+    """ReadToolOutputTool 测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = ToolOutputStore(self.temp_dir)
+        self.tool = ReadToolOutputTool(self.store)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_read_page(self):
+        """测试分页读取并给出下一页 offset"""
+        handle = self.store.put("0123456789")
+
+        result = self.tool.run(handle=handle, offset=3, limit=4)
+
+        self.assertIn("下一页 offset=7", result)
+        self.assertTrue(result.endswith("\n3456"))
+        self.assertIn("已读取到末尾", self.tool.run(handle=handle, offset=7))
+
+    def test_missing_handle(self):
+        """测试不存在的 handle"""
+        with self.assertRaises(ToolExecutionError):
+            self.tool.run(handle="0" * 16)
+
+
+class TestAgentToolResultLimit(unittest.TestCase):
+    """Agent 执行工具时的结果大小限制测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.agent = BaseAgent(
+            model="gpt-4",
+            provider=MockProvider(),
+            tools=[MockTool(name="small", result="ok"), MockTool(name="big", result="x" * 2000)],
+        )
+        self.agent.tool_output_store = ToolOutputStore(self.temp_dir)
+        self.agent.max_tool_result_chars = 100
+
+    def tearDown(self):
+        """测试后清理"""
+        self.agent.shutdown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_oversized_result_is_spilled(self):
+        """测试过长结果被替换为预览，完整内容可以读取"""
+        self.assertEqual(self.agent.run_tool("small"), "ok")
+
+        result = self.agent.run_tool("big")
+
+        self.assertIn("read_tool_output", result)
+        self.assertLess(len(result), 500)
+        handle = result.split("handle=", 1)[1][:16]
+        self.assertEqual(self.agent.tool_output_store.read(handle)[0], "x" * 2000)
+
+    def test_limit_disabled(self):
+        """测试关闭限制时返回完整结果"""
+        self.agent.max_tool_result_chars = None
+
+        self.assertEqual(self.agent.run_tool("big"), "x" * 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""ToolRegistry 测试用例"""
+
+import unittest
+
+from eflycode.core.llm.protocol import ToolFunctionParameters
+from eflycode.core.tool.base import BaseTool
+from eflycode.core.tool.registry import ToolRegistry
+
+
+class CountingTool(BaseTool):
+    """记录 definition 构建次数的工具"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self.description_text = f"{name} tool"
+        self.definition_builds = 0
+        self.revision = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def type(self) -> str:
+        return "function"
+
+    @property
+    def permission(self) -> str:
+        return "read"
+
+    @property
+    def description(self) -> str:
+        self.definition_builds += 1
+        return self.description_text
+
+    @property
+    def parameters(self) -> ToolFunctionParameters:
+        return ToolFunctionParameters(properties={})
+
+    @property
+    def definition_version(self) -> int:
+        return self.revision
+
+    def do_run(self, **kwargs) -> str:
+        return "ok"
+
+
+class TestToolRegistry(unittest.TestCase):
+    """ToolRegistry 测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tool_a = CountingTool("a")
+        self.tool_b = CountingTool("b")
+        self.registry = ToolRegistry([self.tool_a, self.tool_b])
+
+    def test_definitions_are_cached(self):
+        """测试工具未变化时复用同一组定义对象"""
+        first = self.registry.get_definitions()
+        second = self.registry.get_definitions()
+
+        self.assertEqual([d.function.name for d in first], ["a", "b"])
+        self.assertIsNot(first, second)
+        for a, b in zip(first, second):
+            self.assertIs(a, b)
+        self.assertEqual(self.tool_a.definition_builds, 1)
+
+    def test_add_and_remove_bump_version(self):
+        """测试增删工具使版本号递增，未变化的工具定义不重建"""
+        self.registry.get_definitions()
+        version = self.registry.version
+
+        self.registry.add(CountingTool("c"))
+        self.assertGreater(self.registry.version, version)
+        self.assertEqual([d.function.name for d in self.registry.get_definitions()], ["a", "b", "c"])
+        self.assertEqual(self.tool_a.definition_builds, 1)
+
+        self.assertTrue(self.registry.remove("b"))
+        self.assertFalse(self.registry.remove("b"))
+        self.assertEqual([d.function.name for d in self.registry.get_definitions()], ["a", "c"])
+        self.assertNotIn("b", self.registry)
+        self.assertEqual(len(self.registry), 2)
+
+    def test_definition_version_change_rebuilds_tool(self):
+        """测试工具 definition_version 变化时只重建该工具的定义"""
+        first = self.registry.get_definitions()
+
+        self.tool_b.description_text = "changed"
+        self.tool_b.revision += 1
+        second = self.registry.get_definitions()
+
+        self.assertIs(second[0], first[0])
+        self.assertEqual(second[1].function.description, "changed")
+        self.assertEqual(self.tool_b.definition_builds, 2)
+
+    def test_invalidate(self):
+        """测试显式失效后重建全部定义"""
+        first = self.registry.get_definitions()
+
+        self.registry.invalidate()
+        second = self.registry.get_definitions()
+
+        self.assertIsNot(second[0], first[0])
+        self.assertEqual(self.tool_a.definition_builds, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
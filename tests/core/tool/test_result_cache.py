@@ -0,0 +1,222 @@
+"""ToolResultCache 测试用例"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from eflycode.core.agent.base import BaseAgent
+from eflycode.core.llm.protocol import ToolFunctionParameters
+from eflycode.core.tool.base import BaseTool, ToolGroup
+from eflycode.core.tool.file_system_tool import SearchFileContentTool
+from eflycode.core.tool.result_cache import TOOL_RESULT_CACHED_MARK, ToolResultCache
+from tests.core.agent.test_agent import MockProvider
+
+
+class ReadTool(BaseTool):
+    """读取文件内容并记录执行次数的可缓存工具"""
+
+    def __init__(self):
+        self.runs = 0
+
+    @property
+    def name(self) -> str:
+        return "read"
+
+    @property
+    def type(self) -> str:
+        return "function"
+
+    @property
+    def permission(self) -> str:
+        return "read"
+
+    @property
+    def concurrency_safe(self) -> bool:
+        return True
+
+    @property
+    def cacheable(self) -> bool:
+        return True
+
+    @property
+    def description(self) -> str:
+        return "Read file"
+
+    @property
+    def parameters(self) -> ToolFunctionParameters:
+        return ToolFunctionParameters(properties={"file_path": {"type": "string"}})
+
+    def do_run(self, file_path: str, **kwargs) -> str:
+        self.runs += 1
+        return Path(file_path).read_text(encoding="utf-8")
+
+
+class WriteTool(ReadTool):
+    """写入文件的工具"""
+
+    @property
+    def name(self) -> str:
+        return "write"
+
+    @property
+    def permission(self) -> str:
+        return "edit"
+
+    @property
+    def concurrency_safe(self) -> bool:
+        return False
+
+    @property
+    def cacheable(self) -> bool:
+        return False
+
+    def do_run(self, file_path: str, content: str = "", **kwargs) -> str:
+        Path(file_path).write_text(content, encoding="utf-8")
+        return "ok"
+
+
+class TestToolResultCache(unittest.TestCase):
+    """ToolResultCache 测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.file_path = self.temp_dir / "a.txt"
+        self.file_path.write_text("hello", encoding="utf-8")
+        self.tool = ReadTool()
+        self.cache = ToolResultCache()
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, **kwargs):
+        result, slot = self.cache.lookup(self.tool, kwargs, self.temp_dir)
+        if result is None:
+            result = self.tool.run(**kwargs)
+            self.cache.store(slot, result)
+        return result
+
+    def test_hit_and_miss_counters(self):
+        """测试相同调用命中缓存"""
+        self.assertEqual(self._run(file_path=str(self.file_path)), "hello")
+        self.assertEqual(self._run(file_path=str(self.file_path)), "hello")
+
+        self.assertEqual(self.tool.runs, 1)
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+
+    def test_path_arguments_are_normalized(self):
+        """测试相对路径和绝对路径使用同一缓存"""
+        self._run(file_path=str(self.file_path))
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            self._run(file_path="./a.txt")
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(self.tool.runs, 1)
+
+    def test_file_change_misses(self):
+        """测试文件被外部修改后缓存失效"""
+        self._run(file_path=str(self.file_path))
+        self.file_path.write_text("changed content", encoding="utf-8")
+
+        self.assertEqual(self._run(file_path=str(self.file_path)), "changed content")
+        self.assertEqual(self.tool.runs, 2)
+
+    def test_store_skipped_after_invalidate(self):
+        """测试执行期间缓存被清空时不写入结果"""
+        result, slot = self.cache.lookup(self.tool, {"file_path": str(self.file_path)}, self.temp_dir)
+        self.cache.invalidate()
+        self.cache.store(slot, "stale")
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_not_cacheable_tool(self):
+        """测试不可缓存的工具不参与缓存"""
+        result, slot = self.cache.lookup(WriteTool(), {"file_path": str(self.file_path)}, self.temp_dir)
+
+        self.assertIsNone(result)
+        self.assertIsNone(slot)
+        self.assertEqual(self.cache.misses, 0)
+
+    def test_max_entries(self):
+        """测试超过容量时淘汰最久未使用的结果"""
+        cache = ToolResultCache(max_entries=1)
+        for name in ["a", "b"]:
+            _, slot = cache.lookup(self.tool, {"file_path": name}, None)
+            cache.store(slot, name)
+
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.lookup(self.tool, {"file_path": "b"}, None)[0], "b")
+
+
+class TestAgentToolResultCache(unittest.TestCase):
+    """Agent 执行工具时的结果缓存测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.file_path = str(self.temp_dir / "a.txt")
+        Path(self.file_path).write_text("hello", encoding="utf-8")
+        self.read_tool = ReadTool()
+        self.agent = BaseAgent(
+            model="gpt-4", provider=MockProvider(), tools=[self.read_tool, WriteTool(), SearchFileContentTool()]
+        )
+
+    def tearDown(self):
+        """测试后清理"""
+        self.agent.shutdown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_cached_result_is_marked(self):
+        """测试命中缓存的结果带有标记"""
+        first = self.agent.run_tool("read", file_path=self.file_path)
+        second = self.agent.run_tool("read", file_path=self.file_path)
+
+        self.assertEqual(first, "hello")
+        self.assertEqual(second, TOOL_RESULT_CACHED_MARK + "hello")
+        self.assertEqual(self.read_tool.runs, 1)
+
+    def test_mutating_tool_invalidates(self):
+        """测试修改工作区的工具执行后缓存失效"""
+        self.agent.run_tool("read", file_path=self.file_path)
+        self.agent.run_tool("write", file_path=str(self.temp_dir / "b.txt"), content="x")
+
+        self.assertEqual(self.agent.run_tool("read", file_path=self.file_path), "hello")
+        self.assertEqual(self.read_tool.runs, 2)
+
+    def test_tool_group_changes_invalidate(self):
+        """测试添加和移除工具组后缓存失效"""
+        self.agent.run_tool("read", file_path=self.file_path)
+        self.agent.add_tool_group(ToolGroup("extra", "Extra tools", []))
+        self.assertEqual(self.agent.run_tool("read", file_path=self.file_path), "hello")
+        self.assertEqual(self.read_tool.runs, 2)
+
+        self.assertTrue(self.agent.remove_tool_group("extra"))
+        self.assertEqual(self.agent.run_tool("read", file_path=self.file_path), "hello")
+        self.assertEqual(self.read_tool.runs, 3)
+
+    def test_search_sees_in_place_edit(self):
+        """测试文件被原地修改后再次搜索返回新内容
+
+        原地修改不改变目录的 mtime，搜索工具的结果无法用参数中的路径判断是否过期，不能缓存
+        """
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        self.addCleanup(os.chdir, cwd)
+
+        first = self.agent.run_tool("search_file_content", pattern="needle")
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            f.write("needle")
+        second = self.agent.run_tool("search_file_content", pattern="needle")
+
+        self.assertNotIn("L1: needle", first)
+        self.assertNotIn(TOOL_RESULT_CACHED_MARK, second)
+        self.assertIn("L1: needle", second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""ToolSelector 测试用例"""
+
+import unittest
+
+from eflycode.core.llm.protocol import (
+    Message,
+    ToolCall,
+    ToolCallFunction,
+    ToolDefinition,
+    ToolFunction,
+    ToolFunctionParameters,
+)
+from eflycode.core.tool.selection import ToolSelector
+
+
+def _tool(name, description, **properties):
+    return ToolDefinition(
+        function=ToolFunction(
+            name=name,
+            description=description,
+            parameters=ToolFunctionParameters(
+                properties={key: {"type": "string", "description": value} for key, value in properties.items()}
+            ),
+        )
+    )
+
+
+class TestToolSelector(unittest.TestCase):
+    """ToolSelector 测试类"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.selector = ToolSelector(top_k=2)
+        self.tools = [
+            _tool("read_file", "Read a file from the workspace", file_path="Path of the file"),
+            _tool("github_create_issue", "Create a new issue in a GitHub repository", title="Issue title"),
+            _tool("github_list_pull_requests", "List pull requests of a GitHub repository"),
+            _tool("slack_post_message", "Post a message to a Slack channel", channel="Channel name"),
+            _tool("jira_create_ticket", "Create a Jira ticket", summary="Ticket summary"),
+            _tool("postgres_query", "Run a SQL query against the PostgreSQL database", sql="SQL statement"),
+        ]
+        self.core = ["read_file"]
+
+    def _names(self, tools):
+        return [tool.function.name for tool in tools]
+
+    def test_keeps_core_and_most_relevant_tools(self):
+        """测试保留核心工具和与最近对话最相关的工具，保持原来的顺序"""
+        messages = [Message(role="user", content="Please open an issue on GitHub about the failing SQL query")]
+        selected = self.selector.select(self.tools, messages, core_tools=self.core)
+        names = self._names(selected)
+        self.assertEqual(names[0], "read_file")
+        self.assertIn("github_create_issue", names)
+        self.assertIn("postgres_query", names)
+        self.assertEqual(len(names), 3)
+        self.assertEqual(names, [name for name in self._names(self.tools) if name in names])
+
+    def test_keeps_previously_used_tools(self):
+        """测试会话中用过的工具始终保留"""
+        tool_call = ToolCall(
+            id="call_1",
+            type="function",
+            function=ToolCallFunction(name="slack_post_message", arguments="{}"),
+        )
+        messages = [
+            Message(role="user", content="notify the team"),
+            Message(role="assistant", tool_calls=[tool_call]),
+            Message(role="tool", content="ok", tool_call_id="call_1"),
+            Message(role="user", content="now create a jira ticket"),
+        ]
+        names = self._names(self.selector.select(self.tools, messages, core_tools=self.core))
+        self.assertIn("slack_post_message", names)
+        self.assertIn("jira_create_ticket", names)
+
+    def test_tool_outputs_do_not_affect_relevance(self):
+        """测试工具输出中的内容不参与相关性计算"""
+        messages = [
+            Message(role="user", content="hello"),
+            Message(role="tool", content="slack channel message", tool_call_id="call_1"),
+        ]
+        names = self._names(self.selector.select(self.tools, messages, core_tools=self.core))
+        self.assertEqual(names, ["read_file"])
+
+    def test_few_tools_are_not_filtered(self):
+        """测试非核心工具不超过 top_k 时发送全部工具"""
+        tools = self.tools[:3]
+        self.assertIs(self.selector.select(tools, [], core_tools=self.core), tools)
@@ -3,6 +3,7 @@
 import unittest
 
 from eflycode.core.llm.protocol import ChatCompletion, Message
+from eflycode.core.llm.stream_accumulator import TextAccumulator
 from eflycode.core.ui.output import UIOutput
 from eflycode.core.ui.renderer import Renderer
 from eflycode.core.ui.ui_event_queue import UIEventQueue
@@ -91,7 +92,7 @@ class TestRenderer(unittest.TestCase):
         self.ui_queue.process_events()
 
         # 消息应该被添加到缓冲区
-        self.assertEqual(self.renderer._message_buffer, "Hello World")
+        self.assertEqual(self.renderer._message_buffer.text, "Hello World")
 
     def test_handle_message_stop(self):
         """测试处理消息结束事件"""
@@ -188,7 +189,7 @@ class TestRenderer(unittest.TestCase):
     def test_tick_typewriter_effect(self):
         """测试打字机效果"""
         # 添加消息到缓冲区
-        self.renderer._message_buffer = "Hello World"
+        self.renderer._message_buffer = TextAccumulator("Hello World")
         self.renderer._message_index = 0
 
         # 多次 tick 应该逐步输出
@@ -263,7 +264,7 @@ class TestRenderer(unittest.TestCase):
     def test_message_buffer_clearing(self):
         """测试消息缓冲区清空"""
         # 添加消息
-        self.renderer._message_buffer = "Test"
+        self.renderer._message_buffer = TextAccumulator("Test")
         self.renderer._message_index = 0
 
         # 任务开始应该清空缓冲区
@@ -271,7 +272,7 @@ class TestRenderer(unittest.TestCase):
         self.ui_queue.process_events()
         self.renderer.tick()
 
-        self.assertEqual(self.renderer._message_buffer, "")
+        self.assertEqual(self.renderer._message_buffer.text, "")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""链路追踪测试用例"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from eflycode.core.agent.base import BaseAgent
+from eflycode.core.agent.run_loop import AgentRunLoop
+from eflycode.core.llm.protocol import (
+    ChatCompletionChunk,
+    DeltaMessage,
+    DeltaToolCall,
+    DeltaToolCallFunction,
+)
+from eflycode.core.utils.tracing import Tracer, trace_span, traced
+from tests.core.agent.test_run_loop import MockStreamProvider, MockTool
+
+
+def _tool_call_chunks():
+    return [
+        ChatCompletionChunk(
+            id="chatcmpl-1",
+            object="chat.completion.chunk",
+            created=1234567890,
+            model="gpt-4",
+            delta=DeltaMessage(
+                tool_calls=[
+                    DeltaToolCall(
+                        index=i,
+                        id=f"call_{i}",
+                        type="function",
+                        function=DeltaToolCallFunction(name="mock_tool", arguments="{}"),
+                    )
+                    for i in range(2)
+                ]
+            ),
+            finish_reason="tool_calls",
+        )
+    ]
+
+
+class TestTracer(unittest.TestCase):
+    """Tracer 测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        Tracer._instance = None
+
+    def tearDown(self):
+        """测试后清理"""
+        Tracer.get_instance().disable()
+        Tracer._instance = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _read_events(self, tracer):
+        # trace 文件是不闭合的 JSON 数组
+        text = tracer.trace_file.read_text(encoding="utf-8").rstrip().rstrip(",")
+        return json.loads(text + "]")
+
+    def test_disabled_by_default(self):
+        """测试默认关闭，span 不记录任何内容"""
+        tracer = Tracer.get_instance()
+        self.assertFalse(tracer.enabled)
+
+        with trace_span("noop") as span:
+            span.set(a=1)
+        with tracer.turn() as turn_id:
+            self.assertIsNone(turn_id)
+
+        self.assertIsNone(tracer.trace_file)
+
+    def test_turn_summary_and_chrome_trace(self):
+        """测试回合汇总和 Chrome trace 事件"""
+        tracer = Tracer.get_instance()
+        tracer.enable(self.temp_dir)
+
+        @traced("work")
+        def work():
+            with trace_span("inner", item=1):
+                pass
+
+        with tracer.turn(session_id="s1") as turn_id:
+            work()
+            work()
+            try:
+                with trace_span("failing"):
+                    raise ValueError("boom")
+            except ValueError:
+                pass
+
+        events = self._read_events(tracer)
+        names = [event["name"] for event in events]
+        self.assertEqual(names.count("inner"), 2)
+        self.assertIn("agent.turn", names)
+        self.assertTrue(all(event["ph"] == "X" for event in events))
+        failing = next(event for event in events if event["name"] == "failing")
+        self.assertEqual(failing["args"]["error"], "ValueError")
+
+        records = [json.loads(line) for line in (self.temp_dir / "turns.jsonl").read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["turn_id"], turn_id)
+        self.assertEqual(records[0]["session_id"], "s1")
+        self.assertEqual(records[0]["spans"]["work"]["count"], 2)
+        self.assertNotIn("agent.turn", records[0]["spans"])
+
+    def test_agent_run_loop_spans(self):
+        """测试运行循环中各阶段的 span，包括并发执行的工具"""
+        tracer = Tracer.get_instance()
+        tracer.enable(self.temp_dir)
+
+        from eflycode.core.llm.protocol import ChatCompletion, Message
+
+        provider = MockStreamProvider(
+            responses=[
+                _tool_call_chunks(),
+                ChatCompletion(
+                    id="chatcmpl-2",
+                    object="chat.completion",
+                    created=1234567890,
+                    model="gpt-4",
+                    message=Message(role="assistant", content="Done"),
+                ),
+            ]
+        )
+        agent = BaseAgent(model="gpt-4", provider=provider, tools=[MockTool()])
+        try:
+            AgentRunLoop(agent).run("Use tool")
+        finally:
+            agent.shutdown()
+
+        records = [json.loads(line) for line in (self.temp_dir / "turns.jsonl").read_text(encoding="utf-8").splitlines()]
+        spans = records[0]["spans"]
+        self.assertEqual(spans["tool.run"]["count"], 2)
+        self.assertEqual(spans["llm.stream"]["count"], 2)
+        self.assertEqual(spans["llm.time_to_first_token"]["count"], 2)
+        self.assertIn("agent.prepare_request", spans)
+
+    def test_advisor_chain_spans(self):
+        """测试 advisor 链的 span，after_stream 按流累计为一个 span"""
+        tracer = Tracer.get_instance()
+        tracer.enable(self.temp_dir)
+
+        from eflycode.core.llm.advisor import Advisor, AdvisorChain
+        from eflycode.core.llm.protocol import LLMRequest, Message
+
+        chain = AdvisorChain([Advisor()])
+        request = LLMRequest(model="gpt-4", messages=[Message(role="user", content="hi")])
+        chunks = _tool_call_chunks() * 3
+
+        with tracer.turn():
+            self.assertEqual(len(list(chain.stream(request, lambda r: iter(chunks)))), 3)
+
+        events = self._read_events(tracer)
+        after_stream = [event for event in events if event["name"] == "advisor.after_stream"]
+        self.assertEqual(len(after_stream), 1)
+        self.assertEqual(after_stream[0]["args"]["chunks"], 3)
+        self.assertIn("advisor.before_stream", [event["name"] for event in events])
+
+
+if __name__ == "__main__":
+    unittest.main()